@@ -7,23 +7,30 @@ from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 
 from app.handlers.employer_responses_handlers import employer_responses_router
-from app.config import BOT_TOKEN
-from app.db.database import AsyncSessionFactory
+from app.config import BOT_TOKEN, WORKER_PROCESSES, DB_POOL_METRICS_LOG_INTERVAL_SECONDS, DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS, FUNNEL_ROLLUP_INTERVAL_SECONDS, COOLDOWN_PURGE_INTERVAL_SECONDS, INTERACTION_RETENTION_INTERVAL_SECONDS, PROFILE_PURGE_INTERVAL_SECONDS, MOTIVATION_USAGE_FLUSH_SECONDS, BROKEN_PHOTO_CHECK_INTERVAL_SECONDS, BROADCAST_LEASE_SECONDS
+from app.db.database import replica_engine
 from app.db.models import User, UserRole, ApplicantProfile, EmployerProfile, ReferralLink, ReferralUsage
-from sqlalchemy import select
+from sqlalchemy import select, update, case, literal, literal_column, true, BigInteger, Integer, Boolean
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
 from app.handlers.registration_handlers import registration_router
-from app.handlers.settings_handlers import settings_router, show_applicant_settings_menu, show_employer_main_menu
+from app.handlers.settings_handlers import settings_router, show_applicant_settings_menu, show_employer_main_menu, new_responses_count_query
 from app.handlers.browsing_handlers import browsing_router
+from app.handlers.compact_browsing_handlers import compact_browsing_router
 from app.handlers.admin_handlers import admin_router
 from app.middlewares.access_middleware import BanCheckMiddleware
+from app.middlewares.db_session_middleware import DbSessionMiddleware
+from app.middlewares.dedupe_middleware import UpdateDedupeMiddleware
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from app.services.scheduler_jobs import check_and_send_reengagement_notifications
 from datetime import datetime, timezone
 import functools
-from app.services.scheduler_jobs import daily_check_employers_subscription
+from app.services.scheduler_jobs import daily_check_employers_subscription, log_db_pool_metrics, log_update_dedupe_stats, check_replica_lag, update_funnel_rollups, purge_feed_cooldowns, archive_old_interactions, purge_deleted_employer_profiles, flush_motivation_usage_counts, check_broken_photos
+from app.services.sharding import is_primary_shard, run_sharded_ingress
+from app.services.broadcast_service import resume_running_broadcasts
+from app.services.outbox_service import start_outbox_dispatcher
 
 from app.keyboards.reply_keyboards import start_keyboard
 
@@ -34,11 +41,93 @@ logger = logging.getLogger(__name__)
 bot_instance = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
 
+# Порядок важен: дубликаты отсеиваются до сессии БД, сессия апдейта должна появиться в data до проверки бана
+dp.update.outer_middleware(UpdateDedupeMiddleware())
+dp.update.outer_middleware(DbSessionMiddleware())
 dp.update.outer_middleware(BanCheckMiddleware())
 
 
+def build_start_upsert_statement(user_id: int, username: str | None, first_name: str | None,
+                                 last_name: str | None, ref_code: str | None):
+    """
+    Один SQL-запрос для /start:
+    upsert пользователя с RETURNING, lateral-выборка анкет соискателя/работодателя с тем, что нужно меню
+    (статус анкеты, число новых откликов) и (если есть ref_code) запись перехода по реферальной ссылке.
+    """
+    upserted_user = insert(User).values(
+        telegram_id=user_id,
+        username=username,
+        first_name=first_name,
+        last_name=last_name,
+    ).on_conflict_do_update(
+        index_elements=['telegram_id'],
+        set_={
+            'username': username,
+            'first_name': first_name,
+            'last_name': last_name,
+            'last_activity_date': func.now()
+        }
+    ).returning(User.telegram_id, User.role, User.first_name).cte("upserted_user")
+
+    applicant_profile_lookup = (
+        select(ApplicantProfile.id, ApplicantProfile.is_active)
+        .where(ApplicantProfile.user_id == upserted_user.c.telegram_id)
+        .limit(1)
+        .lateral("applicant_profile_lookup")
+    )
+    employer_profile_lookup = (
+        select(
+            EmployerProfile.id,
+            EmployerProfile.is_active,
+            new_responses_count_query(EmployerProfile.id).scalar_subquery().label("new_responses_count"),
+        )
+        .where(EmployerProfile.user_id == upserted_user.c.telegram_id)
+        .limit(1)
+        .lateral("employer_profile_lookup")
+    )
+
+    result_columns = [
+        upserted_user.c.role,
+        upserted_user.c.first_name,
+        applicant_profile_lookup.c.id.is_not(None).label("has_applicant_profile"),
+        employer_profile_lookup.c.id.is_not(None).label("has_employer_profile"),
+        applicant_profile_lookup.c.is_active.label("applicant_profile_is_active"),
+        employer_profile_lookup.c.is_active.label("employer_profile_is_active"),
+        employer_profile_lookup.c.new_responses_count,
+    ]
+
+    if ref_code:
+        # FK на users проверяется в конце запроса, поэтому новый пользователь уже будет вставлен
+        referral_usage_insert = insert(ReferralUsage).from_select(
+            ["link_id", "user_id"],
+            select(ReferralLink.id, literal(user_id, BigInteger)).where(ReferralLink.code == ref_code)
+        )
+        referral_usage = referral_usage_insert.on_conflict_do_update(
+            constraint="uq_referral_usage_link_user",
+            set_={'use_count': ReferralUsage.use_count + 1, 'last_used_at': func.now()}
+        ).returning(
+            ReferralUsage.link_id,
+            # xmax = 0 только у только что вставленной строки: это первый переход пользователя по ссылке
+            literal_column("(xmax = 0)", Boolean).label("is_first_touch")
+        ).cte("referral_usage")
+        link_counters = update(ReferralLink).where(ReferralLink.id == referral_usage.c.link_id).values(
+            total_clicks=ReferralLink.total_clicks + 1,
+            unique_users=ReferralLink.unique_users + case((referral_usage.c.is_first_touch, 1), else_=0)
+        ).returning(ReferralLink.id).cte("referral_link_counters")
+        result_columns.append(select(link_counters.c.id).scalar_subquery().label("referral_link_id"))
+    else:
+        result_columns.append(literal(None, Integer).label("referral_link_id"))
+
+    return (
+        select(*result_columns)
+        .select_from(upserted_user)
+        .outerjoin(applicant_profile_lookup, true())
+        .outerjoin(employer_profile_lookup, true())
+    )
+
+
 @dp.message(CommandStart())
-async def command_start_handler(message: Message, state: FSMContext, command: CommandObject) -> None:
+async def command_start_handler(message: Message, state: FSMContext, command: CommandObject, session: AsyncSession) -> None:
     await state.clear() 
     
     user_id = message.from_user.id
@@ -49,76 +138,50 @@ async def command_start_handler(message: Message, state: FSMContext, command: Co
     ref_code = command.args
     if ref_code:
         logger.info(f"User {user_id} started with referral code: {ref_code}")
-        async with AsyncSessionFactory() as session:
-            async with session.begin():
-                link_result = await session.execute(
-                    select(ReferralLink).where(ReferralLink.code == ref_code)
-                )
-                link = link_result.scalar_one_or_none()
-                
-                if link:
-                    new_usage = ReferralUsage(link_id=link.id, user_id=user_id)
-                    session.add(new_usage)
-                    logger.info(f"Logged usage for link ID {link.id} by user {user_id}")
-                else:
-                    logger.warning(f"User {user_id} used an invalid referral code: {ref_code}")
-
-    async with AsyncSessionFactory() as session:
-        async with session.begin(): 
-            stmt = insert(User).values(
-                telegram_id=user_id,
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-            ).on_conflict_do_update(
-                index_elements=['telegram_id'],
-                set_={
-                    'username': username,
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    'last_activity_date': func.now()
-                }
-            )
-            await session.execute(stmt)
-            logger.info(f"User {user_id} ({username}) data upserted by /start.")
-            db_user = await session.get(User, user_id)
-        
-        if db_user:
-            display_name_for_menu = db_user.first_name if db_user.first_name else message.from_user.first_name
-            
-            if db_user.role == UserRole.APPLICANT:
-                async with session.begin(): 
-                    applicant_profile_db = (await session.execute(
-                        select(ApplicantProfile).where(ApplicantProfile.user_id == user_id)
-                    )).scalar_one_or_none()
-
-                if applicant_profile_db:
-                    logger.info(f"User {user_id} is Applicant. Showing settings menu.")
-                    await show_applicant_settings_menu(message, user_id, display_name_for_menu) 
-                    return
-                else:
-                    logger.warning(f"User {user_id} has APPLICANT role but no profile. Offering role selection.")
-            
-            elif db_user.role == UserRole.EMPLOYER:
-                async with session.begin(): 
-                    employer_profile_db = (await session.execute(
-                        select(EmployerProfile).where(EmployerProfile.user_id == user_id)
-                    )).scalar_one_or_none()
-                
-                if employer_profile_db:
-                    logger.info(f"User {user_id} is Employer. Showing employer main menu.")
-                    await show_employer_main_menu(message, user_id, display_name_for_menu)
-                    return
-                else:
-                    logger.warning(f"User {user_id} has EMPLOYER role but no profile. Offering role selection.")
+
+    # Сессия апдейта (DbSessionMiddleware). Все, что нужно меню, приходит в этой же строке
+    start_row = (await session.execute(
+        build_start_upsert_statement(user_id, username, first_name, last_name, ref_code)
+    )).one_or_none()
+    # Строки пользователя и счетчиков ссылки заблокированы до коммита - не держим их, пока отправляем меню
+    await session.commit()
+    logger.info(f"User {user_id} ({username}) data upserted by /start.")
+
+    if ref_code:
+        if start_row and start_row.referral_link_id:
+            logger.info(f"Logged usage for link ID {start_row.referral_link_id} by user {user_id}")
         else:
-            logger.error(f"User {user_id} NOT FOUND in DB after UPSERT in /start handler!")
+            logger.warning(f"User {user_id} used an invalid referral code: {ref_code}")
 
-        await message.answer(
-            f"Привет, {message.from_user.full_name}!\n"
-            "Что тебе нужно: работа или работник?\n\n",
-            reply_markup=start_keyboard
-        )
+    if start_row:
+        display_name_for_menu = start_row.first_name if start_row.first_name else message.from_user.first_name
+        
+        if start_row.role == UserRole.APPLICANT:
+            if start_row.has_applicant_profile:
+                logger.info(f"User {user_id} is Applicant. Showing settings menu.")
+                await show_applicant_settings_menu(message, user_id, display_name_for_menu, session=session,
+                                                   profile_is_active=start_row.applicant_profile_is_active)
+                return
+            else:
+                logger.warning(f"User {user_id} has APPLICANT role but no profile. Offering role selection.")
+        
+        elif start_row.role == UserRole.EMPLOYER:
+            if start_row.has_employer_profile:
+                logger.info(f"User {user_id} is Employer. Showing employer main menu.")
+                await show_employer_main_menu(message, user_id, display_name_for_menu, session=session,
+                                              profile_is_active=start_row.employer_profile_is_active,
+                                              new_responses_count=start_row.new_responses_count)
+                return
+            else:
+                logger.warning(f"User {user_id} has EMPLOYER role but no profile. Offering role selection.")
+    else:
+        logger.error(f"User {user_id} NOT FOUND in DB after UPSERT in /start handler!")
+
+    await message.answer(
+        f"Привет, {message.from_user.full_name}!\n"
+        "Что тебе нужно: работа или работник?\n\n",
+        reply_markup=start_keyboard
+    )
         
 
 async def on_startup_scheduler(**kwargs): 
@@ -127,6 +190,53 @@ async def on_startup_scheduler(**kwargs):
     
     print("SCHEDULER: on_startup_scheduler called. Attempting to add and start job.")
     try:
+        # Задачи, которые нужны в каждом воркере (у каждого процесса свой пул соединений)
+        scheduler_from_data.add_job(
+            log_db_pool_metrics,
+            'interval',
+            seconds=DB_POOL_METRICS_LOG_INTERVAL_SECONDS,
+            id="db_pool_metrics_job",
+            replace_existing=True
+        )
+        scheduler_from_data.add_job(
+            log_update_dedupe_stats,
+            'interval',
+            seconds=DB_POOL_METRICS_LOG_INTERVAL_SECONDS,
+            id="update_dedupe_stats_job",
+            replace_existing=True
+        )
+        scheduler_from_data.add_job(
+            flush_motivation_usage_counts,
+            'interval',
+            seconds=MOTIVATION_USAGE_FLUSH_SECONDS,
+            id="motivation_usage_flush_job",
+            replace_existing=True
+        )
+        scheduler_from_data.add_job(
+            check_broken_photos,
+            'interval',
+            seconds=BROKEN_PHOTO_CHECK_INTERVAL_SECONDS,
+            args=[bot_from_data],
+            id="broken_photo_check_job",
+            replace_existing=True
+        )
+        if replica_engine is not None:
+            scheduler_from_data.add_job(
+                check_replica_lag,
+                'interval',
+                seconds=DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+                id="db_replica_lag_job",
+                next_run_time=datetime.now(timezone.utc),
+                replace_existing=True
+            )
+
+        if not is_primary_shard():
+            # В режиме нескольких воркеров рассылки и проверки подписки делает только шард 0
+            print("SCHEDULER: Not a primary shard, singleton jobs are skipped.")
+            if not scheduler_from_data.running:
+                scheduler_from_data.start()
+            return
+
         scheduler_from_data.add_job(
             check_and_send_reengagement_notifications, 
             'interval', 
@@ -144,6 +254,56 @@ async def on_startup_scheduler(**kwargs):
             id="daily_subscription_check_job",
             replace_existing=True
         )
+
+        # Рассылки, прерванные перезапуском или падением отправлявшего процесса, продолжаются с последнего чекпоинта
+        scheduler_from_data.add_job(
+            resume_running_broadcasts,
+            'interval',
+            seconds=BROADCAST_LEASE_SECONDS,
+            args=[bot_from_data],
+            id="broadcast_resume_job",
+            next_run_time=datetime.now(timezone.utc),
+            replace_existing=True
+        )
+
+        # PUSH работодателям из outbox_events (в т.ч. оставшиеся с прошлого запуска)
+        start_outbox_dispatcher(bot_from_data)
+
+        scheduler_from_data.add_job(
+            update_funnel_rollups,
+            'interval',
+            seconds=FUNNEL_ROLLUP_INTERVAL_SECONDS,
+            id="funnel_rollup_job",
+            next_run_time=datetime.now(timezone.utc),
+            replace_existing=True
+        )
+
+        scheduler_from_data.add_job(
+            purge_feed_cooldowns,
+            'interval',
+            seconds=COOLDOWN_PURGE_INTERVAL_SECONDS,
+            id="cooldown_purge_job",
+            replace_existing=True
+        )
+
+        # Архив взаимодействий: после роллапов воронки (переносятся только уже свернутые строки)
+        scheduler_from_data.add_job(
+            archive_old_interactions,
+            'interval',
+            seconds=INTERACTION_RETENTION_INTERVAL_SECONDS,
+            id="interaction_retention_job",
+            replace_existing=True
+        )
+
+        # Удаленные анкеты работодателей: зависимые строки пачками, потом сама анкета
+        scheduler_from_data.add_job(
+            purge_deleted_employer_profiles,
+            'interval',
+            seconds=PROFILE_PURGE_INTERVAL_SECONDS,
+            id="profile_purge_job",
+            next_run_time=datetime.now(timezone.utc),
+            replace_existing=True
+        )
         
         if not scheduler_from_data.running:
             scheduler_from_data.start()
@@ -157,20 +317,39 @@ async def on_startup_scheduler(**kwargs):
         traceback.print_exc()
 
 
-async def main() -> None:
-    logger.info("Starting bot...")
-    
-    scheduler = AsyncIOScheduler(timezone="Europe/Kyiv")
-    
-    workflow_data = {"scheduler_instance": scheduler}
-    
+_dispatcher_is_set_up = False
+
+
+def setup_dispatcher() -> Dispatcher:
+    global _dispatcher_is_set_up
+    if _dispatcher_is_set_up:
+        return dp
+
     dp.include_router(registration_router)
     dp.include_router(settings_router)
     dp.include_router(browsing_router)
+    dp.include_router(compact_browsing_router)
     dp.include_router(employer_responses_router)
     dp.include_router(admin_router)
     
     dp.startup.register(on_startup_scheduler) 
+    _dispatcher_is_set_up = True
+    return dp
+
+
+async def main() -> None:
+    logger.info("Starting bot...")
+
+    if WORKER_PROCESSES > 1:
+        logger.info(f"Sharded mode: {WORKER_PROCESSES} worker processes.")
+        await run_sharded_ingress(WORKER_PROCESSES)
+        return
+    
+    scheduler = AsyncIOScheduler(timezone="Europe/Kyiv")
+    
+    workflow_data = {"scheduler_instance": scheduler}
+    
+    setup_dispatcher()
 
     try:
         await dp.start_polling(bot_instance, **workflow_data)
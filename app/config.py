@@ -16,9 +16,117 @@ MOTIVATION_THRESHOLD = 15
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# --- Профиль движка БД ---
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() # false / true / debug
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+# Кэш подготовленных выражений asyncpg. 0 - если БД за pgbouncer в режиме transaction
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "10000"))
+DB_POOL_METRICS_LOG_INTERVAL_SECONDS = int(os.getenv("DB_POOL_METRICS_LOG_INTERVAL_SECONDS", "60"))
+
+# --- Реплика для чтения (необязательно) ---
+# Если DB_REPLICA_HOST не задан, все чтения идут в основную БД
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST", "")
+DB_REPLICA_PORT = os.getenv("DB_REPLICA_PORT", DB_PORT)
+REPLICA_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}"
+    if DB_REPLICA_HOST else ""
+)
+# Сколько секунд после записи пользователь читает только из основной БД (read-your-own-write)
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+# Если отставание реплики больше этого порога, все чтения временно уходят в основную БД
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "3"))
+DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS = int(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS", "10"))
+
+# --- Выгрузки для админов (/export) ---
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000")) # Строк за один FETCH из серверного курсора
+EXPORT_STATEMENT_TIMEOUT_MS = int(os.getenv("EXPORT_STATEMENT_TIMEOUT_MS", "600000"))
+
+# --- Воронка (инкрементальные роллапы) ---
+FUNNEL_ROLLUP_INTERVAL_SECONDS = int(os.getenv("FUNNEL_ROLLUP_INTERVAL_SECONDS", "300"))
+FUNNEL_ROLLUP_BATCH_SIZE = int(os.getenv("FUNNEL_ROLLUP_BATCH_SIZE", "5000"))
+# Взаимодействия моложе этого не берем: их транзакции могли еще не закоммититься с меньшими id
+FUNNEL_ROLLUP_SAFETY_LAG_SECONDS = int(os.getenv("FUNNEL_ROLLUP_SAFETY_LAG_SECONDS", "60"))
+
+# --- Уведомления админам о жалобах ---
+ADMIN_NOTIFY_CONCURRENCY = int(os.getenv("ADMIN_NOTIFY_CONCURRENCY", "5"))
+ADMIN_NOTIFY_SEND_INTERVAL_SECONDS = float(os.getenv("ADMIN_NOTIFY_SEND_INTERVAL_SECONDS", "0.2")) # ~25 сообщений/сек при 5 потоках
+# Повторные жалобы на ту же анкету/пользователя в этом окне дописываются счетчиком в уже отправленное уведомление
+COMPLAINT_FOLD_WINDOW_SECONDS = int(os.getenv("COMPLAINT_FOLD_WINDOW_SECONDS", "600"))
+
+# --- Рассылки по сегментам ---
+BROADCAST_RATE_PER_SECOND = float(os.getenv("BROADCAST_RATE_PER_SECOND", "20")) # Ниже общего лимита Telegram ~30/сек
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "200")) # Получателей между чекпоинтами
+BROADCAST_PROGRESS_UPDATE_SECONDS = int(os.getenv("BROADCAST_PROGRESS_UPDATE_SECONDS", "5"))
+# Аренда рассылки процессом, продлевается на каждом чекпоинте. После падения процесса рассылку подхватят через это время
+BROADCAST_LEASE_SECONDS = int(os.getenv("BROADCAST_LEASE_SECONDS", "300"))
+
+# --- Импорт пустышек из файла ---
+DUMMY_IMPORT_MAX_ROWS = int(os.getenv("DUMMY_IMPORT_MAX_ROWS", "10000"))
+DUMMY_IMPORT_BATCH_SIZE = int(os.getenv("DUMMY_IMPORT_BATCH_SIZE", "1000")) # Строк в одном INSERT ... VALUES (не больше 32767 параметров)
+
+# --- Outbox (PUSH работодателям после коммита отклика) ---
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "8")) # Адресатов, обрабатываемых одновременно
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "2")) # Если разбудить диспетчер не удалось
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120")) # После падения процесса событие берется снова через это время
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+
+# --- Отсев дубликатов апдейтов (повторная доставка, двойное нажатие) ---
+UPDATE_DEDUPE_MAX_IDS = int(os.getenv("UPDATE_DEDUPE_MAX_IDS", "10000")) # Размер LRU update_id и последних действий пользователей
+UPDATE_DEDUPE_WINDOW_SECONDS = float(os.getenv("UPDATE_DEDUPE_WINDOW_SECONDS", "2"))
+
+# --- Кулдауны ленты (applicant_cooldowns) ---
+COOLDOWN_PURGE_INTERVAL_SECONDS = int(os.getenv("COOLDOWN_PURGE_INTERVAL_SECONDS", "600"))
+COOLDOWN_PURGE_BATCH_SIZE = int(os.getenv("COOLDOWN_PURGE_BATCH_SIZE", "5000")) # Строк в одном DELETE, чтобы не держать долгие блокировки
+
+# --- Хранение взаимодействий (горячая таблица + архив по месяцам) ---
+INTERACTION_HOT_RETENTION_DAYS = int(os.getenv("INTERACTION_HOT_RETENTION_DAYS", "30")) # Старше - дизлайки и просмотренные отклики уходят в архив
+INTERACTION_ARCHIVE_RETENTION_MONTHS = int(os.getenv("INTERACTION_ARCHIVE_RETENTION_MONTHS", "12")) # Более старые месячные секции архива удаляются
+INTERACTION_RETENTION_BATCH_SIZE = int(os.getenv("INTERACTION_RETENTION_BATCH_SIZE", "5000"))
+INTERACTION_RETENTION_INTERVAL_SECONDS = int(os.getenv("INTERACTION_RETENTION_INTERVAL_SECONDS", "3600"))
+
+# --- Фоновая очистка удаленных анкет работодателей ---
+PROFILE_PURGE_INTERVAL_SECONDS = int(os.getenv("PROFILE_PURGE_INTERVAL_SECONDS", "30"))
+PROFILE_PURGE_BATCH_SIZE = int(os.getenv("PROFILE_PURGE_BATCH_SIZE", "1000")) # Зависимых строк в одной короткой транзакции
+PROFILE_PURGE_PAUSE_SECONDS = float(os.getenv("PROFILE_PURGE_PAUSE_SECONDS", "0.2")) # Пауза между пачками, чтобы не мешать свайпам
+
+# --- Кэш настроек bot_settings ---
+BOT_SETTINGS_CACHE_TTL_SECONDS = int(os.getenv("BOT_SETTINGS_CACHE_TTL_SECONDS", "300")) # Страховка для правок напрямую в БД
+
+# --- Мотивационный контент в ленте ---
+MOTIVATION_CACHE_TTL_SECONDS = int(os.getenv("MOTIVATION_CACHE_TTL_SECONDS", "300")) # Страховка, если сброс кэша из админки не дошел
+MOTIVATION_USAGE_FLUSH_SECONDS = int(os.getenv("MOTIVATION_USAGE_FLUSH_SECONDS", "30")) # Как часто накопленные показы пишутся в usage_count
+
+# --- Битые file_id фото (кэш неудач send_photo) ---
+PHOTO_FAILURE_CACHE_MAX_IDS = int(os.getenv("PHOTO_FAILURE_CACHE_MAX_IDS", "5000"))
+PHOTO_FAILURE_CACHE_TTL_SECONDS = int(os.getenv("PHOTO_FAILURE_CACHE_TTL_SECONDS", "21600")) # Столько file_id показывается текстом без повторной попытки
+BROKEN_PHOTO_CHECK_INTERVAL_SECONDS = int(os.getenv("BROKEN_PHOTO_CHECK_INTERVAL_SECONDS", "60")) # Проверка неудач через getFile и очистка анкет
+PHOTO_VALIDATION_CONCURRENCY = int(os.getenv("PHOTO_VALIDATION_CONCURRENCY", "5")) # Одновременных getFile при проверке импорта
+
+# --- Компактный просмотр ленты (несколько вакансий в одном сообщении) ---
+COMPACT_FEED_BATCH_SIZE = int(os.getenv("COMPACT_FEED_BATCH_SIZE", "4")) # 3-5: больше - длинное сообщение и много кнопок
+
 ADMIN_IDS_STR = os.getenv("ADMIN_IDS", "")
 ADMIN_IDS = [int(admin_id.strip()) for admin_id in ADMIN_IDS_STR.split(',') if admin_id.strip() and admin_id.strip().isdigit()]
 
+# --- Шардирование апдейтов по воркер-процессам ---
+# 1 = обычный однопроцессный режим (dp.start_polling)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+SHARD_VIRTUAL_NODES = int(os.getenv("SHARD_VIRTUAL_NODES", "64"))
+WORKER_LIVENESS_CHECK_SECONDS = float(os.getenv("WORKER_LIVENESS_CHECK_SECONDS", "2")) # Как часто ingress проверяет, живы ли воркеры
+# Если WEBHOOK_URL пустой, ingress получает апдейты через getUpdates (polling)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
 CHANNEL_ID = 
 CHANNEL_URL = "" 
 
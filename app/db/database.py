@@ -1,10 +1,46 @@
 # app/db/database.py
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
-from typing import AsyncGenerator 
-from app.config import DATABASE_URL
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+from app.config import (
+    DATABASE_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_PRE_PING, DB_POOL_RECYCLE_SECONDS, DB_STATEMENT_CACHE_SIZE, DB_STATEMENT_TIMEOUT_MS,
+    REPLICA_DATABASE_URL, DB_REPLICA_STICKY_SECONDS, DB_REPLICA_MAX_LAG_SECONDS,
+)
+from app.db.pool_metrics import MeteredAsyncQueuePool, pool_metrics
+
+
+def build_engine(database_url: str):
+    # echo: "false" - без логов SQL, "true" - запросы, "debug" - запросы и строки результата
+    echo_level = {"true": True, "debug": "debug"}.get(DB_ECHO, False)
+    # Кэш prepared statements на уровне диалекта SQLAlchemy (и самого asyncpg)
+    url = make_url(database_url).update_query_dict(
+        {"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}
+    )
+    return create_async_engine(
+        url,
+        echo=echo_level,
+        poolclass=MeteredAsyncQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        connect_args={
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            # Таймаут на каждый запрос на стороне сервера
+            "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+        },
+    )
+
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = build_engine(DATABASE_URL)
 
 AsyncSessionFactory = sessionmaker(
     bind=engine,
@@ -12,12 +48,163 @@ AsyncSessionFactory = sessionmaker(
     expire_on_commit=False
 )
 
+# Реплика только для чтения. Без DB_REPLICA_HOST фабрика реплики = основная фабрика
+replica_engine = build_engine(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+
+ReplicaSessionFactory = sessionmaker(
+    bind=replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+) if replica_engine is not None else AsyncSessionFactory
+
 Base = declarative_base()
 
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]: # <--- ИЗМЕНИТЕ ЗДЕСЬ
     async with AsyncSessionFactory() as session:
         yield session
 
+@asynccontextmanager
+async def session_scope(session: AsyncSession | None = None) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Если передана сессия апдейта (из DbSessionMiddleware) - работаем в ней, коммит сделает middleware.
+    Иначе (планировщик, вызовы вне апдейта) - открываем свою сессию с транзакцией.
+    """
+    if session is not None:
+        yield session
+        return
+    async with AsyncSessionFactory() as own_session, own_session.begin():
+        yield own_session
+
+async def release_update_session(session: AsyncSession | None):
+    """
+    Закрывает открытую транзакцию сессии апдейта (коммит), и соединение возвращается в пул.
+    Вызывать после работы с БД и до запросов к Telegram: иначе соединение висит
+    idle in transaction (с блокировками записанных строк) все время отправки.
+    Следующий запрос в этой сессии сам начнет новую транзакцию.
+    """
+    if session is not None and session.in_transaction():
+        await session.commit()
+
+# --- Маршрутизация чтений на реплику ---
+
+# Пользователь текущего апдейта (ставит DbSessionMiddleware), нужен для read-your-own-write
+_current_update_user_id: ContextVar[int | None] = ContextVar("current_update_user_id", default=None)
+# telegram_id -> time.monotonic() последнего коммита с записью в основную БД.
+# Порядок - по времени записи: просроченные записи всегда в начале и вычищаются в note_primary_write
+_recent_primary_writes: OrderedDict[int, float] = OrderedDict()
+# Последнее измеренное отставание реплики (None - еще не мерили или реплики нет)
+_replica_lag_seconds: float | None = None
+
+
+def set_current_update_user(user_id: int | None):
+    return _current_update_user_id.set(user_id)
+
+def reset_current_update_user(token):
+    _current_update_user_id.reset(token)
+
+def note_primary_write(user_id: int):
+    now = time.monotonic()
+    _recent_primary_writes[user_id] = now
+    _recent_primary_writes.move_to_end(user_id)
+    while _recent_primary_writes:
+        _, written_at = next(iter(_recent_primary_writes.items()))
+        if now - written_at <= DB_REPLICA_STICKY_SECONDS:
+            break
+        _recent_primary_writes.popitem(last=False)
+
+def _user_wrote_recently(user_id: int | None) -> bool:
+    if user_id is None:
+        return False
+    written_at = _recent_primary_writes.get(user_id)
+    if written_at is None:
+        return False
+    if time.monotonic() - written_at > DB_REPLICA_STICKY_SECONDS:
+        _recent_primary_writes.pop(user_id, None)
+        return False
+    return True
+
+def is_replica_usable() -> bool:
+    if replica_engine is None:
+        return False
+    return _replica_lag_seconds is None or _replica_lag_seconds <= DB_REPLICA_MAX_LAG_SECONDS
+
+
+# Помечаем сессии, которые что-то писали, и после коммита запоминаем автора записи
+@event.listens_for(Session, "do_orm_execute")
+def _mark_session_write_on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_primary_writes"] = True
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_write_on_flush(session, flush_context):
+    session.info["has_primary_writes"] = True
+
+@event.listens_for(Session, "after_commit")
+def _remember_primary_write_author(session):
+    if session.info.pop("has_primary_writes", False):
+        user_id = _current_update_user_id.get()
+        if user_id is not None:
+            note_primary_write(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_session_writes(session, previous_transaction):
+    session.info.pop("has_primary_writes", None)
+
+
+@asynccontextmanager
+async def read_session_scope(session: AsyncSession | None = None) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для read-only запросов: реплика, если она настроена и не отстает.
+    Остаемся в основной БД (в сессии апдейта, если она есть), когда:
+    - в этом апдейте уже были записи (они еще не закоммичены);
+    - пользователь писал в последние DB_REPLICA_STICKY_SECONDS (реплика могла не догнать);
+    - реплика отстает больше DB_REPLICA_MAX_LAG_SECONDS или недоступна.
+    """
+    use_primary = (
+        not is_replica_usable()
+        or (session is not None and (session.info.get("has_primary_writes") or session.new or session.dirty or session.deleted))
+        or _user_wrote_recently(_current_update_user_id.get())
+    )
+    if use_primary:
+        async with session_scope(session) as primary_session:
+            yield primary_session
+        return
+
+    async with ReplicaSessionFactory() as replica_session:
+        try:
+            await replica_session.connection()
+        except Exception as e_replica:
+            print(f"ERROR read_session_scope: replica unavailable, falling back to primary: {e_replica}")
+            async with session_scope(session) as primary_session:
+                yield primary_session
+            return
+        # Транзакция уже открыта вызовом connection(), на выходе сессия просто откатывается
+        yield replica_session
+
+
+async def refresh_replica_lag() -> float | None:
+    global _replica_lag_seconds
+    if replica_engine is None:
+        return None
+    try:
+        async with replica_engine.connect() as conn:
+            lag = (await conn.execute(text(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            ))).scalar()
+        # NULL - сервер не в режиме recovery (например, отдельный локальный Postgres для тестов)
+        _replica_lag_seconds = float(lag) if lag is not None else 0.0
+    except Exception as e_lag:
+        print(f"ERROR refresh_replica_lag: {e_lag}")
+        _replica_lag_seconds = float("inf") # Пока реплика недоступна - читаем из основной БД
+    return _replica_lag_seconds
+
+
+def get_pool_metrics(reset_window: bool = False) -> dict:
+    return pool_metrics.snapshot(engine.pool, reset_window=reset_window)
+
 async def init_db_models():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        # Триграммные GIN-индексы поиска пользователей (см. models.py) требуют pg_trgm
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,105 @@
+# app/db/dto.py
+# Легкие строки-DTO для горячих путей чтения.
+# Вместо полной ORM-сущности (все колонки + identity map + отслеживание изменений)
+# выбираем только нужные колонки и складываем их в dataclass со __slots__.
+from dataclasses import dataclass, fields
+
+from sqlalchemy import func
+
+from app.db.models import EmployerProfile, User, UserRole, WorkFormatEnum, MotivationalContent, MotivationalContentTypeEnum
+
+
+@dataclass(slots=True)
+class EmployerCard:
+    """Анкета работодателя в ленте соискателя (то, что нужно для format_employer_profile_for_applicant)."""
+    id: int
+    user_id: int | None
+    company_name: str
+    city: str
+    position: str
+    salary: str | None
+    min_age_candidate: int | None
+    description: str
+    work_format: WorkFormatEnum
+    photo_file_id: str | None
+    is_dummy: bool
+
+
+@dataclass(slots=True)
+class EmployerListItem:
+    """Строка в админских списках анкет: без описания и прочих тяжелых полей."""
+    id: int
+    user_id: int | None
+    company_name: str
+    city: str
+    is_active: bool
+    owner_is_banned: bool | None
+
+
+@dataclass(slots=True)
+class EmployerPushTarget:
+    """Что нужно PUSH-уведомлению работодателю."""
+    id: int
+    active_notification_message_id: int | None
+
+
+@dataclass(slots=True)
+class MotivationListItem:
+    """Строка списка мотивационного контента: вместо полного текста - только начало подписи."""
+    id: int
+    content_type: MotivationalContentTypeEnum
+    is_active: bool
+    text_caption: str
+
+
+@dataclass(slots=True)
+class MotivationItem:
+    """Мотивационный контент в кэше ленты (app/services/motivation_service.py)."""
+    id: int
+    content_type: MotivationalContentTypeEnum
+    file_id: str | None
+    text_caption: str
+    usage_count: int
+
+
+@dataclass(slots=True)
+class UserSearchItem:
+    """Строка результата поиска пользователя в админке (id = telegram_id, для keyset-пагинации)."""
+    id: int
+    username: str | None
+    first_name: str | None
+    last_name: str | None
+    role: UserRole | None
+    is_banned: bool
+    company_name: str | None
+
+
+def _model_columns(dto_cls, model, **overrides) -> tuple:
+    # Колонки модели в порядке полей DTO; overrides - для полей не из этой модели
+    return tuple(overrides[f.name] if f.name in overrides else getattr(model, f.name) for f in fields(dto_cls))
+
+
+EMPLOYER_CARD_COLUMNS = _model_columns(EmployerCard, EmployerProfile)
+EMPLOYER_LIST_ITEM_COLUMNS = _model_columns(
+    EmployerListItem, EmployerProfile,
+    owner_is_banned=User.is_banned.label("owner_is_banned") # Требует outerjoin(User, ...)
+)
+EMPLOYER_PUSH_TARGET_COLUMNS = _model_columns(EmployerPushTarget, EmployerProfile)
+USER_SEARCH_ITEM_COLUMNS = _model_columns(
+    UserSearchItem, User,
+    id=User.telegram_id,
+    company_name=EmployerProfile.company_name # Требует outerjoin(EmployerProfile, ...)
+)
+MOTIVATION_LIST_ITEM_COLUMNS = _model_columns(
+    MotivationListItem, MotivationalContent,
+    text_caption=func.substr(MotivationalContent.text_caption, 1, 40).label("text_caption") # Для превью хватает
+)
+
+MOTIVATION_ITEM_COLUMNS = _model_columns(MotivationItem, MotivationalContent)
+
+
+def rows_to_dto(dto_cls, rows) -> list:
+    return [dto_cls(*row) for row in rows]
+
+def row_to_dto(dto_cls, row):
+    return dto_cls(*row) if row is not None else None
@@ -1,7 +1,8 @@
 # app/db/models.py
-from sqlalchemy import Column, BigInteger, String, DateTime, Boolean, Enum as SQLAlchemyEnum, Integer, Text, ForeignKey, Index
+from sqlalchemy import Column, BigInteger, String, DateTime, Date, Boolean, Enum as SQLAlchemyEnum, Integer, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship 
+from sqlalchemy.dialects.postgresql import JSONB
 from app.db.database import Base
 import enum
 import sqlalchemy as sa 
@@ -30,6 +31,12 @@ class ComplaintStatusEnum(enum.Enum):
     VIEWED = "viewed"
     RESOLVED = "resolved"
 
+class BroadcastStatusEnum(enum.Enum):
+    RUNNING = "running"
+    PAUSED = "paused"
+    FINISHED = "finished"
+    CANCELLED = "cancelled"
+
 
 class User(Base):
     __tablename__ = "users"
@@ -63,6 +70,20 @@ class User(Base):
     def __repr__(self):
         return f"<User(telegram_id={self.telegram_id}, role={self.role})>"
 
+# --- Индексы для поиска пользователей в админке (нужно расширение pg_trgm) ---
+# GIN-индексы по триграммам: ILIKE '%...%' идет по индексу, а не полным сканом таблицы.
+# Телефоны хранятся в произвольном формате, поэтому ищем и индексируем только цифры.
+# Константы - literal_column, чтобы выражение в запросе совпадало с выражением индекса.
+USER_PHONE_DIGITS = func.regexp_replace(
+    User.contact_phone, sa.literal_column("'[^0-9]'"), sa.literal_column("''"), sa.literal_column("'g'")
+)
+
+Index('ix_users_username_trgm', User.username, postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+Index('ix_users_first_name_trgm', User.first_name, postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'})
+Index('ix_users_last_name_trgm', User.last_name, postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'})
+Index('ix_users_phone_digits_trgm', USER_PHONE_DIGITS.label('phone_digits'),
+      postgresql_using='gin', postgresql_ops={'phone_digits': 'gin_trgm_ops'})
+
 class ApplicantProfile(Base):
     __tablename__ = "applicant_profiles"
     id = Column(Integer, primary_key=True, index=True)
@@ -100,6 +121,8 @@ class EmployerProfile(Base):
     is_dummy = Column(Boolean, nullable=False, default=False, server_default=sa.false())
     created_by_admin_id = Column(BigInteger, ForeignKey("users.telegram_id", name="fk_employerprofile_created_by_admin_id", ondelete="SET NULL"), nullable=True, index=True)
     deactivation_date = Column(DateTime(timezone=True), nullable=True)
+    # Анкета удалена: скрыта сразу, зависимые строки вычищает фоновая очистка (employer_profile_purges)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
 
     user_owner = relationship(
         "User", 
@@ -116,6 +139,9 @@ class EmployerProfile(Base):
     def __repr__(self):
         return f"<EmployerProfile(id={self.id}, company_name='{self.company_name}')>"
     
+Index('ix_employer_profiles_company_name_trgm', EmployerProfile.company_name,
+      postgresql_using='gin', postgresql_ops={'company_name': 'gin_trgm_ops'})
+
 class ApplicantEmployerInteraction(Base):
     __tablename__ = "applicant_employer_interactions"
     id = Column(Integer, primary_key=True, index=True)
@@ -124,12 +150,62 @@ class ApplicantEmployerInteraction(Base):
     interaction_type = Column(SQLAlchemyEnum(InteractionTypeEnum), nullable=False)
     question_text = Column(Text, nullable=True) 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    cooldown_until = Column(DateTime(timezone=True), nullable=True, index=True)
+    cooldown_until = Column(DateTime(timezone=True), nullable=True) # История; лента читает applicant_cooldowns
     is_viewed_by_employer = Column(Boolean, default=False, nullable=False)
-    __table_args__ = (Index('ix_applicant_cooldown', 'applicant_user_id', 'cooldown_until'),)
+    # Отклики работодателю ищутся только среди непросмотренных: индекс не растет вместе с историей.
+    # Условие совпадает с "is_viewed_by_employer = false" из запросов (литерал, а не параметр)
+    __table_args__ = (
+        Index('ix_interactions_unviewed_by_profile', 'employer_profile_id', 'created_at',
+              postgresql_where=sa.text('is_viewed_by_employer = false')),
+    )
     def __repr__(self):
         return f"<Interaction(applicant={self.applicant_user_id} -> profile={self.employer_profile_id}, type={self.interaction_type})>"
-    
+
+# Не больше одного непросмотренного лайка на пару соискатель-вакансия: повторный лайк - upsert в эту строку.
+# Условие - литералом: ON CONFLICT выводит частичный индекс только из констант, не из параметров запроса
+UNVIEWED_LIKE_PREDICATE = sa.text(f"interaction_type = '{InteractionTypeEnum.LIKE.name}' AND is_viewed_by_employer IS false")
+Index('uq_interactions_unviewed_like', ApplicantEmployerInteraction.applicant_user_id, ApplicantEmployerInteraction.employer_profile_id,
+      unique=True, postgresql_where=UNVIEWED_LIKE_PREDICATE)
+
+
+class ApplicantEmployerInteractionArchive(Base):
+    """
+    Архив старых взаимодействий (дизлайки и просмотренные отклики старше INTERACTION_HOT_RETENTION_DAYS).
+    Секционирован по месяцам created_at: секции создает и удаляет app/services/interaction_retention_service.py,
+    устаревший месяц удаляется целиком (DROP TABLE секции) без DELETE по строкам.
+    Без FK и вторичных индексов: таблицу читают только выгрузки.
+    """
+    __tablename__ = "applicant_employer_interactions_archive"
+
+    id = Column(Integer, primary_key=True) # id из applicant_employer_interactions
+    created_at = Column(DateTime(timezone=True), primary_key=True) # Ключ секционирования входит в PK
+    applicant_user_id = Column(BigInteger, nullable=False)
+    employer_profile_id = Column(Integer, nullable=False)
+    interaction_type = Column(SQLAlchemyEnum(InteractionTypeEnum), nullable=False)
+    question_text = Column(Text, nullable=True)
+    is_viewed_by_employer = Column(Boolean, nullable=False)
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    def __repr__(self):
+        return f"<InteractionArchive(id={self.id}, applicant={self.applicant_user_id} -> profile={self.employer_profile_id})>"
+
+
+class ApplicantCooldown(Base):
+    """
+    Активные кулдауны ленты: одна строка на пару соискатель-вакансия, пока кулдаун не истек.
+    Лента проверяет только эту таблицу (поиск по первичному ключу), applicant_employer_interactions
+    остается историей для аналитики. Истекшие строки чистит purge_expired_cooldowns.
+    """
+    __tablename__ = "applicant_cooldowns"
+
+    applicant_user_id = Column(BigInteger, ForeignKey("users.telegram_id", name="fk_cooldown_applicant_id", ondelete="CASCADE"), primary_key=True)
+    employer_profile_id = Column(Integer, ForeignKey("employer_profiles.id", name="fk_cooldown_employer_profile_id", ondelete="CASCADE"), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ApplicantCooldown(applicant={self.applicant_user_id} -> profile={self.employer_profile_id}, until={self.expires_at})>"
+
 class Complaint(Base):
     __tablename__ = "complaints"
     id = Column(Integer, primary_key=True, index=True)
@@ -183,6 +259,9 @@ class ReferralLink(Base):
     name = Column(String(255), nullable=False)
     creator_admin_id = Column(BigInteger, ForeignKey("users.telegram_id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Счетчики обновляются тем же запросом, что пишет переход (см. build_start_upsert_statement)
+    total_clicks = Column(Integer, nullable=False, default=0, server_default="0")
+    unique_users = Column(Integer, nullable=False, default=0, server_default="0")
     usages = relationship("ReferralUsage", back_populates="link", cascade="all, delete-orphan")
     creator_admin = relationship("User")
 
@@ -195,9 +274,126 @@ class ReferralUsage(Base):
     id = Column(Integer, primary_key=True, index=True)
     link_id = Column(Integer, ForeignKey("referral_links.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(BigInteger, ForeignKey("users.telegram_id", ondelete="CASCADE"), nullable=False, index=True)
-    used_at = Column(DateTime(timezone=True), server_default=func.now())
+    used_at = Column(DateTime(timezone=True), server_default=func.now()) # Первый переход
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+    use_count = Column(Integer, nullable=False, default=1, server_default="1")
     link = relationship("ReferralLink", back_populates="usages")
+
+    # Одна строка на пару (ссылка, пользователь): повторные /start увеличивают use_count
+    __table_args__ = (sa.UniqueConstraint('link_id', 'user_id', name='uq_referral_usage_link_user'),)
     user = relationship("User")
 
     def __repr__(self):
         return f"<ReferralUsage(user_id={self.user_id}, link_id={self.link_id})>"
+
+
+class FunnelDailyRollup(Base):
+    """
+    Воронка по дням: показ с реакцией -> лайк -> вопрос -> просмотр отклика работодателем.
+    Заполняется инкрементально из applicant_employer_interactions (см. app/services/analytics_service.py),
+    отчеты читают только эту таблицу.
+    """
+    __tablename__ = "funnel_daily_rollups"
+
+    day = Column(Date, primary_key=True) # День взаимодействия по UTC
+    # Без FK: история воронки остается и после удаления вакансии/ссылки
+    employer_profile_id = Column(Integer, primary_key=True)
+    referral_link_id = Column(Integer, primary_key=True, default=0, server_default="0") # 0 - пришел не по ссылке
+    city = Column(String(100), nullable=False)
+    views = Column(Integer, nullable=False, default=0, server_default="0")
+    likes = Column(Integer, nullable=False, default=0, server_default="0")
+    questions = Column(Integer, nullable=False, default=0, server_default="0")
+    employer_views = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index('ix_funnel_daily_rollups_city_day', 'city', 'day'),
+        Index('ix_funnel_daily_rollups_referral_day', 'referral_link_id', 'day'),
+    )
+
+    def __repr__(self):
+        return f"<FunnelDailyRollup(day={self.day}, profile={self.employer_profile_id}, views={self.views})>"
+
+
+class Broadcast(Base):
+    """Рассылка админа по сегменту пользователей. last_user_id - чекпоинт keyset-обхода получателей."""
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_by_admin_id = Column(BigInteger, nullable=False)
+    status = Column(SQLAlchemyEnum(BroadcastStatusEnum), nullable=False, default=BroadcastStatusEnum.RUNNING)
+    # Сообщение, которое копируется получателям (copy_message из чата админа)
+    source_chat_id = Column(BigInteger, nullable=False)
+    source_message_id = Column(BigInteger, nullable=False)
+    # Сегмент (пустое поле - без фильтра)
+    segment_role = Column(SQLAlchemyEnum(UserRole), nullable=True)
+    segment_city = Column(String(100), nullable=True)
+    segment_active_within_days = Column(Integer, nullable=True)
+    segment_referral_link_id = Column(Integer, ForeignKey("referral_links.id", ondelete="SET NULL"), nullable=True)
+    segment_has_unread_responses = Column(Boolean, nullable=False, default=False, server_default=sa.false())
+    # Прогресс
+    total_recipients = Column(Integer, nullable=False, default=0, server_default="0") # Оценка на момент запуска
+    last_user_id = Column(BigInteger, nullable=False, default=0, server_default="0")
+    sent_count = Column(Integer, nullable=False, default=0, server_default="0")
+    failed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    progress_chat_id = Column(BigInteger, nullable=True)
+    progress_message_id = Column(BigInteger, nullable=True)
+    # Пока не истекло, рассылку отправляет один из процессов бота (см. app/services/broadcast_service.py)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Broadcast(id={self.id}, status='{self.status.name}', sent={self.sent_count})>"
+
+
+class OutboxEvent(Base):
+    """
+    Исходящее событие (сейчас - PUSH работодателю), записанное в одной транзакции с действием пользователя.
+    Разбирается фоновым диспетчером (app/services/outbox_service.py); успешно обработанные строки удаляются.
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True)
+    event_kind = Column(String(50), nullable=False) # Имя обработчика из register_shard_event_handler
+    target_user_id = Column(BigInteger, nullable=False) # Адресат: события одного адресата схлопываются
+    payload = Column(JSONB, nullable=False, default=dict)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Не раньше этого времени: задержка повтора после ошибки или аренда, пока событие обрабатывается
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True) # Попытки исчерпаны, событие больше не берется
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_outbox_events_pending', 'available_at', postgresql_where=sa.text('failed_at IS NULL')),
+    )
+
+    def __repr__(self):
+        return f"<OutboxEvent(id={self.id}, kind='{self.event_kind}', target={self.target_user_id}, attempts={self.attempts})>"
+
+
+class EmployerProfilePurge(Base):
+    """
+    Очередь фоновой очистки удаленной анкеты работодателя (app/services/profile_purge_service.py).
+    Строка остается после завершения - история удалений и счетчики для админа.
+    """
+    __tablename__ = "employer_profile_purges"
+
+    id = Column(Integer, primary_key=True)
+    # Без FK: сама анкета удаляется последним шагом очистки
+    employer_profile_id = Column(Integer, nullable=False, index=True)
+    company_name = Column(String(200), nullable=True)
+    reason = Column(String(100), nullable=False) # Кто/что удалил: admin:<id>, role_switch, subscription_check...
+    requested_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    deleted_cooldowns = Column(Integer, nullable=False, default=0, server_default="0")
+    deleted_interactions = Column(Integer, nullable=False, default=0, server_default="0")
+    deleted_complaints = Column(Integer, nullable=False, default=0, server_default="0")
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ix_employer_profile_purges_pending', 'requested_at', postgresql_where=sa.text('finished_at IS NULL')),
+    )
+
+    def __repr__(self):
+        return f"<EmployerProfilePurge(id={self.id}, profile={self.employer_profile_id}, finished={self.finished_at is not None})>"
@@ -0,0 +1,132 @@
+# app/db/pagination.py
+# Keyset-пагинация по id для админских списков.
+# Страница = одна выборка LIMIT per_page+1 от курсора, без загрузки всей таблицы и OFFSET.
+#
+# Курсор - короткая строка для callback_data:
+#   "n:<id>" - следующая страница (после последнего id текущей)
+#   "p:<id>" - предыдущая страница (до первого id текущей)
+#   "f:<id>" - страница, начиная с этого id включительно (вернуться на ту же страницу)
+import time
+from dataclasses import dataclass, field
+
+# key -> (time.monotonic() подсчета, количество)
+_count_cache: dict[str, tuple[float, int]] = {}
+COUNT_CACHE_TTL_SECONDS = 60
+
+
+@dataclass(slots=True)
+class KeysetPage:
+    items: list = field(default_factory=list)
+    has_prev: bool = False
+    has_next: bool = False
+    # True, если страница по курсору оказалась пустой (удалили последние записи) и показана предыдущая
+    shifted_back: bool = False
+
+    @property
+    def first_id(self):
+        return self.items[0].id if self.items else None
+
+    @property
+    def last_id(self):
+        return self.items[-1].id if self.items else None
+
+
+def parse_cursor(cursor: str | None) -> tuple[str, int] | None:
+    if not cursor:
+        return None
+    try:
+        direction, anchor_id = cursor.split(":", 1)
+        if direction not in ("n", "p", "f"):
+            return None
+        return direction, int(anchor_id)
+    except ValueError:
+        return None
+
+def next_cursor(page: KeysetPage) -> str:
+    return f"n:{page.last_id}"
+
+def prev_cursor(page: KeysetPage) -> str:
+    return f"p:{page.first_id}"
+
+def anchor_cursor(page: KeysetPage) -> str | None:
+    return f"f:{page.first_id}" if page.items else None
+
+
+def _after(id_column, anchor_id: int, descending: bool, inclusive: bool = False):
+    # Условие "дальше по порядку списка", чем anchor_id
+    if descending:
+        return id_column <= anchor_id if inclusive else id_column < anchor_id
+    return id_column >= anchor_id if inclusive else id_column > anchor_id
+
+def _before(id_column, anchor_id: int, descending: bool):
+    return id_column > anchor_id if descending else id_column < anchor_id
+
+
+async def fetch_keyset_page(
+    session, query, id_column, per_page: int, cursor: str | None = None,
+    descending: bool = False, row_factory=None
+) -> KeysetPage:
+    """
+    query - select(...) с фильтрами, но без order_by/limit.
+    row_factory - во что превратить строку результата (например, DTO из app.db.dto).
+    """
+    parsed = parse_cursor(cursor)
+    direction, anchor_id = parsed if parsed else ("f", None)
+    forward = direction != "p"
+
+    page_query = query
+    if anchor_id is not None:
+        if direction == "p":
+            page_query = page_query.where(_before(id_column, anchor_id, descending))
+        else:
+            page_query = page_query.where(_after(id_column, anchor_id, descending, inclusive=(direction == "f")))
+    # Идем от курсора: в порядке списка вперед, либо в обратном порядке назад
+    order_desc = (descending == forward)
+    page_query = page_query.order_by(id_column.desc() if order_desc else id_column.asc()).limit(per_page + 1)
+
+    rows = (await session.execute(page_query)).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    items = [row_factory(*row) for row in rows] if row_factory else [row[0] for row in rows]
+
+    if not forward:
+        items.reverse()
+        return KeysetPage(items=items, has_prev=has_more, has_next=anchor_id is not None)
+
+    if not items and anchor_id is not None:
+        # Записи страницы удалили - показываем предыдущую страницу
+        previous_page = await fetch_keyset_page(
+            session, query, id_column, per_page, cursor=f"p:{anchor_id}",
+            descending=descending, row_factory=row_factory
+        )
+        previous_page.has_next = False
+        previous_page.shifted_back = True
+        return previous_page
+
+    has_prev = False
+    if anchor_id is not None:
+        if direction == "n":
+            has_prev = True
+        else: # "f": есть ли что-то до первого элемента страницы
+            has_prev = (await session.execute(
+                query.with_only_columns(id_column).where(_before(id_column, items[0].id, descending)).limit(1)
+            )).first() is not None
+    return KeysetPage(items=items, has_prev=has_prev, has_next=has_more)
+
+
+async def get_cached_count(session, cache_key: str, count_query) -> int:
+    """
+    Приблизительное число записей для "стр. X/Y": точный COUNT не чаще раза в COUNT_CACHE_TTL_SECONDS.
+    count_query - select(func.count(...)) с фильтрами списка.
+    """
+    cached = _count_cache.get(cache_key)
+    now = time.monotonic()
+    if cached and now - cached[0] < COUNT_CACHE_TTL_SECONDS:
+        return cached[1]
+    total = (await session.execute(count_query)).scalar_one() or 0
+    _count_cache[cache_key] = (now, total)
+    return total
+
+def total_pages_for(total_items: int, per_page: int, current_page: int = 0) -> int:
+    # Счетчик из кэша может отставать - не показываем "стр. 5/4"
+    return max((total_items + per_page - 1) // per_page, current_page + 1, 1)
@@ -0,0 +1,90 @@
+# app/db/pool_metrics.py
+# Метрики пула соединений: время ожидания checkout и число занятых соединений.
+# Нужны, чтобы видеть голодание пула при всплесках свайпов.
+import time
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Верхние границы корзин гистограммы ожидания checkout (в секундах)
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.total_checkouts = 0
+        self.total_checkout_timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.wait_histogram = [0] * (len(CHECKOUT_WAIT_BUCKETS) + 1)
+        self._reset_window()
+
+    def _reset_window(self):
+        self.window_started_at = time.monotonic()
+        self.window_checkouts = 0
+        self.window_wait_seconds = 0.0
+        self.window_max_wait_seconds = 0.0
+
+    def observe_checkout(self, wait_seconds: float, timed_out: bool = False):
+        if timed_out:
+            self.total_checkout_timeouts += 1
+        self.total_checkouts += 1
+        self.total_wait_seconds += wait_seconds
+        self.window_checkouts += 1
+        self.window_wait_seconds += wait_seconds
+        self.window_max_wait_seconds = max(self.window_max_wait_seconds, wait_seconds)
+        for bucket_index, upper_bound in enumerate(CHECKOUT_WAIT_BUCKETS):
+            if wait_seconds <= upper_bound:
+                self.wait_histogram[bucket_index] += 1
+                break
+        else:
+            self.wait_histogram[-1] += 1
+
+    def snapshot(self, pool, reset_window: bool = False) -> dict:
+        window_checkouts = self.window_checkouts
+        data = {
+            "pool_size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "total_checkouts": self.total_checkouts,
+            "total_checkout_timeouts": self.total_checkout_timeouts,
+            "avg_wait_ms": (self.total_wait_seconds / self.total_checkouts * 1000) if self.total_checkouts else 0.0,
+            "window_seconds": time.monotonic() - self.window_started_at,
+            "window_checkouts": window_checkouts,
+            "window_avg_wait_ms": (self.window_wait_seconds / window_checkouts * 1000) if window_checkouts else 0.0,
+            "window_max_wait_ms": self.window_max_wait_seconds * 1000,
+            "wait_histogram": dict(zip(
+                [f"<={bound * 1000:g}ms" for bound in CHECKOUT_WAIT_BUCKETS] + ["slower"],
+                self.wait_histogram
+            )),
+        }
+        if reset_window:
+            self._reset_window()
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который замеряет, сколько ждали свободное соединение."""
+
+    def _do_get(self):
+        wait_started_at = time.perf_counter()
+        try:
+            connection_record = super()._do_get()
+        except sa_exc.TimeoutError:
+            pool_metrics.observe_checkout(time.perf_counter() - wait_started_at, timed_out=True)
+            raise
+        pool_metrics.observe_checkout(time.perf_counter() - wait_started_at)
+        return connection_record
+
+
+def format_pool_metrics(snapshot: dict) -> str:
+    return (
+        f"in_use={snapshot['in_use']} idle={snapshot['idle']} overflow={snapshot['overflow']} "
+        f"(pool_size={snapshot['pool_size']}) | "
+        f"checkouts={snapshot['window_checkouts']} за {snapshot['window_seconds']:.0f}s, "
+        f"avg_wait={snapshot['window_avg_wait_ms']:.1f}ms, max_wait={snapshot['window_max_wait_ms']:.1f}ms | "
+        f"total_checkouts={snapshot['total_checkouts']}, timeouts={snapshot['total_checkout_timeouts']}"
+    )
@@ -1,25 +1,55 @@
 # app/handlers/admin_handlers.py
 import traceback
 import secrets 
+import os
+import io
+import asyncio
+import functools
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message, ReplyKeyboardRemove, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from aiogram.filters import Command, StateFilter, Filter
+from aiogram.types import Message, ReplyKeyboardRemove, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, FSInputFile, BufferedInputFile
+from aiogram.filters import Command, CommandObject, StateFilter, Filter
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
 
-from app.config import ADMIN_IDS
-from app.db.database import AsyncSessionFactory
+from app.config import ADMIN_IDS, ADMIN_NOTIFY_CONCURRENCY, ADMIN_NOTIFY_SEND_INTERVAL_SECONDS, COMPLAINT_FOLD_WINDOW_SECONDS
+from app.db.database import AsyncSessionFactory, get_pool_metrics, read_session_scope
+from app.db.dto import (
+    EmployerListItem, MotivationListItem, EMPLOYER_LIST_ITEM_COLUMNS, MOTIVATION_LIST_ITEM_COLUMNS
+)
+from app.services.user_search_service import search_users, normalize_search_text
+from app.db.pagination import (
+    KeysetPage, fetch_keyset_page, get_cached_count, total_pages_for, anchor_cursor, next_cursor, prev_cursor
+)
+from app.db.pool_metrics import format_pool_metrics
+from app.middlewares.dedupe_middleware import get_update_dedupe_stats
+from app.services.export_service import EXPORT_ENTITIES, ExportFilters, export_to_gzip_csv
+from app.services.dummy_import_service import (
+    DUMMY_IMPORT_MAX_FILE_BYTES, DummyImportFileError, parse_dummy_import_file, import_dummy_employers, format_dummy_import_errors
+)
+from app.services.analytics_service import FUNNEL_DIMENSIONS, load_funnel_report, format_funnel_row
+from app.services.broadcast_service import (
+    BROADCAST_CONTROL_CALLBACK_PREFIX, BroadcastSegment, count_segment_recipients, start_broadcast_task,
+    is_broadcast_running_here, set_broadcast_status, format_broadcast_progress, build_broadcast_progress_keyboard,
+    update_broadcast_progress_message
+)
+from app.services.profile_purge_service import soft_delete_employer_profiles, load_profile_purges, format_purge_progress
+from app.services.motivation_service import invalidate_motivation_cache
+from app.services.bot_settings_service import get_setting, update_bot_setting, ANTISPAM_DUMMY_TEXT, ANTISPAM_DUMMY_PHOTO_ID
+from app.services.photo_service import send_photo_or_text, usable_photo, is_photo_known_broken
 
-from app.db.models import User, UserRole, BotSettings, EmployerProfile, ApplicantProfile, Complaint, ComplaintStatusEnum, WorkFormatEnum, MotivationalContent, MotivationalContentTypeEnum, ReferralLink, ReferralUsage
+from app.db.models import User, UserRole, EmployerProfile, ApplicantProfile, Complaint, ComplaintStatusEnum, WorkFormatEnum, MotivationalContent, MotivationalContentTypeEnum, ReferralLink, Broadcast, BroadcastStatusEnum
 from sqlalchemy import select, update, delete, func 
-from sqlalchemy.orm import selectinload 
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload, aliased
 import sqlalchemy
 from app.handlers.browsing_handlers import format_employer_profile_for_applicant
 
 
 
-from app.states.admin_states import AdminStates, AdminAddDummyEmployer, AdminReferralManagement
+from app.states.admin_states import AdminStates, AdminAddDummyEmployer, AdminImportDummyEmployers, AdminReferralManagement, AdminBroadcast
 
 
 from app.handlers.settings_handlers import show_applicant_settings_menu, show_employer_main_menu
@@ -27,7 +57,9 @@ from app.handlers.settings_handlers import show_applicant_settings_menu, show_em
 DUMMY_PROFILE_CALLBACK_PREFIX = "dummy_profile_"
 REAL_EMP_PROFILE_CALLBACK_PREFIX = "real_emp_profile_"
 REAL_EMP_LIST_PAGE_CALLBACK_PREFIX = "real_emp_page_"
+DUMMY_LIST_PAGE_CALLBACK_PREFIX = "dummy_list_page_"
 USER_DETAILS_CALLBACK_PREFIX = "admin_user_details_"
+USER_SEARCH_PAGE_CALLBACK_PREFIX = "admin_usearch_page_"
 MOTIVATION_CALLBACK_PREFIX = "admin_motiv_"
 REFERRAL_CALLBACK_PREFIX = "admin_ref_"
 
@@ -42,14 +74,18 @@ class IsAdminFilter(Filter):
         return message.from_user.id in ADMIN_IDS
 
 # --- ОСНОВНОЕ МЕНЮ АДМИНКИ (добавляем новую кнопку) ---
+BTN_FIND_USER_TEXT = "ℹ️ Найти пользователя"
+BTN_FIND_USER_LEGACY_TEXT = "ℹ️ Найти пользователя по ID" # Кнопка из старых клавиатур, которые еще висят в чатах
+BTN_BROADCAST_TEXT = "📣 Рассылка"
 admin_main_menu_keyboard = ReplyKeyboardMarkup(
     keyboard=[
         [KeyboardButton(text="🤖 Анти-спам Пустышка")],
         [KeyboardButton(text="📝 Пустышки Работодателей")],
         [KeyboardButton(text="📄 Просмотр/Модерация Анкет Работодателей")],
         [KeyboardButton(text="📊 Управление трафиком")], 
-        [KeyboardButton(text="ℹ️ Найти пользователя по ID")],
+        [KeyboardButton(text=BTN_FIND_USER_TEXT)],
         [KeyboardButton(text="🎬 Управление Мотивационным Контентом")],
+        [KeyboardButton(text=BTN_BROADCAST_TEXT)],
         [KeyboardButton(text="🚪 Выйти из Админки")]
     ],
     resize_keyboard=True
@@ -77,6 +113,7 @@ motivation_type_keyboard = ReplyKeyboardMarkup(
 def get_manage_dummy_profiles_keyboard() -> InlineKeyboardMarkup:
     buttons = [
         [InlineKeyboardButton(text="➕ Создать новую пустышку", callback_data="admin_action_create_dummy")],
+        [InlineKeyboardButton(text="📥 Импорт пустышек из CSV/JSON", callback_data="admin_action_import_dummies")],
         [InlineKeyboardButton(text="📄 Список/Редактирование пустышек (TODO)", callback_data="admin_action_list_dummies")],
         [InlineKeyboardButton(text="🔙 Назад в Админ-меню", callback_data="admin_back_to_main_from_dummies")]
     ]
@@ -121,18 +158,132 @@ async def admin_panel_exit(message: Message, state: FSMContext):
         from app.bot import start_keyboard 
         await message.answer("Выберите роль, если хотите продолжить:", reply_markup=start_keyboard)
 
-# --- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ДЛЯ BOT_SETTINGS (для анти-спам пустышки) ---
-async def get_bot_setting(session, key: str) -> str | None: # Убрал тип AsyncSession из сигнатуры, т.к. сессия передается
-    result = await session.execute(select(BotSettings.value_str).where(BotSettings.setting_key == key))
-    return result.scalar_one_or_none()
+# --- МЕТРИКИ ПУЛА СОЕДИНЕНИЙ БД ---
+@admin_router.message(Command("db_pool"), IsAdminFilter())
+async def admin_show_db_pool_metrics(message: Message):
+    snapshot = get_pool_metrics()
+    histogram_lines = "\n".join(f"  {bucket}: {count}" for bucket, count in snapshot["wait_histogram"].items())
+    await message.answer(
+        f"📈 Пул соединений БД (текущий процесс):\n"
+        f"{format_pool_metrics(snapshot)}\n\n"
+        f"Ожидание checkout:\n{histogram_lines}"
+    )
+
+@admin_router.message(Command("dedupe_stats"), IsAdminFilter())
+async def admin_show_update_dedupe_stats(message: Message):
+    stats = get_update_dedupe_stats()
+    await message.answer(
+        f"🔁 Отсев дубликатов апдейтов (текущий процесс, с запуска):\n"
+        f"Обработано: {stats.get('passed', 0)}\n"
+        f"Повторная доставка (тот же update_id): {stats.get('redelivered', 0)}\n"
+        f"Повтор действия (двойное нажатие): {stats.get('repeated_action', 0)}"
+    )
 
-async def update_bot_setting(session, key: str, value_str: str | None = None): # Упростил, только value_str
-    stmt = insert(BotSettings).values(setting_key=key, value_str=value_str)
-    stmt = stmt.on_conflict_do_update(
-        index_elements=['setting_key'], 
-        set_=dict(value_str=value_str) 
+@admin_router.message(Command("purges"), IsAdminFilter())
+async def admin_show_profile_purges(message: Message):
+    async with read_session_scope() as session:
+        pending, recent_finished = await load_profile_purges(session)
+    lines = [f"🧹 Очистка удаленных анкет работодателей\nВ очереди: {len(pending)}"]
+    lines.extend(format_purge_progress(purge) for purge in pending[:20])
+    if len(pending) > 20:
+        lines.append(f"... и еще {len(pending) - 20}")
+    if recent_finished:
+        lines.append("\nПоследние завершенные:")
+        lines.extend(format_purge_progress(purge) for purge in recent_finished)
+    await message.answer("\n".join(lines))
+
+# --- ВЫГРУЗКИ (/export) ---
+TELEGRAM_BOT_DOCUMENT_LIMIT_BYTES = 50 * 1024 * 1024 # Больше бот отправить не может
+
+def _export_usage_text() -> str:
+    entities_text = "\n".join(f"  {name} - {title}" for name, (title, _) in EXPORT_ENTITIES.items())
+    return (
+        "Использование: /export <что> [from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД] [city=Город]\n"
+        f"Доступные выгрузки:\n{entities_text}\n\n"
+        "Пример: /export interactions from=2024-01-01 to=2024-01-31 city=Київ"
     )
-    await session.execute(stmt)
+
+def parse_export_args(args_text: str) -> tuple[str, ExportFilters]:
+    """'interactions from=2024-01-01 city=Кривий Ріг' -> ('interactions', ExportFilters(...)). ValueError при ошибке."""
+    tokens = args_text.split()
+    if not tokens or tokens[0].lower() not in EXPORT_ENTITIES:
+        raise ValueError("Неизвестная выгрузка.")
+    entity = tokens[0].lower()
+
+    options: dict[str, str] = {}
+    last_key = None
+    for token in tokens[1:]:
+        key, sep, value = token.partition("=")
+        if sep and key.lower() in ("from", "to", "city"):
+            last_key = key.lower()
+            options[last_key] = value
+        elif last_key == "city": # Город из нескольких слов
+            options["city"] += f" {token}"
+        else:
+            raise ValueError(f"Непонятный параметр: {token}")
+
+    filters = ExportFilters(city=options.get("city") or None)
+    try:
+        if options.get("from"):
+            filters.date_from = datetime.strptime(options["from"], "%Y-%m-%d").date()
+        if options.get("to"):
+            filters.date_to = datetime.strptime(options["to"], "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Дата должна быть в формате ГГГГ-ММ-ДД.")
+    return entity, filters
+
+@admin_router.message(Command("export"), IsAdminFilter())
+async def admin_export_data(message: Message, command: CommandObject):
+    try:
+        entity, filters = parse_export_args(command.args or "")
+    except ValueError as e_args:
+        await message.answer(f"{e_args}\n\n{_export_usage_text()}")
+        return
+
+    print(f"DEBUG: Admin {message.from_user.id} requested export '{entity}' with {filters}")
+    await message.answer("⏳ Готовлю выгрузку, это может занять некоторое время...")
+    try:
+        export_result = await export_to_gzip_csv(entity, filters)
+    except Exception as e:
+        print(f"ERROR admin_export_data: export '{entity}' failed: {e}\n{traceback.format_exc()}")
+        await message.answer("Не удалось сформировать выгрузку. Подробности в логах.")
+        return
+
+    try:
+        if os.path.getsize(export_result.file_path) > TELEGRAM_BOT_DOCUMENT_LIMIT_BYTES:
+            await message.answer("Файл выгрузки больше 50 МБ - Telegram не даст его отправить. Сузьте период или город.")
+            return
+        await message.answer_document(
+            FSInputFile(export_result.file_path, filename=export_result.file_name),
+            caption=f"{EXPORT_ENTITIES[entity][0]}: {export_result.rows_count} строк (CSV, gzip)"
+        )
+    finally:
+        os.remove(export_result.file_path)
+
+# --- ВОРОНКА (/funnel) ---
+FUNNEL_DEFAULT_DAYS = 30
+
+@admin_router.message(Command("funnel"), IsAdminFilter())
+async def admin_show_funnel(message: Message, command: CommandObject):
+    args = (command.args or "").split()
+    dimension = args[0].lower() if args else "city"
+    days_text = args[1] if len(args) > 1 else str(FUNNEL_DEFAULT_DAYS)
+    if dimension not in FUNNEL_DIMENSIONS or not days_text.isdigit() or int(days_text) < 1:
+        await message.answer(
+            f"Использование: /funnel [{'|'.join(FUNNEL_DIMENSIONS)}] [дней]\n"
+            f"Пример: /funnel referral 7 (по умолчанию: city {FUNNEL_DEFAULT_DAYS})"
+        )
+        return
+
+    days = int(days_text)
+    date_from = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date()
+    async with read_session_scope() as session:
+        total, rows = await load_funnel_report(session, dimension, date_from)
+
+    lines = [f"📊 Воронка за {days} дн. (с {date_from:%Y-%m-%d}), разрез: {dimension}", "", format_funnel_row(total), ""]
+    lines += [format_funnel_row(row) for row in rows] or ["Данных пока нет."]
+    lines += ["", "<i>Показ = анкета, на которую соискатель отреагировал. Данные обновляются каждые несколько минут.</i>"]
+    await message.answer("\n".join(lines), parse_mode="HTML")
 
 # --- УПРАВЛЕНИЕ АНТИ-СПАМ ПУСТЫШКОЙ ---
 
@@ -170,7 +321,7 @@ async def admin_process_antispam_text(message: Message, state: FSMContext):
         return # Оставляем пользователя в том же состоянии для повторного ввода
     
     async with AsyncSessionFactory() as session, session.begin():
-        await update_bot_setting(session, "antispam_dummy_text", new_text)
+        await update_bot_setting(session, ANTISPAM_DUMMY_TEXT, new_text)
     
     await message.answer("Текст анти-спам пустышки обновлен!", reply_markup=ReplyKeyboardRemove())
     
@@ -196,11 +347,13 @@ async def show_antispam_dummy_config_menu(target_message_or_cq: Message | Callba
     current_photo_id_value = None
     photo_status_text = "Фото/Видео: <i>Не загружено</i>"
 
-    async with AsyncSessionFactory() as session, session.begin():
-        db_text_val = await get_bot_setting(session, "antispam_dummy_text")
-        if db_text_val: current_text_value = f"<em>{db_text_val}</em>" # Курсив для текста
-        current_photo_id_value = await get_bot_setting(session, "antispam_dummy_photo_id")
-        if current_photo_id_value: photo_status_text = "Фото/Видео: <b>Есть</b>"
+    db_text_val = await get_setting(ANTISPAM_DUMMY_TEXT)
+    if db_text_val: current_text_value = f"<em>{db_text_val}</em>" # Курсив для текста
+    current_photo_id_value = await get_setting(ANTISPAM_DUMMY_PHOTO_ID)
+    if current_photo_id_value: photo_status_text = "Фото/Видео: <b>Есть</b>"
+    if is_photo_known_broken(current_photo_id_value):
+        photo_status_text = "Фото/Видео: <b>Не отправляется</b> (file_id недействителен, пользователям показывается текст)"
+        current_photo_id_value = None
 
     text_to_show += f"<u>Текущий текст:</u>\n{current_text_value}\n\n"
     text_to_show += f"{photo_status_text}\n\nВыберите действие:"
@@ -234,7 +387,7 @@ async def show_antispam_dummy_config_menu(target_message_or_cq: Message | Callba
     except Exception as e:
         print(f"Error in show_antispam_dummy_config_menu (displaying): {e}\n{traceback.format_exc()}")
         # Фоллбэк на простое новое сообщение
-        final_fallback_text = f"Настройки АС-пустышки:\nТекст: {await get_bot_setting(AsyncSessionFactory(), 'antispam_dummy_text') or 'не задан'}\nФото: {'есть' if await get_bot_setting(AsyncSessionFactory(), 'antispam_dummy_photo_id') else 'нет'}"
+        final_fallback_text = f"Настройки АС-пустышки:\nТекст: {await get_setting(ANTISPAM_DUMMY_TEXT) or 'не задан'}\nФото: {'есть' if await get_setting(ANTISPAM_DUMMY_PHOTO_ID) else 'нет'}"
         await message_to_act_on.answer(final_fallback_text, reply_markup=kb) # Отправляем новое сообщение с кнопками
         if isinstance(target_message_or_cq, CallbackQuery): await target_message_or_cq.answer("Ошибка отображения, но меню доступно.")
 
@@ -285,7 +438,7 @@ async def admin_save_antispam_text(message: Message, state: FSMContext):
         return
     
     async with AsyncSessionFactory() as session, session.begin():
-        await update_bot_setting(session, "antispam_dummy_text", new_text)
+        await update_bot_setting(session, ANTISPAM_DUMMY_TEXT, new_text)
     
     await message.answer("Текст анти-спам пустышки обновлен!")
     # await state.set_state(AdminStates.in_panel) # Или None, если show_... не ожидает определенного состояния
@@ -341,7 +494,7 @@ async def admin_save_antispam_media(message: Message, state: FSMContext):
         return
 
     async with AsyncSessionFactory() as session, session.begin():
-        await update_bot_setting(session, "antispam_dummy_photo_id", file_id)
+        await update_bot_setting(session, ANTISPAM_DUMMY_PHOTO_ID, file_id)
     
     await message.answer("Медиафайл для анти-спам пустышки обновлен!", reply_markup=ReplyKeyboardRemove())
     # Возвращаемся к показу настроек пустышки
@@ -363,7 +516,7 @@ async def admin_wrong_file_for_antispam_media(message: Message, state: FSMContex
 @admin_router.callback_query(F.data == "admin_as_delete_photo", StateFilter(AdminStates.in_panel, None)) # Можно из in_panel или другого состояния пустышки
 async def admin_delete_antispam_media(callback_query: CallbackQuery, state: FSMContext):
     async with AsyncSessionFactory() as session, session.begin():
-        await update_bot_setting(session, "antispam_dummy_photo_id", None) # Устанавливаем в None
+        await update_bot_setting(session, ANTISPAM_DUMMY_PHOTO_ID, None) # Устанавливаем в None
     
     await callback_query.answer("Фото/видео для анти-спам пустышки удалено.")
     # Обновляем отображение настроек
@@ -373,146 +526,280 @@ async def admin_delete_antispam_media(callback_query: CallbackQuery, state: FSMC
 # --- УВЕДОМЛЕНИЯ АДМИНИСТРАТОРАМ О ЖАЛОБАХ ---
 
 async def notify_admins_about_complaint(bot: Bot, complaint: Complaint):
-    """Отправляет уведомление о новой жалобе всем администраторам."""
-    
-    reporter_display_info = f"ID: {complaint.reporter_user_id or 'неизвестен'}"
-    
-    reported_entity_type_text = "неизвестный объект" 
-    reported_user_details_text = "Пользователь не определен" 
-    profile_details_snippet = "" 
+    """
+    Ставит уведомление о новой жалобе в фон и сразу возвращается,
+    чтобы рассылка админам не задерживала ответ отправителю жалобы.
+    """
+    complaint_snapshot = _ComplaintSnapshot(
+        id=complaint.id,
+        reporter_user_id=complaint.reporter_user_id,
+        reported_user_id=complaint.reported_user_id,
+        reported_employer_profile_id=complaint.reported_employer_profile_id,
+        reported_applicant_profile_id=complaint.reported_applicant_profile_id,
+    )
+    task = asyncio.create_task(_deliver_complaint_notification(bot, complaint_snapshot))
+    _complaint_notify_tasks.add(task)
+    task.add_done_callback(_complaint_notify_tasks.discard)
+
+
+@dataclass(slots=True)
+class _ComplaintSnapshot:
+    id: int
+    reporter_user_id: int | None
+    reported_user_id: int | None
+    reported_employer_profile_id: int | None
+    reported_applicant_profile_id: int | None
+
+@dataclass(slots=True)
+class _ComplaintPush:
+    """Уже отправленное админам уведомление, в которое складываются повторные жалобы на ту же цель."""
+    first_complaint_id: int
+    created_at: float # time.monotonic()
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    text: str = ""
+    keyboard: InlineKeyboardMarkup | None = None
+    is_photo: bool = False
+    admin_message_ids: dict[int, int] = field(default_factory=dict)
+    repeat_count: int = 0
+    last_complaint_id: int | None = None
+
+# Ссылки на фоновые задачи, чтобы их не собрал GC до завершения
+_complaint_notify_tasks: set[asyncio.Task] = set()
+# Цель жалобы -> последнее уведомление по ней (в пределах процесса)
+_complaint_pushes: dict[str, _ComplaintPush] = {}
+_admin_send_semaphore = asyncio.Semaphore(ADMIN_NOTIFY_CONCURRENCY)
+
+
+def _complaint_target_key(complaint: _ComplaintSnapshot) -> str:
+    if complaint.reported_employer_profile_id:
+        return f"emp:{complaint.reported_employer_profile_id}"
+    if complaint.reported_applicant_profile_id:
+        return f"app:{complaint.reported_applicant_profile_id}"
+    return f"user:{complaint.reported_user_id}"
+
+def _user_display(user: User | None) -> str | None:
+    if not user:
+        return None
+    return f"{user.first_name or ''} (@{user.username or 'N/A'}, ID: {user.telegram_id})"
+
+
+async def load_complaint_context(session, complaint_id: int):
+    """Отправитель, цель, анкета и ее владелец - одним запросом с LEFT JOIN вместо цепочки session.get."""
+    reporter = aliased(User, name="reporter")
+    reported_user = aliased(User, name="reported_user")
+    profile_owner = aliased(User, name="profile_owner")
+    result = await session.execute(
+        select(reporter, reported_user, EmployerProfile, ApplicantProfile, profile_owner)
+        .select_from(Complaint)
+        .outerjoin(reporter, reporter.telegram_id == Complaint.reporter_user_id)
+        .outerjoin(reported_user, reported_user.telegram_id == Complaint.reported_user_id)
+        .outerjoin(EmployerProfile, EmployerProfile.id == Complaint.reported_employer_profile_id)
+        .outerjoin(ApplicantProfile, ApplicantProfile.id == Complaint.reported_applicant_profile_id)
+        .outerjoin(profile_owner, profile_owner.telegram_id == func.coalesce(EmployerProfile.user_id, ApplicantProfile.user_id))
+        .where(Complaint.id == complaint_id)
+    )
+    return result.one_or_none()
+
+
+def build_complaint_notification(complaint: _ComplaintSnapshot, context_row) -> tuple[str, InlineKeyboardMarkup, str | None]:
+    reporter, reported_user_obj, emp_profile, app_profile, owner = context_row if context_row else (None,) * 5
+
+    reporter_display_info = _user_display(reporter) or f"ID: {complaint.reporter_user_id or 'неизвестен'}"
+    reported_entity_type_text = "неизвестный объект"
+    reported_user_details_text = "Пользователь не определен"
+    profile_details_snippet = ""
     photo_to_send_for_admin = None
     target_user_for_action_buttons = complaint.reported_user_id
 
-    try:
-        async with AsyncSessionFactory() as session, session.begin():
-            # 1. Информация об отправителе жалобы
-            if complaint.reporter_user_id:
-                reporter = await session.get(User, complaint.reporter_user_id)
-                if reporter:
-                    reporter_display_info = f"{reporter.first_name or ''} (@{reporter.username or 'N/A'}, ID: {reporter.telegram_id})"
-
-            # 2. Информация о цели жалобы
-            if complaint.reported_user_id:
-                reported_user_obj = await session.get(User, complaint.reported_user_id)
-                if reported_user_obj:
-                    # Заполняем по умолчанию, потом уточним, если это профиль
-                    reported_user_details_text = f"Пользователь: {reported_user_obj.first_name or ''} (@{reported_user_obj.username or 'N/A'}, ID: {reported_user_obj.telegram_id})"
-                else:
-                    reported_user_details_text = f"Пользователь ID {complaint.reported_user_id} (не найден в таблице Users)"
-            
-            # Если жалоба на профиль работодателя
-            if complaint.reported_employer_profile_id:
-                reported_entity_type_text = "анкету РАБОТОДАТЕЛЯ"
-                emp_profile = await session.get(EmployerProfile, complaint.reported_employer_profile_id)
-                if emp_profile:
-                    photo_to_send_for_admin = emp_profile.photo_file_id
-                    # Уточняем reported_user_details_text на основе владельца профиля
-                    owner_id = emp_profile.user_id
-                    if not target_user_for_action_buttons: target_user_for_action_buttons = owner_id # Если вдруг не был установлен
-                    
-                    owner = await session.get(User, owner_id)
-                    if owner: 
-                        reported_user_details_text = f"Работодатель: {owner.first_name or ''} (@{owner.username or 'N/A'}, ID: {owner.telegram_id})"
-                    
-                    wf_display = getattr(emp_profile.work_format, 'name', "Не указан").title()
-                    min_age_d = emp_profile.min_age_candidate if emp_profile.min_age_candidate is not None else "Не указан"
-                    profile_details_snippet = (
-                        f"\n\n<b>--- Детали анкеты (работодатель ID: {emp_profile.id}) ---</b>\n"
-                        f"<b>Компания:</b> {emp_profile.company_name}\n<b>Город:</b> {emp_profile.city}\n"
-                        f"<b>Позиция:</b> {emp_profile.position}\n<b>ЗП:</b> {emp_profile.salary}\n"
-                        f"<b>Мин. возраст:</b> {min_age_d}\n<b>Формат:</b> {wf_display}\n"
-                        f"<b>Описание:</b>\n{emp_profile.description or 'Нет'}\n"
-                        f"<b>Активна:</b> {'Да' if emp_profile.is_active else 'Нет'}"
-                    )
-            # Если жалоба на профиль соискателя
-            elif complaint.reported_applicant_profile_id:
-                reported_entity_type_text = "анкету СОИСКАТЕЛЯ"
-                app_profile = await session.get(ApplicantProfile, complaint.reported_applicant_profile_id)
-                if app_profile:
-                    owner_id = app_profile.user_id
-                    if not target_user_for_action_buttons: target_user_for_action_buttons = owner_id
-                    
-                    owner = await session.get(User, owner_id)
-                    if owner: 
-                        reported_user_details_text = f"Соискатель: {owner.first_name or ''} (@{owner.username or 'N/A'}, ID: {owner.telegram_id})"
-                    
-                    gender_d = getattr(app_profile.gender, 'name', "Не указан").title()
-                    contact_phone_text = "Не указан"
-                    if owner and owner.contact_phone: # Телефон берем из User
-                        contact_phone_text = f"+{owner.contact_phone}"
-                    
-                    profile_details_snippet = (
-                        f"\n\n<b>--- Детали анкеты (соискатель ID: {app_profile.id}) ---</b>\n"
-                        f"<b>Город:</b> {app_profile.city}\n<b>Пол:</b> {gender_d}\n"
-                        f"<b>Возраст:</b> {app_profile.age}\n<b>Опыт:</b>\n{app_profile.experience or 'Нет'}\n"
-                        f"<b>Контактный телефон:</b> {contact_phone_text}"
-                    )
-            # Если жалоба только на пользователя (уже обработано в reported_user_details_text)
-            elif complaint.reported_user_id and not complaint.reported_employer_profile_id and not complaint.reported_applicant_profile_id:
-                 reported_entity_type_text = "ПОЛЬЗОВАТЕЛЯ"
-
-        # Формируем полный текст для PUSH
-        full_notification_text = (
-            f"🚨 Новая жалоба! (ID: {complaint.id})\n\n"
-            f"<b>Отправитель:</b>\n{reporter_display_info}\n\n"
-            f"<b>Жалоба на {reported_entity_type_text}:</b>\n{reported_user_details_text}"
-            f"{profile_details_snippet}" # Добавляем детали анкеты, если они есть
-        )
+    if complaint.reported_user_id:
+        if reported_user_obj:
+            # Заполняем по умолчанию, потом уточним, если это профиль
+            reported_user_details_text = f"Пользователь: {_user_display(reported_user_obj)}"
+        else:
+            reported_user_details_text = f"Пользователь ID {complaint.reported_user_id} (не найден в таблице Users)"
+
+    # Если жалоба на профиль работодателя
+    if complaint.reported_employer_profile_id:
+        reported_entity_type_text = "анкету РАБОТОДАТЕЛЯ"
+        if emp_profile:
+            photo_to_send_for_admin = usable_photo(emp_profile.photo_file_id) # Битое фото - сразу текстом
+            if not target_user_for_action_buttons: target_user_for_action_buttons = emp_profile.user_id
+            if owner:
+                reported_user_details_text = f"Работодатель: {_user_display(owner)}"
+
+            wf_display = getattr(emp_profile.work_format, 'name', "Не указан").title()
+            min_age_d = emp_profile.min_age_candidate if emp_profile.min_age_candidate is not None else "Не указан"
+            profile_details_snippet = (
+                f"\n\n<b>--- Детали анкеты (работодатель ID: {emp_profile.id}) ---</b>\n"
+                f"<b>Компания:</b> {emp_profile.company_name}\n<b>Город:</b> {emp_profile.city}\n"
+                f"<b>Позиция:</b> {emp_profile.position}\n<b>ЗП:</b> {emp_profile.salary}\n"
+                f"<b>Мин. возраст:</b> {min_age_d}\n<b>Формат:</b> {wf_display}\n"
+                f"<b>Описание:</b>\n{emp_profile.description or 'Нет'}\n"
+                f"<b>Активна:</b> {'Да' if emp_profile.is_active else 'Нет'}"
+            )
+    # Если жалоба на профиль соискателя
+    elif complaint.reported_applicant_profile_id:
+        reported_entity_type_text = "анкету СОИСКАТЕЛЯ"
+        if app_profile:
+            if not target_user_for_action_buttons: target_user_for_action_buttons = app_profile.user_id
+            if owner:
+                reported_user_details_text = f"Соискатель: {_user_display(owner)}"
+
+            gender_d = getattr(app_profile.gender, 'name', "Не указан").title()
+            contact_phone_text = f"+{owner.contact_phone}" if owner and owner.contact_phone else "Не указан" # Телефон берем из User
+            profile_details_snippet = (
+                f"\n\n<b>--- Детали анкеты (соискатель ID: {app_profile.id}) ---</b>\n"
+                f"<b>Город:</b> {app_profile.city}\n<b>Пол:</b> {gender_d}\n"
+                f"<b>Возраст:</b> {app_profile.age}\n<b>Опыт:</b>\n{app_profile.experience or 'Нет'}\n"
+                f"<b>Контактный телефон:</b> {contact_phone_text}"
+            )
+    # Если жалоба только на пользователя (уже обработано в reported_user_details_text)
+    elif complaint.reported_user_id:
+        reported_entity_type_text = "ПОЛЬЗОВАТЕЛЯ"
+
+    # Формируем полный текст для PUSH
+    full_notification_text = (
+        f"🚨 Новая жалоба! (ID: {complaint.id})\n\n"
+        f"<b>Отправитель:</b>\n{reporter_display_info}\n\n"
+        f"<b>Жалоба на {reported_entity_type_text}:</b>\n{reported_user_details_text}"
+        f"{profile_details_snippet}" # Добавляем детали анкеты, если они есть
+    )
 
-        # Формирование кнопок
-        action_buttons = []
-        # Кнопка удаления/сброса анкеты
-        if complaint.reported_employer_profile_id:
-            action_buttons.append([InlineKeyboardButton(
-                text="🗑️ Удалить анкету раб-ля (сброс)", 
-                callback_data=f"admin_complaint_delete_reset_emp_profile:{complaint.id}:{complaint.reported_employer_profile_id}:{target_user_for_action_buttons or emp_profile.user_id}"
-            )])
-        elif complaint.reported_applicant_profile_id:
-             action_buttons.append([InlineKeyboardButton(
-                text="🗑️ Удалить анкету соиск-ля (сброс)", 
-                callback_data=f"admin_complaint_delete_reset_app_profile:{complaint.id}:{complaint.reported_applicant_profile_id}:{target_user_for_action_buttons or app_profile.user_id}"
-            )])
-        
-        # Кнопка блокировки пользователя
-        if target_user_for_action_buttons:
-            action_buttons.append([InlineKeyboardButton(
-                text="🚫 Заблокировать этого пользователя", 
-                callback_data=f"admin_complaint_ban_user:{complaint.id}:{target_user_for_action_buttons}"
-            )])
-        
-        # Кнопка "Пометить как обработанную"
+    # Формирование кнопок
+    action_buttons = []
+    # Кнопка удаления/сброса анкеты
+    if complaint.reported_employer_profile_id:
         action_buttons.append([InlineKeyboardButton(
-            text="☑️ Пометить как обработанную", 
-            callback_data=f"admin_complaint_resolve:{complaint.id}"
+            text="🗑️ Удалить анкету раб-ля (сброс)",
+            callback_data=f"admin_complaint_delete_reset_emp_profile:{complaint.id}:{complaint.reported_employer_profile_id}:{target_user_for_action_buttons}"
+        )])
+    elif complaint.reported_applicant_profile_id:
+        action_buttons.append([InlineKeyboardButton(
+            text="🗑️ Удалить анкету соиск-ля (сброс)",
+            callback_data=f"admin_complaint_delete_reset_app_profile:{complaint.id}:{complaint.reported_applicant_profile_id}:{target_user_for_action_buttons}"
+        )])
+
+    # Кнопка блокировки пользователя
+    if target_user_for_action_buttons:
+        action_buttons.append([InlineKeyboardButton(
+            text="🚫 Заблокировать этого пользователя",
+            callback_data=f"admin_complaint_ban_user:{complaint.id}:{target_user_for_action_buttons}"
         )])
-        
-        admin_action_kb = InlineKeyboardMarkup(inline_keyboard=action_buttons)
 
-        # Отправка уведомлений админам
-        for admin_id_loop in ADMIN_IDS:
+    # Кнопка "Пометить как обработанную"
+    action_buttons.append([InlineKeyboardButton(
+        text="☑️ Пометить как обработанную",
+        callback_data=f"admin_complaint_resolve:{complaint.id}"
+    )])
+
+    # Фото - только для жалобы на работодателя с фото
+    photo_file_id = photo_to_send_for_admin if complaint.reported_employer_profile_id else None
+    return full_notification_text, InlineKeyboardMarkup(inline_keyboard=action_buttons), photo_file_id
+
+
+async def _paced_admin_call(admin_id: int, send_coro_factory):
+    """Не больше ADMIN_NOTIFY_CONCURRENCY отправок одновременно, с паузой после каждой; один повтор после RetryAfter."""
+    async with _admin_send_semaphore:
+        try:
             try:
-                # Отправляем фото, если это жалоба на работодателя и у него есть фото
-                if photo_to_send_for_admin and complaint.reported_employer_profile_id:
-                    await bot.send_photo(
-                        chat_id=admin_id_loop,
-                        photo=photo_to_send_for_admin,
-                        caption=full_notification_text[:1024], # Ограничение длины caption
-                        reply_markup=admin_action_kb,
-                        parse_mode="HTML"
-                    )
-                else: # В остальных случаях (жалоба на соискателя или на работодателя без фото) - текстовое сообщение
-                    await bot.send_message(
-                        chat_id=admin_id_loop,
-                        text=full_notification_text,
-                        reply_markup=admin_action_kb,
-                        parse_mode="HTML"
-                    )
-                print(f"DEBUG: Complaint PUSH sent to admin {admin_id_loop} for complaint ID {complaint.id}")
-            except Exception as e_send:
-                print(f"ERROR sending PUSH to admin {admin_id_loop} for complaint {complaint.id}: {e_send}\n{traceback.format_exc()}")
-    
+                return await send_coro_factory()
+            except TelegramRetryAfter as e_flood:
+                print(f"DEBUG: Flood control for admin {admin_id}, retry after {e_flood.retry_after}s")
+                await asyncio.sleep(e_flood.retry_after)
+                return await send_coro_factory()
+        except Exception as e_send:
+            print(f"ERROR sending PUSH to admin {admin_id}: {e_send}\n{traceback.format_exc()}")
+            return None
+        finally:
+            await asyncio.sleep(ADMIN_NOTIFY_SEND_INTERVAL_SECONDS)
+
+
+async def _send_complaint_push(bot: Bot, admin_id: int, text: str, keyboard: InlineKeyboardMarkup, photo_file_id: str | None):
+    if photo_file_id:
+        return await bot.send_photo(
+            chat_id=admin_id, photo=photo_file_id,
+            caption=text[:1024], # Ограничение длины caption
+            reply_markup=keyboard, parse_mode="HTML"
+        )
+    return await bot.send_message(chat_id=admin_id, text=text, reply_markup=keyboard, parse_mode="HTML")
+
+
+async def _fold_repeat_complaint(bot: Bot, push: _ComplaintPush, complaint: _ComplaintSnapshot):
+    push.repeat_count += 1
+    push.last_complaint_id = complaint.id
+    repeat_line = f"\n\n🔁 <b>Повторных жалоб на эту цель: {push.repeat_count}</b> (последняя ID: {complaint.id})"
+
+    async def edit_for(admin_id: int, message_id: int):
+        if push.is_photo:
+            caption = push.text[:1024 - len(repeat_line)] + repeat_line
+            return await bot.edit_message_caption(chat_id=admin_id, message_id=message_id, caption=caption,
+                                                  reply_markup=push.keyboard, parse_mode="HTML")
+        return await bot.edit_message_text(text=push.text + repeat_line, chat_id=admin_id, message_id=message_id,
+                                           reply_markup=push.keyboard, parse_mode="HTML")
+
+    await asyncio.gather(*(
+        _paced_admin_call(admin_id, functools.partial(edit_for, admin_id, message_id))
+        for admin_id, message_id in push.admin_message_ids.items()
+    ))
+    print(f"DEBUG: Complaint {complaint.id} folded into push for complaint {push.first_complaint_id} (repeat #{push.repeat_count})")
+
+
+async def _deliver_complaint_notification(bot: Bot, complaint: _ComplaintSnapshot):
+    try:
+        target_key = _complaint_target_key(complaint)
+        push = _complaint_pushes.get(target_key)
+        if push and time.monotonic() - push.created_at < COMPLAINT_FOLD_WINDOW_SECONDS:
+            async with push.lock: # Ждем, пока первое уведомление будет разослано
+                if push.admin_message_ids:
+                    async with AsyncSessionFactory() as session:
+                        first_status = await session.scalar(select(Complaint.status).where(Complaint.id == push.first_complaint_id))
+                    # Если первую жалобу уже обработали, кнопки в том сообщении сняты - шлем новое
+                    if first_status == ComplaintStatusEnum.NEW:
+                        await _fold_repeat_complaint(bot, push, complaint)
+                        return
+
+        push = _ComplaintPush(first_complaint_id=complaint.id, created_at=time.monotonic())
+        _complaint_pushes[target_key] = push
+        async with push.lock:
+            async with AsyncSessionFactory() as session:
+                context_row = await load_complaint_context(session, complaint.id)
+            push.text, push.keyboard, photo_file_id = build_complaint_notification(complaint, context_row)
+            push.is_photo = photo_file_id is not None
+
+            # Отправка уведомлений админам - параллельно, с общим ограничением скорости
+            sent_messages = await asyncio.gather(*(
+                _paced_admin_call(admin_id, functools.partial(_send_complaint_push, bot, admin_id, push.text, push.keyboard, photo_file_id))
+                for admin_id in ADMIN_IDS
+            ))
+            for admin_id, sent_message in zip(ADMIN_IDS, sent_messages):
+                if sent_message:
+                    push.admin_message_ids[admin_id] = sent_message.message_id
+            print(f"DEBUG: Complaint PUSH for complaint ID {complaint.id} sent to {len(push.admin_message_ids)}/{len(ADMIN_IDS)} admins")
+
+        # Старые записи больше не нужны для склейки
+        expired_keys = [key for key, old_push in _complaint_pushes.items()
+                        if time.monotonic() - old_push.created_at >= COMPLAINT_FOLD_WINDOW_SECONDS]
+        for key in expired_keys:
+            _complaint_pushes.pop(key, None)
     except Exception as e_outer:
-        print(f"CRITICAL ERROR in notify_admins_about_complaint (complaint_id {complaint.id if complaint else 'Unknown'}): {e_outer}\n{traceback.format_exc()}")
+        print(f"CRITICAL ERROR in notify_admins_about_complaint (complaint_id {complaint.id}): {e_outer}\n{traceback.format_exc()}")
+
+
+async def resolve_folded_complaints(session, complaint: Complaint):
+    """Закрывает вместе с жалобой и остальные NEW-жалобы на ту же цель (они склеены в одно уведомление)."""
+    if complaint.reported_employer_profile_id:
+        same_target = Complaint.reported_employer_profile_id == complaint.reported_employer_profile_id
+    elif complaint.reported_applicant_profile_id:
+        same_target = Complaint.reported_applicant_profile_id == complaint.reported_applicant_profile_id
+    elif complaint.reported_user_id:
+        same_target = Complaint.reported_user_id == complaint.reported_user_id
+    else:
+        return
+    await session.execute(
+        update(Complaint)
+        .where(same_target, Complaint.status == ComplaintStatusEnum.NEW, Complaint.id != complaint.id)
+        .values(status=ComplaintStatusEnum.RESOLVED, updated_at=func.now())
+    )
 
 
 
@@ -536,6 +823,7 @@ async def admin_resolve_complaint(callback_query: CallbackQuery, state: FSMConte
 
             complaint.status = ComplaintStatusEnum.RESOLVED # Или VIEWED, а потом админ меняет на RESOLVED
             complaint.updated_at = func.now() # SQLAlchemy обычно сама это делает, но для явности
+            await resolve_folded_complaints(session, complaint)
             # session.add(complaint) # Не обязательно, если объект уже отслеживается
             await callback_query.answer("Жалоба помечена как обработанная.", show_alert=True)
             # Обновляем сообщение у админа, который нажал кнопку (например, убираем кнопки)
@@ -590,6 +878,7 @@ async def admin_ban_user_from_complaint(callback_query: types.CallbackQuery, sta
             
             complaint.status = ComplaintStatusEnum.RESOLVED # Обновляем статус жалобы
             complaint.updated_at = func.now()
+            await resolve_folded_complaints(session, complaint)
             # session.add(complaint) # SQLAlchemy отследит
         else:
             action_taken_message = f"Пользователь ID {user_to_ban_id} не найден для блокировки."
@@ -657,11 +946,15 @@ async def admin_delete_reset_profile_from_complaint(callback_query: types.Callba
         profile_deleted = False
         role_reset = False
 
-        # 2. Удаляем профиль
-        delete_profile_stmt = delete(profile_model_to_delete).where(profile_model_to_delete.id == profile_id_to_delete)
-        profile_delete_result = await session.execute(delete_profile_stmt)
-        if profile_delete_result.rowcount > 0:
-            profile_deleted = True
+        # 2. Удаляем профиль (анкету работодателя - скрываем, ее зависимые строки вычистит фоновая очистка)
+        if profile_model_to_delete is EmployerProfile:
+            profile_deleted = bool(await soft_delete_employer_profiles(
+                session, EmployerProfile.id == profile_id_to_delete, reason=f"admin:{acting_admin_id}"
+            ))
+        else:
+            delete_profile_stmt = delete(profile_model_to_delete).where(profile_model_to_delete.id == profile_id_to_delete)
+            profile_deleted = (await session.execute(delete_profile_stmt)).rowcount > 0
+        if profile_deleted:
             print(f"DEBUG: Admin {acting_admin_id} deleted {entity_name_for_logs} profile ID {profile_id_to_delete}")
         
         # 3. Сбрасываем роль пользователя
@@ -678,6 +971,7 @@ async def admin_delete_reset_profile_from_complaint(callback_query: types.Callba
             .values(status=ComplaintStatusEnum.RESOLVED, updated_at=func.now())
         )
         await session.execute(complaint_status_update_stmt)
+        await resolve_folded_complaints(session, complaint_obj)
         print(f"DEBUG: Complaint ID {complaint_id} status set to RESOLVED by admin {acting_admin_id}")
         
         # Формируем сообщение
@@ -732,6 +1026,7 @@ async def admin_resolve_complaint_action(callback_query: types.CallbackQuery, st
         # Если статус NEW, обрабатываем
         complaint.status = ComplaintStatusEnum.RESOLVED # Или другой подходящий статус
         complaint.updated_at = func.now() 
+        await resolve_folded_complaints(session, complaint)
         # Можно добавить поле 'processed_by_admin_id = acting_admin_id' в модель Complaint
         # session.add(complaint) # Не обязательно, если объект отслеживается
         
@@ -947,6 +1242,84 @@ async def admin_dummy_emp_save_action(message: Message, state: FSMContext):
     await message.answer(ADMIN_GREETING, reply_markup=admin_main_menu_keyboard)
 
 
+# --- ИМПОРТ ПУСТЫШЕК ИЗ ФАЙЛА ---
+DUMMY_IMPORT_INLINE_ERRORS_LIMIT = 20 # Больше - отчет отправляется файлом
+
+def _dummy_import_help_text() -> str:
+    return (
+        "Пришлите файл .csv или .json с пустышками.\n\n"
+        "CSV: первая строка - заголовок, разделитель запятая или точка с запятой.\n"
+        "Колонки: city, company_name, position, salary, min_age, description, work_format, photo_file_id "
+        "(можно по-русски: город, компания, позиция, зп, мин_возраст, описание, формат, фото).\n"
+        "JSON: массив объектов с теми же ключами.\n\n"
+        "min_age и photo_file_id необязательны, work_format - 'Офлайн' или 'Онлайн'.\n"
+        "Правила те же, что при ручном создании. Ошибочные строки пропускаются и попадают в отчет.\n\n"
+        "Для отмены введите /cancel_add_dummy"
+    )
+
+@admin_router.callback_query(F.data == "admin_action_import_dummies")
+async def admin_start_import_dummies_cb(callback_query: CallbackQuery, state: FSMContext):
+    await state.set_state(AdminImportDummyEmployers.waiting_for_file)
+    try:
+        await callback_query.message.edit_reply_markup(reply_markup=None)
+    except Exception as e:
+        print(f"Could not edit reply markup for import_dummies: {e}")
+    await callback_query.message.answer(_dummy_import_help_text(), reply_markup=ReplyKeyboardRemove())
+    await callback_query.answer()
+
+@admin_router.message(Command("cancel_add_dummy"), StateFilter(AdminImportDummyEmployers))
+@admin_router.message(F.text.casefold() == "отмена", StateFilter(AdminImportDummyEmployers))
+async def admin_cancel_import_dummies(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("Импорт пустышек отменен.")
+    await state.set_state(AdminStates.in_panel)
+    await message.answer(ADMIN_GREETING, reply_markup=admin_main_menu_keyboard)
+
+@admin_router.message(AdminImportDummyEmployers.waiting_for_file, F.document)
+async def admin_import_dummies_file(message: Message, state: FSMContext, bot: Bot):
+    document = message.document
+    file_name = document.file_name or ""
+    if not file_name.lower().endswith((".csv", ".json")):
+        await message.answer("Нужен файл .csv или .json. Пришлите другой файл или /cancel_add_dummy")
+        return
+    if document.file_size and document.file_size > DUMMY_IMPORT_MAX_FILE_BYTES:
+        await message.answer(f"Файл больше {DUMMY_IMPORT_MAX_FILE_BYTES // (1024 * 1024)} МБ. Разбейте его на части.")
+        return
+
+    await message.answer("⏳ Проверяю и загружаю пустышки...")
+    try:
+        buffer = await bot.download(document, destination=io.BytesIO())
+        rows = await asyncio.to_thread(parse_dummy_import_file, file_name, buffer.getvalue())
+    except DummyImportFileError as e_file:
+        await message.answer(f"Файл не принят: {e_file}\nИсправьте и пришлите снова или /cancel_add_dummy")
+        return
+
+    try:
+        result = await import_dummy_employers(rows, bot=bot)
+    except Exception as e:
+        print(f"ERROR admin_import_dummies_file: import of '{file_name}' failed: {e}\n{traceback.format_exc()}")
+        await message.answer("Не удалось сохранить пустышки, ничего не добавлено. Подробности в логах.")
+        return
+
+    print(f"DEBUG: Admin {message.from_user.id} imported dummies from '{file_name}': {result.inserted}/{result.total_rows}")
+    summary = f"✅ Импорт завершен: добавлено {result.inserted} из {result.total_rows}, пропущено {len(result.errors)}."
+    if not result.errors:
+        await message.answer(summary)
+    elif len(result.errors) <= DUMMY_IMPORT_INLINE_ERRORS_LIMIT:
+        await message.answer(f"{summary}\n\n{format_dummy_import_errors(result.errors)}")
+    else:
+        report = format_dummy_import_errors(result.errors).encode("utf-8")
+        await message.answer_document(BufferedInputFile(report, filename="dummy_import_errors.txt"), caption=summary)
+
+    await state.clear()
+    await state.set_state(AdminStates.in_panel)
+    await message.answer(ADMIN_GREETING, reply_markup=admin_main_menu_keyboard)
+
+@admin_router.message(AdminImportDummyEmployers.waiting_for_file)
+async def admin_import_dummies_not_a_file(message: Message):
+    await message.answer("Пришлите файл .csv или .json документом, либо /cancel_add_dummy для отмены.")
+
+
 @admin_router.message(F.text == "📝 Пустышки Работодателей", StateFilter(AdminStates.in_panel))
 async def admin_manage_dummy_profiles_menu(message: Message, state: FSMContext):
     # Убираем Reply-клавиатуру главного админ-меню
@@ -975,13 +1348,55 @@ async def admin_back_to_main_panel_from_dummies_cb(callback_query: CallbackQuery
     await callback_query.answer()
     
     
-async def build_dummy_list_keyboard(dummies: list[EmployerProfile], current_page: int = 0, per_page: int = 5) -> InlineKeyboardMarkup:
+# --- KEYSET-ПАГИНАЦИЯ АДМИНСКИХ СПИСКОВ ---
+# В callback_data кнопок "Пред./След." лежит номер страницы (для "стр. X/Y") и курсор по id.
+# Якорь текущей страницы хранится в FSM, чтобы после действий с элементом вернуться на ту же страницу.
+
+DUMMY_LIST_ANCHOR_KEY = "dummy_list_anchor"
+DUMMY_LIST_TITLE = "Список пустышек работодателей (ID: Компания (Город)):\nВыберите для действий."
+REAL_EMP_LIST_ANCHOR_KEY = "real_emp_list_anchor"
+MOTIVATION_LIST_ANCHOR_KEY = "motivation_list_anchor"
+
+def _page_callback(prefix: str, page_number: int, cursor: str) -> str:
+    return f"{prefix}{page_number}:{cursor}"
+
+def _parse_page_callback(callback_data: str, prefix: str) -> tuple[int, str | None]:
+    # "<prefix><страница>:<курсор>"; у старых кнопок курсора нет - "<prefix><страница>"
+    page_str, _, cursor = callback_data[len(prefix):].partition(":")
+    return int(page_str), (cursor or None)
+
+async def _resolve_list_position(state: FSMContext, anchor_key: str, page: int, cursor: str | None) -> tuple[int, str | None]:
+    if cursor is not None or page == 0:
+        return page, cursor
+    # Вернуться на страницу page без курсора: берем якорь из FSM, если он от этой же страницы
+    anchor = (await state.get_data()).get(anchor_key)
+    if anchor and anchor.get("page") == page:
+        return page, anchor.get("cursor")
+    return 0, None
+
+async def _resume_list_position(state: FSMContext, anchor_key: str) -> tuple[int, str | None]:
+    anchor = (await state.get_data()).get(anchor_key) or {}
+    return anchor.get("page", 0), anchor.get("cursor")
+
+async def _remember_list_position(state: FSMContext, anchor_key: str, page: int, keyset_page: KeysetPage):
+    await state.update_data({anchor_key: {"page": page, "cursor": anchor_cursor(keyset_page)}})
+
+def _keyset_pagination_row(prefix: str, page: int, keyset_page: KeysetPage, total_pages: int,
+                           page_info_callback: str) -> list[InlineKeyboardButton]:
+    pagination_row = []
+    if keyset_page.has_prev:
+        pagination_row.append(InlineKeyboardButton(text="◀️ Пред.", callback_data=_page_callback(prefix, max(page - 1, 0), prev_cursor(keyset_page))))
+    if total_pages > 1: # Номер страницы, если их больше одной
+        pagination_row.append(InlineKeyboardButton(text=f"📄 {page+1}/{total_pages}", callback_data=page_info_callback))
+    if keyset_page.has_next:
+        pagination_row.append(InlineKeyboardButton(text="След. ▶️", callback_data=_page_callback(prefix, page + 1, next_cursor(keyset_page))))
+    return pagination_row
+
+
+async def build_dummy_list_keyboard(dummies_page: KeysetPage, current_page: int = 0, total_pages: int = 1) -> InlineKeyboardMarkup:
     buttons = []
-    # Логика пагинации (пока упрощенная - просто отображаем часть списка)
-    start_index = current_page * per_page
-    end_index = start_index + per_page
     
-    for dummy in dummies[start_index:end_index]:
+    for dummy in dummies_page.items:
         # Для каждой пустышки своя строка с кнопками
         buttons.append([
             InlineKeyboardButton(text=f"{dummy.id}: {dummy.company_name[:20]} ({dummy.city[:15]})", 
@@ -990,19 +1405,41 @@ async def build_dummy_list_keyboard(dummies: list[EmployerProfile], current_page
             InlineKeyboardButton(text="🗑️", callback_data=f"{DUMMY_PROFILE_CALLBACK_PREFIX}delete_confirm:{dummy.id}")
         ])
     
+    pagination_row = _keyset_pagination_row(DUMMY_LIST_PAGE_CALLBACK_PREFIX, current_page, dummies_page, total_pages, "no_action_page_num")
+    if pagination_row:
+        buttons.append(pagination_row)
             
     buttons.append([InlineKeyboardButton(text="🔙 Назад (в меню пустышек)", callback_data="admin_back_to_dummy_menu_from_list")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+async def load_dummy_list_keyboard(state: FSMContext, page: int = 0, cursor: str | None = None) -> InlineKeyboardMarkup | None:
+    """Одна страница списка пустышек (None, если пустышек нет)."""
+    per_page = 5
+    page, cursor = await _resolve_list_position(state, DUMMY_LIST_ANCHOR_KEY, page, cursor)
+    async with read_session_scope() as session:
+        dummies_page = await fetch_keyset_page(
+            session,
+            select(*EMPLOYER_LIST_ITEM_COLUMNS)
+            .outerjoin(User, User.telegram_id == EmployerProfile.user_id)
+            .where(EmployerProfile.is_dummy == True, EmployerProfile.deleted_at.is_(None)),
+            EmployerProfile.id, per_page, cursor=cursor, row_factory=EmployerListItem
+        )
+        if not dummies_page.items:
+            return None
+        total_items = await get_cached_count(
+            session, "dummy_profiles",
+            select(func.count(EmployerProfile.id)).where(EmployerProfile.is_dummy == True, EmployerProfile.deleted_at.is_(None))
+        )
+    if dummies_page.shifted_back:
+        page = max(page - 1, 0)
+    await _remember_list_position(state, DUMMY_LIST_ANCHOR_KEY, page, dummies_page)
+    return await build_dummy_list_keyboard(dummies_page, page, total_pages_for(total_items, per_page, page))
+
 @admin_router.callback_query(F.data == "admin_action_list_dummies")
 async def admin_list_dummy_profiles(callback_query: CallbackQuery, state: FSMContext):
-    async with AsyncSessionFactory() as session, session.begin():
-        dummies_result = await session.execute(
-            select(EmployerProfile).where(EmployerProfile.is_dummy == True).order_by(EmployerProfile.id)
-        )
-        all_dummies = dummies_result.scalars().all()
+    keyboard = await load_dummy_list_keyboard(state)
 
-    if not all_dummies:
+    if not keyboard:
         await callback_query.message.edit_text(
             "Список созданных пустышек пуст. Вы можете создать новую.",
             reply_markup=get_manage_dummy_profiles_keyboard() # Возвращаем кнопки "Создать", "Список", "Назад"
@@ -1010,18 +1447,34 @@ async def admin_list_dummy_profiles(callback_query: CallbackQuery, state: FSMCon
         await callback_query.answer()
         return
 
-    # Пока без пагинации, просто покажем первые N (например, 5)
-    keyboard = await build_dummy_list_keyboard(all_dummies, 0, 5) 
     try:
         await callback_query.message.edit_text(
-            f"Список пустышек работодателей (ID: Компания (Город)):\nВыберите для действий.",
+            DUMMY_LIST_TITLE,
             reply_markup=keyboard
         )
     except Exception as e: # Если не вышло отредактировать (например, сообщение было с фото)
         print(f"Error editing message for dummy list: {e}")
         await callback_query.message.delete() # Удаляем старое
         await callback_query.message.answer(
-             f"Список пустышек работодателей (ID: Компания (Город)):\nВыберите для действий.",
+            DUMMY_LIST_TITLE,
+            reply_markup=keyboard
+        )
+    await callback_query.answer()
+
+@admin_router.callback_query(F.data.startswith(DUMMY_LIST_PAGE_CALLBACK_PREFIX))
+async def admin_paginate_dummy_list(callback_query: CallbackQuery, state: FSMContext):
+    try:
+        page, cursor = _parse_page_callback(callback_query.data, DUMMY_LIST_PAGE_CALLBACK_PREFIX)
+    except ValueError:
+        await callback_query.answer("Ошибка страницы.", show_alert=True)
+        return
+
+    keyboard = await load_dummy_list_keyboard(state, page, cursor)
+    if not keyboard:
+        await callback_query.message.edit_text("Список созданных пустышек пуст.", reply_markup=get_manage_dummy_profiles_keyboard())
+    else:
+        await callback_query.message.edit_text(
+            DUMMY_LIST_TITLE,
             reply_markup=keyboard
         )
     await callback_query.answer()
@@ -1074,10 +1527,10 @@ async def admin_dummy_delete_do(callback_query: CallbackQuery, state: FSMContext
     profile_id = int(callback_query.data.split(":")[-1])
     deleted_count = 0
     async with AsyncSessionFactory() as session, session.begin():
-        result = await session.execute(
-            delete(EmployerProfile).where(EmployerProfile.id == profile_id, EmployerProfile.is_dummy == True)
-        )
-        deleted_count = result.rowcount # Количество удаленных строк
+        deleted_count = len(await soft_delete_employer_profiles(
+            session, EmployerProfile.id == profile_id, EmployerProfile.is_dummy == True,
+            reason=f"admin:{callback_query.from_user.id}"
+        ))
     
     if deleted_count > 0:
         await callback_query.answer(f"Пустышка ID {profile_id} удалена.", show_alert=True)
@@ -1103,7 +1556,7 @@ async def admin_view_full_dummy_profile(callback_query: CallbackQuery, state: FS
     async with AsyncSessionFactory() as session, session.begin():
         dummy_profile_instance = await session.get(EmployerProfile, profile_id)
 
-    if dummy_profile_instance and dummy_profile_instance.is_dummy:
+    if dummy_profile_instance and dummy_profile_instance.is_dummy and dummy_profile_instance.deleted_at is None:
         print(f"DEBUG admin_view_full_dummy_profile: Profile ID {profile_id} found and is a dummy.")
         await callback_query.answer() # Отвечаем на callback сразу
 
@@ -1126,22 +1579,16 @@ async def admin_view_full_dummy_profile(callback_query: CallbackQuery, state: FS
 
         # Отправляем новое сообщение с полной анкетой пустышки
         try:
-            if dummy_profile_instance.photo_file_id:
-                print(f"DEBUG admin_view_full_dummy_profile: Sending photo {dummy_profile_instance.photo_file_id}")
-                await callback_query.bot.send_photo( # Используем bot из callback_query
-                    chat_id=callback_query.message.chat.id, # Отправляем в тот же чат
-                    photo=dummy_profile_instance.photo_file_id,
-                    caption=full_text_to_send[:1024], # Ограничение длины caption
-                    parse_mode="HTML",
-                    reply_markup=back_to_list_kb
-                )
-            else:
-                print("DEBUG admin_view_full_dummy_profile: Sending text only")
-                await callback_query.message.answer( # Отправляем новое сообщение в чат
-                    full_text_to_send, 
-                    parse_mode="HTML", 
-                    reply_markup=back_to_list_kb
-                )
+            # Без фото, с битым фото или при ошибке отправки фото - текстом
+            await send_photo_or_text(
+                callback_query.bot, # Используем bot из callback_query
+                callback_query.message.chat.id, # Отправляем в тот же чат
+                dummy_profile_instance.photo_file_id,
+                full_text_to_send,
+                caption=full_text_to_send[:1024], # Ограничение длины caption
+                parse_mode="HTML",
+                reply_markup=back_to_list_kb
+            )
             print(f"DEBUG admin_view_full_dummy_profile: Profile {profile_id} displayed.")
         except Exception as e_send:
             print(f"CRITICAL ERROR admin_view_full_dummy_profile: Could not send profile display: {e_send}")
@@ -1157,10 +1604,9 @@ async def admin_view_full_dummy_profile(callback_query: CallbackQuery, state: FS
             print(f"DEBUG admin_view_full_dummy_profile: Profile ID {profile_id} NOT found.")
             await callback_query.answer("Пустышка не найдена.", show_alert=True)
 
-        async with AsyncSessionFactory() as session, session.begin():
-            dummies_result = await session.execute(select(EmployerProfile).where(EmployerProfile.is_dummy == True).order_by(EmployerProfile.id))
-            all_dummies = dummies_result.scalars().all()
-        keyboard_for_list = await build_dummy_list_keyboard(all_dummies, 0, 5)
+        keyboard_for_list = await load_dummy_list_keyboard(state, *await _resume_list_position(state, DUMMY_LIST_ANCHOR_KEY))
+        if not keyboard_for_list:
+            keyboard_for_list = get_manage_dummy_profiles_keyboard()
         try:
             await callback_query.message.edit_text("Список пустышек:", reply_markup=keyboard_for_list)
         except: # Если предыдущее сообщение не текст или удалено
@@ -1172,20 +1618,14 @@ async def admin_back_to_dummy_list_from_view(callback_query: CallbackQuery, stat
     await callback_query.answer() # Отвечаем на текущий callback
     
     
-    # Для обновления сообщения на список:
-    # 1. Загружаем все пустышки
-    async with AsyncSessionFactory() as session, session.begin():
-        dummies_result = await session.execute(
-            select(EmployerProfile).where(EmployerProfile.is_dummy == True).order_by(EmployerProfile.id)
-        )
-        all_dummies = dummies_result.scalars().all()
+    # Для обновления сообщения на список: возвращаемся на ту страницу, с которой открыли пустышку
+    new_kb = await load_dummy_list_keyboard(state, *await _resume_list_position(state, DUMMY_LIST_ANCHOR_KEY))
 
-    if not all_dummies:
+    if not new_kb:
         new_text = "Список созданных пустышек пуст."
         new_kb = get_manage_dummy_profiles_keyboard() # Кнопки "Создать", "Список (TODO)", "Назад в админ-меню"
     else:
         new_text = f"Список пустышек работодателей (ID: Компания (Город)):\nВыберите для действий."
-        new_kb = await build_dummy_list_keyboard(all_dummies, 0, 5)
 
     try:
         # Если сообщение, с которого мы пришли, имело фото, его нельзя просто отредактировать на текст
@@ -1200,37 +1640,15 @@ async def admin_back_to_dummy_list_from_view(callback_query: CallbackQuery, stat
 
 
 async def build_real_employer_list_keyboard(
-    profiles: list[EmployerProfile], 
+    profiles_page: KeysetPage, 
     current_page: int = 0, 
-    per_page: int = 3 # Давайте по 3 для теста, потом можно увеличить до 5-7
+    total_pages: int = 1
 ) -> InlineKeyboardMarkup:
     buttons = []
-    
-    # Рассчитываем общее количество страниц
-    total_items = len(profiles)
-    total_pages = (total_items + per_page - 1) // per_page # Округление вверх
-
-    # Определяем срез для текущей страницы
-    start_index = current_page * per_page
-    end_index = start_index + per_page
-    
-    paginated_profiles = profiles[start_index:end_index]
 
-    if not paginated_profiles and current_page > 0: # Если на текущей странице пусто, а это не первая страница (например, удалили все на последней)
-        current_page -=1 # Возвращаемся на предыдущую
-        start_index = current_page * per_page
-        end_index = start_index + per_page
-        paginated_profiles = profiles[start_index:end_index]
-
-    for profile in paginated_profiles:
+    for profile in profiles_page.items:
         status_emoji = "🟢" if profile.is_active else "🔴"
-        ban_status_owner_text = ""
-        # Проверку бана владельца лучше делать один раз при загрузке всех профилей и передавать,
-        # но для простоты пока оставим здесь (может быть неоптимально для многих профилей)
-        async with AsyncSessionFactory() as session:
-            owner = await session.get(User, profile.user_id) if profile.user_id else None
-            if owner and owner.is_banned:
-                ban_status_owner_text = " (🚫Владелец забанен)"
+        ban_status_owner_text = " (🚫Владелец забанен)" if profile.owner_is_banned else ""
         
         buttons.append([
             InlineKeyboardButton(
@@ -1253,15 +1671,7 @@ async def build_real_employer_list_keyboard(
 
 
     # Кнопки пагинации
-    pagination_row = []
-    if current_page > 0:
-        pagination_row.append(InlineKeyboardButton(text="◀️ Пред.", callback_data=f"{REAL_EMP_LIST_PAGE_CALLBACK_PREFIX}{current_page-1}"))
-    
-    if total_pages > 1: # Показываем номер страницы, если их больше одной
-        pagination_row.append(InlineKeyboardButton(text=f"📄 {current_page+1}/{total_pages}", callback_data="no_action_page_info"))
-
-    if end_index < total_items:
-        pagination_row.append(InlineKeyboardButton(text="След. ▶️", callback_data=f"{REAL_EMP_LIST_PAGE_CALLBACK_PREFIX}{current_page+1}"))
+    pagination_row = _keyset_pagination_row(REAL_EMP_LIST_PAGE_CALLBACK_PREFIX, current_page, profiles_page, total_pages, "no_action_page_num")
     
     if pagination_row:
         buttons.append(pagination_row)
@@ -1328,9 +1738,11 @@ async def admin_do_delete_real_employer_profile(callback_query: CallbackQuery, s
 
     async with AsyncSessionFactory() as session, session.begin():
         # Удаляем профиль работодателя
-        target_profile = await session.get(EmployerProfile, profile_id_to_delete)
-        if target_profile and not target_profile.is_dummy: # Убеждаемся, что это не пустышка
-            await session.delete(target_profile)
+        # Только реальная анкета, не пустышка; зависимые строки вычистит фоновая очистка
+        if await soft_delete_employer_profiles(
+            session, EmployerProfile.id == profile_id_to_delete, EmployerProfile.is_dummy == False,
+            reason=f"admin:{callback_query.from_user.id}"
+        ):
             profile_deleted = True
             print(f"DEBUG: Admin {callback_query.from_user.id} deleted REAL EmployerProfile ID {profile_id_to_delete}")
         
@@ -1366,17 +1778,30 @@ async def admin_list_real_employer_profiles_entry(message: Message, state: FSMCo
     await show_real_employer_profiles_page(message, state, page=0)
 
 # Новая функция для отображения конкретной страницы списка (чтобы ее можно было вызвать и из callback)
-async def show_real_employer_profiles_page(target_message_or_cq: Message | CallbackQuery, state: FSMContext, page: int = 0):
+# page без cursor - вернуться на страницу page (по якорю из FSM), cursor - перейти по кнопке "Пред./След."
+async def show_real_employer_profiles_page(target_message_or_cq: Message | CallbackQuery, state: FSMContext, page: int = 0,
+                                           cursor: str | None = None):
     message_to_act_on = target_message_or_cq.message if isinstance(target_message_or_cq, CallbackQuery) else target_message_or_cq
     per_page = 3 # Сколько анкет на странице
 
-    async with AsyncSessionFactory() as session, session.begin():
-        profiles_result = await session.execute(
-            select(EmployerProfile).where(EmployerProfile.is_dummy == False).order_by(EmployerProfile.id.desc())
+    page, cursor = await _resolve_list_position(state, REAL_EMP_LIST_ANCHOR_KEY, page, cursor)
+    total_items = 0
+    async with read_session_scope() as session:
+        # Статус бана владельца берем тем же запросом, а не отдельным запросом на каждую строку
+        profiles_page = await fetch_keyset_page(
+            session,
+            select(*EMPLOYER_LIST_ITEM_COLUMNS)
+            .outerjoin(User, User.telegram_id == EmployerProfile.user_id)
+            .where(EmployerProfile.is_dummy == False, EmployerProfile.deleted_at.is_(None)),
+            EmployerProfile.id, per_page, cursor=cursor, descending=True, row_factory=EmployerListItem
         )
-        all_real_profiles = profiles_result.scalars().all()
+        if profiles_page.items:
+            total_items = await get_cached_count(
+                session, "real_employer_profiles",
+                select(func.count(EmployerProfile.id)).where(EmployerProfile.is_dummy == False, EmployerProfile.deleted_at.is_(None))
+            )
 
-    if not all_real_profiles:
+    if not profiles_page.items:
         text_to_send = "В системе еще нет анкет реальных работодателей."
         # Если это callback, нужно отредактировать предыдущее сообщение
         if isinstance(target_message_or_cq, CallbackQuery):
@@ -1387,7 +1812,11 @@ async def show_real_employer_profiles_page(target_message_or_cq: Message | Callb
             await message_to_act_on.answer(text_to_send, reply_markup=admin_main_menu_keyboard)
         return
 
-    keyboard = await build_real_employer_list_keyboard(all_real_profiles, current_page=page, per_page=per_page)
+    if profiles_page.shifted_back:
+        page = max(page - 1, 0)
+    await _remember_list_position(state, REAL_EMP_LIST_ANCHOR_KEY, page, profiles_page)
+    keyboard = await build_real_employer_list_keyboard(profiles_page, current_page=page,
+                                                       total_pages=total_pages_for(total_items, per_page, page))
     list_text = f"Анкеты работодателей (Стр. {page+1}):"
     
     try:
@@ -1404,13 +1833,13 @@ async def show_real_employer_profiles_page(target_message_or_cq: Message | Callb
 @admin_router.callback_query(F.data.startswith(REAL_EMP_LIST_PAGE_CALLBACK_PREFIX))
 async def admin_paginate_real_employer_list(callback_query: CallbackQuery, state: FSMContext):
     try:
-        page = int(callback_query.data[len(REAL_EMP_LIST_PAGE_CALLBACK_PREFIX):])
+        page, cursor = _parse_page_callback(callback_query.data, REAL_EMP_LIST_PAGE_CALLBACK_PREFIX)
     except ValueError:
         await callback_query.answer("Ошибка страницы.", show_alert=True)
         return
     
     # Вызываем функцию отображения нужной страницы
-    await show_real_employer_profiles_page(callback_query, state, page=page)
+    await show_real_employer_profiles_page(callback_query, state, page=page, cursor=cursor)
     # callback_query.answer() уже будет вызван внутри show_real_employer_profiles_page        
 
 
@@ -1436,7 +1865,7 @@ async def admin_view_real_employer_profile(callback_query: CallbackQuery, state:
     async with AsyncSessionFactory() as session, session.begin():
         profile = await session.get(EmployerProfile, profile_id)
     
-    if profile and not profile.is_dummy:
+    if profile and not profile.is_dummy and profile.deleted_at is None: # Удаленная ждет фоновой очистки - для админки ее уже нет
         await callback_query.answer()
 
         wf_display = getattr(profile.work_format, 'name', "Не указан").title()
@@ -1465,10 +1894,8 @@ async def admin_view_real_employer_profile(callback_query: CallbackQuery, state:
         try: await callback_query.message.delete()
         except: pass
 
-        if profile.photo_file_id:
-            await callback_query.message.answer_photo(profile.photo_file_id, caption=profile_text, reply_markup=back_kb, parse_mode="HTML")
-        else:
-            await callback_query.message.answer(profile_text, reply_markup=back_kb, parse_mode="HTML")
+        await send_photo_or_text(callback_query.bot, callback_query.message.chat.id, profile.photo_file_id, profile_text,
+                                 reply_markup=back_kb, parse_mode="HTML")
     else:
         await callback_query.answer("Анкета не найдена или это пустышка.", show_alert=True)
 
@@ -1496,7 +1923,8 @@ async def admin_toggle_real_employer_profile_active(callback_query: CallbackQuer
     # ... (логика изменения is_active, как была) ...
     async with AsyncSessionFactory() as session, session.begin():
         profile = await session.get(EmployerProfile, profile_id)
-        if profile and not profile.is_dummy:
+        # Удаленную анкету не активируем обратно: у нее уже нет владельца (user_id=None)
+        if profile and not profile.is_dummy and profile.deleted_at is None:
             profile.is_active = not profile.is_active
             profile.updated_at = func.now()
             action_message = f"Статус анкеты ID {profile.id} изменен."
@@ -1536,31 +1964,97 @@ async def admin_ban_real_employer_owner(callback_query: CallbackQuery, state: FS
     await callback_query.message.edit_text(f"{callback_query.message.text}\n\n{action_message}\n(Список обновится при следующем открытии)", reply_markup=callback_query.message.reply_markup)
 
 
-@admin_router.message(F.text == "ℹ️ Найти пользователя по ID", StateFilter(AdminStates.in_panel))
+@admin_router.message(F.text.in_({BTN_FIND_USER_TEXT, BTN_FIND_USER_LEGACY_TEXT}), StateFilter(AdminStates.in_panel))
 async def admin_find_user_start(message: Message, state: FSMContext):
     await state.set_state(AdminStates.find_user_id_input)
     # Используем существующую cancel_field_edit_keyboard для отмены ввода
     await message.answer(
-        "Введите Telegram ID пользователя, которого хотите найти.\n"
+        "Введите Telegram ID, @username, имя/фамилию, телефон или название компании пользователя.\n"
         "Для отмены нажмите кнопку ниже или введите /cancel_admin_action."
     )
 
 
+USER_SEARCH_QUERY_KEY = "user_search_query"
+USER_SEARCH_ANCHOR_KEY = "user_search_anchor"
+USER_SEARCH_PER_PAGE = 5
+
+def build_user_search_results_keyboard(results_page: KeysetPage, current_page: int) -> InlineKeyboardMarkup:
+    buttons = []
+    for found_user in results_page.items:
+        full_name = " ".join(part for part in (found_user.first_name, found_user.last_name) if part) or "без имени"
+        username_part = f" @{found_user.username}" if found_user.username else ""
+        company_part = f" | {found_user.company_name[:20]}" if found_user.company_name else ""
+        ban_part = "🚫 " if found_user.is_banned else ""
+        buttons.append([InlineKeyboardButton(
+            text=f"{ban_part}{found_user.id}: {full_name[:25]}{username_part}{company_part}",
+            callback_data=f"{USER_DETAILS_CALLBACK_PREFIX}open:{found_user.id}"
+        )])
+    # Общее число совпадений не считаем (это второй запрос по всем веткам поиска), только Пред./След.
+    pagination_row = _keyset_pagination_row(USER_SEARCH_PAGE_CALLBACK_PREFIX, current_page, results_page, 1, "no_action_page_num")
+    if pagination_row:
+        buttons.append(pagination_row)
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-# Хэндлер для получения ID пользователя от админа
+# Хэндлер для получения поискового запроса от админа
 @admin_router.message(AdminStates.find_user_id_input, F.text)
 async def admin_process_find_user_id(message: Message, state: FSMContext):
-    if not message.text.isdigit():
-        await message.answer("ID пользователя должен быть числом. Попробуйте снова или отмените.",
+    search_text = normalize_search_text(message.text)
+    await state.update_data({USER_SEARCH_QUERY_KEY: search_text, USER_SEARCH_ANCHOR_KEY: None})
+
+    async with read_session_scope() as session:
+        results_page = await search_users(session, search_text, per_page=USER_SEARCH_PER_PAGE)
+
+    if not results_page.items:
+        await message.answer("Никого не найдено (для поиска по тексту нужно минимум 3 символа). "
+                             "Попробуйте другой запрос или отмените.",
                              reply_markup=cancel_field_edit_keyboard)
         return
-    
-    user_to_find_id = int(message.text)
+
+    if len(results_page.items) == 1 and not results_page.has_next:
+        # Единственное совпадение - сразу открываем карточку, как раньше при поиске по ID
+        user_to_find_id = results_page.items[0].id
+        await state.update_data(found_user_id_for_actions=user_to_find_id) # Сохраняем для кнопок действий
+        await message.answer(f"Ищу информацию по пользователю ID: {user_to_find_id}...", reply_markup=ReplyKeyboardRemove())
+        await show_found_user_details(message, state, user_to_find_id)
+        return
+
+    await _remember_list_position(state, USER_SEARCH_ANCHOR_KEY, 0, results_page)
+    await message.answer(
+        f"Результаты поиска по «{search_text}». Выберите пользователя или введите новый запрос:",
+        reply_markup=build_user_search_results_keyboard(results_page, 0)
+    )
+
+@admin_router.callback_query(F.data.startswith(USER_SEARCH_PAGE_CALLBACK_PREFIX), StateFilter(AdminStates.find_user_id_input))
+async def admin_paginate_user_search(callback_query: CallbackQuery, state: FSMContext):
+    try:
+        page, cursor = _parse_page_callback(callback_query.data, USER_SEARCH_PAGE_CALLBACK_PREFIX)
+    except ValueError:
+        await callback_query.answer("Ошибка страницы.", show_alert=True)
+        return
+    search_text = (await state.get_data()).get(USER_SEARCH_QUERY_KEY) or ""
+    page, cursor = await _resolve_list_position(state, USER_SEARCH_ANCHOR_KEY, page, cursor)
+
+    async with read_session_scope() as session:
+        results_page = await search_users(session, search_text, per_page=USER_SEARCH_PER_PAGE, cursor=cursor)
+    if not results_page.items:
+        await callback_query.answer("Результаты поиска устарели, введите запрос заново.", show_alert=True)
+        return
+    if results_page.shifted_back:
+        page = max(page - 1, 0)
+    await _remember_list_position(state, USER_SEARCH_ANCHOR_KEY, page, results_page)
+    await callback_query.message.edit_reply_markup(reply_markup=build_user_search_results_keyboard(results_page, page))
+    await callback_query.answer()
+
+@admin_router.callback_query(F.data.startswith(f"{USER_DETAILS_CALLBACK_PREFIX}open:"), StateFilter(AdminStates.find_user_id_input))
+async def admin_open_found_user(callback_query: CallbackQuery, state: FSMContext):
+    try:
+        user_to_find_id = int(callback_query.data.split(":")[-1])
+    except (ValueError, IndexError):
+        await callback_query.answer("Ошибка: неверный ID пользователя.", show_alert=True)
+        return
     await state.update_data(found_user_id_for_actions=user_to_find_id) # Сохраняем для кнопок действий
-    
-    await message.answer(f"Ищу информацию по пользователю ID: {user_to_find_id}...", reply_markup=ReplyKeyboardRemove())
-    await show_found_user_details(message, state, user_to_find_id)
+    await show_found_user_details(callback_query, state, user_to_find_id)
 
 
 # Функция для отображения деталей найденного пользователя и кнопок действий
@@ -1760,10 +2254,10 @@ async def admin_delete_employer_profile_action(callback_query: CallbackQuery, st
     
     deleted = False
     async with AsyncSessionFactory() as session, session.begin():
-        result = await session.execute(
-            delete(EmployerProfile).where(EmployerProfile.user_id == user_id_of_profile_owner)
+        hidden_profile_ids = await soft_delete_employer_profiles(
+            session, EmployerProfile.user_id == user_id_of_profile_owner, reason=f"admin:{callback_query.from_user.id}"
         )
-        if result.rowcount > 0:
+        if hidden_profile_ids:
             user_obj = await session.get(User, user_id_of_profile_owner)
             if user_obj and user_obj.role == UserRole.EMPLOYER:
                 user_obj.role = None
@@ -1940,6 +2434,7 @@ async def admin_motivation_save(message: Message, state: FSMContext):
             is_active=True # По умолчанию активен
         )
         session.add(new_content)
+    invalidate_motivation_cache()
     
     await message.answer("Новый мотивационный контент успешно добавлен!", reply_markup=ReplyKeyboardRemove())
     await return_to_motivation_management_menu(message, state, edit_previous=False)
@@ -1970,31 +2465,18 @@ async def admin_cancel_current_field_edit_by_button(message: Message, state: FSM
     
 # Функция для построения клавиатуры списка мотивационного контента
 async def build_motivation_list_keyboard(
-    contents: list[MotivationalContent], 
+    contents_page: KeysetPage, 
     current_page: int = 0, 
-    per_page: int = 5 # Установим 5 по умолчанию, для теста можно менять на 3
+    total_pages: int = 1
 ) -> InlineKeyboardMarkup:
     buttons = []
     
-    total_items = len(contents)
-    if total_items == 0: # Если список контента пуст
+    if not contents_page.items: # Если список контента пуст
         buttons.append([InlineKeyboardButton(text="Пока нет контента. Добавить новый?", callback_data="admin_motivation_add")])
         buttons.append([InlineKeyboardButton(text="🔙 Назад (в меню мотивации)", callback_data="admin_motivation_back_to_manage_menu")])
         return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-    # Рассчитываем общее количество страниц, округляя вверх
-    total_pages = (total_items + per_page - 1) // per_page
-    if total_pages == 0: total_pages = 1 # Минимум 1 страница
-
-    # Корректируем current_page, если он выходит за пределы (например, после удаления элементов)
-    current_page = max(0, min(current_page, total_pages - 1))
-
-    # Определяем срез для текущей страницы
-    start_index = current_page * per_page
-    end_index = start_index + per_page
-    paginated_contents = contents[start_index:end_index]
-
-    for content_item in paginated_contents:
+    for content_item in contents_page.items:
         item_text_preview = content_item.text_caption[:25].strip() + "..." if len(content_item.text_caption) > 25 else content_item.text_caption.strip()
         status_emoji = "🟢" if content_item.is_active else "🔴"
         
@@ -2031,16 +2513,7 @@ async def build_motivation_list_keyboard(
         # buttons.append([InlineKeyboardButton(text="-"*20, callback_data="no_action_separator")]) # Разделитель можно убрать для компактности
 
     # Кнопки пагинации
-    pagination_row = []
-    if current_page > 0: # Показывать кнопку "Пред.", только если это не первая страница
-        pagination_row.append(InlineKeyboardButton(text="◀️ Пред.", callback_data=f"{MOTIVATION_CALLBACK_PREFIX}page:{current_page-1}"))
-    
-    if total_pages > 1: # Показываем номер страницы, только если их больше одной
-        pagination_row.append(InlineKeyboardButton(text=f"📄 {current_page+1}/{total_pages}", callback_data="no_action_page_num")) # Некликабельная кнопка номера страницы
-
-    # Проверяем, есть ли следующая страница
-    if (current_page + 1) < total_pages:
-        pagination_row.append(InlineKeyboardButton(text="След. ▶️", callback_data=f"{MOTIVATION_CALLBACK_PREFIX}page:{current_page+1}"))
+    pagination_row = _keyset_pagination_row(f"{MOTIVATION_CALLBACK_PREFIX}page:", current_page, contents_page, total_pages, "no_action_page_num")
     
     if pagination_row: # Добавляем строку пагинации, только если она не пуста
         buttons.append(pagination_row)
@@ -2049,23 +2522,32 @@ async def build_motivation_list_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 # Функция для отображения конкретной страницы списка мотивационного контента
-async def show_motivation_content_list_page(target: Message | CallbackQuery, state: FSMContext, page: int = 0):
+async def show_motivation_content_list_page(target: Message | CallbackQuery, state: FSMContext, page: int = 0,
+                                            cursor: str | None = None):
     message_to_act_on = target.message if isinstance(target, CallbackQuery) else target
     per_page = 3 # Или ваше значение
 
-    async with AsyncSessionFactory() as session, session.begin():
-        content_result = await session.execute(
-            select(MotivationalContent).order_by(MotivationalContent.id.desc()) # Сначала новые
+    page, cursor = await _resolve_list_position(state, MOTIVATION_LIST_ANCHOR_KEY, page, cursor)
+    total_items = 0
+    async with read_session_scope() as session:
+        content_page = await fetch_keyset_page( # Сначала новые
+            session, select(*MOTIVATION_LIST_ITEM_COLUMNS), MotivationalContent.id, per_page,
+            cursor=cursor, descending=True, row_factory=MotivationListItem
         )
-        all_content_items = content_result.scalars().all()
+        if content_page.items:
+            total_items = await get_cached_count(session, "motivational_content", select(func.count(MotivationalContent.id)))
 
-    if not all_content_items:
+    if not content_page.items:
         text_to_send = "Мотивационный контент еще не добавлен."
         # Возвращаем к предыдущему меню (где кнопки "Добавить", "Список", "Назад в админку")
         kb_to_send = get_manage_motivation_keyboard() 
     else:
+        if content_page.shifted_back:
+            page = max(page - 1, 0)
+        await _remember_list_position(state, MOTIVATION_LIST_ANCHOR_KEY, page, content_page)
         text_to_send = f"Список мотивационного контента (Стр. {page+1}):\nВыберите для действий."
-        kb_to_send = await build_motivation_list_keyboard(all_content_items, current_page=page, per_page=per_page)
+        kb_to_send = await build_motivation_list_keyboard(content_page, current_page=page,
+                                                          total_pages=total_pages_for(total_items, per_page, page))
     
     try:
         if isinstance(target, CallbackQuery):
@@ -2090,10 +2572,10 @@ async def admin_list_motivation_content_start(callback_query: CallbackQuery, sta
 @admin_router.callback_query(F.data.startswith(f"{MOTIVATION_CALLBACK_PREFIX}page:"))
 async def admin_paginate_motivation_list(callback_query: CallbackQuery, state: FSMContext):
     try:
-        page = int(callback_query.data.split(":")[-1])
+        page, cursor = _parse_page_callback(callback_query.data, f"{MOTIVATION_CALLBACK_PREFIX}page:")
     except ValueError:
         await callback_query.answer("Ошибка страницы.", show_alert=True); return
-    await show_motivation_content_list_page(callback_query, state, page=page)
+    await show_motivation_content_list_page(callback_query, state, page=page, cursor=cursor)
 
 # Callback "🔙 Назад (в меню мотивации)" из списка контента
 @admin_router.callback_query(F.data == "admin_motivation_back_to_manage_menu")
@@ -2233,6 +2715,7 @@ async def admin_motivation_do_delete_item(callback_query: CallbackQuery, state:
         deleted_count = result.rowcount 
     
     if deleted_count > 0:
+        invalidate_motivation_cache()
         await callback_query.answer(f"Мотивационный контент ID {item_id} удален.", show_alert=True)
     else:
         await callback_query.answer(f"Контент ID {item_id} не найден или уже был удален.", show_alert=True)
@@ -2263,6 +2746,7 @@ async def admin_motivation_toggle_active_status(callback_query: CallbackQuery, s
             return # Выходим, список не обновляем, т.к. элемента нет
 
     if new_status_is_active is not None:
+        invalidate_motivation_cache()
         status_text = "активирован" if new_status_is_active else "деактивирован"
         await callback_query.answer(f"Контент ID {item_id} {status_text}.")
     
@@ -2425,7 +2909,7 @@ async def admin_referral_show_stats(callback_query: CallbackQuery, state: FSMCon
     
     per_page = 5
 
-    async with AsyncSessionFactory() as session:
+    async with read_session_scope() as session:
 
         total_items_res = await session.execute(select(func.count(ReferralLink.id)))
         total_items = total_items_res.scalar_one()
@@ -2438,17 +2922,15 @@ async def admin_referral_show_stats(callback_query: CallbackQuery, state: FSMCon
             await callback_query.answer()
             return
 
-        # Теперь получаем данные для текущей страницы
+        # Счетчики хранятся в самих ссылках: страница читает только per_page строк referral_links
         stmt = (
             select(
                 ReferralLink.id,
                 ReferralLink.name,
                 ReferralLink.code,
-                func.count(ReferralUsage.id).label('total_clicks'),
-                func.count(func.distinct(ReferralUsage.user_id)).label('unique_users')
+                ReferralLink.total_clicks,
+                ReferralLink.unique_users
             )
-            .outerjoin(ReferralUsage, ReferralLink.id == ReferralUsage.link_id)
-            .group_by(ReferralLink.id)
             .order_by(ReferralLink.created_at.desc())
             .offset(page * per_page)
             .limit(per_page)
@@ -2473,4 +2955,207 @@ async def admin_referral_stats_back_to_menu(callback_query: CallbackQuery, state
         "Выберите действие для управления реферальными ссылками:",
         reply_markup=get_referral_management_keyboard()
     )
-    await callback_query.answer()
\ No newline at end of file
+    await callback_query.answer()
+
+# --- РАССЫЛКИ ПО СЕГМЕНТАМ ---
+BROADCAST_CONFIRM_CALLBACK_DATA = "broadcast_confirm"
+BROADCAST_ABORT_CALLBACK_DATA = "broadcast_abort"
+BROADCAST_SEGMENT_HELP = (
+    "Задайте сегмент получателей одной строкой (все параметры необязательны):\n"
+    "<code>role=applicant|employer city=Київ active=7 ref=КОД unread=yes</code>\n\n"
+    "active - были активны за последние N дней, ref - код реферальной ссылки, "
+    "unread=yes - работодатели с непросмотренными откликами.\n"
+    "Чтобы написать всем, отправьте <code>все</code>."
+)
+
+def parse_broadcast_segment(segment_text: str) -> tuple[BroadcastSegment, str | None]:
+    """'role=applicant city=Кривий Ріг active=7' -> (BroadcastSegment, ref_code). ValueError при ошибке."""
+    segment = BroadcastSegment()
+    ref_code = None
+    if segment_text.strip().lower() in ("все", "all"):
+        return segment, ref_code
+
+    last_key = None
+    for token in segment_text.split():
+        key, sep, value = token.partition("=")
+        key = key.lower()
+        if not sep:
+            if last_key == "city": # Город из нескольких слов
+                segment.city += f" {token}"
+                continue
+            raise ValueError(f"Непонятный параметр: {token}")
+        last_key = key
+        if key == "role":
+            roles = {"applicant": UserRole.APPLICANT, "employer": UserRole.EMPLOYER}
+            if value.lower() not in roles:
+                raise ValueError("role может быть applicant или employer.")
+            segment.role = roles[value.lower()]
+        elif key == "city":
+            segment.city = value
+        elif key == "active":
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError("active - число дней, например active=7.")
+            segment.active_within_days = int(value)
+        elif key == "ref":
+            ref_code = value
+        elif key == "unread":
+            segment.has_unread_responses = value.lower() in ("yes", "1", "да", "true")
+        else:
+            raise ValueError(f"Неизвестный параметр: {key}")
+    return segment, ref_code
+
+
+@admin_router.message(F.text == BTN_BROADCAST_TEXT, StateFilter(AdminStates.in_panel))
+async def admin_broadcast_start(message: Message, state: FSMContext):
+    await state.set_state(AdminBroadcast.waiting_for_segment)
+    await message.answer(BROADCAST_SEGMENT_HELP, reply_markup=cancel_field_edit_keyboard, parse_mode="HTML")
+
+@admin_router.message(StateFilter(AdminBroadcast), F.text == "❌ Отменить изменение")
+async def admin_broadcast_cancel_input(message: Message, state: FSMContext):
+    await state.set_state(AdminStates.in_panel)
+    await message.answer("Рассылка отменена.", reply_markup=admin_main_menu_keyboard)
+
+@admin_router.message(StateFilter(AdminBroadcast.waiting_for_segment), F.text)
+async def admin_broadcast_process_segment(message: Message, state: FSMContext):
+    try:
+        segment, ref_code = parse_broadcast_segment(message.text)
+    except ValueError as e_segment:
+        await message.answer(f"{e_segment}\n\n{BROADCAST_SEGMENT_HELP}", parse_mode="HTML")
+        return
+
+    async with read_session_scope() as session:
+        if ref_code:
+            segment.referral_link_id = await session.scalar(select(ReferralLink.id).where(ReferralLink.code == ref_code))
+            if not segment.referral_link_id:
+                await message.answer(f"Реферальная ссылка с кодом {ref_code} не найдена. Попробуйте снова.")
+                return
+        recipients_count = await count_segment_recipients(session, segment)
+
+    if recipients_count == 0:
+        await message.answer("В этом сегменте нет получателей. Задайте другой сегмент или отмените.")
+        return
+
+    await state.update_data(broadcast_segment={
+        "role": segment.role.value if segment.role else None,
+        "city": segment.city,
+        "active_within_days": segment.active_within_days,
+        "referral_link_id": segment.referral_link_id,
+        "has_unread_responses": segment.has_unread_responses,
+    }, broadcast_recipients_count=recipients_count)
+    await state.set_state(AdminBroadcast.waiting_for_message)
+    await message.answer(
+        f"Сегмент: {segment.describe()}\nПолучателей: ~{recipients_count}\n\n"
+        "Теперь отправьте сообщение для рассылки (текст, фото, видео - оно будет скопировано как есть)."
+    )
+
+@admin_router.message(StateFilter(AdminBroadcast.waiting_for_message))
+async def admin_broadcast_process_message(message: Message, state: FSMContext):
+    data = await state.get_data()
+    await state.update_data(broadcast_source_chat_id=message.chat.id, broadcast_source_message_id=message.message_id)
+    await state.set_state(AdminBroadcast.waiting_for_confirmation)
+    confirm_kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f"🚀 Отправить (~{data.get('broadcast_recipients_count', 0)} получателей)", callback_data=BROADCAST_CONFIRM_CALLBACK_DATA)],
+        [InlineKeyboardButton(text="❌ Отмена", callback_data=BROADCAST_ABORT_CALLBACK_DATA)],
+    ])
+    await message.answer("Так сообщение увидят получатели:", reply_markup=ReplyKeyboardRemove())
+    await message.bot.copy_message(chat_id=message.chat.id, from_chat_id=message.chat.id, message_id=message.message_id)
+    await message.answer("Запускаем рассылку?", reply_markup=confirm_kb)
+
+@admin_router.callback_query(F.data == BROADCAST_ABORT_CALLBACK_DATA, StateFilter(AdminBroadcast.waiting_for_confirmation))
+async def admin_broadcast_abort(callback_query: CallbackQuery, state: FSMContext):
+    await state.set_state(AdminStates.in_panel)
+    await callback_query.message.edit_text("Рассылка отменена.")
+    await callback_query.message.answer(ADMIN_GREETING, reply_markup=admin_main_menu_keyboard)
+    await callback_query.answer()
+
+@admin_router.callback_query(F.data == BROADCAST_CONFIRM_CALLBACK_DATA, StateFilter(AdminBroadcast.waiting_for_confirmation))
+async def admin_broadcast_confirm(callback_query: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    segment_data = data.get("broadcast_segment") or {}
+    if not data.get("broadcast_source_message_id"):
+        await callback_query.answer("Сообщение для рассылки не найдено, начните заново.", show_alert=True)
+        return
+
+    await state.set_state(AdminStates.in_panel)
+    await callback_query.message.edit_reply_markup(reply_markup=None)
+    progress_message = await callback_query.message.answer("📣 Запускаю рассылку...")
+
+    async with AsyncSessionFactory() as session, session.begin():
+        broadcast = Broadcast(
+            created_by_admin_id=callback_query.from_user.id,
+            status=BroadcastStatusEnum.RUNNING,
+            source_chat_id=data["broadcast_source_chat_id"],
+            source_message_id=data["broadcast_source_message_id"],
+            segment_role=UserRole(segment_data["role"]) if segment_data.get("role") else None,
+            segment_city=segment_data.get("city"),
+            segment_active_within_days=segment_data.get("active_within_days"),
+            segment_referral_link_id=segment_data.get("referral_link_id"),
+            segment_has_unread_responses=bool(segment_data.get("has_unread_responses")),
+            total_recipients=data.get("broadcast_recipients_count", 0),
+            progress_chat_id=progress_message.chat.id,
+            progress_message_id=progress_message.message_id,
+        )
+        session.add(broadcast)
+        await session.flush()
+        broadcast_id = broadcast.id
+
+    print(f"DEBUG: Admin {callback_query.from_user.id} started broadcast {broadcast_id}")
+    await update_broadcast_progress_message(callback_query.bot, broadcast)
+    start_broadcast_task(callback_query.bot, broadcast_id)
+    await callback_query.message.answer(ADMIN_GREETING, reply_markup=admin_main_menu_keyboard)
+    await callback_query.answer("Рассылка запущена.")
+
+@admin_router.callback_query(F.data.startswith(BROADCAST_CONTROL_CALLBACK_PREFIX))
+async def admin_broadcast_control(callback_query: CallbackQuery):
+    if callback_query.from_user.id not in ADMIN_IDS:
+        await callback_query.answer("Нет доступа.", show_alert=True)
+        return
+    try:
+        action, broadcast_id_str = callback_query.data[len(BROADCAST_CONTROL_CALLBACK_PREFIX):].split(":")
+        broadcast_id = int(broadcast_id_str)
+    except ValueError:
+        await callback_query.answer("Ошибка в данных кнопки.", show_alert=True)
+        return
+
+    if action == "pause":
+        broadcast = await set_broadcast_status(broadcast_id, BroadcastStatusEnum.PAUSED, (BroadcastStatusEnum.RUNNING,))
+        answer_text = "Пауза: текущая пачка доотправится и рассылка остановится."
+    elif action == "resume":
+        broadcast = await set_broadcast_status(broadcast_id, BroadcastStatusEnum.RUNNING, (BroadcastStatusEnum.PAUSED,))
+        if broadcast:
+            start_broadcast_task(callback_query.bot, broadcast_id)
+        answer_text = "Рассылка продолжена."
+    elif action == "cancel":
+        broadcast = await set_broadcast_status(
+            broadcast_id, BroadcastStatusEnum.CANCELLED, (BroadcastStatusEnum.RUNNING, BroadcastStatusEnum.PAUSED)
+        )
+        answer_text = "Рассылка остановлена."
+    else:
+        await callback_query.answer("Неизвестное действие.", show_alert=True)
+        return
+
+    if not broadcast:
+        await callback_query.answer("Статус рассылки уже изменился.", show_alert=True)
+        return
+    # Если рассылка идет в этом процессе, итоговое сообщение обновит она сама после текущей пачки
+    if not is_broadcast_running_here(broadcast_id) or action == "resume":
+        await update_broadcast_progress_message(callback_query.bot, broadcast)
+    await callback_query.answer(answer_text)
+
+@admin_router.message(Command("broadcasts"), IsAdminFilter())
+async def admin_list_broadcasts(message: Message):
+    """Последние рассылки; прогресс активных дальше обновляется в новых сообщениях."""
+    async with AsyncSessionFactory() as session, session.begin():
+        broadcasts = (await session.execute(
+            select(Broadcast).order_by(Broadcast.id.desc()).limit(5)
+        )).scalars().all()
+        if not broadcasts:
+            await message.answer("Рассылок еще не было.")
+            return
+        for broadcast in reversed(broadcasts):
+            sent_message = await message.answer(
+                format_broadcast_progress(broadcast), reply_markup=build_broadcast_progress_keyboard(broadcast)
+            )
+            if broadcast.status in (BroadcastStatusEnum.RUNNING, BroadcastStatusEnum.PAUSED):
+                broadcast.progress_chat_id = sent_message.chat.id
+                broadcast.progress_message_id = sent_message.message_id
@@ -5,11 +5,15 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, ReplyKeyboardRemove, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram import Bot
 
-from app.db.database import AsyncSessionFactory
-from app.db.models import EmployerProfile, User, Complaint, ComplaintStatusEnum, ApplicantProfile, MotivationalContentTypeEnum, MotivationalContent
+from app.db.database import AsyncSessionFactory, session_scope, read_session_scope, release_update_session
+from app.db.dto import EmployerCard, EmployerPushTarget, MotivationItem, EMPLOYER_CARD_COLUMNS, EMPLOYER_PUSH_TARGET_COLUMNS, row_to_dto
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import EmployerProfile, User, Complaint, ComplaintStatusEnum, ApplicantProfile, MotivationalContentTypeEnum
 from sqlalchemy import select, func as sqlalchemy_func, update
 
-from app.db.models import ApplicantEmployerInteraction, InteractionTypeEnum
+from app.db.models import ApplicantEmployerInteraction, InteractionTypeEnum, UNVIEWED_LIKE_PREDICATE
+from sqlalchemy import Boolean, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from datetime import datetime, timedelta, timezone 
 import traceback
 from aiogram.fsm.state import State, StatesGroup
@@ -19,6 +23,12 @@ from app.keyboards.reply_keyboards import applicant_action_keyboard, continue_br
 from aiogram.exceptions import TelegramAPIError
 
 from app.config import MOTIVATION_THRESHOLD
+from app.services.sharding import register_shard_event_handler
+from app.services.outbox_service import add_outbox_event, wake_outbox_dispatcher
+from app.services.cooldown_service import FEED_REACTION_COOLDOWN, set_feed_cooldown, not_in_feed_cooldown
+from app.services.motivation_service import pick_motivational_content
+from app.services.bot_settings_service import get_setting, ANTISPAM_DUMMY_TEXT, ANTISPAM_DUMMY_PHOTO_ID
+from app.services.photo_service import send_photo_or_text
 
 
 browsing_router = Router()
@@ -28,7 +38,7 @@ browsing_router = Router()
 
 
 # Вспомогательная функция для форматирования анкеты работодателя
-def format_employer_profile_for_applicant(profile: EmployerProfile) -> str: # Убрали employer_user, пока не нужен
+def format_employer_profile_for_applicant(profile: EmployerProfile | EmployerCard) -> str: # Убрали employer_user, пока не нужен
     work_format_display = getattr(profile.work_format, 'name', "Не указан").title()
     min_age_display = profile.min_age_candidate if profile.min_age_candidate is not None else "Не указан"
     
@@ -44,27 +54,21 @@ def format_employer_profile_for_applicant(profile: EmployerProfile) -> str: # У
     return text
 
 
-async def get_bot_setting_from_browsing(session, key: str) -> str | None: 
-    from app.db.models import BotSettings 
-    from sqlalchemy import select
-    result = await session.execute(select(BotSettings.value_str).where(BotSettings.setting_key == key))
-    return result.scalar_one_or_none()
-
-async def show_antispam_dummy(message: Message, state: FSMContext):
+async def show_antispam_dummy(message: Message, state: FSMContext, session: AsyncSession | None = None):
     default_antispam_text = ("Ваша активность слишком высока. Пожалуйста, воздержитесь от частых действий.\n"
                              "Вам временно будут показаны информационные сообщения.")
     antispam_text_to_show = default_antispam_text
     antispam_photo_id_to_show = None
 
     try:
-        async with AsyncSessionFactory() as session, session.begin():
-            db_text = await get_bot_setting_from_browsing(session, "antispam_dummy_text") 
-            if db_text:
-                antispam_text_to_show = db_text
-            
-            db_photo_id = await get_bot_setting_from_browsing(session, "antispam_dummy_photo_id")
-            if db_photo_id:
-                antispam_photo_id_to_show = db_photo_id
+        # Из кэша настроек: в режиме анти-спама запросов в БД на каждый показ нет
+        db_text = await get_setting(ANTISPAM_DUMMY_TEXT)
+        if db_text:
+            antispam_text_to_show = db_text
+        
+        db_photo_id = await get_setting(ANTISPAM_DUMMY_PHOTO_ID)
+        if db_photo_id:
+            antispam_photo_id_to_show = db_photo_id
     except Exception as e:
         print(f"ERROR: Could not fetch antispam dummy settings from DB: {e}")
         # В случае ошибки используем значения по умолчанию
@@ -73,23 +77,51 @@ async def show_antispam_dummy(message: Message, state: FSMContext):
     
     print(f"DEBUG: Showing antispam dummy. Photo ID: {antispam_photo_id_to_show}, Text: {antispam_text_to_show[:50]}...")
 
-    if antispam_photo_id_to_show:
-        try:
-            await message.bot.send_photo(
-                chat_id=message.from_user.id,
-                photo=antispam_photo_id_to_show,
-                caption=antispam_text_to_show,
-                reply_markup=applicant_action_keyboard # С обычными кнопками
-            )
-        except Exception as e_photo:
-            print(f"ERROR sending antispam dummy photo: {e_photo}. Sending text only.")
-            # Если не удалось отправить фото, отправляем только текст
-            await message.answer(antispam_text_to_show, reply_markup=applicant_action_keyboard)
-    else:
-        await message.answer(antispam_text_to_show, reply_markup=applicant_action_keyboard)
+    # Если не удалось отправить фото (или оно уже известно как битое) - только текст
+    await send_photo_or_text(message.bot, message.from_user.id, antispam_photo_id_to_show, antispam_text_to_show,
+                             reply_markup=applicant_action_keyboard) # С обычными кнопками
+
+# Анти-спам: не больше ACTION_LIMIT_FOR_ANTISPAM действий в ленте за TIME_WINDOW_SECONDS_FOR_ANTISPAM секунд
+MAX_RECENT_ACTIONS_TO_TRACK = 10
+ACTION_LIMIT_FOR_ANTISPAM = 10
+TIME_WINDOW_SECONDS_FOR_ANTISPAM = 10
+ANTISPAM_DURATION_MINUTES = 5
+
+async def register_feed_action(state: FSMContext, current_data_fsm: dict) -> bool:
+    """
+    Блок 2 анти-спама: запоминает время действия в ленте (обычной или компактной).
+    True - действий слишком много: анти-спам режим включен, само действие выполнять не нужно.
+    """
+    recent_actions_timestamps = current_data_fsm.get("recent_actions_timestamps", [])
+    recent_actions_timestamps.append(datetime.now(timezone.utc))
+    if len(recent_actions_timestamps) > MAX_RECENT_ACTIONS_TO_TRACK:
+        recent_actions_timestamps = recent_actions_timestamps[-MAX_RECENT_ACTIONS_TO_TRACK:]
+    await state.update_data(recent_actions_timestamps=recent_actions_timestamps)
+    if len(recent_actions_timestamps) < ACTION_LIMIT_FOR_ANTISPAM:
+        return False
+    time_diff = recent_actions_timestamps[-1] - recent_actions_timestamps[-ACTION_LIMIT_FOR_ANTISPAM]
+    if time_diff.total_seconds() > TIME_WINDOW_SECONDS_FOR_ANTISPAM:
+        return False
+    antispam_end_time = datetime.now(timezone.utc) + timedelta(minutes=ANTISPAM_DURATION_MINUTES)
+    await state.update_data(in_antispam_mode=True, antispam_mode_until=antispam_end_time, recent_actions_timestamps=[])
+    return True
+
+async def trigger_antispam_if_flooding(message: Message, state: FSMContext, session: AsyncSession | None,
+                                       user_id: int, current_data_fsm: dict, action_name: str) -> bool:
+    """Блок 2 для кнопок обычной ленты: при срабатывании предупреждает и показывает анти-спам пустышку."""
+    if not await register_feed_action(state, current_data_fsm):
+        return False
+    print(f"ANTISPAM TRIGGERED for user {user_id} by {action_name} action!")
+    await message.answer(
+        f"Ваша активность кажется чрезмерной. Пожалуйста, сделайте перерыв.\n"
+        f"В течение следующих {ANTISPAM_DURATION_MINUTES} минут вам будут показаны информационные сообщения.",
+        reply_markup=applicant_action_keyboard
+    )
+    await show_antispam_dummy(message, state, session)
+    return True
 
 # Основная функция показа анкет
-async def show_next_employer_profile(message: Message, user_id: int, state: FSMContext):
+async def show_next_employer_profile(message: Message, user_id: int, state: FSMContext, session: AsyncSession | None = None):
     data = await state.get_data()
     in_antispam_mode = data.get("in_antispam_mode", False)
     antispam_mode_until = data.get("antispam_mode_until")
@@ -98,7 +130,7 @@ async def show_next_employer_profile(message: Message, user_id: int, state: FSMC
     # 1. Проверка анти-спам режима
     if in_antispam_mode and antispam_mode_until and current_time_for_all_checks < antispam_mode_until:
         print(f"DEBUG: User {user_id} is in antispam mode. Showing dummy. Until: {antispam_mode_until}")
-        await show_antispam_dummy(message, state)
+        await show_antispam_dummy(message, state, session)
         return 
 
     if in_antispam_mode and antispam_mode_until and current_time_for_all_checks >= antispam_mode_until:
@@ -106,122 +138,122 @@ async def show_next_employer_profile(message: Message, user_id: int, state: FSMC
         await state.update_data(in_antispam_mode=False, antispam_mode_until=None, recent_actions_timestamps=[])
     
     # 2. Логика получения реальной или пустышкиной анкеты работодателя
-    employer_profile_to_show: EmployerProfile | None = None
-    async with AsyncSessionFactory() as session, session.begin():
-        applicant_profile_q = await session.execute(select(ApplicantProfile).where(ApplicantProfile.user_id == user_id))
-        applicant_profile_obj = applicant_profile_q.scalar_one_or_none()
+    employer_profile_to_show: EmployerCard | None = None
+    # Подбор анкеты - только чтение, его можно отдать реплике. Проверка кулдауна не
+    # пропустит свежий лайк: после записи в этом апдейте (или недавней записи пользователя)
+    # read_session_scope остается в основной БД
+    async with read_session_scope(session) as feed_session:
+        # Из анкеты соискателя нужен только город
+        applicant_city_raw = (await feed_session.execute(
+            select(ApplicantProfile.city).where(ApplicantProfile.user_id == user_id)
+        )).scalar_one_or_none()
         
         applicant_city = None
-        if applicant_profile_obj and applicant_profile_obj.city:
-            applicant_city = applicant_profile_obj.city.strip().lower()
+        if applicant_city_raw:
+            applicant_city = applicant_city_raw.strip().lower()
         
-        subquery_cooled_down_profiles = (
-            select(ApplicantEmployerInteraction.employer_profile_id).where(
-                ApplicantEmployerInteraction.applicant_user_id == user_id,
-                ApplicantEmployerInteraction.cooldown_until > current_time_for_all_checks
-            ).distinct()
-        ).scalar_subquery()
+        # Кулдауны - из компактной applicant_cooldowns (NOT EXISTS по первичному ключу), не из истории действий
+        not_cooled_down = not_in_feed_cooldown(user_id, current_time_for_all_checks)
 
         # Поиск реальных анкет
         if applicant_city:
-            query_in_city = (select(EmployerProfile).where(
+            query_in_city = (select(*EMPLOYER_CARD_COLUMNS).where(
                 EmployerProfile.is_active == True, EmployerProfile.is_dummy == False,
                 sqlalchemy_func.lower(EmployerProfile.city) == applicant_city,
-                EmployerProfile.id.notin_(subquery_cooled_down_profiles)
+                not_cooled_down
             ).order_by(sqlalchemy_func.random()).limit(1))
-            employer_profile_to_show = (await session.execute(query_in_city)).scalar_one_or_none()
+            employer_profile_to_show = row_to_dto(EmployerCard, (await feed_session.execute(query_in_city)).first())
 
         if not employer_profile_to_show:
             conditions_other = [
                 EmployerProfile.is_active == True, EmployerProfile.is_dummy == False,
-                EmployerProfile.id.notin_(subquery_cooled_down_profiles)
+                not_cooled_down
             ]
             if applicant_city: conditions_other.append(sqlalchemy_func.lower(EmployerProfile.city) != applicant_city)
-            query_other_cities = (select(EmployerProfile).where(*conditions_other)
+            query_other_cities = (select(*EMPLOYER_CARD_COLUMNS).where(*conditions_other)
                                   .order_by(sqlalchemy_func.random()).limit(1))
-            employer_profile_to_show = (await session.execute(query_other_cities)).scalar_one_or_none()
+            employer_profile_to_show = row_to_dto(EmployerCard, (await feed_session.execute(query_other_cities)).first())
         
         # Если реальных нет, ищем пустышки (is_dummy=True)
         if not employer_profile_to_show:
             print(f"DEBUG: No real profiles found for user {user_id}. Looking for dummy profiles.")
             dummy_conditions = [
                 EmployerProfile.is_active == True, EmployerProfile.is_dummy == True,
-                EmployerProfile.id.notin_(subquery_cooled_down_profiles)
+                not_cooled_down
             ]
             if applicant_city: # Приоритет пустышек по городу соискателя
                  dummy_conditions.append(sqlalchemy_func.lower(EmployerProfile.city) == applicant_city)
             
-            query_dummies_city = (select(EmployerProfile).where(*dummy_conditions)
+            query_dummies_city = (select(*EMPLOYER_CARD_COLUMNS).where(*dummy_conditions)
                                   .order_by(sqlalchemy_func.random()).limit(1))
-            employer_profile_to_show = (await session.execute(query_dummies_city)).scalar_one_or_none()
+            employer_profile_to_show = row_to_dto(EmployerCard, (await feed_session.execute(query_dummies_city)).first())
 
             if not employer_profile_to_show and applicant_city: # Если в городе нет, ищем пустышки в других городах
                 dummy_conditions_other_city = [
                     EmployerProfile.is_active == True, EmployerProfile.is_dummy == True,
-                    EmployerProfile.id.notin_(subquery_cooled_down_profiles),
+                    not_cooled_down,
                     sqlalchemy_func.lower(EmployerProfile.city) != applicant_city
                 ]
-                query_dummies_other = (select(EmployerProfile).where(*dummy_conditions_other_city)
+                query_dummies_other = (select(*EMPLOYER_CARD_COLUMNS).where(*dummy_conditions_other_city)
                                        .order_by(sqlalchemy_func.random()).limit(1))
-                employer_profile_to_show = (await session.execute(query_dummies_other)).scalar_one_or_none()
+                employer_profile_to_show = row_to_dto(EmployerCard, (await feed_session.execute(query_dummies_other)).first())
             
             if employer_profile_to_show:
                 print(f"DEBUG: Found DUMMY profile to show: ID {employer_profile_to_show.id}")
 
-        # 3. Показ анкеты или сообщения "нет анкет"
-        if employer_profile_to_show:
-            current_session_views = data.get("session_view_count_for_motivation", 0) + 1
-            
-            if current_session_views >= MOTIVATION_THRESHOLD:
-                await state.update_data(session_view_count_for_motivation=0) 
-                print(f"DEBUG: Motivational content TRIGGERED for user {user_id} after {current_session_views-1} views.")
-                motivation_was_sent = await send_random_motivational_content(message, state)
-                if motivation_was_sent: # Если мотивация успешно показана (и ждем "Продолжить")
-                    return # Выходим, не показываем анкету работодателя сейчас
-            else:
-                await state.update_data(session_view_count_for_motivation=current_session_views)
-            # --- Конец блока мотивации ---
+    # Подбор закончен: соединение апдейта возвращаем в пул до отправки анкеты
+    await release_update_session(session)
 
-            # Если мотивация не была показана (или не должна была), показываем анкету работодателя
-            profile_text = format_employer_profile_for_applicant(employer_profile_to_show)
-            await state.update_data(
-                current_shown_employer_profile_id=employer_profile_to_show.id,
-                current_shown_employer_user_id=employer_profile_to_show.user_id
-            )
-            if employer_profile_to_show.photo_file_id:
-                try:
-                    await message.bot.send_photo(chat_id=user_id, photo=employer_profile_to_show.photo_file_id,
-                                                 caption=profile_text, parse_mode="HTML", reply_markup=applicant_action_keyboard)
-                except Exception as e_photo_send:
-                    print(f"Error sending employer profile photo: {e_photo_send}")
-                    await message.answer(profile_text, parse_mode="HTML", reply_markup=applicant_action_keyboard)
-            else:
-                await message.answer(profile_text, parse_mode="HTML", reply_markup=applicant_action_keyboard)
-        else: 
-            await message.answer("На данный момент подходящих анкет нет. Попробуйте зайти позже!", reply_markup=ReplyKeyboardRemove())
-            await state.clear() # Очищаем состояние просмотра
-            from app.handlers.settings_handlers import show_applicant_settings_menu
-            display_name_for_menu = message.from_user.first_name
-            user_for_menu = await session.get(User, user_id)
-            if user_for_menu and user_for_menu.first_name:
-                display_name_for_menu = user_for_menu.first_name
-            await show_applicant_settings_menu(message, user_id, display_name_for_menu)
+    # 3. Показ анкеты или сообщения "нет анкет"
+    if employer_profile_to_show:
+        current_session_views = data.get("session_view_count_for_motivation", 0) + 1
+        
+        if current_session_views >= MOTIVATION_THRESHOLD:
+            await state.update_data(session_view_count_for_motivation=0) 
+            print(f"DEBUG: Motivational content TRIGGERED for user {user_id} after {current_session_views-1} views.")
+            motivation_was_sent = await send_random_motivational_content(message, state, session)
+            if motivation_was_sent: # Если мотивация успешно показана (и ждем "Продолжить")
+                return # Выходим, не показываем анкету работодателя сейчас
+        else:
+            await state.update_data(session_view_count_for_motivation=current_session_views)
+        # --- Конец блока мотивации ---
+
+        # Если мотивация не была показана (или не должна была), показываем анкету работодателя
+        profile_text = format_employer_profile_for_applicant(employer_profile_to_show)
+        await state.update_data(
+            current_shown_employer_profile_id=employer_profile_to_show.id,
+            current_shown_employer_user_id=employer_profile_to_show.user_id
+        )
+        await send_photo_or_text(message.bot, user_id, employer_profile_to_show.photo_file_id, profile_text,
+                                 parse_mode="HTML", reply_markup=applicant_action_keyboard)
+    else: 
+        await message.answer("На данный момент подходящих анкет нет. Попробуйте зайти позже!", reply_markup=ReplyKeyboardRemove())
+        await state.clear() # Очищаем состояние просмотра
+        from app.handlers.settings_handlers import show_applicant_settings_menu
+        display_name_for_menu = message.from_user.first_name
+        async with session_scope(session) as menu_session:
+            user_first_name = (await menu_session.execute(
+                select(User.first_name).where(User.telegram_id == user_id)
+            )).scalar_one_or_none()
+        if user_first_name:
+            display_name_for_menu = user_first_name
+        await show_applicant_settings_menu(message, user_id, display_name_for_menu, session=session)
 
 
 
 
 # Хэндлер для "⏹️ Остановить показ"
 @browsing_router.message(F.text == "⏹️ Остановить показ") 
-async def stop_browsing_profiles(message: Message, state: FSMContext):
+async def stop_browsing_profiles(message: Message, state: FSMContext, session: AsyncSession):
     user_id = message.from_user.id
     
     # --- ПРОВЕРКА, СУЩЕСТВУЕТ ЛИ ЕЩЕ АКТИВНАЯ АНКЕТА СОИСКАТЕЛЯ ---
-    async with AsyncSessionFactory() as session_check_profile, session_check_profile.begin():
-        applicant_profile_exists = (await session_check_profile.execute(
-            select(ApplicantProfile.id) # Просто проверяем наличие
-            .where(ApplicantProfile.user_id == user_id, ApplicantProfile.is_active == True) 
-            # user_id_who_interacted - это ID соискателя в текущем хэндлере
-        )).scalar_one_or_none()
+    applicant_profile_exists = (await session.execute(
+        select(ApplicantProfile.id) # Просто проверяем наличие
+        .where(ApplicantProfile.user_id == user_id, ApplicantProfile.is_active == True) 
+        # user_id_who_interacted - это ID соискателя в текущем хэндлере
+    )).scalar_one_or_none()
+    await release_update_session(session) # Дальше - ответы в Telegram, не держим транзакцию
 
     if not applicant_profile_exists:
         await state.clear()
@@ -241,23 +273,22 @@ async def stop_browsing_profiles(message: Message, state: FSMContext):
     from app.handlers.settings_handlers import show_applicant_settings_menu
     
     display_name = message.from_user.first_name
-    async with AsyncSessionFactory() as new_session, new_session.begin(): # Новая сессия для получения имени
-        user = await new_session.get(User, user_id)
-        if user and user.first_name:
-            display_name = user.first_name
-    await show_applicant_settings_menu(message, user_id, display_name)
+    user = await session.get(User, user_id) # Та же сессия апдейта
+    if user and user.first_name:
+        display_name = user.first_name
+    await show_applicant_settings_menu(message, user_id, display_name, session=session)
     
 @browsing_router.message(F.text == "👎")
-async def process_dislike_employer(message: Message, state: FSMContext):
+async def process_dislike_employer(message: Message, state: FSMContext, session: AsyncSession):
     user_id = message.from_user.id # ID соискателя
     
     # --- ПРОВЕРКА, СУЩЕСТВУЕТ ЛИ ЕЩЕ АКТИВНАЯ АНКЕТА СОИСКАТЕЛЯ ---
-    async with AsyncSessionFactory() as session_check_profile, session_check_profile.begin():
-        applicant_profile_exists = (await session_check_profile.execute(
-            select(ApplicantProfile.id) # Просто проверяем наличие
-            .where(ApplicantProfile.user_id == user_id, ApplicantProfile.is_active == True) 
-            # user_id_who_interacted - это ID соискателя в текущем хэндлере
-        )).scalar_one_or_none()
+    applicant_profile_exists = (await session.execute(
+        select(ApplicantProfile.id) # Просто проверяем наличие
+        .where(ApplicantProfile.user_id == user_id, ApplicantProfile.is_active == True) 
+        # user_id_who_interacted - это ID соискателя в текущем хэндлере
+    )).scalar_one_or_none()
+    await release_update_session(session) # Дальше - ответы в Telegram, не держим транзакцию
 
     if not applicant_profile_exists:
         await state.clear() 
@@ -284,40 +315,21 @@ async def process_dislike_employer(message: Message, state: FSMContext):
         now_utc = datetime.now(timezone.utc)
 
         if is_still_in_antispam_ban and antispam_ban_ends_at and now_utc < antispam_ban_ends_at:
-            await show_antispam_dummy(message, state) 
+            await show_antispam_dummy(message, state, session) 
         else: # Бан истек или его не было (но мы на пустышке - это странно, но очистим)
             if is_still_in_antispam_ban: # Сбрасываем флаги, если они еще стоят
                  await state.update_data(in_antispam_mode=False, antispam_mode_until=None, recent_actions_timestamps=[])
                  print(f"DEBUG: Antispam ban for user {user_id} ended upon interaction with dummy.")
             await message.answer("Период информационных сообщений закончился. Попробуем найти следующую анкету.", 
                                  reply_markup=applicant_action_keyboard) # Возвращаем кнопки просмотра
-            await show_next_employer_profile(message, user_id, state) # Показываем реальную
+            await show_next_employer_profile(message, user_id, state, session) # Показываем реальную
         return 
     # --- КОНЕЦ БЛОКА 1 ---
 
     # --- БЛОК 2: ТРИГГЕР АНТИ-СПАМА (если это было взаимодействие с реальной анкетой) ---
   
-    recent_actions_timestamps = current_data_fsm.get("recent_actions_timestamps", [])
-    current_action_time = datetime.now(timezone.utc)
-    recent_actions_timestamps.append(current_action_time)
-    MAX_RECENT_ACTIONS_TO_TRACK = 10; ACTION_LIMIT_FOR_ANTISPAM = 10; TIME_WINDOW_SECONDS_FOR_ANTISPAM = 10 
-    if len(recent_actions_timestamps) > MAX_RECENT_ACTIONS_TO_TRACK:
-        recent_actions_timestamps = recent_actions_timestamps[-MAX_RECENT_ACTIONS_TO_TRACK:]
-    await state.update_data(recent_actions_timestamps=recent_actions_timestamps)
-    if len(recent_actions_timestamps) >= ACTION_LIMIT_FOR_ANTISPAM:
-        time_diff = recent_actions_timestamps[-1] - recent_actions_timestamps[-ACTION_LIMIT_FOR_ANTISPAM]
-        if time_diff.total_seconds() <= TIME_WINDOW_SECONDS_FOR_ANTISPAM:
-            print(f"ANTISPAM TRIGGERED for user {user_id} by '{message.text}' action!")
-            antispam_duration_minutes = 5 
-            antispam_end_time = datetime.now(timezone.utc) + timedelta(minutes=antispam_duration_minutes)
-            await state.update_data(in_antispam_mode=True, antispam_mode_until=antispam_end_time, recent_actions_timestamps=[])
-            await message.answer(
-                f"Ваша активность кажется чрезмерной. Пожалуйста, сделайте перерыв.\n"
-                f"В течение следующих {antispam_duration_minutes} минут вам будут показаны информационные сообщения.", 
-                reply_markup=applicant_action_keyboard 
-            )
-            await show_antispam_dummy(message, state) 
-            return
+    if await trigger_antispam_if_flooding(message, state, session, user_id, current_data_fsm, f"'{message.text}'"):
+        return
     # --- КОНЕЦ БЛОКА 2 ---
     
     # --- ЕСЛИ НЕ ВЫШЛИ ИЗ-ЗА БЛОКА 1 ИЛИ 2 -> ОСНОВНАЯ ЛОГИКА ХЭНДЛЕРА ---
@@ -328,23 +340,24 @@ async def process_dislike_employer(message: Message, state: FSMContext):
         return
 
     try:
-        async with AsyncSessionFactory() as session, session.begin():
-            cooldown_duration_hours = 0.1 # Кулдаун в часах для дизлайка
-            now_utc = datetime.now(timezone.utc) 
-            cooldown_end_time_utc = now_utc + timedelta(hours=cooldown_duration_hours)
-
-            new_interaction = ApplicantEmployerInteraction(
-                applicant_user_id=user_id,
-                employer_profile_id=shown_employer_profile_id,
-                interaction_type=InteractionTypeEnum.DISLIKE,
-                created_at=now_utc, 
-                cooldown_until=cooldown_end_time_utc
-            )
-            session.add(new_interaction)
-            print(f"DEBUG: Dislike recorded. Applicant {user_id} -> EmpProfile {shown_employer_profile_id}. Cooldown until {cooldown_end_time_utc}")
+        now_utc = datetime.now(timezone.utc) 
+        cooldown_end_time_utc = now_utc + FEED_REACTION_COOLDOWN
+
+        new_interaction = ApplicantEmployerInteraction(
+            applicant_user_id=user_id,
+            employer_profile_id=shown_employer_profile_id,
+            interaction_type=InteractionTypeEnum.DISLIKE,
+            created_at=now_utc, 
+            cooldown_until=cooldown_end_time_utc
+        )
+        session.add(new_interaction)
+        await set_feed_cooldown(session, user_id, shown_employer_profile_id, cooldown_end_time_utc)
+        # Коммит до отправки следующей анкеты: строки кулдауна не заблокированы на время запросов к Telegram
+        await session.commit()
+        print(f"DEBUG: Dislike recorded. Applicant {user_id} -> EmpProfile {shown_employer_profile_id}. Cooldown until {cooldown_end_time_utc}")
 
         # Показываем следующую анкету
-        await show_next_employer_profile(message, user_id, state)
+        await show_next_employer_profile(message, user_id, state, session)
 
     except Exception as e:
         print(f"Error processing dislike: {e}\n{traceback.format_exc()}")
@@ -352,24 +365,50 @@ async def process_dislike_employer(message: Message, state: FSMContext):
         
         from app.handlers.settings_handlers import show_applicant_settings_menu 
         display_name = message.from_user.first_name
-        async with AsyncSessionFactory() as session_err, session_err.begin(): # Новая сессия для получения имени
-            user_for_menu_err = await session_err.get(User, user_id) # Используем user_id
-            if user_for_menu_err and user_for_menu_err.first_name:
-                display_name = user_for_menu_err.first_name
-        await show_applicant_settings_menu(message, user_id, display_name) # Используем user_id
+        await session.rollback() # Сессия апдейта могла остаться в состоянии ошибки
+        user_for_menu_err = await session.get(User, user_id) # Используем user_id
+        if user_for_menu_err and user_for_menu_err.first_name:
+            display_name = user_for_menu_err.first_name
+        await show_applicant_settings_menu(message, user_id, display_name, session=session) # Используем user_id
         
 
+def build_like_upsert_statement(applicant_user_id: int, employer_profile_id: int, cooldown_until: datetime):
+    """
+    Лайк одним запросом: новая строка или, если непросмотренный лайк на эту вакансию уже есть,
+    обновление его cooldown_until (опирается на uq_interactions_unviewed_like).
+    created_at не переписываем: по нему воронка относит лайк и его просмотр к одному дню.
+    Возвращает (id, is_new).
+    """
+    now_utc = datetime.now(timezone.utc)
+    like_insert = insert(ApplicantEmployerInteraction).values(
+        applicant_user_id=applicant_user_id,
+        employer_profile_id=employer_profile_id,
+        interaction_type=InteractionTypeEnum.LIKE,
+        created_at=now_utc,
+        cooldown_until=cooldown_until,
+        is_viewed_by_employer=False
+    )
+    return like_insert.on_conflict_do_update(
+        index_elements=[ApplicantEmployerInteraction.applicant_user_id, ApplicantEmployerInteraction.employer_profile_id],
+        index_where=UNVIEWED_LIKE_PREDICATE,
+        set_={"cooldown_until": like_insert.excluded.cooldown_until}
+    ).returning(
+        ApplicantEmployerInteraction.id,
+        # xmax = 0 только у только что вставленной строки
+        literal_column("(xmax = 0)", Boolean).label("is_new")
+    )
+
 @browsing_router.message(F.text == "❤️")
-async def process_like_employer(message: Message, state: FSMContext):
+async def process_like_employer(message: Message, state: FSMContext, session: AsyncSession):
     user_id_from_message = message.from_user.id # ID соискателя
     
     # --- ПРОВЕРКА, СУЩЕСТВУЕТ ЛИ ЕЩЕ АКТИВНАЯ АНКЕТА СОИСКАТЕЛЯ ---
-    async with AsyncSessionFactory() as session_check_profile, session_check_profile.begin():
-        applicant_profile_exists = (await session_check_profile.execute(
-            select(ApplicantProfile.id) # Просто проверяем наличие
-            .where(ApplicantProfile.user_id == user_id_from_message, ApplicantProfile.is_active == True) 
-            # user_id_who_interacted - это ID соискателя в текущем хэндлере
-        )).scalar_one_or_none()
+    applicant_profile_exists = (await session.execute(
+        select(ApplicantProfile.id) # Просто проверяем наличие
+        .where(ApplicantProfile.user_id == user_id_from_message, ApplicantProfile.is_active == True) 
+        # user_id_who_interacted - это ID соискателя в текущем хэндлере
+    )).scalar_one_or_none()
+    await release_update_session(session) # Дальше - ответы в Telegram, не держим транзакцию
 
     if not applicant_profile_exists:
         await state.clear() # Очищаем FSM соискателя
@@ -395,41 +434,21 @@ async def process_like_employer(message: Message, state: FSMContext):
         now_utc = datetime.now(timezone.utc)
 
         if is_still_in_antispam_ban and antispam_ban_ends_at and now_utc < antispam_ban_ends_at:
-            await show_antispam_dummy(message, state) # Снова показываем пустышку
+            await show_antispam_dummy(message, state, session) # Снова показываем пустышку
         else: # Бан истек или его не было (но мы на пустышке - это странно, но очистим)
             if is_still_in_antispam_ban: # Сбрасываем флаги, если они еще стоят
                  await state.update_data(in_antispam_mode=False, antispam_mode_until=None, recent_actions_timestamps=[])
                  print(f"DEBUG: Antispam ban for user {user_id_from_message} ended upon interaction with dummy.")
             await message.answer("Период информационных сообщений закончился. Попробуем найти следующую анкету.", 
                                  reply_markup=applicant_action_keyboard) # Возвращаем кнопки просмотра
-            await show_next_employer_profile(message, user_id_from_message, state) # Показываем реальную
+            await show_next_employer_profile(message, user_id_from_message, state, session) # Показываем реальную
         return # Важно: ВЫХОДИМ из хэндлера, не обрабатываем дальше
     # --- КОНЕЦ БЛОКА 1 ---
 
     # --- БЛОК 2: ТРИГГЕР АНТИ-СПАМА (если это было взаимодействие с реальной анкетой) ---
 
-    recent_actions_timestamps = current_data_fsm.get("recent_actions_timestamps", [])
-
-    current_action_time = datetime.now(timezone.utc)
-    recent_actions_timestamps.append(current_action_time)
-    MAX_RECENT_ACTIONS_TO_TRACK = 10; ACTION_LIMIT_FOR_ANTISPAM = 10; TIME_WINDOW_SECONDS_FOR_ANTISPAM = 10 
-    if len(recent_actions_timestamps) > MAX_RECENT_ACTIONS_TO_TRACK:
-        recent_actions_timestamps = recent_actions_timestamps[-MAX_RECENT_ACTIONS_TO_TRACK:]
-    await state.update_data(recent_actions_timestamps=recent_actions_timestamps)
-    if len(recent_actions_timestamps) >= ACTION_LIMIT_FOR_ANTISPAM:
-        time_diff = recent_actions_timestamps[-1] - recent_actions_timestamps[-ACTION_LIMIT_FOR_ANTISPAM]
-        if time_diff.total_seconds() <= TIME_WINDOW_SECONDS_FOR_ANTISPAM:
-            print(f"ANTISPAM TRIGGERED for user {user_id_from_message} by '{message.text}' action!")
-            antispam_duration_minutes = 5 
-            antispam_end_time = datetime.now(timezone.utc) + timedelta(minutes=antispam_duration_minutes)
-            await state.update_data(in_antispam_mode=True, antispam_mode_until=antispam_end_time, recent_actions_timestamps=[])
-            await message.answer(
-                f"Ваша активность кажется чрезмерной. Пожалуйста, сделайте перерыв.\n"
-                f"В течение следующих {antispam_duration_minutes} минут вам будут показаны информационные сообщения.", 
-                reply_markup=applicant_action_keyboard 
-            )
-            await show_antispam_dummy(message, state) 
-            return
+    if await trigger_antispam_if_flooding(message, state, session, user_id_from_message, current_data_fsm, f"'{message.text}'"):
+        return
     # --- КОНЕЦ БЛОКА 2 ---
     
     # --- ЕСЛИ НЕ ВЫШЛИ ИЗ-ЗА БЛОКА 1 ИЛИ 2 -> ОСНОВНАЯ ЛОГИКА ХЭНДЛЕРА ---
@@ -444,56 +463,38 @@ async def process_like_employer(message: Message, state: FSMContext):
 
 
     try:
-        async with AsyncSessionFactory() as session, session.begin():
-            # Проверяем, есть ли уже активный (непросмотренный) лайк
-            existing_like_check = await session.execute(
-                select(ApplicantEmployerInteraction).where(
-                    ApplicantEmployerInteraction.applicant_user_id == user_id_from_message,
-                    ApplicantEmployerInteraction.employer_profile_id == shown_employer_profile_id,
-                    ApplicantEmployerInteraction.interaction_type == InteractionTypeEnum.LIKE,
-                    ApplicantEmployerInteraction.is_viewed_by_employer == False 
-                )
-            )
-            existing_active_like = existing_like_check.scalar_one_or_none()
+        cooldown_end_time_utc = datetime.now(timezone.utc) + FEED_REACTION_COOLDOWN
 
-            cooldown_duration_hours_like = 0.1 
-            cooldown_end_time_utc = datetime.now(timezone.utc) + timedelta(hours=cooldown_duration_hours_like)
-            
-            if existing_active_like:
-                existing_active_like.cooldown_until = cooldown_end_time_utc 
-                existing_active_like.created_at = datetime.now(timezone.utc) 
-                session.add(existing_active_like)
-                await session.flush() # Получаем ID
-                interaction_id_for_push = existing_active_like.id
-                await message.answer("Вы уже откликались на эту вакансию, и ваш отклик еще не просмотрен. Мы напомнили о вас!")
-                print(f"DEBUG: Repeated Like recorded. Applicant {user_id_from_message} -> EmpProfile {shown_employer_profile_id}. Interaction ID: {interaction_id_for_push}")
-            else:
-                new_interaction = ApplicantEmployerInteraction(
-                    applicant_user_id=user_id_from_message, 
-                    employer_profile_id=shown_employer_profile_id,
-                    interaction_type=InteractionTypeEnum.LIKE, 
-                    created_at=datetime.now(timezone.utc),
-                    cooldown_until=cooldown_end_time_utc, 
-                    is_viewed_by_employer=False
-                )
-                session.add(new_interaction)
-                await session.flush() 
-                interaction_id_for_push = new_interaction.id
-                await message.answer("Ваш отклик (лайк) отправлен работодателю!")
-                print(f"DEBUG: New Like recorded. Applicant {user_id_from_message} -> EmpProfile {shown_employer_profile_id}. Interaction ID: {interaction_id_for_push}")
-        # --- Транзакция сохранения лайка здесь завершена и закоммичена ---
-
-        # Отправляем PUSH-уведомление ПОСЛЕ того, как лайк сохранен
+        # Один запрос вместо SELECT + INSERT/UPDATE: двойное нажатие не создаст второй лайк
+        like_row = (await session.execute(
+            build_like_upsert_statement(user_id_from_message, shown_employer_profile_id, cooldown_end_time_utc)
+        )).one()
+        interaction_id_for_push = like_row.id
+        await set_feed_cooldown(session, user_id_from_message, shown_employer_profile_id, cooldown_end_time_utc)
+
+        # PUSH работодателю - через outbox в этой же транзакции: отправит фоновый диспетчер после коммита
         if target_employer_user_id and interaction_id_for_push:
-            await send_or_update_employer_notification(
-                bot_instance=message.bot, 
+            add_outbox_event(
+                session, "employer_push", target_employer_user_id,
                 employer_user_id=target_employer_user_id,
                 interaction_id=interaction_id_for_push, # Этот ID пока не используется в send_or_update..., но может пригодиться
                 interaction_type_text="лайк"
             )
-        
+
+        # Лайк, кулдаун и outbox фиксируем до ответа соискателю: "отклик отправлен" - только после коммита,
+        # и строки не заблокированы на время запросов к Telegram. PUSH работодателю не ждет наших отправок
+        await session.commit()
+        wake_outbox_dispatcher()
+
+        if like_row.is_new:
+            await message.answer("Ваш отклик (лайк) отправлен работодателю!")
+            print(f"DEBUG: New Like recorded. Applicant {user_id_from_message} -> EmpProfile {shown_employer_profile_id}. Interaction ID: {interaction_id_for_push}")
+        else:
+            await message.answer("Вы уже откликались на эту вакансию, и ваш отклик еще не просмотрен. Мы напомнили о вас!")
+            print(f"DEBUG: Repeated Like recorded. Applicant {user_id_from_message} -> EmpProfile {shown_employer_profile_id}. Interaction ID: {interaction_id_for_push}")
+
         # Показываем следующую анкету соискателю
-        await show_next_employer_profile(message, user_id_from_message, state)
+        await show_next_employer_profile(message, user_id_from_message, state, session)
 
     except Exception as e:
         print(f"Error processing like: {e}\n{traceback.format_exc()}")
@@ -501,26 +502,26 @@ async def process_like_employer(message: Message, state: FSMContext):
         
         from app.handlers.settings_handlers import show_applicant_settings_menu 
         display_name = message.from_user.first_name
-        async with AsyncSessionFactory() as session_err, session_err.begin():
-            user_for_menu_err = await session_err.get(User, user_id_from_message)
-            if user_for_menu_err and user_for_menu_err.first_name:
-                display_name = user_for_menu_err.first_name
-        await show_applicant_settings_menu(message, user_id_from_message, display_name)
+        await session.rollback() # Сессия апдейта могла остаться в состоянии ошибки
+        user_for_menu_err = await session.get(User, user_id_from_message)
+        if user_for_menu_err and user_for_menu_err.first_name:
+            display_name = user_for_menu_err.first_name
+        await show_applicant_settings_menu(message, user_id_from_message, display_name, session=session)
         
         
 # Кнопка "❓ Отправить вопрос" - этот хэндлер остается как есть
 @browsing_router.message(F.text == "❓ Отправить вопрос")
-async def ask_question_to_employer_start(message: Message, state: FSMContext):
+async def ask_question_to_employer_start(message: Message, state: FSMContext, session: AsyncSession):
     user_id_from_message = message.from_user.id # Для единообразия используем это имя
     current_data_fsm = await state.get_data()
     
     # --- ПРОВЕРКА, СУЩЕСТВУЕТ ЛИ ЕЩЕ АКТИВНАЯ АНКЕТА СОИСКАТЕЛЯ ---
-    async with AsyncSessionFactory() as session_check_profile, session_check_profile.begin():
-        applicant_profile_exists = (await session_check_profile.execute(
-            select(ApplicantProfile.id) # Просто проверяем наличие
-            .where(ApplicantProfile.user_id == user_id_from_message, ApplicantProfile.is_active == True) 
-            # user_id_who_interacted - это ID соискателя в текущем хэндлере
-        )).scalar_one_or_none()
+    applicant_profile_exists = (await session.execute(
+        select(ApplicantProfile.id) # Просто проверяем наличие
+        .where(ApplicantProfile.user_id == user_id_from_message, ApplicantProfile.is_active == True) 
+        # user_id_who_interacted - это ID соискателя в текущем хэндлере
+    )).scalar_one_or_none()
+    await release_update_session(session) # Дальше - ответы в Telegram, не держим транзакцию
 
     if not applicant_profile_exists:
         await state.clear() # Очищаем FSM соискателя
@@ -544,41 +545,21 @@ async def ask_question_to_employer_start(message: Message, state: FSMContext):
         now_utc = datetime.now(timezone.utc)
 
         if is_still_in_antispam_ban and antispam_ban_ends_at and now_utc < antispam_ban_ends_at:
-            await show_antispam_dummy(message, state) # Снова показываем пустышку
+            await show_antispam_dummy(message, state, session) # Снова показываем пустышку
         else: # Бан истек или его не было (но мы на пустышке - это странно, но очистим)
             if is_still_in_antispam_ban: # Сбрасываем флаги, если они еще стоят
                  await state.update_data(in_antispam_mode=False, antispam_mode_until=None, recent_actions_timestamps=[])
                  print(f"DEBUG: Antispam ban for user {user_id_from_message} ended upon interaction with dummy.")
             await message.answer("Период информационных сообщений закончился. Попробуем найти следующую анкету.", 
                                  reply_markup=applicant_action_keyboard) # Возвращаем кнопки просмотра
-            await show_next_employer_profile(message, user_id_from_message, state) # Показываем реальную
+            await show_next_employer_profile(message, user_id_from_message, state, session) # Показываем реальную
         return # Важно: ВЫХОДИМ из хэндлера, не обрабатываем дальше
     # --- КОНЕЦ БЛОКА 1 ---
 
     # --- БЛОК 2: ТРИГГЕР АНТИ-СПАМА (если это было взаимодействие с реальной анкетой) ---
 
-    recent_actions_timestamps = current_data_fsm.get("recent_actions_timestamps", [])
-
-    current_action_time = datetime.now(timezone.utc)
-    recent_actions_timestamps.append(current_action_time)
-    MAX_RECENT_ACTIONS_TO_TRACK = 10; ACTION_LIMIT_FOR_ANTISPAM = 10; TIME_WINDOW_SECONDS_FOR_ANTISPAM = 10 
-    if len(recent_actions_timestamps) > MAX_RECENT_ACTIONS_TO_TRACK:
-        recent_actions_timestamps = recent_actions_timestamps[-MAX_RECENT_ACTIONS_TO_TRACK:]
-    await state.update_data(recent_actions_timestamps=recent_actions_timestamps)
-    if len(recent_actions_timestamps) >= ACTION_LIMIT_FOR_ANTISPAM:
-        time_diff = recent_actions_timestamps[-1] - recent_actions_timestamps[-ACTION_LIMIT_FOR_ANTISPAM]
-        if time_diff.total_seconds() <= TIME_WINDOW_SECONDS_FOR_ANTISPAM:
-            print(f"ANTISPAM TRIGGERED for user {user_id_from_message} by '{message.text}' action!")
-            antispam_duration_minutes = 5 
-            antispam_end_time = datetime.now(timezone.utc) + timedelta(minutes=antispam_duration_minutes)
-            await state.update_data(in_antispam_mode=True, antispam_mode_until=antispam_end_time, recent_actions_timestamps=[])
-            await message.answer(
-                f"Ваша активность кажется чрезмерной. Пожалуйста, сделайте перерыв.\n"
-                f"В течение следующих {antispam_duration_minutes} минут вам будут показаны информационные сообщения.", 
-                reply_markup=applicant_action_keyboard 
-            )
-            await show_antispam_dummy(message, state) 
-            return
+    if await trigger_antispam_if_flooding(message, state, session, user_id_from_message, current_data_fsm, f"'{message.text}'"):
+        return
     # --- КОНЕЦ БЛОКА 2 ---
     
     # --- ЕСЛИ НЕ ВЫШЛИ ИЗ-ЗА БЛОКА 1 ИЛИ 2 -> ОСНОВНАЯ ЛОГИКА ХЭНДЛЕРА ---
@@ -595,7 +576,7 @@ async def ask_question_to_employer_start(message: Message, state: FSMContext):
     
 # Отмена ввода вопроса
 @browsing_router.message(ApplicantBrowsingStates.asking_question, F.text == "🚫 Отменить ввод вопроса")
-async def cancel_question_input(message: Message, state: FSMContext):
+async def cancel_question_input(message: Message, state: FSMContext, session: AsyncSession):
     user_id = message.from_user.id
     current_data = await state.get_data()
     # current_shown_employer_profile_id должен все еще быть в FSM с предыдущего показа анкеты
@@ -610,44 +591,42 @@ async def cancel_question_input(message: Message, state: FSMContext):
 
     
     if shown_employer_profile_id:
-        async with AsyncSessionFactory() as session, session.begin():
-            employer_profile_to_reshow = await session.get(EmployerProfile, shown_employer_profile_id) # Получаем по PK (id)
+        employer_profile_to_reshow = row_to_dto(EmployerCard, (await session.execute(
+            select(*EMPLOYER_CARD_COLUMNS).where(
+                EmployerProfile.id == shown_employer_profile_id, EmployerProfile.is_active == True
+            )
+        )).first())
+        await release_update_session(session)
             
-            if employer_profile_to_reshow and employer_profile_to_reshow.is_active:
-                profile_text = format_employer_profile_for_applicant(employer_profile_to_reshow)
+        if employer_profile_to_reshow:
+            profile_text = format_employer_profile_for_applicant(employer_profile_to_reshow)
                 
-                # Восстанавливаем данные в FSM, как будто мы ее только что показали
-                await state.update_data(
-                    current_shown_employer_profile_id=employer_profile_to_reshow.id,
-                    current_shown_employer_user_id=employer_profile_to_reshow.user_id
-                )
-
-                if employer_profile_to_reshow.photo_file_id:
-                    try:
-                        await message.bot.send_photo(chat_id=user_id, photo=employer_profile_to_reshow.photo_file_id,
-                                                     caption=profile_text, parse_mode="HTML", reply_markup=applicant_action_keyboard)
-                    except: # Фоллбэк на текстовое сообщение
-                        await message.answer(profile_text, parse_mode="HTML", reply_markup=applicant_action_keyboard)
-                else:
-                    await message.answer(profile_text, parse_mode="HTML", reply_markup=applicant_action_keyboard)
-            else:
-                # Если анкета вдруг стала неактивна или удалена, показываем следующую
-                await message.answer("Анкета, к которой вы хотели задать вопрос, больше не доступна. Показываю следующую.")
-                await show_next_employer_profile(message, user_id, state)
+            # Восстанавливаем данные в FSM, как будто мы ее только что показали
+            await state.update_data(
+                current_shown_employer_profile_id=employer_profile_to_reshow.id,
+                current_shown_employer_user_id=employer_profile_to_reshow.user_id
+            )
+
+            await send_photo_or_text(message.bot, user_id, employer_profile_to_reshow.photo_file_id, profile_text,
+                                     parse_mode="HTML", reply_markup=applicant_action_keyboard)
+        else:
+            # Если анкета вдруг стала неактивна или удалена, показываем следующую
+            await message.answer("Анкета, к которой вы хотели задать вопрос, больше не доступна. Показываю следующую.")
+            await show_next_employer_profile(message, user_id, state, session)
     else:
         # Если не смогли восстановить ID, просто показываем следующую (или меню, если нет анкет)
         await message.answer("Не удалось вернуться к предыдущей анкете. Показываю следующую.")
-        await show_next_employer_profile(message, user_id, state)
+        await show_next_employer_profile(message, user_id, state, session)
 
 # Получение текста вопроса от соискателя
 @browsing_router.message(ApplicantBrowsingStates.asking_question, F.text)
-async def process_question_to_employer(message: Message, state: FSMContext):
+async def process_question_to_employer(message: Message, state: FSMContext, session: AsyncSession):
     applicant_user_id = message.from_user.id
     applicant_name_for_notif = message.from_user.full_name
     question_text = message.text.strip()
 
     if question_text == "🚫 Отменить ввод вопроса": # Эта проверка должна быть до валидации длины
-        return await cancel_question_input(message, state) # Используем уже существующий cancel_question_input
+        return await cancel_question_input(message, state, session) # Используем уже существующий cancel_question_input
 
     if not (5 <= len(question_text) <= 500):
         await message.answer(
@@ -666,49 +645,49 @@ async def process_question_to_employer(message: Message, state: FSMContext):
         await state.clear()
         from app.handlers.settings_handlers import show_applicant_settings_menu
         display_name = message.from_user.first_name
-        async with AsyncSessionFactory() as session_err, session_err.begin():
-            user_err = await session_err.get(User, applicant_user_id)
-            if user_err and user_err.first_name: display_name = user_err.first_name
-        await show_applicant_settings_menu(message, applicant_user_id, display_name)
+        user_err = await session.get(User, applicant_user_id)
+        if user_err and user_err.first_name: display_name = user_err.first_name
+        await show_applicant_settings_menu(message, applicant_user_id, display_name, session=session)
         return
     
     if not target_employer_user_id:
         print(f"CRITICAL: target_employer_user_id is None in process_question for profile {target_profile_id}. Notification may not be sent.")
         
     try:
-        async with AsyncSessionFactory() as session, session.begin():
-            cooldown_duration_hours_question = 0.1
-            cooldown_end_time_utc = datetime.now(timezone.utc) + timedelta(hours=cooldown_duration_hours_question)
-            new_interaction = ApplicantEmployerInteraction(
-                applicant_user_id=applicant_user_id, 
-                employer_profile_id=target_profile_id,
-                interaction_type=InteractionTypeEnum.QUESTION_SENT, 
-                question_text=question_text,
-                created_at=datetime.now(timezone.utc), 
-                cooldown_until=cooldown_end_time_utc,
-                is_viewed_by_employer=False
-            )
-            session.add(new_interaction)
-            await session.flush() 
-            interaction_id_for_push = new_interaction.id
-            print(f"DEBUG: Question Sent & flushed. Applicant {applicant_user_id} -> EmpProfile {target_profile_id}. Interaction ID: {interaction_id_for_push}")
-        # --- Транзакция сохранения вопроса здесь завершена и закоммичена ---
-
-        await message.answer("Ваш вопрос отправлен работодателю!", reply_markup=ReplyKeyboardRemove()) 
-        await state.set_state(None) 
-        await state.update_data(question_target_profile_id=None) # Очищаем ID цели вопроса
-        
-        # Показываем следующую анкету соискателю
-        await show_next_employer_profile(message, applicant_user_id, state)
+        cooldown_end_time_utc = datetime.now(timezone.utc) + FEED_REACTION_COOLDOWN
+        new_interaction = ApplicantEmployerInteraction(
+            applicant_user_id=applicant_user_id, 
+            employer_profile_id=target_profile_id,
+            interaction_type=InteractionTypeEnum.QUESTION_SENT, 
+            question_text=question_text,
+            created_at=datetime.now(timezone.utc), 
+            cooldown_until=cooldown_end_time_utc,
+            is_viewed_by_employer=False
+        )
+        session.add(new_interaction)
+        await session.flush() 
+        interaction_id_for_push = new_interaction.id
+        await set_feed_cooldown(session, applicant_user_id, target_profile_id, cooldown_end_time_utc)
+        print(f"DEBUG: Question Sent & flushed. Applicant {applicant_user_id} -> EmpProfile {target_profile_id}. Interaction ID: {interaction_id_for_push}")
 
-        # ОТПРАВЛЯЕМ PUSH УВЕДОМЛЕНИЕ ПОСЛЕ
         if target_employer_user_id and interaction_id_for_push:
-            await send_or_update_employer_notification(
-                bot_instance=message.bot,
+            add_outbox_event(
+                session, "employer_push", target_employer_user_id,
                 employer_user_id=target_employer_user_id,
                 interaction_id=interaction_id_for_push,
                 interaction_type_text="вопрос"
             )
+
+        # Вопрос фиксируем до ответа соискателю (см. лайк)
+        await session.commit()
+        wake_outbox_dispatcher()
+
+        await message.answer("Ваш вопрос отправлен работодателю!", reply_markup=ReplyKeyboardRemove()) 
+        await state.set_state(None) 
+        await state.update_data(question_target_profile_id=None) # Очищаем ID цели вопроса
+
+        # Показываем следующую анкету соискателю
+        await show_next_employer_profile(message, applicant_user_id, state, session)
             
     except Exception as e:
         print(f"Error processing question to employer: {e}\n{traceback.format_exc()}")
@@ -716,13 +695,13 @@ async def process_question_to_employer(message: Message, state: FSMContext):
         await state.clear() 
         from app.handlers.settings_handlers import show_applicant_settings_menu
         display_name = message.from_user.first_name
-        async with AsyncSessionFactory() as session_err, session_err.begin():
-            user_err = await session_err.get(User, applicant_user_id)
-            if user_err and user_err.first_name: display_name = user_err.first_name
-        await show_applicant_settings_menu(message, applicant_user_id, display_name)
+        await session.rollback() # Сессия апдейта могла остаться в состоянии ошибки
+        user_err = await session.get(User, applicant_user_id)
+        if user_err and user_err.first_name: display_name = user_err.first_name
+        await show_applicant_settings_menu(message, applicant_user_id, display_name, session=session)
 
 @browsing_router.message(F.text == "🚩 Жалоба")
-async def process_report_employer(message: Message, state: FSMContext):
+async def process_report_employer(message: Message, state: FSMContext, session: AsyncSession):
     user_id_who_reported = message.from_user.id # ID соискателя, который жалуется
     
     # <<<--- НАЧАЛО ОБЩЕГО АНТИ-СПАМ БЛОКА ---<<<
@@ -736,47 +715,19 @@ async def process_report_employer(message: Message, state: FSMContext):
         now_utc = datetime.now(timezone.utc)
 
         if is_still_in_antispam_ban and antispam_ban_ends_at and now_utc < antispam_ban_ends_at:
-            await show_antispam_dummy(message, state) 
+            await show_antispam_dummy(message, state, session) 
         else: 
             if is_still_in_antispam_ban:
                  await state.update_data(in_antispam_mode=False, antispam_mode_until=None, recent_actions_timestamps=[])
                  print(f"DEBUG: Antispam ban for user {user_id_who_reported} ended upon interaction with dummy.")
             await message.answer("Период информационных сообщений закончился. Попробуем найти следующую анкету.", 
                                  reply_markup=applicant_action_keyboard) 
-            await show_next_employer_profile(message, user_id_who_reported, state) 
+            await show_next_employer_profile(message, user_id_who_reported, state, session) 
         return 
     
     # 2. Анти-спам ТРИГГЕР (если предыдущая анкета была не пустышкой)
-    recent_actions_timestamps = current_data_fsm.get("recent_actions_timestamps", [])
-    current_action_time = datetime.now(timezone.utc)
-    recent_actions_timestamps.append(current_action_time)
-    MAX_RECENT_ACTIONS_TO_TRACK = 10  # сколько последних действий мы учитываем
-    ACTION_LIMIT_FOR_ANTISPAM = 10    # сколько действий допускается за ограниченное время
-    TIME_WINDOW_SECONDS_FOR_ANTISPAM = 10  # это время, за которое эти действия считаются "подозрительными"
-
-
-    if len(recent_actions_timestamps) > MAX_RECENT_ACTIONS_TO_TRACK:
-        recent_actions_timestamps = recent_actions_timestamps[-MAX_RECENT_ACTIONS_TO_TRACK:]
-    await state.update_data(recent_actions_timestamps=recent_actions_timestamps)
-
-    if len(recent_actions_timestamps) >= ACTION_LIMIT_FOR_ANTISPAM:
-        time_difference = recent_actions_timestamps[-1] - recent_actions_timestamps[-ACTION_LIMIT_FOR_ANTISPAM]
-        if time_difference.total_seconds() <= TIME_WINDOW_SECONDS_FOR_ANTISPAM:
-            print(f"ANTISPAM TRIGGERED for user {user_id_who_reported} by REPORT action!") # Отладочное сообщение
-            antispam_duration_minutes = 5 
-            antispam_end_time = datetime.now(timezone.utc) + timedelta(minutes=antispam_duration_minutes)
-            await state.update_data(
-                in_antispam_mode=True, 
-                antispam_mode_until=antispam_end_time,
-                recent_actions_timestamps=[] 
-            )
-            await message.answer(
-                f"Ваша активность кажется чрезмерной. Пожалуйста, сделайте перерыв.\n"
-                f"В течение следующих {antispam_duration_minutes} минут вам будут показаны информационные сообщения.", 
-                reply_markup=applicant_action_keyboard 
-            )
-            await show_antispam_dummy(message, state) 
-            return 
+    if await trigger_antispam_if_flooding(message, state, session, user_id_who_reported, current_data_fsm, "REPORT"):
+        return
     # >>>--- КОНЕЦ ОБЩЕГО АНТИ-СПАМ БЛОКА ---<<<
     
     # --- Если все проверки пройдены, основная логика жалобы ---
@@ -789,12 +740,11 @@ async def process_report_employer(message: Message, state: FSMContext):
         return
 
     if not user_id_of_profile_owner and profile_id_being_reported:
-        async with AsyncSessionFactory() as temp_session, temp_session.begin():
-            emp_profile_for_owner_id_q = await temp_session.execute(
-                select(EmployerProfile.user_id).where(EmployerProfile.id == profile_id_being_reported)
-            )
-            user_id_of_profile_owner = emp_profile_for_owner_id_q.scalar_one_or_none()
-            print(f"DEBUG: Had to fetch employer_user_id ({user_id_of_profile_owner}) from DB for complaint on profile {profile_id_being_reported}")
+        emp_profile_for_owner_id_q = await session.execute(
+            select(EmployerProfile.user_id).where(EmployerProfile.id == profile_id_being_reported)
+        )
+        user_id_of_profile_owner = emp_profile_for_owner_id_q.scalar_one_or_none()
+        print(f"DEBUG: Had to fetch employer_user_id ({user_id_of_profile_owner}) from DB for complaint on profile {profile_id_being_reported}")
 
     if not user_id_of_profile_owner: # Если так и не смогли определить владельца
         print(f"CRITICAL ERROR: Could not determine owner for employer_profile_id {profile_id_being_reported} to file a complaint.")
@@ -804,43 +754,46 @@ async def process_report_employer(message: Message, state: FSMContext):
     try:
         complaint_obj_to_notify = None # Переменная для хранения объекта жалобы
 
-        async with AsyncSessionFactory() as session, session.begin():
-            # 1. Создаем запись о жалобе
-            new_complaint = Complaint(
-                reporter_user_id=user_id_who_reported,
-                reported_employer_profile_id=profile_id_being_reported, 
-                reported_user_id=user_id_of_profile_owner,
-                reported_applicant_profile_id=None,                     
-                status=ComplaintStatusEnum.NEW
-            )
-            session.add(new_complaint)
-            await session.flush()
+        # 1. Создаем запись о жалобе
+        new_complaint = Complaint(
+            reporter_user_id=user_id_who_reported,
+            reported_employer_profile_id=profile_id_being_reported, 
+            reported_user_id=user_id_of_profile_owner,
+            reported_applicant_profile_id=None,                     
+            status=ComplaintStatusEnum.NEW
+        )
+        session.add(new_complaint)
+        await session.flush()
 
             
-            # 2. Устанавливаем кулдаун
-            cooldown_duration_hours_report = 0.1
-            cooldown_end_time_utc = datetime.now(timezone.utc) + timedelta(hours=cooldown_duration_hours_report)
-            complaint_cooldown_interaction = ApplicantEmployerInteraction(
-                applicant_user_id=user_id_who_reported,
-                employer_profile_id=profile_id_being_reported,
-                interaction_type=InteractionTypeEnum.DISLIKE, 
-                cooldown_until=cooldown_end_time_utc,
-                created_at=datetime.now(timezone.utc)
-            )
-            session.add(complaint_cooldown_interaction)
+        # 2. Устанавливаем кулдаун
+        cooldown_end_time_utc = datetime.now(timezone.utc) + FEED_REACTION_COOLDOWN
+        complaint_cooldown_interaction = ApplicantEmployerInteraction(
+            applicant_user_id=user_id_who_reported,
+            employer_profile_id=profile_id_being_reported,
+            interaction_type=InteractionTypeEnum.DISLIKE, 
+            cooldown_until=cooldown_end_time_utc,
+            created_at=datetime.now(timezone.utc)
+        )
+        session.add(complaint_cooldown_interaction)
+        await set_feed_cooldown(session, user_id_who_reported, profile_id_being_reported, cooldown_end_time_utc)
             
-            # Получаем ID жалобы после добавления в сессию, но до коммита
-            await session.flush() # Это присвоит new_complaint.id
-            if new_complaint.id: # Убедимся, что ID есть
-                complaint_obj_to_notify = new_complaint # Сохраняем сам объект для передачи
-                print(f"DEBUG: Complaint CREATED (ID: {new_complaint.id}) by {user_id_who_reported} on profile {profile_id_being_reported}")
-                print(f"DEBUG: Cooldown set for profile {profile_id_being_reported} for user {user_id_who_reported} due to complaint.")
-            else:
-                print("ERROR: new_complaint.id was not set after flush!")
+        # Получаем ID жалобы после добавления в сессию, но до коммита
+        await session.flush() # Это присвоит new_complaint.id
+        if new_complaint.id: # Убедимся, что ID есть
+            complaint_obj_to_notify = new_complaint # Сохраняем сам объект для передачи
+            print(f"DEBUG: Complaint CREATED (ID: {new_complaint.id}) by {user_id_who_reported} on profile {profile_id_being_reported}")
+            print(f"DEBUG: Cooldown set for profile {profile_id_being_reported} for user {user_id_who_reported} due to complaint.")
+        else:
+            print("ERROR: new_complaint.id was not set after flush!")
+
+        # Жалобу и кулдаун фиксируем до ответа соискателю; уведомление админам читает их в своей сессии
+        await session.commit()
         
-        # --- ДЕЙСТВИЯ ПОСЛЕ УСПЕШНОЙ ТРАНЗАКЦИИ ---
         await message.answer("Спасибо, ваша жалоба принята и будет рассмотрена.", reply_markup=ReplyKeyboardRemove())
-        
+        await show_next_employer_profile(message, user_id_who_reported, state, session)
+
+        # --- ДЕЙСТВИЯ ПОСЛЕ УСПЕШНОЙ ТРАНЗАКЦИИ ---
         # Отправляем уведомление админам, если жалоба была успешно создана и имеет ID
         if complaint_obj_to_notify and complaint_obj_to_notify.id:
             from app.handlers.admin_handlers import notify_admins_about_complaint # Локальный импорт
@@ -848,18 +801,16 @@ async def process_report_employer(message: Message, state: FSMContext):
                 await notify_admins_about_complaint(message.bot, complaint_obj_to_notify)
             except Exception as e_notify:
                 print(f"ERROR sending complaint notification to admins: {e_notify}\n{traceback.format_exc()}")
-        
-        await show_next_employer_profile(message, user_id_who_reported, state)
 
     except Exception as e:
         print(f"Error processing report: {e}\n{traceback.format_exc()}")
         await message.answer("Произошла ошибка при отправке жалобы. Попробуйте позже.")
         from app.handlers.settings_handlers import show_applicant_settings_menu
         display_name = message.from_user.first_name
-        async with AsyncSessionFactory() as session_err, session_err.begin():
-            user_err = await session_err.get(User, user_id_who_reported)
-            if user_err and user_err.first_name: display_name = user_err.first_name
-        await show_applicant_settings_menu(message, user_id_who_reported, display_name) # передаем user_id
+        await session.rollback() # Сессия апдейта могла остаться в состоянии ошибки
+        user_err = await session.get(User, user_id_who_reported)
+        if user_err and user_err.first_name: display_name = user_err.first_name
+        await show_applicant_settings_menu(message, user_id_who_reported, display_name, session=session) # передаем user_id
 
         
         
@@ -877,18 +828,18 @@ async def send_or_update_employer_notification(
 
     # 1. Получить данные из БД
     async with AsyncSessionFactory() as session, session.begin():
-        profile_record = (await session.execute(
-            select(EmployerProfile) # Выбираем весь объект, чтобы получить и .id, и .user_id
+        profile_record = row_to_dto(EmployerPushTarget, (await session.execute(
+            select(*EMPLOYER_PUSH_TARGET_COLUMNS) # Нужны только id и ID активного PUSH-сообщения
             .where(EmployerProfile.user_id == employer_user_id)
-        )).scalar_one_or_none()
+        )).first())
 
         if not profile_record:
             print(f"  DEBUG_PUSH: EXIT - No EmployerProfile record for user_id {employer_user_id}. Cannot send PUSH.")
             return
         
         db_employer_profile_id = profile_record.id # Теперь это точно ID профиля работодателя
-        db_active_notification_message_id = profile_record.active_notification_message_id
-        print(f"  DEBUG_PUSH: For employer_user_id {employer_user_id}, found profile_id: {db_employer_profile_id}, DB active_notif_msg_id: {db_active_notification_message_id}")
+        db_active_notification_message_id_from_db = profile_record.active_notification_message_id
+        print(f"  DEBUG_PUSH: For employer_user_id {employer_user_id}, found profile_id: {db_employer_profile_id}, DB active_notif_msg_id: {db_active_notification_message_id_from_db}")
 
         # Теперь используем db_employer_profile_id для подсчета
         count_result = (await session.execute(
@@ -996,17 +947,23 @@ async def send_or_update_employer_notification(
             print(f"  DEBUG_PUSH: DB Updated: employer {employer_user_id} active_notification_message_id = {final_message_id_to_store_in_db}")
     print(f"---send_or_update_employer_notification END for employer {employer_user_id}---\n")
 
-async def send_random_motivational_content(message: Message, state: FSMContext) -> bool:
-    user_id = message.from_user.id
-    selected_content_item: MotivationalContent | None = None
 
-    async with AsyncSessionFactory() as session, session.begin():
-        active_motivation_query = (
-            select(MotivationalContent)
-            .where(MotivationalContent.is_active == True)
-            .order_by(sqlalchemy_func.random()).limit(1)
-        )
-        selected_content_item = (await session.execute(active_motivation_query)).scalar_one_or_none()
+# События "employer_push" приходят из outbox (app/services/outbox_service.py), который разбирает шард 0.
+# Отдельная блокировка на работодателя не нужна: диспетчер один, пачки идут по очереди,
+# а события одного работодателя в пачке схлопываются в один вызов - два PUSH параллельно не уйдут.
+@register_shard_event_handler("employer_push")
+async def handle_employer_push_event(bot: Bot, employer_user_id: int, interaction_id: int, interaction_type_text: str):
+    await send_or_update_employer_notification(
+        bot_instance=bot,
+        employer_user_id=employer_user_id,
+        interaction_id=interaction_id,
+        interaction_type_text=interaction_type_text
+    )
+
+async def send_random_motivational_content(message: Message, state: FSMContext, session: AsyncSession | None = None) -> bool:
+    user_id = message.from_user.id
+    selected_content_item: MotivationItem | None = await pick_motivational_content(session)
+    await release_update_session(session) # Кэш мог перечитываться из основной БД
 
     if selected_content_item:
         print(f"DEBUG: Sending motivational content ID {selected_content_item.id} to user {user_id}")
@@ -1042,10 +999,10 @@ async def send_random_motivational_content(message: Message, state: FSMContext)
 
 
 @browsing_router.message(F.text == "▶️ Продолжить просмотр", StateFilter(ApplicantBrowsingStates.watching_motivation))
-async def resume_browsing_after_motivation(message: Message, state: FSMContext):
+async def resume_browsing_after_motivation(message: Message, state: FSMContext, session: AsyncSession):
     user_id = message.from_user.id
     await message.answer("Отлично! Ищем дальше...", reply_markup=ReplyKeyboardRemove()) # Убираем кнопку "Продолжить"
     await state.set_state(None) # Сбрасываем состояние просмотра мотивации
-    await show_next_employer_profile(message, user_id, state) # Показываем следующую вакансию
+    await show_next_employer_profile(message, user_id, state, session) # Показываем следующую вакансию
     
     
@@ -0,0 +1,312 @@
+# app/handlers/compact_browsing_handlers.py
+# Компактный просмотр ленты: COMPACT_FEED_BATCH_SIZE вакансий одним сообщением, у каждой свои inline ❤️/👎/ℹ️.
+# Список подбирается одним запросом (приоритет как в обычной ленте: реальные в городе соискателя,
+# реальные в других городах, пустышки - только если реальных нет), реакции пишутся теми же
+# лайком/дизлайком с кулдауном и обновляют это же сообщение через edit_message_text.
+# Когда в списке не осталось неотмеченных вакансий, следующий список подставляется тем же редактированием.
+# Фото, вопрос и жалоба - только в обычном режиме (в edit_message_text фото не добавить).
+import html
+import traceback
+from datetime import datetime, timezone
+
+from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message, ReplyKeyboardRemove
+from sqlalchemy import select, func as sqlalchemy_func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import COMPACT_FEED_BATCH_SIZE
+from app.db.database import read_session_scope, release_update_session
+from app.db.dto import EmployerCard, EMPLOYER_CARD_COLUMNS, row_to_dto, rows_to_dto
+from app.db.models import ApplicantEmployerInteraction, ApplicantProfile, EmployerProfile, InteractionTypeEnum, User
+from app.handlers.browsing_handlers import build_like_upsert_statement, format_employer_profile_for_applicant, register_feed_action, ANTISPAM_DURATION_MINUTES
+from app.handlers.settings_handlers import BTN_COMPACT_BROWSING_TEXT, show_applicant_settings_menu
+from app.services.cooldown_service import FEED_REACTION_COOLDOWN, set_feed_cooldown, not_in_feed_cooldown
+from app.services.outbox_service import add_outbox_event, wake_outbox_dispatcher
+
+compact_browsing_router = Router()
+
+# --- КОНСТАНТЫ ДЛЯ CALLBACK DATA ---
+COMPACT_FEED_PREFIX = "cfeed:"
+COMPACT_LIKE_PREFIX = f"{COMPACT_FEED_PREFIX}like:"
+COMPACT_DISLIKE_PREFIX = f"{COMPACT_FEED_PREFIX}dislike:"
+COMPACT_OPEN_PREFIX = f"{COMPACT_FEED_PREFIX}open:"
+COMPACT_BACK_CALLBACK_DATA = f"{COMPACT_FEED_PREFIX}back"
+COMPACT_MORE_CALLBACK_DATA = f"{COMPACT_FEED_PREFIX}more"
+COMPACT_STOP_CALLBACK_DATA = f"{COMPACT_FEED_PREFIX}stop"
+
+# Статус карточки в списке (хранится в FSM)
+_PENDING, _LIKED, _DISLIKED = "pending", "liked", "disliked"
+_STATUS_MARKS = {_PENDING: "▫️", _LIKED: "❤️", _DISLIKED: "👎"}
+
+
+def build_feed_batch_query(user_id: int, applicant_city: str | None, now: datetime, limit: int, exclude_ids=()):
+    """Одним запросом то, что обычная лента выбирает до четырех раз по одной анкете."""
+    conditions = [EmployerProfile.is_active == True, not_in_feed_cooldown(user_id, now)]
+    if exclude_ids:
+        conditions.append(EmployerProfile.id.not_in(list(exclude_ids)))
+    priority = [EmployerProfile.is_dummy] # false < true: сначала реальные
+    if applicant_city:
+        priority.append(sqlalchemy_func.lower(EmployerProfile.city) != applicant_city) # Сначала город соискателя
+    return select(*EMPLOYER_CARD_COLUMNS).where(*conditions).order_by(*priority, sqlalchemy_func.random()).limit(limit)
+
+
+async def load_feed_batch(session, user_id: int, exclude_ids=()) -> list[EmployerCard] | None:
+    """Следующий список. None - анкета соискателя неактивна или удалена."""
+    cards = None
+    async with read_session_scope(session) as feed_session:
+        applicant_row = (await feed_session.execute(
+            select(ApplicantProfile.city, ApplicantProfile.is_active).where(ApplicantProfile.user_id == user_id)
+        )).first()
+        if applicant_row and applicant_row.is_active:
+            applicant_city = applicant_row.city.strip().lower() if applicant_row.city else None
+            cards = rows_to_dto(EmployerCard, (await feed_session.execute(
+                build_feed_batch_query(user_id, applicant_city, datetime.now(timezone.utc), COMPACT_FEED_BATCH_SIZE, exclude_ids)
+            )).all())
+    await release_update_session(session) # Дальше только отправка и редактирование сообщений
+    if cards is None:
+        return None
+    # Пустышки только добирают пустую ленту, как в обычном режиме
+    real_cards = [card for card in cards if not card.is_dummy]
+    return real_cards or cards
+
+
+def _card_summary(card: EmployerCard) -> str:
+    salary = html.escape(card.salary) if card.salary else "з/п не указана"
+    return f"<b>{html.escape(card.position)}</b> - {html.escape(card.company_name)}, {html.escape(card.city)}, {salary}"
+
+
+def render_compact_feed(cards: list[list]) -> tuple[str, InlineKeyboardMarkup]:
+    """cards - [id, user_id, краткое описание, статус] из FSM. Без запросов в БД."""
+    lines = ["📋 <b>Вакансии для вас</b>", ""]
+    buttons = []
+    for number, (profile_id, _, summary, status) in enumerate(cards, start=1):
+        lines.append(f"{_STATUS_MARKS[status]} {number}. {summary}")
+        if status == _PENDING:
+            buttons.append([
+                InlineKeyboardButton(text=f"❤️ {number}", callback_data=f"{COMPACT_LIKE_PREFIX}{profile_id}"),
+                InlineKeyboardButton(text=f"👎 {number}", callback_data=f"{COMPACT_DISLIKE_PREFIX}{profile_id}"),
+                InlineKeyboardButton(text=f"ℹ️ {number}", callback_data=f"{COMPACT_OPEN_PREFIX}{profile_id}"),
+            ])
+    buttons.append([
+        InlineKeyboardButton(text="➡️ Следующие", callback_data=COMPACT_MORE_CALLBACK_DATA),
+        InlineKeyboardButton(text="⏹️ Стоп", callback_data=COMPACT_STOP_CALLBACK_DATA),
+    ])
+    return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def _cards_for_state(cards: list[EmployerCard]) -> list[list]:
+    return [[card.id, card.user_id, _card_summary(card), _PENDING] for card in cards]
+
+
+async def _edit_feed_message(message: Message, text: str, keyboard: InlineKeyboardMarkup | None):
+    try:
+        await message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    except TelegramBadRequest as e_edit: # "message is not modified" при повторном нажатии
+        print(f"DEBUG: Compact feed message {message.message_id} not edited: {e_edit}")
+
+
+async def _finish_compact_feed(message: Message, user_id: int, display_name: str, state: FSMContext, session: AsyncSession, text: str):
+    await state.update_data(compact_feed_cards=None, compact_feed_message_id=None)
+    await _edit_feed_message(message, text, None)
+    await show_applicant_settings_menu(message, user_id, display_name, session=session)
+
+
+async def _show_next_batch(callback_query: CallbackQuery, state: FSMContext, session: AsyncSession, exclude_ids):
+    user_id = callback_query.from_user.id
+    cards = await load_feed_batch(session, user_id, exclude_ids)
+    if not cards:
+        text = ("Ваша анкета неактивна. Просмотр остановлен." if cards is None
+                else "На данный момент подходящих анкет нет. Попробуйте зайти позже!")
+        await _finish_compact_feed(callback_query.message, user_id, callback_query.from_user.first_name, state, session, text)
+        return
+    state_cards = _cards_for_state(cards)
+    await state.update_data(compact_feed_cards=state_cards)
+    text, keyboard = render_compact_feed(state_cards)
+    await _edit_feed_message(callback_query.message, text, keyboard)
+
+
+@compact_browsing_router.message(F.text == BTN_COMPACT_BROWSING_TEXT)
+async def applicant_start_compact_browsing(message: Message, state: FSMContext, session: AsyncSession):
+    user_id = message.from_user.id
+    data = await state.get_data()
+    antispam_mode_until = data.get("antispam_mode_until")
+    if data.get("in_antispam_mode") and antispam_mode_until and datetime.now(timezone.utc) < antispam_mode_until:
+        await message.answer("Сейчас действует перерыв после слишком частых действий. Попробуйте через несколько минут.")
+        return
+
+    cards = await load_feed_batch(session, user_id)
+    if cards is None:
+        await message.answer("Ваша анкета неактивна или не создана. Сначала возобновите поиск или создайте анкету.", reply_markup=ReplyKeyboardRemove())
+        await show_applicant_settings_menu(message, user_id, message.from_user.first_name, session=session)
+        return
+    if not cards:
+        await message.answer("На данный момент подходящих анкет нет. Попробуйте зайти позже!")
+        return
+
+    await state.set_state(None)
+    await message.answer("💸🔍", reply_markup=ReplyKeyboardRemove())
+    state_cards = _cards_for_state(cards)
+    text, keyboard = render_compact_feed(state_cards)
+    feed_message = await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+    await state.update_data(compact_feed_cards=state_cards, compact_feed_message_id=feed_message.message_id)
+
+
+async def _current_feed(callback_query: CallbackQuery, state: FSMContext) -> list[list] | None:
+    """Карточки списка, если нажата кнопка в актуальном сообщении; иначе отвечает и возвращает None."""
+    data = await state.get_data()
+    cards = data.get("compact_feed_cards")
+    if not cards or data.get("compact_feed_message_id") != callback_query.message.message_id:
+        await callback_query.answer("Этот список устарел. Откройте просмотр списком заново.", show_alert=True)
+        try: await callback_query.message.edit_reply_markup(reply_markup=None)
+        except TelegramBadRequest: pass
+        return None
+    return cards
+
+
+def _find_card(cards: list[list], profile_id: int) -> list | None:
+    return next((card for card in cards if card[0] == profile_id), None)
+
+
+@compact_browsing_router.callback_query(F.data.startswith(COMPACT_LIKE_PREFIX) | F.data.startswith(COMPACT_DISLIKE_PREFIX))
+async def compact_feed_react(callback_query: CallbackQuery, state: FSMContext, session: AsyncSession):
+    user_id = callback_query.from_user.id
+    is_like = callback_query.data.startswith(COMPACT_LIKE_PREFIX)
+    try:
+        profile_id = int(callback_query.data.rsplit(":", 1)[1])
+    except ValueError:
+        await callback_query.answer("Ошибка данных.", show_alert=True); return
+
+    cards = await _current_feed(callback_query, state)
+    if cards is None:
+        return
+    card = _find_card(cards, profile_id)
+    if card is None or card[3] != _PENDING:
+        await callback_query.answer("Вы уже отметили эту вакансию.")
+        return
+    employer_user_id = card[1]
+
+    # Анти-спам общий с обычной лентой; пустышку в список не подставляем - отвечаем всплывающим сообщением
+    current_data_fsm = await state.get_data()
+    antispam_mode_until = current_data_fsm.get("antispam_mode_until")
+    if current_data_fsm.get("in_antispam_mode") and antispam_mode_until:
+        if datetime.now(timezone.utc) < antispam_mode_until:
+            minutes_left = int((antispam_mode_until - datetime.now(timezone.utc)).total_seconds() // 60) + 1
+            await callback_query.answer(f"Слишком много действий подряд. Сделайте перерыв (~{minutes_left} мин).", show_alert=True)
+            return
+        await state.update_data(in_antispam_mode=False, antispam_mode_until=None, recent_actions_timestamps=[])
+        current_data_fsm = await state.get_data()
+    if await register_feed_action(state, current_data_fsm):
+        print(f"ANTISPAM TRIGGERED for user {user_id} by compact feed action!")
+        await callback_query.answer(
+            "Ваша активность кажется чрезмерной. Пожалуйста, сделайте перерыв.\n"
+            f"Отметки будут недоступны {ANTISPAM_DURATION_MINUTES} минут.", show_alert=True
+        )
+        return
+
+    try:
+        cooldown_end_time_utc = datetime.now(timezone.utc) + FEED_REACTION_COOLDOWN
+        if is_like:
+            like_row = (await session.execute(
+                build_like_upsert_statement(user_id, profile_id, cooldown_end_time_utc)
+            )).one()
+            if employer_user_id:
+                add_outbox_event(
+                    session, "employer_push", employer_user_id,
+                    employer_user_id=employer_user_id, interaction_id=like_row.id, interaction_type_text="лайк"
+                )
+            print(f"DEBUG: Compact feed like. Applicant {user_id} -> EmpProfile {profile_id}. Interaction ID: {like_row.id}, new: {like_row.is_new}")
+        else:
+            session.add(ApplicantEmployerInteraction(
+                applicant_user_id=user_id,
+                employer_profile_id=profile_id,
+                interaction_type=InteractionTypeEnum.DISLIKE,
+                created_at=datetime.now(timezone.utc),
+                cooldown_until=cooldown_end_time_utc
+            ))
+            print(f"DEBUG: Compact feed dislike. Applicant {user_id} -> EmpProfile {profile_id}")
+        await set_feed_cooldown(session, user_id, profile_id, cooldown_end_time_utc)
+        await session.commit()
+    except Exception as e:
+        print(f"Error processing compact feed reaction: {e}\n{traceback.format_exc()}")
+        await session.rollback()
+        await callback_query.answer("Не удалось сохранить действие. Возможно, вакансия уже недоступна.", show_alert=True)
+        return
+    if is_like:
+        wake_outbox_dispatcher()
+
+    card[3] = _LIKED if is_like else _DISLIKED
+    await callback_query.answer("Отклик отправлен работодателю!" if is_like else None)
+    if any(other_card[3] == _PENDING for other_card in cards):
+        await state.update_data(compact_feed_cards=cards)
+        text, keyboard = render_compact_feed(cards)
+        await _edit_feed_message(callback_query.message, text, keyboard)
+    else: # Все отмечены - сразу следующий список в этом же сообщении
+        await _show_next_batch(callback_query, state, session, exclude_ids=[other_card[0] for other_card in cards])
+
+
+@compact_browsing_router.callback_query(F.data.startswith(COMPACT_OPEN_PREFIX))
+async def compact_feed_open_card(callback_query: CallbackQuery, state: FSMContext, session: AsyncSession):
+    try:
+        profile_id = int(callback_query.data.rsplit(":", 1)[1])
+    except ValueError:
+        await callback_query.answer("Ошибка данных.", show_alert=True); return
+    cards = await _current_feed(callback_query, state)
+    if cards is None:
+        return
+    card = _find_card(cards, profile_id)
+    if card is None or card[3] != _PENDING:
+        await callback_query.answer("Вы уже отметили эту вакансию.")
+        return
+
+    async with read_session_scope(session) as read_session:
+        employer_card = row_to_dto(EmployerCard, (await read_session.execute(
+            select(*EMPLOYER_CARD_COLUMNS).where(EmployerProfile.id == profile_id, EmployerProfile.is_active == True)
+        )).first())
+    await release_update_session(session)
+    if employer_card is None:
+        await callback_query.answer("Вакансия больше не доступна.", show_alert=True)
+        return
+
+    number = cards.index(card) + 1
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="❤️", callback_data=f"{COMPACT_LIKE_PREFIX}{profile_id}"),
+            InlineKeyboardButton(text="👎", callback_data=f"{COMPACT_DISLIKE_PREFIX}{profile_id}"),
+        ],
+        [InlineKeyboardButton(text="⬅️ К списку", callback_data=COMPACT_BACK_CALLBACK_DATA)],
+    ])
+    await callback_query.answer()
+    await _edit_feed_message(callback_query.message, f"{number}. {format_employer_profile_for_applicant(employer_card)}", keyboard)
+
+
+@compact_browsing_router.callback_query(F.data == COMPACT_BACK_CALLBACK_DATA)
+async def compact_feed_back_to_list(callback_query: CallbackQuery, state: FSMContext):
+    cards = await _current_feed(callback_query, state)
+    if cards is None:
+        return
+    await callback_query.answer()
+    text, keyboard = render_compact_feed(cards)
+    await _edit_feed_message(callback_query.message, text, keyboard)
+
+
+@compact_browsing_router.callback_query(F.data == COMPACT_MORE_CALLBACK_DATA)
+async def compact_feed_more(callback_query: CallbackQuery, state: FSMContext, session: AsyncSession):
+    cards = await _current_feed(callback_query, state)
+    if cards is None:
+        return
+    await callback_query.answer()
+    # Неотмеченные вакансии без кулдауна - просто не повторяем их в следующем списке
+    await _show_next_batch(callback_query, state, session, exclude_ids=[card[0] for card in cards])
+
+
+@compact_browsing_router.callback_query(F.data == COMPACT_STOP_CALLBACK_DATA)
+async def compact_feed_stop(callback_query: CallbackQuery, state: FSMContext, session: AsyncSession):
+    user_id = callback_query.from_user.id
+    await callback_query.answer()
+    display_name = callback_query.from_user.first_name
+    user = await session.get(User, user_id)
+    if user and user.first_name:
+        display_name = user.first_name
+    await _finish_compact_feed(callback_query.message, user_id, display_name, state, session, "Показ анкет остановлен.")
@@ -8,8 +8,10 @@ from aiogram.types import Message, ReplyKeyboardRemove, InlineKeyboardMarkup, In
 
 from app.db.database import AsyncSessionFactory
 from app.db.models import User, ApplicantProfile, EmployerProfile, ApplicantEmployerInteraction, InteractionTypeEnum, GenderEnum
-from sqlalchemy import select, update, func as sqlalchemy_func, delete
+from sqlalchemy import select, update, func as sqlalchemy_func
 from app.db.models import Complaint, ComplaintStatusEnum
+from app.services.analytics_service import note_employer_view
+from app.services.profile_purge_service import soft_delete_employer_profiles
 
 from app.handlers.registration_handlers import is_user_subscribed_to_channel
 from app.keyboards.reply_keyboards import start_keyboard
@@ -115,6 +117,7 @@ async def display_applicant_response(
             if not current_interaction_in_session.is_viewed_by_employer:
                 current_interaction_in_session.is_viewed_by_employer = True
                 current_interaction_in_session.updated_at = datetime.now(timezone.utc)
+                await note_employer_view(session, current_interaction_in_session)
             return 
 
         # Формируем текст анкеты
@@ -124,6 +127,7 @@ async def display_applicant_response(
         if not current_interaction_in_session.is_viewed_by_employer:
             current_interaction_in_session.is_viewed_by_employer = True
             current_interaction_in_session.updated_at = datetime.now(timezone.utc)
+            await note_employer_view(session, current_interaction_in_session)
             print(f"DEBUG: Interaction ID {current_interaction_in_session.id} marked as viewed by employer {employer_user_id}.")
         
         # Сохраняем ID соискателя (на которого можно пожаловаться) и информацию о следующих откликах в FSM
@@ -200,7 +204,7 @@ async def cq_view_specific_response_from_push(callback_query: types.CallbackQuer
 
     if not is_subscribed:
         async with AsyncSessionFactory() as session, session.begin():
-            await session.execute(delete(EmployerProfile).where(EmployerProfile.user_id == user_id))
+            await soft_delete_employer_profiles(session, EmployerProfile.user_id == user_id, reason="subscription_check")
             await session.execute(update(User).where(User.telegram_id == user_id).values(role=None))
         
         await state.clear()
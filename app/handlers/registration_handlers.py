@@ -13,12 +13,13 @@ from sqlalchemy.sql import func
 from app.states.registration_states import EmployerRegistration
 from app.db.models import EmployerProfile, WorkFormatEnum
 from sqlalchemy import select, delete
+from app.services.profile_purge_service import soft_delete_employer_profiles
 from app.db.models import User, UserRole, ApplicantProfile, EmployerProfile, WorkFormatEnum, GenderEnum
 from app.handlers.settings_handlers import show_employer_main_menu, applicant_continue_browsing
 from app.handlers.browsing_handlers import show_next_employer_profile
 import traceback
 from app.keyboards.reply_keyboards import start_keyboard
-from app.utils.validators import contains_urls
+from app.utils.validators import contains_urls, contains_contacts
 from aiogram.exceptions import TelegramBadRequest
 from app.config import CHANNEL_ID, CHANNEL_URL
 
@@ -91,7 +92,7 @@ async def cancel_registration_handler(message: Message, state: FSMContext):
 async def process_applicant_city(message: Message, state: FSMContext):
     city = message.text.strip().capitalize()
     
-    if contains_urls(city):
+    if contains_urls(city, short_field=True):
         await message.answer("Пожалуйста, не используйте ссылки в описании вашего опыта. Введите текст снова:")
         return # Оставляем пользователя в том же состоянии для повторного ввода
     
@@ -133,7 +134,7 @@ async def process_invalid_applicant_gender(message: Message, state: FSMContext):
 async def process_applicant_age(message: Message, state: FSMContext):
     age_text = message.text.strip()
     
-    if contains_urls(age_text):
+    if contains_urls(age_text, short_field=True):
         await message.answer("Пожалуйста, не используйте ссылки в описании вашего опыта. Введите текст снова:")
         return # Оставляем пользователя в том же состоянии для повторного ввода
     
@@ -155,8 +156,8 @@ async def process_applicant_age(message: Message, state: FSMContext):
 async def process_applicant_experience(message: Message, state: FSMContext):
     experience = message.text.strip()
     
-    if contains_urls(experience):
-        await message.answer("Пожалуйста, не используйте ссылки в описании вашего опыта. Введите текст снова:")
+    if contains_contacts(experience):
+        await message.answer("Пожалуйста, не указывайте ссылки и контакты (телефон, @username) в описании опыта - работодатель свяжется через бота. Введите текст снова:")
         return 
     
     if not (2 <= len(experience) <= 1000): # Ограничение для Text поля
@@ -245,9 +246,7 @@ async def process_applicant_confirmation(message: Message, state: FSMContext):
             current_user_db_role = current_user_role_q.scalar_one_or_none()
 
             if current_user_db_role == UserRole.EMPLOYER:
-                await session.execute(
-                    delete(EmployerProfile).where(EmployerProfile.user_id == user_id)
-                )
+                await soft_delete_employer_profiles(session, EmployerProfile.user_id == user_id, reason="role_switch")
                 print(f"DEBUG: Employer profile for user {user_id} deleted as they are registering as Applicant.")
 
             # 2. Обновляем/создаем запись User с ролью APPLICANT и телефоном
@@ -404,7 +403,7 @@ async def handle_subscription_check_before_register(callback_query: CallbackQuer
 async def process_employer_city(message: Message, state: FSMContext):
     city = message.text.strip().capitalize() # Нормализация
     
-    if contains_urls(city):
+    if contains_urls(city, short_field=True):
         await message.answer("Пожалуйста, не используйте ссылки в описании компании/вакансии. Введите текст снова:")
         return
     
@@ -421,7 +420,7 @@ async def process_employer_city(message: Message, state: FSMContext):
 async def process_employer_company_name(message: Message, state: FSMContext):
     company_name = message.text.strip()
     
-    if contains_urls(company_name):
+    if contains_urls(company_name, short_field=True):
         await message.answer("Пожалуйста, не используйте ссылки в описании компании/вакансии. Введите текст снова:")
         return
     
@@ -438,7 +437,7 @@ async def process_employer_company_name(message: Message, state: FSMContext):
 async def process_employer_position(message: Message, state: FSMContext):
     position = message.text.strip()
     
-    if contains_urls(position):
+    if contains_urls(position, short_field=True):
         await message.answer("Пожалуйста, не используйте ссылки в описании компании/вакансии. Введите текст снова:")
         return
     
@@ -455,7 +454,7 @@ async def process_employer_position(message: Message, state: FSMContext):
 async def process_employer_salary(message: Message, state: FSMContext):
     salary = message.text.strip()
     
-    if contains_urls(salary):
+    if contains_urls(salary, short_field=True):
         await message.answer("Пожалуйста, не используйте ссылки в описании компании/вакансии. Введите текст снова:")
         return
     
@@ -495,8 +494,8 @@ async def process_employer_min_age(message: Message, state: FSMContext):
 async def process_employer_description(message: Message, state: FSMContext):
     description = message.text.strip()
     
-    if contains_urls(description):
-        await message.answer("Пожалуйста, не используйте ссылки в описании компании/вакансии. Введите текст снова:")
+    if contains_contacts(description):
+        await message.answer("Пожалуйста, не указывайте ссылки и контакты (телефон, @username) в описании - соискатели откликаются через бота. Введите текст снова:")
         return
     
     if not (10 <= len(description) <= 700):
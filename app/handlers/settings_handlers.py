@@ -11,11 +11,14 @@ from aiogram.types import (
 )
 from aiogram.filters import Command, StateFilter
 
-from app.db.database import AsyncSessionFactory
+from app.db.database import AsyncSessionFactory, session_scope, release_update_session
 from app.db.models import User, UserRole, ApplicantProfile, EmployerProfile, GenderEnum, WorkFormatEnum, ApplicantEmployerInteraction, InteractionTypeEnum
 from sqlalchemy import select, update, delete
+from app.services.profile_purge_service import soft_delete_employer_profiles
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func, func as sqlalchemy_func
 from app.keyboards.reply_keyboards import start_keyboard
+from app.utils.validators import contains_contacts
 
 from app.states.editing_states import ApplicantEditProfile, EmployerEditProfile 
 
@@ -26,9 +29,11 @@ settings_router = Router()
 # --- ТЕКСТОВЫЕ КОНСТАНТЫ И КЛАВИАТУРЫ ---
 
 APPLICANT_SETTINGS_MENU_TEXT = "Меню настроек соискателя:"
+BTN_COMPACT_BROWSING_TEXT = "📋 Смотреть списком"
 applicant_settings_keyboard_active = ReplyKeyboardMarkup(
     keyboard=[
         [KeyboardButton(text="Продолжить смотреть анкеты")],
+        [KeyboardButton(text=BTN_COMPACT_BROWSING_TEXT)], # Компактный режим: несколько вакансий в одном сообщении
         [KeyboardButton(text="Моя анкета")], # Эта кнопка будет вести к редактированию
         [KeyboardButton(text="Заполнить анкету заново")],
         [KeyboardButton(text="Я больше не ищу работу")]
@@ -99,17 +104,22 @@ cancel_field_edit_keyboard = ReplyKeyboardMarkup(
 
 # --- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ОТОБРАЖЕНИЯ МЕНЮ И АНКЕТ ДЛЯ РЕДАКТИРОВАНИЯ ---
 
-async def show_applicant_settings_menu(message_to_reply: Message, user_id_param: int, user_first_name: str = None):
+async def show_applicant_settings_menu(message_to_reply: Message, user_id_param: int, user_first_name: str = None,
+                                       session: AsyncSession | None = None, profile_is_active: bool | None = None):
+    """profile_is_active - если вызывающий уже знает статус анкеты (например, /start), запроса в БД не будет."""
     name_prefix = f"{user_first_name}, " if user_first_name else ""
     current_keyboard = applicant_settings_keyboard_active
-    async with AsyncSessionFactory() as session, session.begin():
-        profile_is_active_status = (await session.execute(
-            select(ApplicantProfile.is_active).where(ApplicantProfile.user_id == user_id_param)
-        )).scalar_one_or_none()
-        if profile_is_active_status is False: # Профиль есть, но не активен
-            current_keyboard = applicant_settings_keyboard_inactive
-        elif profile_is_active_status is None: # Профиля нет совсем (хотя сюда не должны попадать, если нет профиля)
-             pass # Остается active, но кнопки "продолжить" и "деактивировать" не сработают как надо
+    profile_is_active_status = profile_is_active
+    if profile_is_active_status is None:
+        async with session_scope(session) as session:
+            profile_is_active_status = (await session.execute(
+                select(ApplicantProfile.is_active).where(ApplicantProfile.user_id == user_id_param)
+            )).scalar_one_or_none()
+        await release_update_session(session)
+    if profile_is_active_status is False: # Профиль есть, но не активен
+        current_keyboard = applicant_settings_keyboard_inactive
+    elif profile_is_active_status is None: # Профиля нет совсем (хотя сюда не должны попадать, если нет профиля)
+         pass # Остается active, но кнопки "продолжить" и "деактивировать" не сработают как надо
 
     await message_to_reply.answer(
         f"{name_prefix}добро пожаловать в ваше меню настроек!\n{APPLICANT_SETTINGS_MENU_TEXT}",
@@ -125,7 +135,7 @@ async def employer_fill_again_from_settings(message: Message, state: FSMContext)
         user = await session.get(User, user_id)
         if user and user.role == UserRole.EMPLOYER:
             is_employer = True
-            await session.execute(delete(EmployerProfile).where(EmployerProfile.user_id == user_id))
+            await soft_delete_employer_profiles(session, EmployerProfile.user_id == user_id, reason="refill_by_owner")
             await session.execute(update(User).where(User.telegram_id == user_id).values(role=None))
     
     if is_employer:
@@ -168,45 +178,56 @@ async def applicant_fill_again_from_settings(message: Message, state: FSMContext
             from app.bot import start_keyboard
             await message.answer("Действие не определено для вашей текущей роли.", reply_markup=start_keyboard)
 
-async def show_employer_main_menu(message_to_reply_to: Message, user_id_param: int, user_first_name: str = None):
+
+def new_responses_count_query(employer_profile_id):
+    """Число новых непросмотренных откликов (лайки и вопросы) на анкету работодателя."""
+    return (
+        select(sqlalchemy_func.count(ApplicantEmployerInteraction.id))
+        .where(
+            ApplicantEmployerInteraction.employer_profile_id == employer_profile_id,
+            ApplicantEmployerInteraction.is_viewed_by_employer == False,
+            ApplicantEmployerInteraction.interaction_type.in_([InteractionTypeEnum.LIKE, InteractionTypeEnum.QUESTION_SENT])
+        )
+    )
+
+
+async def show_employer_main_menu(message_to_reply_to: Message, user_id_param: int, user_first_name: str = None,
+                                  session: AsyncSession | None = None, profile_is_active: bool | None = None,
+                                  new_responses_count: int | None = None):
+    """profile_is_active и new_responses_count - если вызывающий уже загрузил их (например, /start), запросов в БД не будет."""
     user_id = user_id_param # ID текущего пользователя (работодателя)
     name_prefix = f"{user_first_name}, " if user_first_name else ""
     
     is_profile_active_for_keyboard = True # По умолчанию считаем, что профиль активен для выбора клавиатуры
-    new_responses_count = 0
-
-    async with AsyncSessionFactory() as session, session.begin():
-        # Проверяем наличие профиля работодателя и его статус активности
-        employer_profile_data = (await session.execute(
-            select(EmployerProfile.id, EmployerProfile.is_active) # Нам нужен только ID для подсчета и is_active для клавиатуры
-            .where(EmployerProfile.user_id == user_id)
-        )).first() # Используем .first() так как ожидаем одну или ноль записей
-
-        if not employer_profile_data:
-            # Если профиля работодателя нет, отправляем на начальный выбор роли
-            from app.bot import start_keyboard # Локальный импорт
-            await message_to_reply_to.answer(
-                f"{name_prefix}Анкета вашей компании не создана или не найдена. Пожалуйста, выберите роль:", 
-                reply_markup=start_keyboard
-            )
-            print(f"DEBUG show_employer_main_menu: Employer profile NOT FOUND for user_id {user_id}. Showing start_keyboard.")
-            return
+    if profile_is_active is not None and new_responses_count is not None:
+        is_profile_active_for_keyboard = profile_is_active
+    else:
+        async with session_scope(session) as session:
+            # Проверяем наличие профиля работодателя и его статус активности
+            employer_profile_data = (await session.execute(
+                select(EmployerProfile.id, EmployerProfile.is_active) # Нам нужен только ID для подсчета и is_active для клавиатуры
+                .where(EmployerProfile.user_id == user_id)
+            )).first() # Используем .first() так как ожидаем одну или ноль записей
+
+            if not employer_profile_data:
+                # Если профиля работодателя нет, отправляем на начальный выбор роли
+                from app.bot import start_keyboard # Локальный импорт
+                await message_to_reply_to.answer(
+                    f"{name_prefix}Анкета вашей компании не создана или не найдена. Пожалуйста, выберите роль:", 
+                    reply_markup=start_keyboard
+                )
+                print(f"DEBUG show_employer_main_menu: Employer profile NOT FOUND for user_id {user_id}. Showing start_keyboard.")
+                return
 
-        # Профиль найден, получаем его ID и статус активности
-        employer_profile_id_for_count = employer_profile_data.id
-        is_profile_active_for_keyboard = employer_profile_data.is_active
+            # Профиль найден, получаем его ID и статус активности
+            employer_profile_id_for_count = employer_profile_data.id
+            is_profile_active_for_keyboard = employer_profile_data.is_active
         
-        # Подсчитываем новые непросмотренные отклики
-        count_new_responses_result = await session.execute(
-            select(sqlalchemy_func.count(ApplicantEmployerInteraction.id))
-            .where(
-                ApplicantEmployerInteraction.employer_profile_id == employer_profile_id_for_count,
-                ApplicantEmployerInteraction.is_viewed_by_employer == False,
-                ApplicantEmployerInteraction.interaction_type.in_([InteractionTypeEnum.LIKE, InteractionTypeEnum.QUESTION_SENT])
-            )
-        )
-        new_responses_count = count_new_responses_result.scalar_one() or 0
-        print(f"DEBUG show_employer_main_menu: Employer {user_id}, Profile ID {employer_profile_id_for_count}, New responses count: {new_responses_count}")
+            # Подсчитываем новые непросмотренные отклики
+            count_new_responses_result = await session.execute(new_responses_count_query(employer_profile_id_for_count))
+            new_responses_count = count_new_responses_result.scalar_one() or 0
+            print(f"DEBUG show_employer_main_menu: Employer {user_id}, Profile ID {employer_profile_id_for_count}, New responses count: {new_responses_count}")
+        await release_update_session(session)
         
     # Формируем текст сообщения
     main_menu_message_text = f"{name_prefix}{EMPLOYER_MAIN_MENU_TEXT}"
@@ -609,6 +630,9 @@ async def process_editing_applicant_experience(message: Message, state: FSMConte
     if not (2 <= len(new_experience) <= 2000):
         await message.answer("Опыт от 2 до 2000 симв. Введите снова:", reply_markup=cancel_field_edit_keyboard)
         return
+    if contains_contacts(new_experience):
+        await message.answer("Без ссылок и контактов (телефон, @username), пожалуйста. Введите снова:", reply_markup=cancel_field_edit_keyboard)
+        return
     await update_applicant_field_and_show(message, state, "experience", new_experience)
 
 # Общий обработчик отмены редактирования текущего поля СОИСКАТЕЛЯ (для Reply-кнопки)
@@ -913,6 +937,9 @@ async def process_editing_employer_description(message: Message, state: FSMConte
     if not (10 <= len(new_desc) <= 2000):
         await message.answer("Описание: 10-2000 симв.", reply_markup=cancel_field_edit_keyboard)
         return
+    if contains_contacts(new_desc):
+        await message.answer("Без ссылок и контактов (телефон, @username), пожалуйста. Введите снова:", reply_markup=cancel_field_edit_keyboard)
+        return
     await update_employer_field_and_show(message, state, "description", new_desc)
 
 @settings_router.message(EmployerEditProfile.editing_work_format, F.text.in_({"Офлайн", "Онлайн"}))
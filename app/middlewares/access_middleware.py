@@ -3,7 +3,7 @@ from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware, Bot
 from aiogram.types import Update, Message, CallbackQuery # Добавил Bot
 
-from app.db.database import AsyncSessionFactory
+from app.db.database import session_scope, release_update_session
 from app.db.models import User
 from sqlalchemy import select
 import traceback # Для детальных ошибок
@@ -39,7 +39,8 @@ class BanCheckMiddleware(BaseMiddleware):
         print(f"DEBUG BanCheck: Checking ban status for user_id: {user_id}")
         is_banned_in_db = False
         try:
-            async with AsyncSessionFactory() as session, session.begin():
+            # Используем сессию апдейта из DbSessionMiddleware (без отдельного checkout из пула)
+            async with session_scope(data.get("session")) as session:
                 db_flag_result = await session.execute(
                     select(User.is_banned).where(User.telegram_id == user_id)
                 )
@@ -49,8 +50,12 @@ class BanCheckMiddleware(BaseMiddleware):
                 
                 if db_flag is True: # Явная проверка на булево True
                     is_banned_in_db = True
+            # Не держим соединение апдейта в транзакции, пока хэндлер ходит в Telegram
+            await release_update_session(data.get("session"))
         except Exception as e_db:
             print(f"ERROR BanCheck: DB error checking ban status for {user_id}: {e_db}\n{traceback.format_exc()}")
+            if data.get("session") is not None:
+                await data["session"].rollback()
             # В случае ошибки БД, решаем, пропускать пользователя или блокировать. 
             # Безопаснее пропустить, чтобы не заблокировать из-за временной проблемы с БД.
             print(f"DEBUG BanCheck: Proceeding user {user_id} due to DB error during ban check.")
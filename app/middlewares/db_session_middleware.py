@@ -0,0 +1,37 @@
+# app/middlewares/db_session_middleware.py
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from app.db.database import AsyncSessionFactory, set_current_update_user, reset_current_update_user
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на весь апдейт (unit of work).
+    Соединение из пула берется лениво - при первом запросе (autobegin),
+    коммит делается один раз после хэндлера, при исключении - откат.
+    Хэндлеры получают ее через параметр `session`.
+    """
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Автор апдейта нужен маршрутизации чтений: после его записей читаем из основной БД
+        event_user = data.get("event_from_user")
+        user_token = set_current_update_user(event_user.id if event_user else None)
+        try:
+            async with AsyncSessionFactory() as session:
+                data["session"] = session
+                try:
+                    result = await handler(event, data)
+                except Exception:
+                    await session.rollback()
+                    raise
+                if session.in_transaction():
+                    await session.commit()
+                return result
+        finally:
+            reset_current_update_user(user_token)
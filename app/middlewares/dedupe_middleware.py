@@ -0,0 +1,95 @@
+# app/middlewares/dedupe_middleware.py
+from collections import Counter, OrderedDict
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from app.config import UPDATE_DEDUPE_MAX_IDS, UPDATE_DEDUPE_WINDOW_SECONDS
+
+# Счетчики текущего процесса: passed / redelivered / repeated_action
+_dedupe_stats: Counter = Counter()
+
+
+def get_update_dedupe_stats() -> dict:
+    return dict(_dedupe_stats)
+
+def format_update_dedupe_stats(stats: dict) -> str:
+    return (
+        f"passed={stats.get('passed', 0)} redelivered={stats.get('redelivered', 0)} "
+        f"repeated_action={stats.get('repeated_action', 0)}"
+    )
+
+
+class UpdateDedupeMiddleware(BaseMiddleware):
+    """
+    Отбрасывает дубликаты апдейтов до сессии БД и хэндлеров:
+    - повторную доставку того же update_id (Telegram шлет апдейт заново после таймаута вебхука);
+    - повтор того же действия пользователя (текст/callback_data + FSM-состояние + показанная анкета)
+      в пределах UPDATE_DEDUPE_WINDOW_SECONDS - двойное нажатие ❤️/👎 на медленной сети.
+    Регистрируется первым outer-middleware: FSM-контекст к этому моменту уже в data.
+    """
+    def __init__(self, max_update_ids: int = UPDATE_DEDUPE_MAX_IDS, window_seconds: float = UPDATE_DEDUPE_WINDOW_SECONDS):
+        self.max_update_ids = max_update_ids
+        self.window_seconds = window_seconds
+        self._seen_update_ids: OrderedDict[int, None] = OrderedDict()
+        # user_id -> (отпечаток последнего действия, time.monotonic())
+        self._last_user_actions: OrderedDict[int, tuple[tuple, float]] = OrderedDict()
+
+    def _is_redelivered(self, update_id: int) -> bool:
+        if update_id in self._seen_update_ids:
+            return True
+        self._seen_update_ids[update_id] = None
+        if len(self._seen_update_ids) > self.max_update_ids:
+            self._seen_update_ids.popitem(last=False)
+        return False
+
+    async def _action_fingerprint(self, event: Update, data: Dict[str, Any]) -> tuple | None:
+        if event.message and event.message.text:
+            action = ("text", event.message.text)
+        elif event.callback_query and event.callback_query.data:
+            action = ("callback", event.callback_query.data)
+        else:
+            return None # Медиа, контакты и прочее не дедуплицируем
+        state = data.get("state")
+        card_id = (await state.get_data()).get("current_shown_employer_profile_id") if state else None
+        return action + (data.get("raw_state"), card_id)
+
+    def _is_repeated_action(self, user_id: int, fingerprint: tuple) -> bool:
+        now = time.monotonic()
+        previous = self._last_user_actions.get(user_id)
+        if previous and previous[0] == fingerprint and now - previous[1] < self.window_seconds:
+            return True
+        self._last_user_actions[user_id] = (fingerprint, now)
+        self._last_user_actions.move_to_end(user_id)
+        if len(self._last_user_actions) > self.max_update_ids:
+            self._last_user_actions.popitem(last=False)
+        return False
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        if self._is_redelivered(event.update_id):
+            _dedupe_stats["redelivered"] += 1
+            print(f"DEBUG Dedupe: update {event.update_id} already processed, dropped.")
+            return None
+
+        event_user = data.get("event_from_user")
+        if event_user is not None:
+            fingerprint = await self._action_fingerprint(event, data)
+            if fingerprint is not None and self._is_repeated_action(event_user.id, fingerprint):
+                _dedupe_stats["repeated_action"] += 1
+                print(f"DEBUG Dedupe: repeated action {fingerprint[:2]} from user {event_user.id} dropped.")
+                if event.callback_query:
+                    try:
+                        await event.callback_query.answer() # Иначе у дубликата крутятся "часики"
+                    except Exception:
+                        pass
+                return None
+
+        _dedupe_stats["passed"] += 1
+        return await handler(event, data)
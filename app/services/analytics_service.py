@@ -0,0 +1,214 @@
+# app/services/analytics_service.py
+# Воронка: показ с реакцией -> лайк -> вопрос -> просмотр отклика работодателем.
+# Сырые взаимодействия сворачиваются в funnel_daily_rollups по (день, вакансия, реф. ссылка)
+# пачками от водяного знака (последний обработанный id взаимодействия в bot_settings),
+# поэтому каждое взаимодействие читается один раз, а отчеты не трогают сырую таблицу.
+# Просмотры работодателем прогон не считает: их сразу добавляет note_employer_view (upsert строки роллапа
+# за день создания отклика), так что водяной знак при просмотре не читается и не блокируется.
+#
+# "Показ" - анкета вакансии, на которую соискатель отреагировал (лайк/дизлайк/вопрос):
+# показы без реакции в базе не хранятся.
+import html
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select, update, func, case, cast, literal, Date
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import FUNNEL_ROLLUP_BATCH_SIZE, FUNNEL_ROLLUP_SAFETY_LAG_SECONDS
+from app.db.database import AsyncSessionFactory
+from app.db.models import (
+    ApplicantEmployerInteraction, BotSettings, EmployerProfile, FunnelDailyRollup,
+    InteractionTypeEnum, ReferralLink, ReferralUsage
+)
+
+FUNNEL_ROLLUP_WATERMARK_KEY = "funnel_rollup_last_interaction_id"
+FUNNEL_ROLLUP_MAX_BATCHES_PER_RUN = 20
+
+FUNNEL_DIMENSIONS = ("city", "vacancy", "referral")
+
+
+@dataclass(slots=True)
+class FunnelReportRow:
+    label: str
+    views: int
+    likes: int
+    questions: int
+    employer_views: int
+
+
+def _interaction_referral_link_id(applicant_user_id_column):
+    # Ссылка, по которой пришел соискатель (первая, если их несколько); 0 - без ссылки
+    return func.coalesce(
+        select(func.min(ReferralUsage.link_id))
+        .where(ReferralUsage.user_id == applicant_user_id_column)
+        .scalar_subquery(),
+        0
+    )
+
+async def _lock_watermark(session) -> int | None:
+    query = select(BotSettings.value_int).where(BotSettings.setting_key == FUNNEL_ROLLUP_WATERMARK_KEY)
+    return (await session.execute(query.with_for_update())).scalar_one_or_none()
+
+
+async def _rollup_next_batch() -> int:
+    """Сворачивает одну пачку взаимодействий после водяного знака. Возвращает число обработанных."""
+    interaction = ApplicantEmployerInteraction
+    async with AsyncSessionFactory() as session, session.begin():
+        await session.execute(
+            insert(BotSettings).values(setting_key=FUNNEL_ROLLUP_WATERMARK_KEY, value_int=0)
+            .on_conflict_do_nothing(index_elements=['setting_key'])
+        )
+        # Блокировка строки водяного знака: параллельный запуск (другой воркер) ждет
+        watermark = await _lock_watermark(session) or 0
+
+        candidates = (await session.execute(
+            select(interaction.id, interaction.created_at)
+            .where(interaction.id > watermark)
+            .order_by(interaction.id)
+            .limit(FUNNEL_ROLLUP_BATCH_SIZE)
+        )).all()
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=FUNNEL_ROLLUP_SAFETY_LAG_SECONDS)
+        upper_id = None
+        for candidate_id, created_at in candidates:
+            if created_at is not None and created_at >= cutoff:
+                break
+            upper_id = candidate_id
+        if upper_id is None:
+            return 0
+
+        batch = (
+            select(
+                cast(func.timezone("UTC", interaction.created_at), Date).label("day"),
+                interaction.employer_profile_id.label("employer_profile_id"),
+                _interaction_referral_link_id(interaction.applicant_user_id).label("referral_link_id"),
+                EmployerProfile.city.label("city"),
+                interaction.interaction_type.label("interaction_type"),
+            )
+            .join(EmployerProfile, EmployerProfile.id == interaction.employer_profile_id)
+            .where(interaction.id > watermark, interaction.id <= upper_id)
+            .subquery("funnel_batch")
+        )
+        aggregated = (
+            select(
+                batch.c.day, batch.c.employer_profile_id, batch.c.referral_link_id,
+                func.max(batch.c.city),
+                func.count(),
+                func.count().filter(batch.c.interaction_type == InteractionTypeEnum.LIKE),
+                func.count().filter(batch.c.interaction_type == InteractionTypeEnum.QUESTION_SENT),
+            )
+            .group_by(batch.c.day, batch.c.employer_profile_id, batch.c.referral_link_id)
+        )
+        upsert = insert(FunnelDailyRollup).from_select(
+            ["day", "employer_profile_id", "referral_link_id", "city", "views", "likes", "questions"],
+            aggregated
+        )
+        await session.execute(upsert.on_conflict_do_update(
+            index_elements=["day", "employer_profile_id", "referral_link_id"],
+            set_={
+                "city": upsert.excluded.city,
+                "views": FunnelDailyRollup.views + upsert.excluded.views,
+                "likes": FunnelDailyRollup.likes + upsert.excluded.likes,
+                "questions": FunnelDailyRollup.questions + upsert.excluded.questions,
+            }
+        ))
+        await session.execute(
+            update(BotSettings)
+            .where(BotSettings.setting_key == FUNNEL_ROLLUP_WATERMARK_KEY)
+            .values(value_int=upper_id)
+        )
+        processed = sum(1 for candidate_id, _ in candidates if candidate_id <= upper_id)
+    print(f"DEBUG: Funnel rollup: {processed} interactions up to id {upper_id}")
+    return processed
+
+
+async def rollup_funnel_interactions() -> int:
+    total_processed = 0
+    for _ in range(FUNNEL_ROLLUP_MAX_BATCHES_PER_RUN):
+        processed = await _rollup_next_batch()
+        total_processed += processed
+        if processed < FUNNEL_ROLLUP_BATCH_SIZE:
+            break
+    return total_processed
+
+
+async def note_employer_view(session, interaction: ApplicantEmployerInteraction):
+    """
+    Вызывать в той же транзакции, где отклик помечается просмотренным.
+    Добавляет просмотр в строку роллапа за день создания отклика (создает ее, если прогон до нее еще не дошел).
+    День берется из created_at: повторный лайк его не переписывает, поэтому день совпадает с днем показа в роллапе.
+    """
+    created_at = interaction.created_at or datetime.now(timezone.utc)
+    view_row = (
+        select(
+            literal(created_at.astimezone(timezone.utc).date(), Date),
+            literal(interaction.employer_profile_id),
+            _interaction_referral_link_id(literal(interaction.applicant_user_id)),
+            EmployerProfile.city,
+            literal(0), literal(0), literal(0), literal(1),
+        )
+        .where(EmployerProfile.id == interaction.employer_profile_id)
+    )
+    upsert = insert(FunnelDailyRollup).from_select(
+        ["day", "employer_profile_id", "referral_link_id", "city", "views", "likes", "questions", "employer_views"], view_row
+    )
+    await session.execute(upsert.on_conflict_do_update(
+        index_elements=["day", "employer_profile_id", "referral_link_id"],
+        set_={"employer_views": FunnelDailyRollup.employer_views + 1}
+    ))
+
+
+async def load_funnel_report(session, dimension: str, date_from: date, limit: int = 15) -> tuple[FunnelReportRow, list[FunnelReportRow]]:
+    """(итого, строки по разрезу с наибольшим числом показов). Читает только funnel_daily_rollups."""
+    sums = (
+        func.sum(FunnelDailyRollup.views), func.sum(FunnelDailyRollup.likes),
+        func.sum(FunnelDailyRollup.questions), func.sum(FunnelDailyRollup.employer_views),
+    )
+    in_period = FunnelDailyRollup.day >= date_from
+
+    total_row = (await session.execute(select(*sums).where(in_period))).one()
+    total = FunnelReportRow("Всего", *(value or 0 for value in total_row))
+
+    if dimension == "city":
+        query = (
+            select(FunnelDailyRollup.city, *sums)
+            .where(in_period).group_by(FunnelDailyRollup.city)
+            .order_by(sums[0].desc()).limit(limit)
+        )
+    elif dimension in ("vacancy", "referral"):
+        # Сначала группируем по id, название подтягиваем уже для topN строк
+        key_column = FunnelDailyRollup.employer_profile_id if dimension == "vacancy" else FunnelDailyRollup.referral_link_id
+        grouped = (
+            select(key_column.label("key_id"), *(column_sum.label(f"sum_{i}") for i, column_sum in enumerate(sums)))
+            .where(in_period).group_by(key_column)
+            .order_by(sums[0].desc()).limit(limit)
+            .subquery("funnel_grouped")
+        )
+        if dimension == "vacancy":
+            label = func.coalesce(EmployerProfile.company_name + " (" + EmployerProfile.city + ")", "Удаленная вакансия")
+            joined_model, join_on = EmployerProfile, EmployerProfile.id == grouped.c.key_id
+        else:
+            label = case((grouped.c.key_id == 0, "Без ссылки"), else_=func.coalesce(ReferralLink.name, "Удаленная ссылка"))
+            joined_model, join_on = ReferralLink, ReferralLink.id == grouped.c.key_id
+        query = (
+            select(label, grouped.c.sum_0, grouped.c.sum_1, grouped.c.sum_2, grouped.c.sum_3)
+            .select_from(grouped).outerjoin(joined_model, join_on)
+            .order_by(grouped.c.sum_0.desc())
+        )
+    else:
+        raise ValueError(f"Unknown funnel dimension: {dimension}")
+
+    rows = (await session.execute(query)).all()
+    return total, [FunnelReportRow(str(row[0]), *(value or 0 for value in row[1:])) for row in rows]
+
+
+def _percent(part: int, whole: int) -> str:
+    return f"{part * 100 / whole:.1f}%" if whole else "-"
+
+def format_funnel_row(row: FunnelReportRow) -> str:
+    # Просмотры работодателем считаем от лайков и вопросов: дизлайки работодателю не показываются
+    return (
+        f"<b>{html.escape(row.label)}</b>: показов {row.views} → лайков {row.likes} ({_percent(row.likes, row.views)})"
+        f" → вопросов {row.questions} ({_percent(row.questions, row.views)})"
+        f" → просмотрено работодателем {row.employer_views} ({_percent(row.employer_views, row.likes + row.questions)})"
+    )
@@ -0,0 +1,91 @@
+# app/services/bot_settings_service.py
+# Реестр настроек из bot_settings с кэшем в памяти процесса.
+# Таблица маленькая: грузится целиком одним запросом, чтения идут из памяти (анти-спам пустышка
+# показывается как раз тогда, когда пользователь спамит, и раньше делала по два запроса на каждый показ).
+# Кэш сбрасывается после коммита update_bot_setting - в этом процессе и событием во всех шардах;
+# BOT_SETTINGS_CACHE_TTL_SECONDS - страховка для правок напрямую в БД.
+# Служебные строки (водяной знак воронки) читаются под блокировкой в своих транзакциях и через кэш не идут.
+import asyncio
+import time
+from dataclasses import dataclass
+
+from aiogram import Bot
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import BOT_SETTINGS_CACHE_TTL_SECONDS
+from app.db.database import AsyncSessionFactory
+from app.db.models import BotSettings
+from app.services.sharding import post_all_shards_event, register_shard_event_handler
+
+
+@dataclass(frozen=True, slots=True)
+class BotSetting:
+    key: str
+    value_type: type # str -> value_str, int -> value_int
+    default: str | int | None = None
+
+
+ANTISPAM_DUMMY_TEXT = BotSetting("antispam_dummy_text", str)
+ANTISPAM_DUMMY_PHOTO_ID = BotSetting("antispam_dummy_photo_id", str)
+
+
+# setting_key -> (value_str, value_int)
+_settings_cache: dict[str, tuple[str | None, int | None]] = {}
+_settings_loaded_at = 0.0
+_settings_cache_stale = True
+_settings_reload_lock = asyncio.Lock()
+
+
+async def _reload_settings_cache():
+    global _settings_cache, _settings_loaded_at, _settings_cache_stale
+    _settings_cache_stale = False # Сброс во время загрузки снова выставит флаг
+    # Всегда основная БД: значение с отстающей реплики осталось бы в кэше до следующего сброса
+    async with AsyncSessionFactory() as session:
+        rows = (await session.execute(
+            select(BotSettings.setting_key, BotSettings.value_str, BotSettings.value_int)
+        )).all()
+    _settings_cache = {key: (value_str, value_int) for key, value_str, value_int in rows}
+    _settings_loaded_at = time.monotonic()
+
+
+async def get_setting(setting: BotSetting):
+    """Значение настройки из кэша (default, если строки нет или значение пустое)."""
+    if _settings_cache_stale or time.monotonic() - _settings_loaded_at > BOT_SETTINGS_CACHE_TTL_SECONDS:
+        async with _settings_reload_lock:
+            if _settings_cache_stale or time.monotonic() - _settings_loaded_at > BOT_SETTINGS_CACHE_TTL_SECONDS:
+                await _reload_settings_cache()
+    value_str, value_int = _settings_cache.get(setting.key, (None, None))
+    value = value_int if setting.value_type is int else value_str
+    return setting.default if value is None else value
+
+
+async def update_bot_setting(session, setting: BotSetting, value: str | int | None):
+    """Записывает настройку в транзакции вызывающего. Кэши сбрасываются после коммита."""
+    column = "value_int" if setting.value_type is int else "value_str"
+    stmt = insert(BotSettings).values(setting_key=setting.key, **{column: value})
+    stmt = stmt.on_conflict_do_update(index_elements=['setting_key'], set_={column: value})
+    await session.execute(stmt)
+    session.info["bot_settings_changed"] = True
+
+
+def _mark_settings_cache_stale():
+    global _settings_cache_stale
+    _settings_cache_stale = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_settings_after_commit(session):
+    if session.info.pop("bot_settings_changed", False):
+        _mark_settings_cache_stale()
+        post_all_shards_event("bot_settings_invalidate")
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_settings_change(session, previous_transaction):
+    session.info.pop("bot_settings_changed", None)
+
+
+@register_shard_event_handler("bot_settings_invalidate")
+async def _handle_bot_settings_invalidate(bot: Bot):
+    _mark_settings_cache_stale()
@@ -0,0 +1,341 @@
+# app/services/broadcast_service.py
+# Рассылки админов по сегменту пользователей.
+# Получатели читаются keyset-ом по telegram_id пачками по BROADCAST_BATCH_SIZE,
+# отправка - параллельно (BROADCAST_CONCURRENCY) через общий ограничитель скорости.
+# После каждой пачки прогресс сохраняется в broadcasts.last_user_id: паузу/продолжение
+# и перезапуск бота рассылка переживает (пачка, прерванная падением, может уйти повторно).
+# Отправляет рассылку только процесс, взявший аренду broadcasts.lease_until: кнопка "Продолжить"
+# в другом воркере или повторный запуск не создают второго отправителя.
+import asyncio
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import select, update, func, exists, or_
+
+from app.config import (
+    BROADCAST_RATE_PER_SECOND, BROADCAST_CONCURRENCY, BROADCAST_BATCH_SIZE, BROADCAST_PROGRESS_UPDATE_SECONDS,
+    BROADCAST_LEASE_SECONDS
+)
+from app.db.database import AsyncSessionFactory, read_session_scope
+from app.db.models import (
+    User, UserRole, ApplicantProfile, EmployerProfile, ApplicantEmployerInteraction, InteractionTypeEnum,
+    ReferralUsage, Broadcast, BroadcastStatusEnum
+)
+from app.services.city_service import normalize_city_input
+
+BROADCAST_CONTROL_CALLBACK_PREFIX = "broadcast_ctl:"
+
+
+@dataclass(slots=True)
+class BroadcastSegment:
+    role: UserRole | None = None
+    city: str | None = None
+    active_within_days: int | None = None
+    referral_link_id: int | None = None
+    has_unread_responses: bool = False
+
+    def describe(self) -> str:
+        parts = []
+        if self.role: parts.append("соискатели" if self.role == UserRole.APPLICANT else "работодатели")
+        if self.city: parts.append(f"город {self.city}")
+        if self.active_within_days: parts.append(f"активны за {self.active_within_days} дн.")
+        if self.referral_link_id: parts.append(f"реф. ссылка #{self.referral_link_id}")
+        if self.has_unread_responses: parts.append("есть непросмотренные отклики")
+        return ", ".join(parts) or "все пользователи"
+
+def segment_of(broadcast: Broadcast) -> BroadcastSegment:
+    return BroadcastSegment(
+        role=broadcast.segment_role,
+        city=broadcast.segment_city,
+        active_within_days=broadcast.segment_active_within_days,
+        referral_link_id=broadcast.segment_referral_link_id,
+        has_unread_responses=broadcast.segment_has_unread_responses,
+    )
+
+
+def build_segment_recipients_query(segment: BroadcastSegment):
+    """select(User.telegram_id) по сегменту, без order_by/limit. Забаненным не пишем."""
+    query = select(User.telegram_id).where(User.is_banned.is_(False))
+    if segment.role:
+        query = query.where(User.role == segment.role)
+    if segment.city:
+        city_name = normalize_city_input(segment.city).lower()
+        query = query.where(
+            exists().where(ApplicantProfile.user_id == User.telegram_id, func.lower(ApplicantProfile.city) == city_name)
+            | exists().where(EmployerProfile.user_id == User.telegram_id, func.lower(EmployerProfile.city) == city_name)
+        )
+    if segment.active_within_days:
+        query = query.where(User.last_activity_date >= datetime.now(timezone.utc) - timedelta(days=segment.active_within_days))
+    if segment.referral_link_id:
+        query = query.where(exists().where(
+            ReferralUsage.user_id == User.telegram_id, ReferralUsage.link_id == segment.referral_link_id
+        ))
+    if segment.has_unread_responses:
+        query = query.where(exists().where(
+            EmployerProfile.user_id == User.telegram_id,
+            ApplicantEmployerInteraction.employer_profile_id == EmployerProfile.id,
+            ApplicantEmployerInteraction.is_viewed_by_employer.is_(False),
+            ApplicantEmployerInteraction.interaction_type.in_([InteractionTypeEnum.LIKE, InteractionTypeEnum.QUESTION_SENT]),
+        ))
+    return query
+
+async def count_segment_recipients(session, segment: BroadcastSegment) -> int:
+    recipients = build_segment_recipients_query(segment).subquery()
+    return (await session.execute(select(func.count()).select_from(recipients))).scalar_one()
+
+
+class _SendPacer:
+    """Равномерный темп отправки: не чаще rate_per_second сообщений, общий для всех рассылок процесса."""
+    def __init__(self, rate_per_second: float):
+        self.interval = 1 / rate_per_second
+        self.next_slot = 0.0
+
+    async def wait_turn(self):
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def back_off(self, seconds: float):
+        # Flood control от Telegram - притормаживаем всех отправителей
+        self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+_pacer = _SendPacer(BROADCAST_RATE_PER_SECOND)
+_send_semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+# broadcast_id -> задача рассылки в этом процессе
+_running_broadcasts: dict[int, asyncio.Task] = {}
+
+
+async def _deliver(bot: Bot, broadcast: Broadcast, user_id: int) -> bool:
+    async with _send_semaphore:
+        for _ in range(2): # Одна повторная попытка после RetryAfter
+            await _pacer.wait_turn()
+            try:
+                await bot.copy_message(chat_id=user_id, from_chat_id=broadcast.source_chat_id, message_id=broadcast.source_message_id)
+                return True
+            except TelegramRetryAfter as e_flood:
+                print(f"DEBUG: Broadcast {broadcast.id}: flood control, retry after {e_flood.retry_after}s")
+                _pacer.back_off(e_flood.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest): # Бот заблокирован / чат не найден
+                return False
+            except Exception as e_send:
+                print(f"ERROR broadcast {broadcast.id}: sending to {user_id} failed: {e_send}")
+                return False
+    return False
+
+
+def build_broadcast_progress_keyboard(broadcast: Broadcast) -> InlineKeyboardMarkup | None:
+    buttons = []
+    if broadcast.status == BroadcastStatusEnum.RUNNING:
+        buttons.append(InlineKeyboardButton(text="⏸ Пауза", callback_data=f"{BROADCAST_CONTROL_CALLBACK_PREFIX}pause:{broadcast.id}"))
+    elif broadcast.status == BroadcastStatusEnum.PAUSED:
+        buttons.append(InlineKeyboardButton(text="▶️ Продолжить", callback_data=f"{BROADCAST_CONTROL_CALLBACK_PREFIX}resume:{broadcast.id}"))
+    if broadcast.status in (BroadcastStatusEnum.RUNNING, BroadcastStatusEnum.PAUSED):
+        buttons.append(InlineKeyboardButton(text="⏹ Остановить", callback_data=f"{BROADCAST_CONTROL_CALLBACK_PREFIX}cancel:{broadcast.id}"))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+def format_broadcast_progress(broadcast: Broadcast, rate_per_second: float | None = None) -> str:
+    status_titles = {
+        BroadcastStatusEnum.RUNNING: "🚀 идет",
+        BroadcastStatusEnum.PAUSED: "⏸ на паузе",
+        BroadcastStatusEnum.FINISHED: "✅ завершена",
+        BroadcastStatusEnum.CANCELLED: "⏹ остановлена",
+    }
+    processed = broadcast.sent_count + broadcast.failed_count
+    lines = [
+        f"📣 Рассылка #{broadcast.id}: {status_titles.get(broadcast.status, broadcast.status.name)}",
+        f"Сегмент: {segment_of(broadcast).describe()}",
+        f"Обработано: {processed} из ~{broadcast.total_recipients} "
+        f"(доставлено {broadcast.sent_count}, ошибок {broadcast.failed_count})",
+    ]
+    if broadcast.status == BroadcastStatusEnum.RUNNING and rate_per_second:
+        remaining = max(broadcast.total_recipients - processed, 0)
+        eta_seconds = int(remaining / rate_per_second)
+        lines.append(f"Скорость: {rate_per_second:.1f} сообщ./сек, осталось ~{eta_seconds // 60} мин {eta_seconds % 60} сек")
+    return "\n".join(lines)
+
+async def update_broadcast_progress_message(bot: Bot, broadcast: Broadcast, rate_per_second: float | None = None):
+    if not broadcast.progress_chat_id or not broadcast.progress_message_id:
+        return
+    try:
+        await bot.edit_message_text(
+            text=format_broadcast_progress(broadcast, rate_per_second),
+            chat_id=broadcast.progress_chat_id, message_id=broadcast.progress_message_id,
+            reply_markup=build_broadcast_progress_keyboard(broadcast)
+        )
+    except TelegramBadRequest as e_edit: # "message is not modified" и т.п.
+        print(f"DEBUG: Broadcast {broadcast.id}: progress message not updated: {e_edit}")
+    except Exception as e_edit:
+        print(f"ERROR broadcast {broadcast.id}: progress update failed: {e_edit}")
+
+
+def _lease_deadline() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=BROADCAST_LEASE_SECONDS)
+
+def _lease_is_free():
+    return or_(Broadcast.lease_until.is_(None), Broadcast.lease_until < datetime.now(timezone.utc))
+
+async def _claim_broadcast(broadcast_id: int) -> bool:
+    """Берет аренду RUNNING-рассылки. False - рассылку уже отправляет другой процесс (или она не RUNNING)."""
+    async with AsyncSessionFactory() as session, session.begin():
+        # Конкурирующий UPDATE ждет блокировку строки и перепроверяет условие: аренду получит только один
+        result = await session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.status == BroadcastStatusEnum.RUNNING, _lease_is_free())
+            .values(lease_until=_lease_deadline())
+            .returning(Broadcast.id)
+        )
+        return result.scalar_one_or_none() is not None
+
+async def _release_broadcast(broadcast_id: int, pause: bool = False):
+    async with AsyncSessionFactory() as session, session.begin():
+        await session.execute(update(Broadcast).where(Broadcast.id == broadcast_id).values(lease_until=None))
+        if pause:
+            await session.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id, Broadcast.status == BroadcastStatusEnum.RUNNING)
+                .values(status=BroadcastStatusEnum.PAUSED)
+            )
+        return await session.get(Broadcast, broadcast_id)
+
+
+async def _run_broadcast(bot: Bot, broadcast_id: int):
+    async with AsyncSessionFactory() as session:
+        broadcast = await session.get(Broadcast, broadcast_id)
+    if not broadcast or broadcast.status != BroadcastStatusEnum.RUNNING:
+        return
+    recipients_query = build_segment_recipients_query(segment_of(broadcast))
+    print(f"DEBUG: Broadcast {broadcast_id} started from user_id > {broadcast.last_user_id}")
+
+    run_started_at = time.monotonic()
+    processed_this_run = 0
+    last_progress_update_at = 0.0
+    while True:
+        async with read_session_scope() as session:
+            recipient_ids = (await session.execute(
+                recipients_query.where(User.telegram_id > broadcast.last_user_id)
+                .order_by(User.telegram_id).limit(BROADCAST_BATCH_SIZE)
+            )).scalars().all()
+
+        if recipient_ids:
+            delivered = await asyncio.gather(*(_deliver(bot, broadcast, user_id) for user_id in recipient_ids))
+            batch_sent = sum(delivered)
+            # Чекпоинт и заодно актуальный статус (пауза/остановка могли прийти во время пачки)
+            async with AsyncSessionFactory() as session, session.begin():
+                await session.execute(
+                    update(Broadcast).where(Broadcast.id == broadcast_id).values(
+                        last_user_id=recipient_ids[-1],
+                        sent_count=Broadcast.sent_count + batch_sent,
+                        failed_count=Broadcast.failed_count + (len(recipient_ids) - batch_sent),
+                        lease_until=_lease_deadline(),
+                    )
+                )
+                broadcast = await session.get(Broadcast, broadcast_id, populate_existing=True)
+            processed_this_run += len(recipient_ids)
+        else:
+            async with AsyncSessionFactory() as session, session.begin():
+                await session.execute(
+                    update(Broadcast)
+                    .where(Broadcast.id == broadcast_id, Broadcast.status == BroadcastStatusEnum.RUNNING)
+                    .values(status=BroadcastStatusEnum.FINISHED, finished_at=func.now(), lease_until=None)
+                )
+                broadcast = await session.get(Broadcast, broadcast_id, populate_existing=True)
+
+        if broadcast.status != BroadcastStatusEnum.RUNNING:
+            await update_broadcast_progress_message(bot, broadcast)
+            print(f"DEBUG: Broadcast {broadcast_id} stopped with status {broadcast.status.name}: "
+                  f"sent {broadcast.sent_count}, failed {broadcast.failed_count}")
+            return
+
+        now = time.monotonic()
+        if now - last_progress_update_at >= BROADCAST_PROGRESS_UPDATE_SECONDS:
+            last_progress_update_at = now
+            await update_broadcast_progress_message(bot, broadcast, processed_this_run / max(now - run_started_at, 0.001))
+
+
+async def _claim_and_run(bot: Bot, broadcast_id: int):
+    try:
+        if not await _claim_broadcast(broadcast_id):
+            print(f"DEBUG: Broadcast {broadcast_id} is not claimed: sent by another process or not running")
+            return
+    except Exception as e:
+        print(f"ERROR broadcast {broadcast_id}: claim failed: {e}")
+        return
+    crashed = False
+    try:
+        await _run_broadcast(bot, broadcast_id)
+    except Exception as e:
+        crashed = True
+        print(f"ERROR broadcast {broadcast_id} crashed: {e}\n{traceback.format_exc()}")
+    try:
+        # Упавшая рассылка встает на паузу: админ видит кнопку "Продолжить"
+        broadcast = await _release_broadcast(broadcast_id, pause=crashed)
+        if crashed and broadcast:
+            print(f"WARNING: Broadcast {broadcast_id} paused after crash")
+            await update_broadcast_progress_message(bot, broadcast)
+    except Exception as e:
+        # Аренда истечет сама, рассылку подхватит resume_running_broadcasts
+        print(f"ERROR broadcast {broadcast_id}: lease release failed: {e}")
+
+def start_broadcast_task(bot: Bot, broadcast_id: int) -> bool:
+    """
+    Запускает рассылку в фоне этого процесса. False, если она здесь уже идет.
+    Отправка начнется, только если удастся взять аренду (другой процесс ее не держит).
+    """
+    running_task = _running_broadcasts.get(broadcast_id)
+    if running_task and not running_task.done():
+        return False
+
+    async def runner():
+        try:
+            await _claim_and_run(bot, broadcast_id)
+        finally:
+            # Только после снятия аренды: "Продолжить" в этом процессе запустит новую задачу
+            _running_broadcasts.pop(broadcast_id, None)
+
+    _running_broadcasts[broadcast_id] = asyncio.create_task(runner())
+    return True
+
+def is_broadcast_running_here(broadcast_id: int) -> bool:
+    running_task = _running_broadcasts.get(broadcast_id)
+    return bool(running_task and not running_task.done())
+
+
+async def set_broadcast_status(broadcast_id: int, new_status: BroadcastStatusEnum, from_statuses: tuple) -> Broadcast | None:
+    """Меняет статус, только если текущий - один из from_statuses. Возвращает рассылку или None."""
+    async with AsyncSessionFactory() as session, session.begin():
+        values = {"status": new_status}
+        if new_status in (BroadcastStatusEnum.FINISHED, BroadcastStatusEnum.CANCELLED):
+            values["finished_at"] = func.now()
+        result = await session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.status.in_(from_statuses))
+            .values(**values)
+        )
+        if result.rowcount == 0:
+            return None
+        return await session.get(Broadcast, broadcast_id, populate_existing=True)
+
+
+async def resume_running_broadcasts(bot: Bot):
+    """
+    Продолжает RUNNING-рассылки без действующей аренды с последнего чекпоинта:
+    после рестарта и после падения процесса, который их отправлял. Запускается периодически.
+    """
+    try:
+        async with AsyncSessionFactory() as session:
+            broadcast_ids = (await session.execute(
+                select(Broadcast.id).where(Broadcast.status == BroadcastStatusEnum.RUNNING, _lease_is_free())
+            )).scalars().all()
+        for broadcast_id in broadcast_ids:
+            if start_broadcast_task(bot, broadcast_id):
+                print(f"DEBUG: Resuming broadcast {broadcast_id} without an active lease")
+    except Exception as e:
+        print(f"ERROR resume_running_broadcasts: {e}\n{traceback.format_exc()}")
@@ -0,0 +1,64 @@
+# app/services/cooldown_service.py
+# Кулдауны ленты в отдельной компактной таблице applicant_cooldowns.
+# Раньше лента исключала анкеты подзапросом по applicant_employer_interactions, где копится вся история
+# лайков/дизлайков/вопросов, и подзапрос дорожал с каждым действием соискателя. Теперь на пару
+# соискатель-вакансия одна строка, пока кулдаун активен: проверка - поиск по первичному ключу,
+# размер таблицы ограничен числом активных кулдаунов (истекшие удаляет фоновая задача).
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, delete, exists, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import COOLDOWN_PURGE_BATCH_SIZE
+from app.db.database import AsyncSessionFactory
+from app.db.models import ApplicantCooldown, EmployerProfile
+
+# Через сколько анкета снова попадает в ленту после лайка, дизлайка, вопроса или жалобы (обе ленты)
+FEED_REACTION_COOLDOWN = timedelta(hours=0.1)
+
+
+async def set_feed_cooldown(session, applicant_user_id: int, employer_profile_id: int, expires_at: datetime):
+    """
+    Ставит/продлевает кулдаун в транзакции действия (лайк, дизлайк, вопрос, жалоба).
+    Выполняется сразу, а не через session.add: следующая анкета подбирается в этом же апдейте.
+    Более поздний срок не укорачивается.
+    """
+    cooldown_insert = insert(ApplicantCooldown).values(
+        applicant_user_id=applicant_user_id, employer_profile_id=employer_profile_id, expires_at=expires_at
+    )
+    await session.execute(cooldown_insert.on_conflict_do_update(
+        index_elements=[ApplicantCooldown.applicant_user_id, ApplicantCooldown.employer_profile_id],
+        set_={"expires_at": func.greatest(ApplicantCooldown.expires_at, cooldown_insert.excluded.expires_at)}
+    ))
+
+
+def not_in_feed_cooldown(applicant_user_id: int, now: datetime):
+    """Условие для запроса ленты: у анкеты нет активного кулдауна этого соискателя."""
+    return ~exists().where(
+        ApplicantCooldown.applicant_user_id == applicant_user_id,
+        ApplicantCooldown.employer_profile_id == EmployerProfile.id,
+        ApplicantCooldown.expires_at > now
+    )
+
+
+async def purge_expired_cooldowns() -> int:
+    """Удаляет истекшие кулдауны пачками по COOLDOWN_PURGE_BATCH_SIZE. Возвращает число удаленных строк."""
+    total_deleted = 0
+    while True:
+        now = datetime.now(timezone.utc)
+        expired_keys = (
+            select(ApplicantCooldown.applicant_user_id, ApplicantCooldown.employer_profile_id)
+            .where(ApplicantCooldown.expires_at <= now)
+            .limit(COOLDOWN_PURGE_BATCH_SIZE)
+        )
+        async with AsyncSessionFactory() as session, session.begin():
+            result = await session.execute(
+                delete(ApplicantCooldown)
+                .where(tuple_(ApplicantCooldown.applicant_user_id, ApplicantCooldown.employer_profile_id).in_(expired_keys))
+                # Повторная проверка на самой строке: кулдаун, продленный параллельным действием, не удаляем
+                .where(ApplicantCooldown.expires_at <= now)
+                .execution_options(synchronize_session=False)
+            )
+        total_deleted += result.rowcount or 0
+        if (result.rowcount or 0) < COOLDOWN_PURGE_BATCH_SIZE:
+            return total_deleted
@@ -0,0 +1,223 @@
+# app/services/dummy_import_service.py
+# Массовый импорт пустышек работодателей из CSV/JSON вместо пошагового FSM.
+# Строки проверяются теми же правилами, что и при ручном создании (длины полей,
+# возраст 16-70, без ссылок, город через normalize_city_input), валидные вставляются
+# многострочными INSERT пачками по DUMMY_IMPORT_BATCH_SIZE в одной транзакции.
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from sqlalchemy import select, insert, func, tuple_
+
+from app.config import DUMMY_IMPORT_BATCH_SIZE, DUMMY_IMPORT_MAX_ROWS
+from app.db.database import AsyncSessionFactory
+from app.db.models import EmployerProfile, WorkFormatEnum
+from app.services.city_service import normalize_city_input
+from app.services.photo_service import is_valid_file_id_format, find_broken_file_ids
+from app.utils.validators import contains_urls
+
+DUMMY_IMPORT_MAX_FILE_BYTES = 5 * 1024 * 1024
+
+# Заголовок колонки (как в файле, без регистра) -> поле анкеты
+DUMMY_IMPORT_COLUMN_ALIASES = {
+    "city": "city", "город": "city",
+    "company_name": "company_name", "company": "company_name", "компания": "company_name",
+    "position": "position", "позиция": "position", "должность": "position",
+    "salary": "salary", "зп": "salary", "зарплата": "salary",
+    "min_age": "min_age_candidate", "min_age_candidate": "min_age_candidate", "мин_возраст": "min_age_candidate",
+    "description": "description", "описание": "description",
+    "work_format": "work_format", "формат": "work_format",
+    "photo_file_id": "photo_file_id", "фото": "photo_file_id",
+}
+DUMMY_IMPORT_REQUIRED_FIELDS = ("city", "company_name", "position", "salary", "description", "work_format")
+
+# Те же ограничения, что и в шагах AdminAddDummyEmployer
+_TEXT_FIELD_LIMITS = {
+    "company_name": ("Название", 2, 200),
+    "position": ("Позиция", 3, 150),
+    "salary": ("ЗП", 3, 100),
+    "description": ("Описание", 10, 2000),
+}
+_SHORT_TEXT_FIELDS = ("company_name", "position", "salary")
+_WORK_FORMAT_VALUES = {
+    "офлайн": WorkFormatEnum.OFFLINE, "offline": WorkFormatEnum.OFFLINE,
+    "онлайн": WorkFormatEnum.ONLINE, "online": WorkFormatEnum.ONLINE,
+}
+
+
+class DummyImportFileError(ValueError):
+    """Файл целиком не читается (формат, кодировка, заголовок, размер)."""
+
+
+@dataclass(slots=True)
+class DummyImportResult:
+    total_rows: int = 0
+    inserted: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list) # (номер строки, причина)
+
+
+def _decode(raw: bytes) -> str:
+    # Excel под Windows сохраняет CSV в cp1251
+    for encoding in ("utf-8-sig", "cp1251"):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise DummyImportFileError("Не удалось определить кодировку файла (нужен UTF-8 или Windows-1251).")
+
+
+def _normalize_keys(raw_row: dict) -> dict:
+    row = {}
+    for key, value in raw_row.items():
+        field_name = DUMMY_IMPORT_COLUMN_ALIASES.get(str(key or "").strip().lower())
+        if field_name:
+            row[field_name] = "" if value is None else str(value).strip()
+    return row
+
+
+def parse_dummy_import_file(file_name: str, raw: bytes) -> list[tuple[int, dict]]:
+    """[(номер строки для отчета, поля)]. Для CSV номер - строка файла, для JSON - позиция в массиве с 1."""
+    if len(raw) > DUMMY_IMPORT_MAX_FILE_BYTES:
+        raise DummyImportFileError(f"Файл больше {DUMMY_IMPORT_MAX_FILE_BYTES // (1024 * 1024)} МБ.")
+    text_content = _decode(raw)
+
+    if (file_name or "").lower().endswith(".json"):
+        try:
+            items = json.loads(text_content)
+        except json.JSONDecodeError as e:
+            raise DummyImportFileError(f"Некорректный JSON: {e}")
+        if not isinstance(items, list):
+            raise DummyImportFileError("JSON должен быть массивом объектов.")
+        rows = [(index, _normalize_keys(item) if isinstance(item, dict) else None) for index, item in enumerate(items, start=1)]
+    else:
+        try:
+            dialect = csv.Sniffer().sniff(text_content[:4096], delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(text_content), dialect=dialect)
+        header_fields = {DUMMY_IMPORT_COLUMN_ALIASES.get((name or "").strip().lower()) for name in reader.fieldnames or []}
+        missing = [name for name in DUMMY_IMPORT_REQUIRED_FIELDS if name not in header_fields]
+        if missing:
+            raise DummyImportFileError(f"В заголовке CSV нет колонок: {', '.join(missing)}")
+        # Первая строка - заголовок, данные начинаются со второй
+        rows = [(reader.line_num, _normalize_keys(raw_row)) for raw_row in reader]
+
+    if len(rows) > DUMMY_IMPORT_MAX_ROWS:
+        raise DummyImportFileError(f"Слишком много строк: {len(rows)} (максимум {DUMMY_IMPORT_MAX_ROWS}).")
+    return rows
+
+
+def validate_dummy_row(row: dict | None) -> tuple[dict | None, str | None]:
+    """(значения для INSERT, None) или (None, причина отказа)."""
+    if row is None:
+        return None, "строка не является объектом"
+    missing = [name for name in DUMMY_IMPORT_REQUIRED_FIELDS if not row.get(name)]
+    if missing:
+        return None, f"не заполнено: {', '.join(missing)}"
+
+    city = normalize_city_input(row["city"])
+    if not (2 <= len(city) <= 100):
+        return None, "Город: 2-100 симв."
+
+    values = {"city": city}
+    for field_name, (label, min_length, max_length) in _TEXT_FIELD_LIMITS.items():
+        value = row[field_name]
+        if not (min_length <= len(value) <= max_length):
+            return None, f"{label}: {min_length}-{max_length} симв."
+        if contains_urls(value, short_field=field_name in _SHORT_TEXT_FIELDS):
+            return None, f"{label}: ссылки запрещены"
+        values[field_name] = value
+
+    min_age_text = row.get("min_age_candidate", "")
+    if min_age_text in ("", "-", "0"):
+        values["min_age_candidate"] = None
+    elif min_age_text.isdigit() and 16 <= int(min_age_text) <= 70:
+        values["min_age_candidate"] = int(min_age_text)
+    else:
+        return None, "Мин. возраст: число 16-70 или '-'"
+
+    work_format = _WORK_FORMAT_VALUES.get(row["work_format"].lower())
+    if work_format is None:
+        return None, "Формат: 'Офлайн' или 'Онлайн'"
+    values["work_format"] = work_format
+    photo_file_id = row.get("photo_file_id") or None
+    if photo_file_id and not is_valid_file_id_format(photo_file_id):
+        return None, "Фото: неверный file_id"
+    values["photo_file_id"] = photo_file_id
+    return values, None
+
+
+def _dedupe_key(values: dict) -> tuple:
+    return values["city"].lower(), values["company_name"].lower(), values["position"].lower()
+
+
+_ASYNCPG_MAX_PARAMS = 32767 # Лимит параметров на один запрос
+_EXISTING_KEYS_CHUNK = 2000 # 3 параметра на ключ
+# Строк в одном INSERT ... VALUES: с запасом считаем параметром каждую колонку таблицы
+_INSERT_BATCH_ROWS = min(DUMMY_IMPORT_BATCH_SIZE, _ASYNCPG_MAX_PARAMS // len(EmployerProfile.__table__.columns))
+
+async def _existing_dummy_keys(session, keys: set[tuple]) -> set[tuple]:
+    dedupe_columns = (func.lower(EmployerProfile.city), func.lower(EmployerProfile.company_name), func.lower(EmployerProfile.position))
+    keys_list = list(keys)
+    existing = set()
+    for chunk_start in range(0, len(keys_list), _EXISTING_KEYS_CHUNK):
+        result = await session.execute(
+            select(*dedupe_columns)
+            .where(EmployerProfile.is_dummy.is_(True), EmployerProfile.deleted_at.is_(None), tuple_(*dedupe_columns).in_(keys_list[chunk_start:chunk_start + _EXISTING_KEYS_CHUNK]))
+        )
+        existing.update(tuple(row) for row in result.all())
+    return existing
+
+
+async def import_dummy_employers(rows: list[tuple[int, dict]], bot: Bot | None = None) -> DummyImportResult:
+    result = DummyImportResult(total_rows=len(rows))
+    valid_rows: list[tuple[int, dict]] = []
+    seen_keys = set()
+    for row_number, row in rows:
+        values, error = validate_dummy_row(row)
+        if error:
+            result.errors.append((row_number, error))
+            continue
+        key = _dedupe_key(values)
+        if key in seen_keys:
+            result.errors.append((row_number, "дубликат строки выше (город + компания + позиция)"))
+            continue
+        seen_keys.add(key)
+        valid_rows.append((row_number, values))
+
+    # file_id из файла мог устареть или относиться к другому боту - проверяем до сохранения,
+    # иначе каждый показ такой пустышки заканчивался бы неудачным send_photo
+    if bot is not None:
+        broken_photos = await find_broken_file_ids(bot, (values["photo_file_id"] for _, values in valid_rows if values["photo_file_id"]))
+        if broken_photos:
+            result.errors.extend(
+                (row_number, "Фото: file_id не найден в Telegram")
+                for row_number, values in valid_rows if values["photo_file_id"] in broken_photos
+            )
+            seen_keys = {_dedupe_key(values) for _, values in valid_rows if values["photo_file_id"] not in broken_photos}
+            valid_rows = [(row_number, values) for row_number, values in valid_rows if values["photo_file_id"] not in broken_photos]
+
+    async with AsyncSessionFactory() as session, session.begin():
+        # Повторная загрузка того же файла не должна плодить копии
+        existing_keys = await _existing_dummy_keys(session, seen_keys)
+        to_insert = []
+        for row_number, values in valid_rows:
+            if _dedupe_key(values) in existing_keys:
+                result.errors.append((row_number, "такая пустышка уже есть"))
+                continue
+            to_insert.append({**values, "user_id": None, "is_active": True, "is_dummy": True})
+
+        # Именно .values(список): execute(insert(), список) у asyncpg - executemany, по INSERT на строку
+        for batch_start in range(0, len(to_insert), _INSERT_BATCH_ROWS):
+            await session.execute(insert(EmployerProfile).values(to_insert[batch_start:batch_start + _INSERT_BATCH_ROWS]))
+        result.inserted = len(to_insert)
+
+    result.errors.sort()
+    print(f"DEBUG: Dummy import: {result.inserted} inserted, {len(result.errors)} rejected of {result.total_rows}")
+    return result
+
+
+def format_dummy_import_errors(errors: list[tuple[int, str]]) -> str:
+    return "\n".join(f"Строка {row_number}: {reason}" for row_number, reason in errors)
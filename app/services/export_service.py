@@ -0,0 +1,174 @@
+# app/services/export_service.py
+# Выгрузки для админов: пользователи, анкеты, отклики, жалобы.
+# Строки идут из серверного курсора (session.stream + yield_per) пачками по EXPORT_CHUNK_SIZE
+# и сразу пишутся в gzip-CSV во временном файле - вся таблица в памяти не держится.
+import asyncio
+import csv
+import enum
+import gzip
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import select, func, or_, text
+
+from app.config import EXPORT_CHUNK_SIZE, EXPORT_STATEMENT_TIMEOUT_MS, INTERACTION_HOT_RETENTION_DAYS
+from app.db.database import read_session_scope
+from app.db.models import User, ApplicantProfile, EmployerProfile, ApplicantEmployerInteraction, ApplicantEmployerInteractionArchive, Complaint
+from app.services.city_service import normalize_city_input
+
+
+@dataclass(slots=True)
+class ExportFilters:
+    date_from: date | None = None
+    date_to: date | None = None # Включительно
+    city: str | None = None
+
+
+@dataclass(slots=True)
+class ExportResult:
+    file_path: str
+    file_name: str
+    rows_count: int
+
+
+def _users_query():
+    city = func.coalesce(ApplicantProfile.city, EmployerProfile.city)
+    query = (
+        select(
+            User.telegram_id, User.username, User.first_name, User.last_name, User.role,
+            User.contact_phone, city.label("city"), User.is_banned, User.registration_date, User.last_activity_date
+        )
+        .outerjoin(ApplicantProfile, ApplicantProfile.user_id == User.telegram_id)
+        .outerjoin(EmployerProfile, EmployerProfile.user_id == User.telegram_id)
+    )
+    return query, User.telegram_id, User.registration_date, [ApplicantProfile.city, EmployerProfile.city]
+
+def _employer_profiles_query():
+    query = select(
+        EmployerProfile.id, EmployerProfile.user_id, EmployerProfile.company_name, EmployerProfile.city,
+        EmployerProfile.position, EmployerProfile.salary, EmployerProfile.min_age_candidate,
+        EmployerProfile.work_format, EmployerProfile.is_active, EmployerProfile.is_dummy,
+        EmployerProfile.created_at, EmployerProfile.deactivation_date
+    ).where(EmployerProfile.deleted_at.is_(None)) # Удаленные, еще не дочищенные фоном, не выгружаем
+    return query, EmployerProfile.id, EmployerProfile.created_at, [EmployerProfile.city]
+
+def _applicant_profiles_query():
+    query = select(
+        ApplicantProfile.id, ApplicantProfile.user_id, ApplicantProfile.city, ApplicantProfile.gender,
+        ApplicantProfile.age, ApplicantProfile.experience, ApplicantProfile.is_active,
+        ApplicantProfile.created_at, ApplicantProfile.deactivation_date
+    )
+    return query, ApplicantProfile.id, ApplicantProfile.created_at, [ApplicantProfile.city]
+
+def _interactions_query():
+    query = (
+        select(
+            ApplicantEmployerInteraction.id, ApplicantEmployerInteraction.applicant_user_id,
+            ApplicantEmployerInteraction.employer_profile_id, EmployerProfile.company_name, EmployerProfile.city,
+            ApplicantEmployerInteraction.interaction_type, ApplicantEmployerInteraction.question_text,
+            ApplicantEmployerInteraction.is_viewed_by_employer, ApplicantEmployerInteraction.created_at
+        )
+        .join(EmployerProfile, EmployerProfile.id == ApplicantEmployerInteraction.employer_profile_id)
+        .where(EmployerProfile.deleted_at.is_(None)) # Отклики удаленной анкеты уже частично дочищены фоном
+    )
+    return query, ApplicantEmployerInteraction.id, ApplicantEmployerInteraction.created_at, [EmployerProfile.city]
+
+def _interactions_archive_query():
+    archive = ApplicantEmployerInteractionArchive
+    # outerjoin: вакансия могла быть удалена, архив без FK
+    query = (
+        select(
+            archive.id, archive.applicant_user_id, archive.employer_profile_id, EmployerProfile.company_name, EmployerProfile.city,
+            archive.interaction_type, archive.question_text, archive.is_viewed_by_employer, archive.created_at
+        )
+        .outerjoin(EmployerProfile, EmployerProfile.id == archive.employer_profile_id)
+    )
+    return query, archive.id, archive.created_at, [EmployerProfile.city]
+
+def _complaints_query():
+    city = func.coalesce(EmployerProfile.city, ApplicantProfile.city)
+    query = (
+        select(
+            Complaint.id, Complaint.reporter_user_id, Complaint.reported_user_id,
+            Complaint.reported_employer_profile_id, Complaint.reported_applicant_profile_id, city.label("city"),
+            Complaint.reason_text, Complaint.status, Complaint.created_at, Complaint.updated_at
+        )
+        .outerjoin(EmployerProfile, EmployerProfile.id == Complaint.reported_employer_profile_id)
+        .outerjoin(ApplicantProfile, ApplicantProfile.id == Complaint.reported_applicant_profile_id)
+    )
+    return query, Complaint.id, Complaint.created_at, [EmployerProfile.city, ApplicantProfile.city]
+
+
+# Имя выгрузки (аргумент команды /export) -> (описание, построитель запроса)
+EXPORT_ENTITIES = {
+    "users": ("Пользователи", _users_query),
+    "employers": ("Анкеты работодателей", _employer_profiles_query),
+    "applicants": ("Анкеты соискателей", _applicant_profiles_query),
+    "interactions": ("Лайки и вопросы", _interactions_query),
+    "interactions_archive": (f"Архив лайков, дизлайков и вопросов (старше {INTERACTION_HOT_RETENTION_DAYS} дн.)", _interactions_archive_query),
+    "complaints": ("Жалобы", _complaints_query),
+}
+
+
+def build_export_query(entity: str, filters: ExportFilters):
+    _, query_builder = EXPORT_ENTITIES[entity]
+    query, id_column, date_column, city_columns = query_builder()
+
+    # Границы дат - по UTC, как и хранится в timestamptz
+    if filters.date_from:
+        query = query.where(date_column >= datetime.combine(filters.date_from, time.min, tzinfo=timezone.utc))
+    if filters.date_to:
+        query = query.where(date_column < datetime.combine(filters.date_to + timedelta(days=1), time.min, tzinfo=timezone.utc))
+    if filters.city:
+        city_name = normalize_city_input(filters.city).lower()
+        query = query.where(or_(*(func.lower(city_column) == city_name for city_column in city_columns)))
+    # Порядок по первичному ключу: индексный обход без сортировки всей выборки
+    return query.order_by(id_column)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    return value
+
+def _write_chunk(writer, rows):
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+
+
+async def export_to_gzip_csv(entity: str, filters: ExportFilters) -> ExportResult:
+    """
+    Пишет выгрузку во временный .csv.gz и возвращает путь к нему.
+    Удалить файл после отправки - задача вызывающего.
+    """
+    query = build_export_query(entity, filters)
+    file_name = f"{entity}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv.gz"
+    fd, file_path = tempfile.mkstemp(prefix="export_", suffix=".csv.gz")
+    os.close(fd)
+
+    rows_count = 0
+    try:
+        # utf-8-sig: Excel открывает кириллицу без ручного выбора кодировки
+        with gzip.open(file_path, "wt", encoding="utf-8-sig", newline="", compresslevel=6) as gz_file:
+            writer = csv.writer(gz_file)
+            writer.writerow([column.name for column in query.selected_columns])
+
+            async with read_session_scope() as session:
+                # Выгрузка может идти минутами - общий statement_timeout для нее слишком строгий
+                await session.execute(text(f"SET LOCAL statement_timeout = {int(EXPORT_STATEMENT_TIMEOUT_MS)}"))
+                stream = await session.stream(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+                async for rows in stream.partitions():
+                    # Сжатие и запись - в потоке, чтобы не блокировать event loop на больших пачках
+                    await asyncio.to_thread(_write_chunk, writer, rows)
+                    rows_count += len(rows)
+    except Exception:
+        os.remove(file_path)
+        raise
+
+    print(f"DEBUG: Export '{entity}' finished: {rows_count} rows -> {file_path}")
+    return ExportResult(file_path=file_path, file_name=file_name, rows_count=rows_count)
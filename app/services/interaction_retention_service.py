@@ -0,0 +1,149 @@
+# app/services/interaction_retention_service.py
+# Хранение applicant_employer_interactions: в горячей таблице остаются только свежие строки
+# и непросмотренные отклики, все остальное уезжает в архив, секционированный по месяцам.
+#
+# В архив переносятся строки старше INTERACTION_HOT_RETENTION_DAYS, если это дизлайк или просмотренный
+# работодателем отклик, кулдаун истек и строка уже свернута в воронку (id <= водяной знак роллапа):
+# отчеты читают funnel_daily_rollups, так что перенос их не меняет.
+# Перенос - один DELETE ... RETURNING + INSERT пачкой; секция нужного месяца создается заранее.
+# Месяцы старше INTERACTION_ARCHIVE_RETENTION_MONTHS удаляются DROP TABLE секции, без построчного DELETE.
+#
+# Горячую таблицу не секционируем: уникальный частичный индекс непросмотренных лайков (uq_interactions_unviewed_like)
+# на секционированной таблице обязан включать created_at и перестал бы защищать от повторного лайка.
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select, delete, insert, or_, text
+
+from app.config import (
+    INTERACTION_HOT_RETENTION_DAYS, INTERACTION_ARCHIVE_RETENTION_MONTHS, INTERACTION_RETENTION_BATCH_SIZE
+)
+from app.db.database import AsyncSessionFactory
+from app.db.models import ApplicantEmployerInteraction, ApplicantEmployerInteractionArchive, BotSettings, InteractionTypeEnum
+from app.services.analytics_service import FUNNEL_ROLLUP_WATERMARK_KEY
+
+INTERACTION_RETENTION_MAX_BATCHES_PER_RUN = 20
+
+ARCHIVE_TABLE = ApplicantEmployerInteractionArchive.__tablename__
+ARCHIVE_COLUMNS = (
+    "id", "created_at", "applicant_user_id", "employer_profile_id", "interaction_type", "question_text", "is_viewed_by_employer"
+)
+
+# Секции, о которых процесс уже знает, что они созданы
+_known_archive_partitions: set[str] = set()
+
+
+def _month_start(value: datetime | date) -> date:
+    return date(value.year, value.month, 1)
+
+def _add_months(month: date, months: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def archive_partition_name(month: date) -> str:
+    return f"{ARCHIVE_TABLE}_{month.year:04d}_{month.month:02d}"
+
+def _archive_cutoff_month(now: datetime) -> date:
+    """Первый месяц, который еще хранится в архиве."""
+    return _add_months(_month_start(now.astimezone(timezone.utc)), -INTERACTION_ARCHIVE_RETENTION_MONTHS)
+
+
+async def _ensure_archive_partition(session, month: date) -> str | None:
+    """Создает секцию месяца, если процесс еще не знает о ней. Имя секции - запомнить после коммита."""
+    partition_name = archive_partition_name(month)
+    if partition_name in _known_archive_partitions:
+        return None
+    # Имя и границы строятся из даты, пользовательского ввода здесь нет
+    await session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name} PARTITION OF {ARCHIVE_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+    ))
+    return partition_name
+
+
+async def _archive_next_batch() -> int:
+    """Переносит одну пачку в архив. Возвращает число убранных из горячей таблицы строк."""
+    interaction = ApplicantEmployerInteraction
+    now = datetime.now(timezone.utc)
+    hot_cutoff = now - timedelta(days=INTERACTION_HOT_RETENTION_DAYS)
+    archive_cutoff = datetime.combine(_archive_cutoff_month(now), datetime.min.time(), tzinfo=timezone.utc)
+
+    created_partitions = []
+    async with AsyncSessionFactory() as session, session.begin():
+        # Водяной знак воронки только растет, блокировка не нужна
+        watermark = (await session.execute(
+            select(BotSettings.value_int).where(BotSettings.setting_key == FUNNEL_ROLLUP_WATERMARK_KEY)
+        )).scalar_one_or_none()
+        if not watermark:
+            return 0 # Воронка еще ничего не свернула - переносить нечего
+
+        candidates = (await session.execute(
+            select(interaction.id, interaction.created_at)
+            .where(
+                interaction.id <= watermark,
+                interaction.created_at < hot_cutoff,
+                or_(interaction.interaction_type == InteractionTypeEnum.DISLIKE, interaction.is_viewed_by_employer.is_(True)),
+                or_(interaction.cooldown_until.is_(None), interaction.cooldown_until <= now),
+            )
+            .order_by(interaction.id)
+            .limit(INTERACTION_RETENTION_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )).all()
+        if not candidates:
+            return 0
+
+        for month in sorted({_month_start(created_at.astimezone(timezone.utc)) for _, created_at in candidates}):
+            if month >= archive_cutoff.date():
+                created_partitions.append(await _ensure_archive_partition(session, month))
+
+        moved = (
+            delete(interaction)
+            .where(interaction.id.in_([candidate_id for candidate_id, _ in candidates]))
+            .returning(*(getattr(interaction, column) for column in ARCHIVE_COLUMNS))
+            .cte("moved_interactions")
+        )
+        # Строки старше срока хранения архива просто удаляются
+        await session.execute(
+            insert(ApplicantEmployerInteractionArchive).from_select(
+                ARCHIVE_COLUMNS, select(moved).where(moved.c.created_at >= archive_cutoff)
+            )
+        )
+    _known_archive_partitions.update(name for name in created_partitions if name)
+    return len(candidates)
+
+
+async def drop_expired_archive_partitions() -> list[str]:
+    """Удаляет секции архива целиком, если весь их месяц старше срока хранения."""
+    cutoff_month = _archive_cutoff_month(datetime.now(timezone.utc))
+    prefix = f"{ARCHIVE_TABLE}_"
+    dropped = []
+    async with AsyncSessionFactory() as session, session.begin():
+        partition_names = (await session.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :parent_name"
+        ), {"parent_name": ARCHIVE_TABLE})).scalars().all()
+        for partition_name in partition_names:
+            suffix = partition_name[len(prefix):] if partition_name.startswith(prefix) else ""
+            try:
+                year, month = (int(part) for part in suffix.split("_"))
+                partition_month = date(year, month, 1)
+            except ValueError:
+                continue # Секция создана вручную с другим именем - не трогаем
+            if partition_month < cutoff_month:
+                await session.execute(text(f"DROP TABLE IF EXISTS {partition_name}"))
+                _known_archive_partitions.discard(partition_name)
+                dropped.append(partition_name)
+    return dropped
+
+
+async def apply_interaction_retention() -> tuple[int, list[str]]:
+    """(перенесено/удалено строк из горячей таблицы, удаленные секции архива)."""
+    total_moved = 0
+    for _ in range(INTERACTION_RETENTION_MAX_BATCHES_PER_RUN):
+        moved = await _archive_next_batch()
+        total_moved += moved
+        if moved < INTERACTION_RETENTION_BATCH_SIZE:
+            break
+    dropped = await drop_expired_archive_partitions()
+    return total_moved, dropped
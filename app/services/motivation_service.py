@@ -0,0 +1,130 @@
+# app/services/motivation_service.py
+# Мотивационный контент в ленте соискателя.
+# Активные элементы держатся в памяти процесса: раньше каждый показ делал ORDER BY random() по всей таблице.
+# Выбор - алиас-таблица Уокера (метод Воуза): O(1) на показ, веса больше у реже показанных элементов.
+# Показы копятся в памяти и раз в MOTIVATION_USAGE_FLUSH_SECONDS пишутся в usage_count одним UPDATE.
+# Админка после добавления/удаления/переключения вызывает invalidate_motivation_cache - кэш сбрасывается
+# во всех шардах; MOTIVATION_CACHE_TTL_SECONDS - страховка, если событие не дошло.
+import asyncio
+import random
+import time
+from collections import Counter
+
+from aiogram import Bot
+from sqlalchemy import select, update, case
+
+from app.config import MOTIVATION_CACHE_TTL_SECONDS
+from app.db.database import AsyncSessionFactory, read_session_scope
+from app.db.dto import MotivationItem, MOTIVATION_ITEM_COLUMNS, rows_to_dto
+from app.db.models import MotivationalContent
+from app.services.sharding import post_all_shards_event, register_shard_event_handler
+
+
+class AliasSampler:
+    """Выбор индекса с вероятностью, пропорциональной весу, за O(1). Построение - O(n)."""
+    __slots__ = ("_probabilities", "_aliases")
+
+    def __init__(self, weights: list[float]):
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        self._probabilities = [1.0] * count
+        self._aliases = list(range(count))
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            small_index, large_index = small.pop(), large.pop()
+            self._probabilities[small_index] = scaled[small_index]
+            self._aliases[small_index] = large_index
+            scaled[large_index] -= 1.0 - scaled[small_index]
+            (small if scaled[large_index] < 1.0 else large).append(large_index)
+        # Остатки (погрешность округления) - вероятность 1.0, уже проставлена
+
+    def sample(self) -> int:
+        index = random.randrange(len(self._probabilities))
+        return index if random.random() < self._probabilities[index] else self._aliases[index]
+
+
+def _motivation_weights(usage_counts: list[int]) -> list[float]:
+    """Чем больше показов относительно самого редкого элемента, тем меньше вес (1/sqrt - без резкого перекоса к новому)."""
+    min_usage = min(usage_counts)
+    return [1.0 / (1 + usage - min_usage) ** 0.5 for usage in usage_counts]
+
+
+_motivation_items: list[MotivationItem] = []
+_motivation_sampler: AliasSampler | None = None
+_motivation_loaded_at = 0.0
+_motivation_cache_stale = True
+_motivation_reload_lock = asyncio.Lock()
+# Показы, еще не записанные в usage_count: content_id -> сколько раз
+_pending_usage: Counter = Counter()
+
+
+async def _reload_motivation_cache(session=None):
+    global _motivation_items, _motivation_sampler, _motivation_loaded_at, _motivation_cache_stale
+    _motivation_cache_stale = False # Сброс во время загрузки снова выставит флаг
+    async with read_session_scope(session) as read_session:
+        rows = (await read_session.execute(
+            select(*MOTIVATION_ITEM_COLUMNS).where(MotivationalContent.is_active == True).order_by(MotivationalContent.id)
+        )).all()
+    items = rows_to_dto(MotivationItem, rows)
+    _motivation_items = items
+    _motivation_sampler = AliasSampler(
+        _motivation_weights([item.usage_count + _pending_usage[item.id] for item in items])
+    ) if items else None
+    _motivation_loaded_at = time.monotonic()
+    print(f"DEBUG: Motivation cache reloaded, {len(items)} active items")
+
+
+async def pick_motivational_content(session=None) -> MotivationItem | None:
+    """Случайный активный элемент (реже показанные - чаще). Показ сразу учитывается в буфере usage_count."""
+    if _motivation_cache_stale or time.monotonic() - _motivation_loaded_at > MOTIVATION_CACHE_TTL_SECONDS:
+        async with _motivation_reload_lock:
+            if _motivation_cache_stale or time.monotonic() - _motivation_loaded_at > MOTIVATION_CACHE_TTL_SECONDS:
+                await _reload_motivation_cache(session)
+    if _motivation_sampler is None:
+        return None
+    item = _motivation_items[_motivation_sampler.sample()]
+    _pending_usage[item.id] += 1
+    return item
+
+
+def _mark_motivation_cache_stale():
+    global _motivation_cache_stale
+    _motivation_cache_stale = True
+
+
+def invalidate_motivation_cache():
+    """Вызывать после коммита изменений мотивационного контента в админке."""
+    _mark_motivation_cache_stale()
+    post_all_shards_event("motivation_cache_invalidate")
+
+
+@register_shard_event_handler("motivation_cache_invalidate")
+async def _handle_motivation_cache_invalidate(bot: Bot):
+    _mark_motivation_cache_stale()
+
+
+async def flush_motivation_usage() -> int:
+    """Пишет накопленные показы в usage_count одним UPDATE. Возвращает число обновленных элементов."""
+    if not _pending_usage:
+        return 0
+    pending = dict(_pending_usage)
+    _pending_usage.clear()
+    try:
+        async with AsyncSessionFactory() as session, session.begin():
+            result = await session.execute(
+                update(MotivationalContent)
+                .where(MotivationalContent.id.in_(list(pending)))
+                .values(
+                    usage_count=MotivationalContent.usage_count + case(pending, value=MotivationalContent.id, else_=0),
+                    updated_at=MotivationalContent.updated_at # Счетчик показов - не правка контента
+                )
+                .execution_options(synchronize_session=False)
+            )
+    except Exception:
+        _pending_usage.update(pending) # Вернем в буфер, запишем при следующем сбросе
+        raise
+    # Веса пересчитаем по свежим счетчикам (в т.ч. показам из других шардов)
+    _mark_motivation_cache_stale()
+    return result.rowcount or 0
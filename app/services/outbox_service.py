@@ -0,0 +1,157 @@
+# app/services/outbox_service.py
+# Transactional outbox: событие (PUSH работодателю) пишется в outbox_events в той же транзакции,
+# что и лайк/вопрос, а отправляет его фоновый диспетчер шарда 0. Ответ соискателю ждет только коммита,
+# а событие переживает падение процесса: строка удаляется лишь после успешной обработки.
+#
+# Диспетчер берет пачку через FOR UPDATE SKIP LOCKED и "арендует" ее, сдвигая available_at на
+# OUTBOX_LEASE_SECONDS: параллельный диспетчер эти строки пропустит, а после падения они вернутся сами.
+# События одного адресата в пачке схлопываются в один вызов - PUSH все равно пересчитывает отклики.
+import asyncio
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from aiogram import Bot
+from sqlalchemy import select, update, delete
+
+from app.config import (
+    OUTBOX_BATCH_SIZE, OUTBOX_CONCURRENCY, OUTBOX_POLL_INTERVAL_SECONDS, OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS
+)
+from app.db.database import AsyncSessionFactory
+from app.db.models import OutboxEvent
+from app.services.sharding import get_shard_event_handler, post_primary_shard_event, register_shard_event_handler
+
+OUTBOX_RETRY_BASE_SECONDS = 5
+OUTBOX_RETRY_MAX_SECONDS = 600
+
+_outbox_wakeup = asyncio.Event()
+_outbox_dispatcher_task: asyncio.Task | None = None
+
+
+def add_outbox_event(session, event_kind: str, target_user_id: int, **payload) -> OutboxEvent:
+    """Добавляет событие в текущую транзакцию. После коммита вызвать wake_outbox_dispatcher()."""
+    event = OutboxEvent(
+        event_kind=event_kind, target_user_id=target_user_id, payload=payload,
+        available_at=datetime.now(timezone.utc)
+    )
+    session.add(event)
+    return event
+
+
+def wake_outbox_dispatcher():
+    """Будит диспетчер без ожидания. Если сигнал потеряется, событие подберет очередной опрос."""
+    if not post_primary_shard_event("outbox_wake"):
+        _outbox_wakeup.set()
+
+@register_shard_event_handler("outbox_wake")
+async def handle_outbox_wake_event(bot: Bot):
+    _outbox_wakeup.set()
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), OUTBOX_RETRY_MAX_SECONDS))
+
+
+async def _claim_outbox_batch() -> list:
+    now = datetime.now(timezone.utc)
+    claimable_ids = (
+        select(OutboxEvent.id)
+        .where(OutboxEvent.failed_at.is_(None), OutboxEvent.available_at <= now)
+        .order_by(OutboxEvent.id)
+        .limit(OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    async with AsyncSessionFactory() as session, session.begin():
+        result = await session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(claimable_ids))
+            .values(available_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS), attempts=OutboxEvent.attempts + 1)
+            .returning(OutboxEvent.id, OutboxEvent.event_kind, OutboxEvent.target_user_id, OutboxEvent.payload, OutboxEvent.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
+
+async def _handle_event_group(bot: Bot, semaphore: asyncio.Semaphore, event_kind: str, payload: dict) -> str | None:
+    """None - успех, иначе текст ошибки."""
+    handler = get_shard_event_handler(event_kind)
+    if handler is None:
+        return f"No handler registered for event '{event_kind}'"
+    async with semaphore:
+        try:
+            await handler(bot, **payload)
+            return None
+        except Exception as e:
+            print(f"ERROR OUTBOX: event '{event_kind}' failed: {e}\n{traceback.format_exc()}")
+            return f"{type(e).__name__}: {e}"[:1000]
+
+
+async def dispatch_outbox_batch(bot: Bot) -> int:
+    """Обрабатывает одну пачку. Возвращает число взятых событий."""
+    events = await _claim_outbox_batch()
+    if not events:
+        return 0
+
+    # (тип, адресат) -> ids событий и payload самого свежего из них
+    groups: dict[tuple, dict] = {}
+    for event in sorted(events, key=lambda event: event.id):
+        group = groups.setdefault((event.event_kind, event.target_user_id), {"ids": [], "attempts": 0})
+        group["ids"].append(event.id)
+        group["payload"] = event.payload
+        group["attempts"] = max(group["attempts"], event.attempts)
+
+    semaphore = asyncio.Semaphore(OUTBOX_CONCURRENCY)
+    errors = await asyncio.gather(*(
+        _handle_event_group(bot, semaphore, event_kind, group["payload"])
+        for (event_kind, _), group in groups.items()
+    ))
+
+    done_ids = []
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionFactory() as session, session.begin():
+        for group, error in zip(groups.values(), errors):
+            if error is None:
+                done_ids.extend(group["ids"])
+                continue
+            retry_values = {"last_error": error}
+            if group["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+                retry_values["failed_at"] = now
+            else:
+                retry_values["available_at"] = now + _retry_delay(group["attempts"])
+            await session.execute(
+                update(OutboxEvent).where(OutboxEvent.id.in_(group["ids"])).values(**retry_values)
+                .execution_options(synchronize_session=False)
+            )
+        if done_ids:
+            await session.execute(
+                delete(OutboxEvent).where(OutboxEvent.id.in_(done_ids)).execution_options(synchronize_session=False)
+            )
+
+    failed_groups = sum(1 for error in errors if error is not None)
+    print(f"DEBUG OUTBOX: {len(events)} events in {len(groups)} calls, {failed_groups} failed")
+    return len(events)
+
+
+async def _run_outbox_dispatcher(bot: Bot):
+    print("OUTBOX: dispatcher started.")
+    while True:
+        _outbox_wakeup.clear()
+        try:
+            claimed = await dispatch_outbox_batch(bot)
+        except Exception as e:
+            print(f"ERROR OUTBOX: dispatcher iteration failed: {e}\n{traceback.format_exc()}")
+            claimed = 0
+        if claimed >= OUTBOX_BATCH_SIZE:
+            continue # Очередь не разобрана - сразу следующая пачка
+        try:
+            await asyncio.wait_for(_outbox_wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_outbox_dispatcher(bot: Bot):
+    """Запускает диспетчер в фоне (вызывать только в шарде 0)."""
+    global _outbox_dispatcher_task
+    if _outbox_dispatcher_task and not _outbox_dispatcher_task.done():
+        return
+    _outbox_dispatcher_task = asyncio.create_task(_run_outbox_dispatcher(bot))
@@ -0,0 +1,152 @@
+# app/services/photo_service.py
+# Отправка карточек с фото и кэш битых file_id.
+# Если send_photo падает на file_id (устарел, неверный, не тот тип файла), раньше каждый просмотр
+# этой анкеты платил за неудачный запрос и повторную отправку текстом. Теперь такой file_id попадает
+# в кэш неудач процесса и дальше сразу уходит в текстовый режим, а фоновая задача проверяет его через
+# getFile и, если он действительно битый, убирает фото из анкет и настройки анти-спам пустышки.
+import asyncio
+import re
+import time
+from collections import OrderedDict
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+from sqlalchemy import update
+
+from app.config import PHOTO_FAILURE_CACHE_MAX_IDS, PHOTO_FAILURE_CACHE_TTL_SECONDS, PHOTO_VALIDATION_CONCURRENCY
+from app.db.database import AsyncSessionFactory
+from app.db.models import EmployerProfile
+from app.services.bot_settings_service import get_setting, update_bot_setting, ANTISPAM_DUMMY_PHOTO_ID
+
+# file_id Telegram - base64url без паддинга
+_FILE_ID_RE = re.compile(r"[A-Za-z0-9_-]{20,255}")
+
+# Ошибки Bot API, которые означают проблему самого файла, а не подписи/чата/сети
+_BROKEN_FILE_MARKERS = (
+    "wrong file identifier", "wrong remote file", "file_id_invalid", "file reference",
+    "wrong padding", "type of file mismatch", "wrong type of the web page content", "failed to get http url content",
+)
+
+# file_id -> time.monotonic() неудачи (LRU, не больше PHOTO_FAILURE_CACHE_MAX_IDS)
+_failed_file_ids: OrderedDict[str, float] = OrderedDict()
+# Неудачи, еще не проверенные фоновой задачей
+_unverified_failures: set[str] = set()
+
+
+def is_valid_file_id_format(file_id: str) -> bool:
+    return bool(_FILE_ID_RE.fullmatch(file_id))
+
+
+def is_broken_file_error(error: TelegramBadRequest) -> bool:
+    message = (error.message or "").lower()
+    return any(marker in message for marker in _BROKEN_FILE_MARKERS)
+
+
+def is_photo_known_broken(file_id: str | None) -> bool:
+    if not file_id:
+        return False
+    failed_at = _failed_file_ids.get(file_id)
+    if failed_at is None:
+        return False
+    if time.monotonic() - failed_at > PHOTO_FAILURE_CACHE_TTL_SECONDS:
+        _failed_file_ids.pop(file_id, None)
+        return False
+    return True
+
+
+def note_photo_failure(file_id: str):
+    _failed_file_ids[file_id] = time.monotonic()
+    _failed_file_ids.move_to_end(file_id)
+    while len(_failed_file_ids) > PHOTO_FAILURE_CACHE_MAX_IDS:
+        _failed_file_ids.popitem(last=False)
+    _unverified_failures.add(file_id)
+
+
+def usable_photo(file_id: str | None) -> str | None:
+    """file_id, если он не в кэше битых, иначе None - для мест со своей логикой отправки."""
+    return None if is_photo_known_broken(file_id) else file_id
+
+
+async def send_photo_or_text(bot: Bot, chat_id: int, photo_file_id: str | None, text: str,
+                             caption: str | None = None, **kwargs) -> Message:
+    """
+    send_photo (подпись - caption или text), при ошибке - send_message с text.
+    Битый file_id запоминается, и следующие показы сразу идут текстом.
+    """
+    if photo_file_id and not is_photo_known_broken(photo_file_id):
+        try:
+            return await bot.send_photo(chat_id=chat_id, photo=photo_file_id, caption=text if caption is None else caption, **kwargs)
+        except TelegramBadRequest as e_photo:
+            if is_broken_file_error(e_photo):
+                note_photo_failure(photo_file_id)
+            print(f"Error sending photo {photo_file_id[:20]}... to {chat_id}: {e_photo}. Sending text only.")
+        except Exception as e_photo:
+            print(f"Error sending photo {photo_file_id[:20]}... to {chat_id}: {e_photo}. Sending text only.")
+    return await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+
+
+async def _check_file_id(bot: Bot, file_id: str) -> bool | None:
+    """True - файл доступен, False - битый, None - проверить не удалось (сеть, лимиты)."""
+    try:
+        await bot.get_file(file_id)
+    except TelegramBadRequest as e:
+        # Например, "file is too big" у видео - сам file_id рабочий
+        return not is_broken_file_error(e)
+    except Exception as e:
+        print(f"WARNING PHOTO CHECK: getFile {file_id[:20]}... failed: {e}")
+        return None
+    return True
+
+
+async def find_broken_file_ids(bot: Bot, file_ids) -> set[str]:
+    """Проверка file_id перед сохранением: формат, затем getFile (не больше PHOTO_VALIDATION_CONCURRENCY одновременно)."""
+    unique_ids = set(file_ids)
+    broken = {file_id for file_id in unique_ids if not is_valid_file_id_format(file_id)}
+    semaphore = asyncio.Semaphore(PHOTO_VALIDATION_CONCURRENCY)
+
+    async def check(file_id: str):
+        async with semaphore:
+            if await _check_file_id(bot, file_id) is False:
+                broken.add(file_id)
+
+    await asyncio.gather(*(check(file_id) for file_id in unique_ids - broken))
+    return broken
+
+
+async def clear_broken_photos(bot: Bot) -> int:
+    """
+    Проверяет накопленные неудачи через getFile. Подтвержденные битые file_id убираются из анкет
+    и настройки анти-спам пустышки. Возвращает число анкет, у которых убрано фото.
+    """
+    if not _unverified_failures:
+        return 0
+    pending = list(_unverified_failures)
+    _unverified_failures.clear()
+
+    confirmed = []
+    for file_id in pending:
+        check_result = await _check_file_id(bot, file_id)
+        if check_result is False:
+            confirmed.append(file_id)
+        elif check_result is None:
+            _unverified_failures.add(file_id) # Повторим в следующий раз
+        # True: getFile работает, но send_photo не прошел (например, видео вместо фото) -
+        # в БД не трогаем, до истечения TTL показываем текстом
+    if not confirmed:
+        return 0
+
+    antispam_photo_id = await get_setting(ANTISPAM_DUMMY_PHOTO_ID)
+    async with AsyncSessionFactory() as session, session.begin():
+        result = await session.execute(
+            update(EmployerProfile)
+            .where(EmployerProfile.photo_file_id.in_(confirmed))
+            .values(photo_file_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        if antispam_photo_id in confirmed:
+            await update_bot_setting(session, ANTISPAM_DUMMY_PHOTO_ID, None)
+            print("WARNING PHOTO CHECK: Antispam dummy photo is broken and was removed")
+    cleared = result.rowcount or 0
+    print(f"DEBUG: Broken photos confirmed: {len(confirmed)}, removed from {cleared} employer profiles")
+    return cleared
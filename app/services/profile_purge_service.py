@@ -0,0 +1,165 @@
+# app/services/profile_purge_service.py
+# Удаление анкеты работодателя в два этапа.
+# 1. soft_delete_employer_profiles - в транзакции вызывающего: анкета скрывается (is_active=False, deleted_at),
+#    отвязывается от владельца (user_id=NULL - он может сразу зарегистрироваться заново) и ставится в очередь.
+# 2. Фоновая задача шарда 0 вычищает зависимые строки (кулдауны, взаимодействия, жалобы) пачками по
+#    PROFILE_PURGE_BATCH_SIZE в коротких транзакциях и только потом удаляет саму анкету - ON DELETE CASCADE
+#    к этому моменту уже нечего удалять, и долгих блокировок, мешающих свайпам, нет.
+import asyncio
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update, delete, insert, func
+
+from app.config import PROFILE_PURGE_BATCH_SIZE, PROFILE_PURGE_PAUSE_SECONDS
+from app.db.database import AsyncSessionFactory
+from app.db.models import (
+    ApplicantCooldown, ApplicantEmployerInteraction, Complaint, EmployerProfile, EmployerProfilePurge
+)
+
+PROFILE_PURGE_MAX_BATCHES_PER_RUN = 200
+
+# (счетчик в EmployerProfilePurge, модель, колонка ссылки на анкету, ключ для выбора пачки)
+_PURGE_STEPS = (
+    ("deleted_cooldowns", ApplicantCooldown, ApplicantCooldown.employer_profile_id, ApplicantCooldown.applicant_user_id),
+    ("deleted_interactions", ApplicantEmployerInteraction, ApplicantEmployerInteraction.employer_profile_id, ApplicantEmployerInteraction.id),
+    ("deleted_complaints", Complaint, Complaint.reported_employer_profile_id, Complaint.id),
+)
+
+
+@dataclass(slots=True)
+class PurgeProgress:
+    id: int
+    employer_profile_id: int
+    company_name: str | None
+    reason: str
+    requested_at: datetime
+    deleted_cooldowns: int
+    deleted_interactions: int
+    deleted_complaints: int
+    finished_at: datetime | None
+    last_error: str | None
+
+
+async def soft_delete_employer_profiles(session, *conditions, reason: str) -> list[int]:
+    """
+    Скрывает подходящие под условия анкеты и ставит их в очередь очистки (в транзакции вызывающего).
+    Возвращает id скрытых анкет - пустой список, если удалять нечего.
+    """
+    hidden_profiles = (await session.execute(
+        update(EmployerProfile)
+        .where(*conditions, EmployerProfile.deleted_at.is_(None))
+        .values(is_active=False, user_id=None, active_notification_message_id=None, deleted_at=func.now())
+        .returning(EmployerProfile.id, EmployerProfile.company_name)
+        .execution_options(synchronize_session=False)
+    )).all()
+    if hidden_profiles:
+        await session.execute(insert(EmployerProfilePurge), [
+            {"employer_profile_id": profile.id, "company_name": profile.company_name, "reason": reason}
+            for profile in hidden_profiles
+        ])
+        print(f"DEBUG: Employer profiles {[profile.id for profile in hidden_profiles]} hidden and queued for purge ({reason})")
+    return [profile.id for profile in hidden_profiles]
+
+
+async def _purge_dependents_batch(purge_id: int, profile_id: int, counter_name: str, model, profile_column, key_column) -> int:
+    batch_keys = select(key_column).where(profile_column == profile_id).limit(PROFILE_PURGE_BATCH_SIZE)
+    async with AsyncSessionFactory() as session, session.begin():
+        result = await session.execute(
+            delete(model).where(profile_column == profile_id, key_column.in_(batch_keys))
+            .execution_options(synchronize_session=False)
+        )
+        deleted = result.rowcount or 0
+        if deleted:
+            counter = getattr(EmployerProfilePurge, counter_name)
+            await session.execute(
+                update(EmployerProfilePurge).where(EmployerProfilePurge.id == purge_id).values({counter: counter + deleted})
+            )
+    return deleted
+
+
+async def _process_purge(purge_id: int, profile_id: int, batch_budget: int) -> tuple[bool, int]:
+    """(очистка завершена, израсходовано пачек). Незавершенная продолжится при следующем запуске."""
+    batches_used = 0
+    for counter_name, model, profile_column, key_column in _PURGE_STEPS:
+        while True:
+            if batches_used >= batch_budget:
+                return False, batches_used
+            deleted = await _purge_dependents_batch(purge_id, profile_id, counter_name, model, profile_column, key_column)
+            batches_used += 1
+            if deleted < PROFILE_PURGE_BATCH_SIZE:
+                break
+            await asyncio.sleep(PROFILE_PURGE_PAUSE_SECONDS)
+
+    async with AsyncSessionFactory() as session, session.begin():
+        await session.execute(
+            delete(EmployerProfile).where(EmployerProfile.id == profile_id, EmployerProfile.deleted_at.is_not(None))
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            update(EmployerProfilePurge).where(EmployerProfilePurge.id == purge_id)
+            .values(finished_at=datetime.now(timezone.utc), last_error=None)
+        )
+    return True, batches_used
+
+
+async def run_pending_profile_purges() -> int:
+    """Обрабатывает очередь по порядку, не больше PROFILE_PURGE_MAX_BATCHES_PER_RUN пачек. Возвращает число завершенных очисток."""
+    async with AsyncSessionFactory() as session:
+        pending = (await session.execute(
+            select(EmployerProfilePurge.id, EmployerProfilePurge.employer_profile_id)
+            .where(EmployerProfilePurge.finished_at.is_(None))
+            .order_by(EmployerProfilePurge.requested_at, EmployerProfilePurge.id)
+        )).all()
+
+    finished = 0
+    batch_budget = PROFILE_PURGE_MAX_BATCHES_PER_RUN
+    for purge_id, profile_id in pending:
+        if batch_budget <= 0:
+            break
+        try:
+            is_finished, batches_used = await _process_purge(purge_id, profile_id, batch_budget)
+        except Exception as e:
+            print(f"ERROR PROFILE PURGE: purge {purge_id} (profile {profile_id}) failed: {e}\n{traceback.format_exc()}")
+            async with AsyncSessionFactory() as session, session.begin():
+                await session.execute(
+                    update(EmployerProfilePurge).where(EmployerProfilePurge.id == purge_id)
+                    .values(last_error=f"{type(e).__name__}: {e}"[:1000])
+                )
+            continue
+        batch_budget -= batches_used
+        if is_finished:
+            finished += 1
+            print(f"DEBUG: Employer profile {profile_id} purged (purge {purge_id})")
+    return finished
+
+
+async def load_profile_purges(session, finished_limit: int = 5) -> tuple[list[PurgeProgress], list[PurgeProgress]]:
+    """(незавершенные очистки, последние завершенные) для админки."""
+    columns = (
+        EmployerProfilePurge.id, EmployerProfilePurge.employer_profile_id, EmployerProfilePurge.company_name,
+        EmployerProfilePurge.reason, EmployerProfilePurge.requested_at, EmployerProfilePurge.deleted_cooldowns,
+        EmployerProfilePurge.deleted_interactions, EmployerProfilePurge.deleted_complaints,
+        EmployerProfilePurge.finished_at, EmployerProfilePurge.last_error,
+    )
+    pending_rows = (await session.execute(
+        select(*columns).where(EmployerProfilePurge.finished_at.is_(None)).order_by(EmployerProfilePurge.requested_at)
+    )).all()
+    finished_rows = (await session.execute(
+        select(*columns).where(EmployerProfilePurge.finished_at.is_not(None))
+        .order_by(EmployerProfilePurge.finished_at.desc()).limit(finished_limit)
+    )).all()
+    return [PurgeProgress(*row) for row in pending_rows], [PurgeProgress(*row) for row in finished_rows]
+
+
+def format_purge_progress(purge: PurgeProgress) -> str:
+    status = "готово" if purge.finished_at else "в очереди"
+    text = (
+        f"#{purge.id} анкета {purge.employer_profile_id} ({purge.company_name or '-'}), {purge.reason}: {status}\n"
+        f"   удалено: кулдаунов {purge.deleted_cooldowns}, взаимодействий {purge.deleted_interactions}, "
+        f"жалоб {purge.deleted_complaints}"
+    )
+    if purge.last_error and not purge.finished_at:
+        text += f"\n   последняя ошибка: {purge.last_error[:200]}"
+    return text
@@ -2,11 +2,20 @@
 from datetime import datetime, timedelta, timezone
 import random
 from aiogram import Bot
-from sqlalchemy import select, update, or_, and_, delete
+from sqlalchemy import select, update, or_, and_
 import asyncio
-from app.db.database import AsyncSessionFactory
+from app.db.database import AsyncSessionFactory, get_pool_metrics, read_session_scope, refresh_replica_lag
+from app.db.pool_metrics import format_pool_metrics
+from app.middlewares.dedupe_middleware import get_update_dedupe_stats, format_update_dedupe_stats
+from app.config import DB_REPLICA_MAX_LAG_SECONDS
 from app.db.models import User, UserRole, ApplicantProfile, EmployerProfile
 from app.handlers.registration_handlers import is_user_subscribed_to_channel
+from app.services.analytics_service import rollup_funnel_interactions
+from app.services.cooldown_service import purge_expired_cooldowns
+from app.services.interaction_retention_service import apply_interaction_retention
+from app.services.profile_purge_service import soft_delete_employer_profiles, run_pending_profile_purges
+from app.services.motivation_service import flush_motivation_usage
+from app.services.photo_service import clear_broken_photos
 
 _user_last_reengagement_indices = {} 
 
@@ -113,7 +122,8 @@ async def check_and_send_reengagement_notifications(bot: Bot):
 
     users_to_notify_info = [] # Будем хранить {'user_id': id, 'reason': reason}
 
-    async with AsyncSessionFactory() as session, session.begin():
+    # Поиск кандидатов - только чтение, идет в реплику (если она настроена)
+    async with read_session_scope() as session:
         print("SCHEDULER JOB: Checking for users who stopped search...")
         
         # 1. Пользователи, остановившие поиск
@@ -216,32 +226,33 @@ async def daily_check_employers_subscription(bot: Bot):
     print(f"SCHEDULER: Running daily employer subscription check at {datetime.now(timezone.utc)}")
     unsubscribed_user_ids = []
 
-    async with AsyncSessionFactory() as session:
+    # Сначала только id: проверки подписки идут через Telegram с паузами, и снимок на реплике
+    # все это время держать нельзя (долгие запросы на hot standby конфликтуют с репликацией)
+    async with read_session_scope() as session:
         # Получаем всех пользователей с ролью Работодатель и активным профилем
-        result = await session.execute(
-            select(User).join(
+        employer_ids = (await session.execute(
+            select(User.telegram_id).join(
                 EmployerProfile, User.telegram_id == EmployerProfile.user_id # <-- УТОЧНЯЕМ УСЛОВИЕ JOIN
             ).where(
                 User.role == UserRole.EMPLOYER,
                 EmployerProfile.is_active == True
             )
-        )
-        employers = result.scalars().all()
+        )).scalars().all()
         
-        if not employers:
-            print("SCHEDULER: Subscription check finished. No active employers found.")
-            return
+    if not employer_ids:
+        print("SCHEDULER: Subscription check finished. No active employers found.")
+        return
 
-        print(f"SCHEDULER: Found {len(employers)} active employers to check.")
+    print(f"SCHEDULER: Found {len(employer_ids)} active employers to check.")
 
-        for employer in employers:
-            try:
-                is_subscribed = await is_user_subscribed_to_channel(employer.telegram_id, bot)
-                if not is_subscribed:
-                    unsubscribed_user_ids.append(employer.telegram_id)
-                await asyncio.sleep(0.1) 
-            except Exception as e:
-                print(f"SCHEDULER: Error checking user {employer.telegram_id}: {e}")
+    for employer_id in employer_ids:
+        try:
+            is_subscribed = await is_user_subscribed_to_channel(employer_id, bot)
+            if not is_subscribed:
+                unsubscribed_user_ids.append(employer_id)
+            await asyncio.sleep(0.1) 
+        except Exception as e:
+            print(f"SCHEDULER: Error checking user {employer_id}: {e}")
 
     if not unsubscribed_user_ids:
         print("SCHEDULER: Daily subscription check finished. All active employers are subscribed.")
@@ -249,22 +260,116 @@ async def daily_check_employers_subscription(bot: Bot):
 
     print(f"SCHEDULER: Found {len(unsubscribed_user_ids)} unsubscribed employers. Deleting their profiles...")
 
+    # Все изменения одной короткой транзакцией, уведомления - после коммита
     async with AsyncSessionFactory() as session, session.begin():
-        for user_id in unsubscribed_user_ids:
-            try:
-                # Удаляем анкету и сбрасываем роль
-                await session.execute(delete(EmployerProfile).where(EmployerProfile.user_id == user_id))
-                await session.execute(update(User).where(User.telegram_id == user_id).values(role=None))
-                
-                # Отправляем уведомление
-                await bot.send_message(
-                    chat_id=user_id,
-                    text="Вы не подписаны на канал, оформите подписку и тогда вы снова сможете получить доступ к боту"
-                )
-                print(f"SCHEDULER: Profile for user {user_id} deleted and notification sent.")
-            except Exception as e:
-                print(f"SCHEDULER: Could not process/notify user {user_id}. Maybe bot is blocked. Error: {e}")
-            
-            await asyncio.sleep(0.1)
+        # Скрываем анкеты (зависимые строки вычистит фоновая очистка) и сбрасываем роль
+        await soft_delete_employer_profiles(session, EmployerProfile.user_id.in_(unsubscribed_user_ids), reason="subscription_check")
+        await session.execute(update(User).where(User.telegram_id.in_(unsubscribed_user_ids)).values(role=None))
+
+    for user_id in unsubscribed_user_ids:
+        try:
+            # Отправляем уведомление
+            await bot.send_message(
+                chat_id=user_id,
+                text="Вы не подписаны на канал, оформите подписку и тогда вы снова сможете получить доступ к боту"
+            )
+            print(f"SCHEDULER: Profile for user {user_id} deleted and notification sent.")
+        except Exception as e:
+            print(f"SCHEDULER: Could not notify user {user_id}. Maybe bot is blocked. Error: {e}")
+        
+        await asyncio.sleep(0.1)
     
     print("SCHEDULER: Daily subscription check and processing of unsubscribed employers finished.")
+
+
+# --- МЕТРИКИ ПУЛА СОЕДИНЕНИЙ (выполняется в каждом воркере, у каждого свой пул) ---
+
+async def log_db_pool_metrics():
+    snapshot = get_pool_metrics(reset_window=True)
+    print(f"DB POOL METRICS: {format_pool_metrics(snapshot)}")
+    if snapshot["total_checkout_timeouts"] or snapshot["window_max_wait_ms"] > 500:
+        print(f"WARNING DB POOL: possible pool starvation, wait histogram: {snapshot['wait_histogram']}")
+
+
+async def log_update_dedupe_stats():
+    print(f"UPDATE DEDUPE (since start): {format_update_dedupe_stats(get_update_dedupe_stats())}")
+
+
+# --- ПОКАЗЫ МОТИВАЦИОННОГО КОНТЕНТА (в каждом воркере: буфер показов локален для процесса) ---
+
+async def flush_motivation_usage_counts():
+    try:
+        await flush_motivation_usage()
+    except Exception as e:
+        print(f"ERROR SCHEDULER: Motivation usage flush failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+# --- БИТЫЕ ФОТО (в каждом воркере: кэш неудач send_photo локален для процесса) ---
+
+async def check_broken_photos(bot: Bot):
+    try:
+        await clear_broken_photos(bot)
+    except Exception as e:
+        print(f"ERROR SCHEDULER: Broken photo check failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+# --- ОТСТАВАНИЕ РЕПЛИКИ (в каждом воркере: маршрутизация чтений локальна для процесса) ---
+
+async def check_replica_lag():
+    lag_seconds = await refresh_replica_lag()
+    if lag_seconds is not None and lag_seconds > DB_REPLICA_MAX_LAG_SECONDS:
+        print(f"WARNING DB REPLICA: lag {lag_seconds:.1f}s > {DB_REPLICA_MAX_LAG_SECONDS}s, reads go to primary")
+
+
+async def update_funnel_rollups():
+    try:
+        processed = await rollup_funnel_interactions()
+        if processed:
+            print(f"SCHEDULER: Funnel rollups updated, {processed} new interactions.")
+    except Exception as e:
+        print(f"ERROR SCHEDULER: Funnel rollup failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+# --- ОЧИСТКА ИСТЕКШИХ КУЛДАУНОВ ЛЕНТЫ (только шард 0) ---
+
+async def purge_feed_cooldowns():
+    try:
+        deleted = await purge_expired_cooldowns()
+        if deleted:
+            print(f"SCHEDULER: Purged {deleted} expired feed cooldowns.")
+    except Exception as e:
+        print(f"ERROR SCHEDULER: Cooldown purge failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+# --- АРХИВАЦИЯ СТАРЫХ ВЗАИМОДЕЙСТВИЙ (только шард 0) ---
+
+async def archive_old_interactions():
+    try:
+        moved, dropped_partitions = await apply_interaction_retention()
+        if moved or dropped_partitions:
+            print(f"SCHEDULER: Interaction retention: {moved} rows left the hot table, dropped partitions: {dropped_partitions}")
+    except Exception as e:
+        print(f"ERROR SCHEDULER: Interaction retention failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+# --- ФОНОВАЯ ОЧИСТКА УДАЛЕННЫХ АНКЕТ РАБОТОДАТЕЛЕЙ (только шард 0) ---
+
+async def purge_deleted_employer_profiles():
+    try:
+        finished = await run_pending_profile_purges()
+        if finished:
+            print(f"SCHEDULER: Purged {finished} deleted employer profiles.")
+    except Exception as e:
+        print(f"ERROR SCHEDULER: Employer profile purge failed: {e}")
+        import traceback
+        traceback.print_exc()
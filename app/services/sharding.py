@@ -0,0 +1,419 @@
+# app/services/sharding.py
+# Режим нескольких воркер-процессов: один ingress (polling или webhook) раскладывает
+# апдейты по воркерам через consistent-hash кольцо по telegram_id.
+# Каждый воркер держит свой Dispatcher, свое FSM-хранилище и свои in-memory кэши,
+# поэтому все апдейты одного пользователя всегда попадают в один и тот же процесс.
+#
+# Связь ingress <-> воркер - два однонаправленных Pipe на воркер (входящие апдейты/события и
+# исходящие события воркера). У каждого конца ровно один процесс-владелец, межпроцессных блокировок нет:
+# воркер, убитый посреди записи или чтения, не может заблокировать остальных. События между шардами
+# (post_primary_shard_event, post_all_shards_event) пересылает ingress.
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+from aiogram import Bot
+
+from app.config import (
+    BOT_TOKEN, SHARD_VIRTUAL_NODES, WORKER_LIVENESS_CHECK_SECONDS,
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET,
+)
+
+# Ключи апдейта, в которых лежит объект с полем "from" (отправитель)
+UPDATE_KEYS_WITH_SENDER = (
+    "message", "edited_message", "callback_query", "inline_query",
+    "chosen_inline_result", "shipping_query", "pre_checkout_query",
+    "my_chat_member", "chat_member", "chat_join_request", "poll_answer",
+)
+
+ShardEventHandler = Callable[..., Awaitable[Any]]
+
+# Адресат события "все шарды, кроме отправителя"
+ALL_OTHER_SHARDS = -1
+
+
+class ConsistentHashRing:
+    """Кольцо consistent hashing: telegram_id -> номер шарда (воркера)."""
+
+    def __init__(self, shard_count: int, virtual_nodes: int = SHARD_VIRTUAL_NODES):
+        self.shard_count = shard_count
+        self._ring_hashes: list[int] = []
+        self._ring_shards: list[int] = []
+        points = []
+        for shard_index in range(shard_count):
+            for vnode in range(virtual_nodes):
+                points.append((self._hash(f"shard-{shard_index}-vnode-{vnode}"), shard_index))
+        points.sort()
+        self._ring_hashes = [point_hash for point_hash, _ in points]
+        self._ring_shards = [shard_index for _, shard_index in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def get_shard(self, telegram_id: int) -> int:
+        if self.shard_count <= 1:
+            return 0
+        position = bisect.bisect(self._ring_hashes, self._hash(str(telegram_id)))
+        if position == len(self._ring_hashes):
+            position = 0
+        return self._ring_shards[position]
+
+
+# --- Состояние текущего процесса ---
+# None = однопроцессный режим, все события обрабатываются локально
+_current_shard_index: int | None = None
+_shard_ring: ConsistentHashRing | None = None
+_ingress_connection = None # Конец Pipe воркера для событий в другие шарды (пишет только этот процесс)
+_ingress_send_lock = threading.Lock()
+_shard_event_handlers: dict[str, ShardEventHandler] = {}
+
+
+def register_shard_event_handler(event_kind: str):
+    """Декоратор: регистрирует обработчик межшардового события (выполняется в шарде-владельце)."""
+    def decorator(func: ShardEventHandler) -> ShardEventHandler:
+        _shard_event_handlers[event_kind] = func
+        return func
+    return decorator
+
+
+def get_shard_event_handler(event_kind: str) -> ShardEventHandler | None:
+    return _shard_event_handlers.get(event_kind)
+
+
+def configure_shard(shard_index: int, shard_count: int, ingress_connection):
+    global _current_shard_index, _shard_ring, _ingress_connection
+    _current_shard_index = shard_index
+    _shard_ring = ConsistentHashRing(shard_count)
+    _ingress_connection = ingress_connection
+
+
+def get_owner_shard(telegram_id: int) -> int:
+    if _shard_ring is None:
+        return 0
+    return _shard_ring.get_shard(telegram_id)
+
+
+def is_primary_shard() -> bool:
+    """Синглтон-задачи (планировщик и т.п.) выполняются только в шарде 0."""
+    return _current_shard_index is None or _current_shard_index == 0
+
+
+def post_primary_shard_event(event_kind: str, **payload) -> bool:
+    """
+    Кладет событие в очередь шарда 0 (без ожидания обработки).
+    False - текущий процесс сам шард 0 или шардирование выключено: обрабатывать локально.
+    """
+    if _current_shard_index is None or _current_shard_index == 0:
+        return False
+    _send_to_ingress(0, event_kind, payload)
+    return True
+
+
+def post_all_shards_event(event_kind: str, **payload) -> bool:
+    """
+    Кладет событие в очереди всех остальных шардов (например, сброс локального кэша).
+    False - шардирование выключено, других процессов нет.
+    """
+    if _current_shard_index is None:
+        return False
+    _send_to_ingress(ALL_OTHER_SHARDS, event_kind, payload)
+    return True
+
+
+def _send_to_ingress(target_shard: int, event_kind: str, payload: dict):
+    # Сообщения маленькие, ingress читает их сразу: send не ждет
+    with _ingress_send_lock:
+        _ingress_connection.send(("event", target_shard, event_kind, payload))
+
+
+def extract_update_user_id(raw_update: dict) -> int | None:
+    for key in UPDATE_KEYS_WITH_SENDER:
+        event = raw_update.get(key)
+        if not event:
+            continue
+        sender = event.get("from") or event.get("user")
+        if sender and "id" in sender:
+            return sender["id"]
+        chat = event.get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+    return None
+
+
+def _dispatch_raw_update(raw_update: dict, ring: ConsistentHashRing, shard_links: list):
+    user_id = extract_update_user_id(raw_update)
+    # Апдейты без пользователя (редкие служебные) всегда уходят в шард 0
+    shard_index = ring.get_shard(user_id) if user_id is not None else 0
+    shard_links[shard_index].put(("update", raw_update))
+
+
+# --- Ingress (главный процесс) ---
+
+class ShardLink:
+    """
+    Отправка в воркер: put() не блокирует ingress, поток-отправитель пишет в Pipe по порядку.
+    При перезапуске воркера connect() подставляет новый Pipe; еще не отправленное уходит новому процессу.
+    """
+
+    def __init__(self, shard_index: int):
+        self.shard_index = shard_index
+        self._pending = queue.SimpleQueue()
+        self._connection = None
+        self._connected = threading.Condition()
+        threading.Thread(target=self._send_loop, name=f"shard-link-{shard_index}", daemon=True).start()
+
+    def put(self, item):
+        self._pending.put(item)
+
+    def connect(self, connection):
+        with self._connected:
+            old_connection, self._connection = self._connection, connection
+            self._connected.notify_all()
+        if old_connection is not None:
+            old_connection.close()
+
+    def _send_loop(self):
+        while True:
+            item = self._pending.get()
+            while True:
+                with self._connected:
+                    while self._connection is None:
+                        self._connected.wait()
+                    connection = self._connection
+                try:
+                    connection.send(item)
+                    break
+                except Exception as e:
+                    # Воркер умер (BrokenPipe) или Pipe уже заменен в connect(): ждем новый и повторяем
+                    print(f"ERROR INGRESS: Send to worker {self.shard_index} failed: {type(e).__name__}: {e}")
+                    with self._connected:
+                        if self._connection is connection:
+                            self._connection = None
+            if item is None: # Сигнал остановки воркера отправлен
+                return
+
+
+def _relay_worker_events(shard_index: int, connection, shard_links: list):
+    """Поток ingress: события воркера shard_index -> входящие Pipe шардов-адресатов."""
+    while True:
+        try:
+            _, target_shard, event_kind, payload = connection.recv()
+        except (EOFError, OSError): # Воркер завершился
+            connection.close()
+            return
+        if target_shard == ALL_OTHER_SHARDS:
+            for other_index, shard_link in enumerate(shard_links):
+                if other_index != shard_index:
+                    shard_link.put(("event", event_kind, payload))
+        else:
+            shard_links[target_shard].put(("event", event_kind, payload))
+
+async def _run_polling_ingress(ring: ConsistentHashRing, shard_links: list):
+    api_url = f"https://api.telegram.org/bot{BOT_TOKEN}/getUpdates"
+    offset = None
+    retry_delay = 1
+    # Апдейты разбираем только как JSON: pydantic-модели строятся уже в воркерах
+    async with aiohttp.ClientSession() as http_session:
+        print("INGRESS: Polling started.")
+        while True:
+            params = {"timeout": 30}
+            if offset is not None:
+                params["offset"] = offset
+            try:
+                async with http_session.get(api_url, params=params, timeout=aiohttp.ClientTimeout(total=45)) as response:
+                    payload = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"ERROR INGRESS: getUpdates failed: {type(e).__name__}: {e}. Retry in {retry_delay}s")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+                continue
+
+            if not payload.get("ok"):
+                print(f"ERROR INGRESS: getUpdates returned error: {payload.get('description')}. Retry in {retry_delay}s")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+                continue
+
+            retry_delay = 1
+            for raw_update in payload.get("result", []):
+                _dispatch_raw_update(raw_update, ring, shard_links)
+                offset = raw_update["update_id"] + 1
+
+
+async def _run_webhook_ingress(ring: ConsistentHashRing, shard_links: list):
+    from aiohttp import web
+
+    async def handle_webhook(request: web.Request) -> web.Response:
+        if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+            return web.Response(status=401)
+        raw_update = await request.json()
+        _dispatch_raw_update(raw_update, ring, shard_links)
+        return web.Response()
+
+    web_app = web.Application()
+    web_app.router.add_post(WEBHOOK_PATH, handle_webhook)
+    runner = web.AppRunner(web_app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    print(f"INGRESS: Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def _start_worker(mp_context, shard_index: int, worker_count: int, shard_links: list):
+    """Новые Pipe для воркера (старые после падения не переиспользуются) и сам процесс."""
+    inbox_reader, inbox_writer = mp_context.Pipe(duplex=False)
+    events_reader, events_writer = mp_context.Pipe(duplex=False)
+    process = mp_context.Process(
+        target=_worker_process_main,
+        args=(shard_index, worker_count, inbox_reader, events_writer),
+        name=f"bot-worker-{shard_index}",
+        daemon=True,
+    )
+    process.start()
+    # Концы воркера в ingress не нужны; закрываем, чтобы его смерть давала BrokenPipe/EOF, а не тишину
+    inbox_reader.close()
+    events_writer.close()
+    shard_links[shard_index].connect(inbox_writer)
+    threading.Thread(
+        target=_relay_worker_events, args=(shard_index, events_reader, shard_links),
+        name=f"shard-events-{shard_index}", daemon=True,
+    ).start()
+    return process
+
+
+async def _supervise_workers(mp_context, workers: list, shard_links: list):
+    """
+    Перезапускает упавшие воркеры с новыми Pipe. Апдейты и события, которые ingress еще не успел
+    отправить, достаются новому процессу. Потеряны те, что упавший воркер уже прочитал или что остались
+    в буфере его старого Pipe: offset getUpdates подтверждается до обработки, Telegram их не пришлет повторно.
+    """
+    while True:
+        await asyncio.sleep(WORKER_LIVENESS_CHECK_SECONDS)
+        for shard_index, process in enumerate(workers):
+            if process.is_alive():
+                continue
+            print(f"ERROR INGRESS: Worker {shard_index} (pid {process.pid}) died with exit code {process.exitcode}. Restarting; "
+                  f"updates it had already received are lost.")
+            workers[shard_index] = _start_worker(mp_context, shard_index, len(workers), shard_links)
+            print(f"INGRESS: Worker {shard_index} restarted (pid {workers[shard_index].pid}).")
+
+
+async def run_sharded_ingress(worker_count: int):
+    """Запускает worker_count воркер-процессов и единый ingress в текущем процессе."""
+    mp_context = multiprocessing.get_context("spawn")
+    shard_links = [ShardLink(shard_index) for shard_index in range(worker_count)]
+    ring = ConsistentHashRing(worker_count)
+
+    workers = [_start_worker(mp_context, shard_index, worker_count, shard_links) for shard_index in range(worker_count)]
+    print(f"INGRESS: Started {worker_count} worker processes.")
+    supervisor_task = asyncio.create_task(_supervise_workers(mp_context, workers, shard_links))
+
+    ingress_bot = Bot(token=BOT_TOKEN)
+    try:
+        if WEBHOOK_URL:
+            await ingress_bot.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET or None)
+            await ingress_bot.session.close()
+            await _run_webhook_ingress(ring, shard_links)
+        else:
+            await ingress_bot.delete_webhook()
+            await ingress_bot.session.close()
+            await _run_polling_ingress(ring, shard_links)
+    finally:
+        supervisor_task.cancel()
+        print("INGRESS: Stopping workers...")
+        for shard_link in shard_links:
+            shard_link.put(None)
+        for process in workers:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        print("INGRESS: Workers stopped.")
+
+
+# --- Воркер (дочерний процесс) ---
+
+def _worker_process_main(shard_index: int, shard_count: int, inbox, ingress_connection):
+    try:
+        asyncio.run(_run_worker(shard_index, shard_count, inbox, ingress_connection))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"ERROR WORKER {shard_index}: crashed: {e}", flush=True)
+        traceback.print_exc()
+        # Поток чтения может остаться в inbox.recv(), и обычный выход его ждал бы вечно.
+        # Процесс должен именно завершиться, чтобы ingress его перезапустил
+        os._exit(1)
+
+
+async def _process_raw_update(dp, bot: Bot, raw_update: dict, workflow_data: dict):
+    try:
+        await dp.feed_raw_update(bot, raw_update, **workflow_data)
+    except Exception as e:
+        print(f"ERROR WORKER {_current_shard_index}: update {raw_update.get('update_id')} failed: {e}")
+        traceback.print_exc()
+
+
+async def _process_shard_event(bot: Bot, event_kind: str, payload: dict):
+    handler = _shard_event_handlers.get(event_kind)
+    if handler is None:
+        print(f"ERROR SHARDING: No handler registered for event '{event_kind}'")
+        return
+    try:
+        await handler(bot, **payload)
+    except Exception as e:
+        print(f"ERROR WORKER {_current_shard_index}: event '{event_kind}' failed: {e}")
+        traceback.print_exc()
+
+
+async def _run_worker(shard_index: int, shard_count: int, inbox, ingress_connection):
+    configure_shard(shard_index, shard_count, ingress_connection)
+
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from app.bot import bot_instance, dp, setup_dispatcher  # Локальный импорт: воркер поднимает своего бота
+
+    setup_dispatcher()
+    scheduler = AsyncIOScheduler(timezone="Europe/Kyiv")
+    workflow_data = {
+        "dispatcher": dp,
+        "bots": [bot_instance],
+        **dp.workflow_data,
+        "scheduler_instance": scheduler,
+    }
+    await dp.emit_startup(bot=bot_instance, **workflow_data)
+    print(f"WORKER {shard_index}: started (pid {multiprocessing.current_process().pid}).")
+
+    loop = asyncio.get_running_loop()
+    running_tasks: set[asyncio.Task] = set()
+    try:
+        while True:
+            try:
+                item = await loop.run_in_executor(None, inbox.recv)
+            except EOFError: # Ingress завершился
+                break
+            if item is None:
+                break
+            if item[0] == "update":
+                task = asyncio.create_task(_process_raw_update(dp, bot_instance, item[1], workflow_data))
+            else:
+                task = asyncio.create_task(_process_shard_event(bot_instance, item[1], item[2]))
+            running_tasks.add(task)
+            task.add_done_callback(running_tasks.discard)
+    finally:
+        if running_tasks:
+            await asyncio.gather(*running_tasks, return_exceptions=True)
+        await dp.emit_shutdown(bot=bot_instance, **workflow_data)
+        if scheduler.running:
+            scheduler.shutdown()
+        await bot_instance.session.close()
+        print(f"WORKER {shard_index}: stopped.")
@@ -0,0 +1,73 @@
+# app/services/user_search_service.py
+# Поиск пользователей для админки по свободному тексту:
+# Telegram ID, @username, имя/фамилия, телефон, название компании.
+# Каждая ветка UNION попадает в свой триграммный GIN-индекс (см. models.py),
+# затем результат пагинируется keyset-ом по telegram_id.
+import re
+
+from sqlalchemy import select, union, or_
+
+from app.db.models import User, EmployerProfile, USER_PHONE_DIGITS
+from app.db.dto import UserSearchItem, USER_SEARCH_ITEM_COLUMNS
+from app.db.pagination import KeysetPage, fetch_keyset_page
+
+# Триграммный индекс помогает только с подстрокой от 3 символов
+MIN_SUBSTRING_SEARCH_LENGTH = 3
+MIN_PHONE_DIGITS_FOR_SEARCH = 5
+TELEGRAM_ID_MAX = 2**63 - 1
+
+
+def normalize_search_text(raw_text: str) -> str:
+    return raw_text.strip().lstrip("@").strip()
+
+LIKE_ESCAPE_CHAR = "!" # Не обратный слеш: его экранирование в литерале зависит от standard_conforming_strings
+
+def _escape_like(value: str) -> str:
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def build_user_search_ids_query(search_text: str):
+    """UNION telegram_id всех совпадений (None, если запрос пустой или слишком короткий)."""
+    search_text = normalize_search_text(search_text)
+    if not search_text:
+        return None
+
+    branches = []
+    digits_only = re.sub(r"[^0-9]", "", search_text)
+
+    # Точное совпадение по Telegram ID (по первичному ключу)
+    if search_text.isdigit() and int(search_text) <= TELEGRAM_ID_MAX:
+        branches.append(select(User.telegram_id).where(User.telegram_id == int(search_text)))
+
+    if len(search_text) >= MIN_SUBSTRING_SEARCH_LENGTH:
+        pattern = f"%{_escape_like(search_text)}%"
+        branches.append(select(User.telegram_id).where(User.username.ilike(pattern, escape=LIKE_ESCAPE_CHAR)))
+        branches.append(select(User.telegram_id).where(or_(
+            User.first_name.ilike(pattern, escape=LIKE_ESCAPE_CHAR), # BitmapOr по двум индексам
+            User.last_name.ilike(pattern, escape=LIKE_ESCAPE_CHAR)
+        )))
+        branches.append(
+            select(EmployerProfile.user_id.label("telegram_id"))
+            .where(EmployerProfile.user_id.is_not(None), EmployerProfile.company_name.ilike(pattern, escape=LIKE_ESCAPE_CHAR))
+        )
+
+    # Телефон: ищем по цифрам, если в запросе есть заметная цифровая часть ("+380 67 123-45-67", "671234567")
+    if len(digits_only) >= MIN_PHONE_DIGITS_FOR_SEARCH and not re.search(r"[^\d\s+()\-.]", search_text):
+        branches.append(select(User.telegram_id).where(USER_PHONE_DIGITS.like(f"%{digits_only}%")))
+
+    if not branches:
+        return None
+    return union(*branches)
+
+
+async def search_users(session, search_text: str, per_page: int = 5, cursor: str | None = None) -> KeysetPage:
+    matched_ids_query = build_user_search_ids_query(search_text)
+    if matched_ids_query is None:
+        return KeysetPage()
+    matched_ids = matched_ids_query.subquery("matched_user_ids")
+    query = (
+        select(*USER_SEARCH_ITEM_COLUMNS)
+        .outerjoin(EmployerProfile, EmployerProfile.user_id == User.telegram_id)
+        .where(User.telegram_id.in_(select(matched_ids.c.telegram_id)))
+    )
+    return await fetch_keyset_page(session, query, User.telegram_id, per_page, cursor=cursor, row_factory=UserSearchItem)
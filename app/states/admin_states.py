@@ -29,5 +29,13 @@ class AdminAddDummyEmployer(StatesGroup):
     waiting_for_photo = State()
     waiting_for_confirmation = State()
 
+class AdminImportDummyEmployers(StatesGroup):
+    waiting_for_file = State()
+
 class AdminReferralManagement(StatesGroup):
     waiting_for_name = State()
+
+class AdminBroadcast(StatesGroup):
+    waiting_for_segment = State()
+    waiting_for_message = State()
+    waiting_for_confirmation = State()
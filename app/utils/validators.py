@@ -1,19 +1,221 @@
-import re
-
-URL_REGEX = re.compile(
-    r'((?:(?:https?|ftp):\/\/)'
-    r'(?:\S+(?::\S*)?@)?'
-    r'(?:(?:[1-9]\d?|1\d\d|2[01]\d|22[0-3])'
-    r'(?:\.(?:1?\d{1,2}|2[0-4]\d|25[0-5])){2}'
-    r'(?:\.(?:[1-9]\d?|1\d\d|2[0-4]\d|25[0-4]))|'
-    r'(?:(?:[a-z\u00a1-\uffff0-9]+-?)*[a-z\u00a1-\uffff0-9]+)'
-    r'(?:\.(?:[a-z\u00a1-\uffff0-9]+-?)*[a-z\u00a1-\uffff0-9]+)*'
-    r'(?:\.(?:[a-z\u00a1-\uffff]{2,}))'
-    r')(?::\d{2,5})?'
-    r'(?:[\/?#]\S*)?)', re.IGNORECASE
-)
-
-def contains_urls(text: str) -> bool:
+# Поиск ссылок и контактов в пользовательском тексте (город, опыт, описание и т.п.).
+# Вместо большого URL-регэкспа с вложенными квантификаторами - однопроходные сканеры:
+# каждый символ просматривается константное число раз, поэтому время линейно
+# от длины текста на любом вводе (регэксп на длинных "a-a-a-..." уходил в откат).
+
+# Зоны, после которых "слово.слово" считаем доменом. Латинские зоны требуют латинских меток,
+# кириллические - кириллических: "в Киеве.In" или "кафе.com" доменом не считаются.
+KNOWN_TLDS = frozenset((
+    "com", "net", "org", "info", "biz", "me", "io", "co", "ly", "gl", "to", "tv", "cc", "ws", "gg", "ai",
+    "su", "ru", "ua", "by", "kz", "uz", "md", "ge", "am", "az", "kg", "tj", "lt", "lv", "ee", "pl", "de",
+    "uk", "us", "eu", "fr", "it", "es", "cz", "sk", "at", "ch", "nl", "be", "il", "in", "cn", "tk",
+    "app", "dev", "site", "online", "shop", "store", "pro", "link", "xyz", "top", "club", "live", "life",
+    "work", "world", "space", "tech", "website", "page", "click", "fun", "icu", "vip", "one", "pw",
+    "рф", "укр", "рус", "бел", "қаз", "срб", "мон", "ком", "орг", "онлайн", "сайт",
+))
+URL_MARKERS = ("http://", "https://", "ftp://", "www.")
+# Технологии и компании, которые пишутся как домен: в свободном тексте это не ссылка
+# (если нет пути после домена и это не адрес почты)
+NAME_LIKE_HOSTS = frozenset(("asp.net", "ado.net", "vb.net", "socket.io", "ukr.net", "booking.com"))
+
+# Маскировка точки: "site dot com", "site(dot)com", "t . me", "site[.]com"
+_DOT_WORDS = frozenset(("dot", "точка", "тчк", "(dot)", "[dot]", "(.)", "[.]", "."))
+_INLINE_DOT_REPLACEMENTS = (("(dot)", "."), ("[dot]", "."), ("(.)", "."), ("[.]", "."))
+
+TELEGRAM_HANDLE_MIN_LENGTH = 5
+TELEGRAM_HANDLE_MAX_LENGTH = 32
+PHONE_MAX_DIGITS = 15
+_PHONE_SEPARATORS = " -()."
+
+
+def _compact_for_hosts(text: str) -> tuple[str, bool]:
+    """
+    Нижний регистр, маскировки точки -> '.', пробелы вокруг отдельно стоящих '.' и '/' убраны.
+    Точку в конце или начале слова не склеиваем: "manager. In 2020" и "junior .NET" - обычный текст.
+    Второе значение - была ли в тексте маскировка точки.
+    """
+    lowered = text.lower()
+    has_masked_dot = False
+    for masked, plain in _INLINE_DOT_REPLACEMENTS:
+        if masked in lowered:
+            has_masked_dot = True
+            lowered = lowered.replace(masked, plain)
+
+    parts = []
+    previous = None
+    for token in lowered.split():
+        is_dot = token in _DOT_WORDS
+        if is_dot:
+            token = "."
+            has_masked_dot = True
+        if previous is not None:
+            glue = is_dot or previous == "." or token == "/" or previous == "/"
+            if not glue:
+                parts.append(" ")
+        parts.append(token)
+        previous = token
+    return "".join(parts), has_masked_dot
+
+
+def _is_label_char(char: str) -> bool:
+    return char.isalnum() or char == "-"
+
+def _label_script(label: str) -> str | None:
+    # "latin" / "cyrillic" / None (цифры, дефисы, смешанное)
+    has_latin = has_cyrillic = False
+    for char in label:
+        if "a" <= char <= "z":
+            has_latin = True
+        elif "а" <= char <= "я" or char in "ёіїєґқ":
+            has_cyrillic = True
+        elif not (char.isdigit() or char == "-"):
+            return None
+    if has_latin == has_cyrillic:
+        return None if has_latin else "digits"
+    return "latin" if has_latin else "cyrillic"
+
+def _looks_like_host(labels: list[str]) -> bool:
+    if len(labels) < 2 or labels[-1] not in KNOWN_TLDS:
+        return False
+    tld_script = _label_script(labels[-1])
+    for label in labels[:-1]:
+        script = _label_script(label.strip("-"))
+        if not label.strip("-") or script not in (tld_script, "digits"):
+            return False
+    # Хотя бы одна метка кроме зоны - не чисто цифровая ("2.ru" в тексте чаще опечатка)
+    return any(_label_script(label) == tld_script for label in labels[:-1])
+
+
+def _contains_host(compact: str, short_field: bool, has_masked_dot: bool) -> bool:
+    length = len(compact)
+    position = 0
+    while position < length:
+        if not _is_label_char(compact[position]):
+            position += 1
+            continue
+        # Цепочка меток через одиночные точки: label(.label)*
+        start = position
+        labels = []
+        while True:
+            end = position
+            while end < length and _is_label_char(compact[end]):
+                end += 1
+            labels.append(compact[position:end])
+            if end + 1 < length and compact[end] == "." and _is_label_char(compact[end + 1]):
+                position = end + 1
+                continue
+            position = end
+            break
+        if not _looks_like_host(labels):
+            continue
+        # Почта ("name@mail.ru"), путь ("site.com/vacancy") или маскировка точки - ссылка в любом поле
+        if has_masked_dot or (start > 0 and compact[start - 1] == "@") or (end < length and compact[end] == "/"):
+            return True
+        if short_field:
+            # "Booking.com", "ASP.NET" в названии/позиции - не ссылка, "jobs.site.com" - ссылка
+            if len(labels) > 2:
+                return True
+        elif ".".join(labels) not in NAME_LIKE_HOSTS:
+            return True
+    return False
+
+
+def contains_urls(text: str, short_field: bool = False) -> bool:
+    """
+    Ссылка в любом виде: со схемой, www., голый домен с известной зоной, замаскированный домен.
+    short_field - для коротких полей (компания, позиция, ЗП, город): голый "слово.зона" там чаще
+    название ("Booking.com"), поэтому ссылкой считается только домен с поддоменом, путем или маскировкой точки.
+    """
+    if not text:
+        return False
+    compact, has_masked_dot = _compact_for_hosts(text)
+    if any(marker in compact for marker in URL_MARKERS):
+        return True
+    return _contains_host(compact, short_field, has_masked_dot)
+
+
+def _contains_telegram_handle(text: str) -> bool:
+    lowered = text.lower()
+    length = len(lowered)
+    position = lowered.find("@")
+    while position != -1:
+        # "name@mail.ru" - это почта, ее ловит contains_urls
+        if position == 0 or not lowered[position - 1].isalnum():
+            start = position + 1
+            while start < length and lowered[start] == " ":
+                start += 1
+            end = start
+            while end < length and (("a" <= lowered[end] <= "z") or lowered[end].isdigit() or lowered[end] == "_"):
+                end += 1
+            if "a" <= lowered[start:start + 1] <= "z" and TELEGRAM_HANDLE_MIN_LENGTH <= end - start <= TELEGRAM_HANDLE_MAX_LENGTH:
+                return True
+        position = lowered.find("@", position + 1)
+    return False
+
+
+def _is_phone_number(digits: str, has_plus: bool) -> bool:
+    if has_plus:
+        return 10 <= len(digits) <= PHONE_MAX_DIGITS
+    return (
+        (len(digits) == 12 and digits.startswith("380"))
+        or (len(digits) == 10 and digits.startswith("0"))
+        or (len(digits) == 11 and digits[0] in "78")
+    )
+
+def _digit_groups_contain_phone(groups: list[str], plus_at_start: bool) -> bool:
+    # Окно из подряд идущих групп; в номере не больше 15 цифр, поэтому окно короткое
+    for start in range(len(groups)):
+        digits = ""
+        for index in range(start, len(groups)):
+            digits += groups[index]
+            if len(digits) > PHONE_MAX_DIGITS:
+                break
+            if _is_phone_number(digits, plus_at_start and start == 0):
+                return True
+    return False
+
+def _contains_phone(text: str) -> bool:
+    """
+    Номер - цепочка цифр с разделителями (пробел, дефис, скобки, точка) и подходящей длиной:
+    +XXXXXXXXXX..., 380XXXXXXXXX, 0XXXXXXXXX, 7/8XXXXXXXXXX.
+    " - " с пробелами рвет цепочку: "8 000 - 10 000" - это вилка зарплаты, а не телефон.
+    """
+    length = len(text)
+    position = 0
+    while position < length:
+        char = text[position]
+        if not ("0" <= char <= "9" or char == "+"):
+            position += 1
+            continue
+        plus_at_start = char == "+"
+        if plus_at_start:
+            position += 1
+        groups = []
+        current = []
+        while position < length:
+            char = text[position]
+            if "0" <= char <= "9":
+                current.append(char)
+            elif char in _PHONE_SEPARATORS:
+                if char == "-" and text[position - 1:position] == " " and text[position + 1:position + 2] == " ":
+                    break
+                if current:
+                    groups.append("".join(current))
+                    current = []
+            else:
+                break
+            position += 1
+        if current:
+            groups.append("".join(current))
+        if groups and _digit_groups_contain_phone(groups, plus_at_start):
+            return True
+        if position < length and text[position] == "-":
+            position += 1
+    return False
+
+
+def contains_contacts(text: str) -> bool:
+    """Ссылки, @username или номер телефона - для свободного текста (опыт, описание вакансии)."""
     if not text:
         return False
-    return bool(URL_REGEX.search(text))
+    return contains_urls(text) or _contains_telegram_handle(text) or _contains_phone(text)
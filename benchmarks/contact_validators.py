@@ -0,0 +1,47 @@
+# benchmarks/contact_validators.py
+# Время contains_contacts на враждебном вводе: длинные повторы фрагментов, на которых
+# регэкспы уходят в откат. Сканеры линейные, если ns/char почти не меняется от 10k до 1M символов.
+#
+#   python -m benchmarks.contact_validators
+import argparse
+import time
+
+from app.utils.validators import contains_contacts
+
+# Имя -> повторяемый фрагмент
+ADVERSARIAL_UNITS = {
+    "label-dash": "a-",
+    "label-dot": "a.",
+    "cyrillic-dash": "ё-",
+    "digit-space": "1 ",
+    "at-sign": "@a",
+    "dot-word": "x dot ",
+    "inline-dot": "a(dot)",
+    "plus-digit": "+1-",
+    "mix": "a-б.1 @ ",
+}
+
+
+def _adversarial_text(unit: str, length: int) -> str:
+    # Символ в конце ломает последнее совпадение - сканер доходит до конца строки
+    return (unit * (length // len(unit) + 1))[:length] + "!"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="contains_contacts ns/char on adversarial input")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'case':<14} " + " ".join(f"{length:>10}" for length in args.lengths) + "  (ns/char)")
+    for name, unit in ADVERSARIAL_UNITS.items():
+        timings = []
+        for length in args.lengths:
+            text = _adversarial_text(unit, length)
+            started = time.perf_counter()
+            contains_contacts(text)
+            timings.append((time.perf_counter() - started) / length * 1e9)
+        print(f"{name:<14} " + " ".join(f"{ns_per_char:>10.0f}" for ns_per_char in timings))
+
+
+if __name__ == "__main__":
+    main()
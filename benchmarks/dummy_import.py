@@ -0,0 +1,117 @@
+# benchmarks/dummy_import.py
+# Время вставки пустышек: INSERT ... VALUES пачками (как в import_dummy_employers)
+# против executemany (execute(insert(), список) - у asyncpg это INSERT на каждую строку).
+# Нужен отдельный (не боевой) Postgres в переменных DB_* - таблицы создаются в схеме
+# bench_dummy_import и удаляются в конце.
+#
+#   python -m benchmarks.dummy_import --rows 1000 10000
+import argparse
+import asyncio
+import os
+import time
+
+# Только основная БД: в схеме реплики бенчмарка нет
+os.environ["DB_REPLICA_HOST"] = ""
+
+BENCH_SCHEMA = "bench_dummy_import"
+
+
+def _use_bench_schema():
+    from sqlalchemy import event
+    from app.db.database import engine
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_search_path(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # public - для gin_trgm_ops из pg_trgm
+        cursor.execute(f"SET search_path TO {BENCH_SCHEMA}, public")
+        cursor.close()
+
+    return engine
+
+
+async def _prepare_schema(engine):
+    from sqlalchemy import text
+    from app.db.models import User, EmployerProfile
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+    # Новое соединение - уже с search_path на свежую схему
+    await engine.dispose()
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: User.metadata.create_all(sync_conn, tables=[User.__table__, EmployerProfile.__table__]))
+
+
+async def _truncate(engine):
+    from sqlalchemy import text
+
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE employer_profiles"))
+
+
+def _synthetic_rows(rows_count: int) -> list[tuple[int, dict]]:
+    return [
+        (row_number, {
+            "city": "Киев", "company_name": f"Компания {row_number}", "position": "Официант", "salary": "1000 грн",
+            "min_age_candidate": "18", "description": f"Описание вакансии номер {row_number}", "work_format": "Офлайн",
+        })
+        for row_number in range(2, rows_count + 2)
+    ]
+
+
+async def _time_executemany(rows: list[tuple[int, dict]]) -> float:
+    from sqlalchemy import insert
+    from app.config import DUMMY_IMPORT_BATCH_SIZE
+    from app.db.database import AsyncSessionFactory
+    from app.db.models import EmployerProfile
+    from app.services.dummy_import_service import validate_dummy_row
+
+    to_insert = [{**validate_dummy_row(row)[0], "user_id": None, "is_active": True, "is_dummy": True} for _, row in rows]
+    started = time.perf_counter()
+    async with AsyncSessionFactory() as session, session.begin():
+        for batch_start in range(0, len(to_insert), DUMMY_IMPORT_BATCH_SIZE):
+            await session.execute(insert(EmployerProfile), to_insert[batch_start:batch_start + DUMMY_IMPORT_BATCH_SIZE])
+    return time.perf_counter() - started
+
+
+async def _time_import(rows: list[tuple[int, dict]]) -> float:
+    from app.services.dummy_import_service import import_dummy_employers
+
+    started = time.perf_counter()
+    result = await import_dummy_employers(rows)
+    assert result.inserted == len(rows), result.errors[:5]
+    return time.perf_counter() - started
+
+
+async def _run_benchmark(rows_list: list[int]):
+    from sqlalchemy import text
+
+    engine = _use_bench_schema()
+    await _prepare_schema(engine)
+    try:
+        print(f"{'rows':>8} {'executemany s':>14} {'import (VALUES) s':>18}")
+        for rows_count in rows_list:
+            rows = _synthetic_rows(rows_count)
+            await _truncate(engine)
+            executemany_seconds = await _time_executemany(rows)
+            await _truncate(engine)
+            # Сюда входят и валидация, и проверка дублей - как у админа при загрузке файла
+            import_seconds = await _time_import(rows)
+            print(f"{rows_count:>8} {executemany_seconds:>14.2f} {import_seconds:>18.2f}")
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dummy employer import: multi-row VALUES vs executemany")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000])
+    args = parser.parse_args()
+    asyncio.run(_run_benchmark(args.rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# benchmarks/export_memory.py
+# Пиковая память export_to_gzip_csv("interactions") на миллионах строк.
+# Нужен отдельный (не боевой) Postgres в переменных DB_* - таблицы создаются в схеме
+# bench_export и удаляются в конце. Строки генерирует сам сервер (generate_series),
+# каждая выгрузка идет в отдельном процессе, чтобы ru_maxrss относился только к ней.
+#
+#   python -m benchmarks.export_memory --rows 1000000 2000000 5000000
+#
+# Выгрузка потоковая, если пиковый RSS почти не растет вместе с числом строк.
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# Только основная БД: в схеме реплики бенчмарка нет
+os.environ["DB_REPLICA_HOST"] = ""
+
+BENCH_SCHEMA = "bench_export"
+APPLICANTS_COUNT = 10_000
+EMPLOYERS_COUNT = 1_000
+EMPLOYER_ID_OFFSET = 1_000_000_000
+
+
+def _use_bench_schema():
+    from sqlalchemy import event
+    from app.db.database import engine
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_search_path(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # public - для gin_trgm_ops из pg_trgm
+        cursor.execute(f"SET search_path TO {BENCH_SCHEMA}, public")
+        cursor.close()
+
+    return engine
+
+
+async def _prepare_schema(engine):
+    from sqlalchemy import text
+    from app.db.database import Base
+    import app.db.models # noqa: F401 - регистрирует таблицы в Base.metadata
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+    # Новое соединение - уже с search_path на свежую схему
+    await engine.dispose()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "INSERT INTO users (telegram_id, first_name, role, is_banned) "
+            "SELECT i, 'applicant ' || i, 'APPLICANT'::userrole, false FROM generate_series(1, :applicants) AS i"
+        ), {"applicants": APPLICANTS_COUNT})
+        await conn.execute(text(
+            "INSERT INTO users (telegram_id, first_name, role, is_banned) "
+            "SELECT :offset + i, 'employer ' || i, 'EMPLOYER'::userrole, false FROM generate_series(1, :employers) AS i"
+        ), {"offset": EMPLOYER_ID_OFFSET, "employers": EMPLOYERS_COUNT})
+        await conn.execute(text(
+            "INSERT INTO employer_profiles (id, user_id, company_name, city, position, salary, description, work_format, is_active, is_dummy) "
+            "SELECT i, :offset + i, 'Компания ' || i, (ARRAY['Киев', 'Львов', 'Одесса', 'Днепр'])[1 + i % 4], "
+            "'Менеджер', '1000$', 'Описание вакансии', 'OFFLINE'::workformatenum, true, false FROM generate_series(1, :employers) AS i"
+        ), {"offset": EMPLOYER_ID_OFFSET, "employers": EMPLOYERS_COUNT})
+
+
+async def _grow_interactions(engine, rows_total: int):
+    from sqlalchemy import text
+
+    async with engine.begin() as conn:
+        await conn.execute(text("SET LOCAL statement_timeout = 0"))
+        current = (await conn.execute(text("SELECT count(*) FROM applicant_employer_interactions"))).scalar()
+        # Все строки просмотрены: частичный уникальный индекс непросмотренных лайков не мешает
+        await conn.execute(text(
+            "INSERT INTO applicant_employer_interactions "
+            "(id, applicant_user_id, employer_profile_id, interaction_type, question_text, created_at, is_viewed_by_employer) "
+            "SELECT i, 1 + i % :applicants, 1 + i % :employers, "
+            "(ARRAY['LIKE', 'DISLIKE', 'QUESTION_SENT'])[1 + i % 3]::interactiontypeenum, "
+            "CASE WHEN i % 3 = 2 THEN 'Какой график работы и есть ли обучение для новичков? #' || i END, "
+            "now() - (i % 365) * interval '1 day', true "
+            "FROM generate_series(:first_id, :last_id) AS i"
+        ), {"applicants": APPLICANTS_COUNT, "employers": EMPLOYERS_COUNT, "first_id": current + 1, "last_id": rows_total})
+        await conn.execute(text("ANALYZE applicant_employer_interactions"))
+
+
+async def _drop_schema(engine):
+    from sqlalchemy import text
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+    await engine.dispose()
+
+
+def _max_rss_mb() -> float:
+    # На Linux ru_maxrss - в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _run_export_child():
+    engine = _use_bench_schema()
+    from app.services.export_service import ExportFilters, export_to_gzip_csv
+
+    rss_before_mb = _max_rss_mb()
+    started = time.perf_counter()
+    result = await export_to_gzip_csv("interactions", ExportFilters())
+    elapsed = time.perf_counter() - started
+    file_mb = os.path.getsize(result.file_path) / (1024 * 1024)
+    os.remove(result.file_path)
+    await engine.dispose()
+    print(json.dumps({
+        "rows": result.rows_count, "seconds": round(elapsed, 1), "file_mb": round(file_mb, 1),
+        "rss_before_mb": round(rss_before_mb, 1), "peak_rss_mb": round(_max_rss_mb(), 1),
+    }))
+
+
+async def _run_benchmark(rows_list: list[int]):
+    engine = _use_bench_schema()
+    await _prepare_schema(engine)
+    try:
+        print(f"{'rows':>10} {'seconds':>8} {'file MB':>8} {'RSS before MB':>14} {'peak RSS MB':>12}")
+        for rows_total in sorted(rows_list):
+            await _grow_interactions(engine, rows_total)
+            child = subprocess.run(
+                [sys.executable, "-m", "benchmarks.export_memory", "--child"],
+                stdout=subprocess.PIPE, text=True, check=True,
+            )
+            # Последняя строка - JSON, выше - DEBUG-логи выгрузки
+            stats = json.loads(child.stdout.strip().splitlines()[-1])
+            print(f"{stats['rows']:>10} {stats['seconds']:>8} {stats['file_mb']:>8} {stats['rss_before_mb']:>14} {stats['peak_rss_mb']:>12}")
+    finally:
+        await _drop_schema(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of the interactions export on N synthetic rows")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 2_000_000, 5_000_000])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(_run_export_child())
+    else:
+        asyncio.run(_run_benchmark(args.rows))
+
+
+if __name__ == "__main__":
+    main()
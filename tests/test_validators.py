@@ -0,0 +1,105 @@
+import pytest
+
+from app.utils.validators import contains_urls, contains_contacts
+
+
+# Обычный текст: точка в конце предложения, названия технологий и компаний, зарплаты, даты
+PLAIN_TEXTS = [
+    "I worked as a manager. In 2020 I moved to Kyiv",
+    "Work with clients. It was fun",
+    "Looking for a job. To be honest",
+    "Python. It is great",
+    "junior .NET developer",
+    "Senior ASP.NET developer",
+    "Опыт 3 года. Me and my team",
+    "Работал в кафе. In general",
+    "Работаю официантом. Ищу работу",
+    "Работал в Booking.com 3 года",
+    "Знаю Socket.io и Node.js",
+    "Кафе.com",
+    "и т.д. Работал",
+    "г. Киев, ул.Ленина",
+    "опыт 2.5 года",
+    "v1.0",
+    "1.ru",
+    "01.02.2023",
+    "15 000 - 20 000 грн",
+    "8 000 - 10 000 - 12 000 грн",
+    "10000-15000",
+    "от 8000 до 12000 грн",
+    "Зарплата 30000 40000",
+    "@bob",
+    "email@",
+    "",
+]
+
+# Ссылки, в том числе с маскировкой точки
+URL_TEXTS = [
+    "http://x.ru",
+    "https://t.me/joe",
+    "www.site.com",
+    "go to t.me",
+    "мой сайт example.com.ua",
+    "my-shop.online",
+    "сайт кафе.рф",
+    "ivan@gmail.com",
+    "example.com / vacancy",
+    "site dot com",
+    "site(dot)com",
+    "site [.] com",
+    "site [dot] com",
+    "site точка com",
+    "сайт example тчк com",
+    "example . com",
+    "пиши на t . me / joe",
+]
+
+# Контакты без ссылок: ники и телефоны
+HANDLE_AND_PHONE_TEXTS = [
+    "@ivan_petrov",
+    "пиши @ ivan_petrov",
+    "0501234567",
+    "050 123 45 67",
+    "+380 (50) 123-45-67",
+    "8 (050) 123-45-67",
+    "380501234567",
+    "звони 097-123-45-67 после 18",
+    "+7 999 123 45 67",
+]
+
+
+@pytest.mark.parametrize("text", PLAIN_TEXTS)
+def test_plain_text_has_no_contacts(text):
+    assert not contains_urls(text)
+    assert not contains_contacts(text)
+
+
+@pytest.mark.parametrize("text", URL_TEXTS)
+def test_urls_are_found(text):
+    assert contains_urls(text)
+    assert contains_contacts(text)
+
+
+@pytest.mark.parametrize("text", HANDLE_AND_PHONE_TEXTS)
+def test_handles_and_phones_are_contacts(text):
+    assert not contains_urls(text)
+    assert contains_contacts(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Голый "слово.зона" в названии компании или позиции - это название
+    ("Booking.com", False),
+    ("ASP.NET", False),
+    ("Сервис.рф", False),
+    ("go to t.me", False),
+    ("I worked as a manager. In 2020", False),
+    # Поддомен, путь, почта или маскировка точки - ссылка и в коротком поле
+    ("jobs.site.com", True),
+    ("site.com/vacancy", True),
+    ("ivan@mail.ru", True),
+    ("site dot com", True),
+    ("t . me / joe", True),
+    ("https://booking.com", True),
+])
+def test_short_field(text, expected):
+    assert contains_urls(text, short_field=True) is expected